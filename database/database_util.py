@@ -12,7 +12,7 @@ import logging
 
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from sqlalchemy import or_, and_
+from sqlalchemy import or_, and_, case, false, func, tuple_
 
 # Use the unified session pattern (get_db_session) instead of make_local_session
 from database.db_util import get_db_session
@@ -553,6 +553,19 @@ class DatabaseOperations:
                     results.append(result)
                 return results
 
+    def bulk_update_mappings(self, model, mappings: List[Dict[str, Any]], session: Session = None) -> int:
+        """
+        One executemany UPDATE by primary key. Each mapping: {"id": ..., <field>: <value>, ...}.
+        Unlike bulk_update_records, does not re-fetch or commit.
+        """
+        if not mappings:
+            return 0
+        if session is None:
+            with get_db_session() as new_session:
+                return self.bulk_update_mappings(model, mappings, session=new_session)
+        session.bulk_update_mappings(model, mappings)
+        return len(mappings)
+
     # endregion (GENERIC BULK/BATCH OPERATIONS)
 
     # region ACCOUNT CODE
@@ -765,7 +778,8 @@ class DatabaseOperations:
             self.logger.info(f"🤷 No close matches found for '{contact_name}'.")
             return None
 
-    def _is_one_edit_away(self, s1: str, s2: str) -> bool:
+    @staticmethod
+    def _is_one_edit_away(s1: str, s2: str) -> bool:
         """
         Determines if two strings are at most one edit away from each other.
         """
@@ -953,6 +967,21 @@ class DatabaseOperations:
     def bulk_update_detail_items(self, updates: List[Dict[str, Any]], session: Session = None):
         return self.bulk_update_records(DetailItem, updates, session=session)
 
+    def bulk_update_detail_item_pulse_ids(self, mappings: List[Dict[str, Any]], session: Session = None) -> int:
+        """
+        Writes Monday pulse_id / parent_pulse_id back for many detail items in ONE
+        executemany UPDATE. Each mapping: {"id", "pulse_id", "parent_pulse_id"}.
+        """
+        if not mappings:
+            return 0
+        if session is None:
+            from database.db_util import get_db_session
+            with get_db_session() as new_session:
+                return self.bulk_update_detail_item_pulse_ids(mappings, session=new_session)
+        session.bulk_update_mappings(DetailItem, mappings)
+        self.logger.info(f"🔗 Stored Monday pulse ids for {len(mappings)} detail item(s).")
+        return len(mappings)
+
     def bulk_delete_detail_items(self, record_ids: List[int], session: Session = None) -> bool:
         return self.bulk_delete_records(DetailItem, record_ids, session=session)
 
@@ -1032,6 +1061,122 @@ class DatabaseOperations:
         return self.bulk_has_changes(Invoice, checks, session=session)
     # endregion
 
+    # region RECONCILIATION
+    INVOICE_PAYMENT_TYPES = ('INV', 'PROF', 'PROJ')
+    INVOICE_FINAL_STATES = ('RECONCILED', 'PAID')
+
+    def reconcile_invoices(self, invoice_ids: List[int], session: Session = None) -> List[Dict[str, Any]]:
+        """
+        Set-based RTP / PO MISMATCH evaluation for many invoices at once.
+
+        Detail items belong to an invoice when (project_number, po_number) match and
+        detail_number == invoice_number (same linking rule as the detail aggregator).
+          1) ONE aggregate query sums the non-final detail items of every invoice.
+          2) ONE UPDATE sets state='RTP' where the sum equals the invoice total and
+             'PO MISMATCH' otherwise, touching only rows whose state actually changes
+             (so unchanged rows don't fire detail_item audit triggers).
+
+        Database errors propagate (the caller's session is left for the caller to roll back).
+
+        Returns one summary dict per invoice found:
+          {invoice_id, project_number, po_number, invoice_number, invoice_total,
+           detail_total, detail_count, state}
+        where state is None when the invoice has no open detail items.
+        """
+        if not invoice_ids:
+            return []
+        if session is None:
+            with get_db_session() as new_session:
+                return self.reconcile_invoices(invoice_ids, session=new_session)
+
+        prefix = "[BATCH OPERATION] "
+        detail_key = tuple_(DetailItem.project_number, DetailItem.po_number, DetailItem.detail_number)
+        open_detail_filters = and_(
+            func.upper(DetailItem.payment_type).in_(self.INVOICE_PAYMENT_TYPES),
+            DetailItem.state.notin_(self.INVOICE_FINAL_STATES)
+        )
+
+        try:
+            # 1) Aggregate open detail items per invoice
+            rows = (
+                session.query(
+                    Invoice.id,
+                    Invoice.project_number,
+                    Invoice.po_number,
+                    Invoice.invoice_number,
+                    func.coalesce(Invoice.total, 0),
+                    func.coalesce(func.sum(DetailItem.sub_total), 0),
+                    func.count(DetailItem.id)
+                )
+                .outerjoin(
+                    DetailItem,
+                    and_(
+                        DetailItem.project_number == Invoice.project_number,
+                        DetailItem.po_number == Invoice.po_number,
+                        DetailItem.detail_number == Invoice.invoice_number,
+                        open_detail_filters
+                    )
+                )
+                .filter(Invoice.id.in_(list(invoice_ids)))
+                .group_by(Invoice.id, Invoice.project_number, Invoice.po_number, Invoice.invoice_number, Invoice.total)
+                .all()
+            )
+
+            summaries = []
+            rtp_keys = []
+            mismatch_keys = []
+            for inv_id, project_number, po_number, invoice_number, invoice_total, detail_total, detail_count in rows:
+                state = None
+                if detail_count:
+                    key = (project_number, po_number, invoice_number)
+                    if abs(float(detail_total) - float(invoice_total)) < 0.0001:
+                        state = 'RTP'
+                        rtp_keys.append(key)
+                    else:
+                        state = 'PO MISMATCH'
+                        mismatch_keys.append(key)
+                summaries.append({
+                    'invoice_id': inv_id,
+                    'project_number': project_number,
+                    'po_number': po_number,
+                    'invoice_number': invoice_number,
+                    'invoice_total': float(invoice_total),
+                    'detail_total': float(detail_total),
+                    'detail_count': detail_count,
+                    'state': state
+                })
+
+            # 2) One set-based UPDATE for every invoice evaluated above
+            updated = 0
+            if rtp_keys or mismatch_keys:
+                in_rtp = detail_key.in_(rtp_keys) if rtp_keys else false()
+                in_mismatch = detail_key.in_(mismatch_keys) if mismatch_keys else false()
+                updated = (
+                    session.query(DetailItem)
+                    .filter(open_detail_filters)
+                    .filter(or_(
+                        and_(in_rtp, DetailItem.state != 'RTP'),
+                        and_(in_mismatch, DetailItem.state != 'PO MISMATCH')
+                    ))
+                    .update(
+                        {DetailItem.state: case((in_rtp, 'RTP'), else_='PO MISMATCH')},
+                        synchronize_session=False
+                    )
+                )
+                session.flush()
+
+            self.logger.info(
+                f"{prefix}🧮 Reconciled {len(summaries)} invoice(s): {len(rtp_keys)} RTP, "
+                f"{len(mismatch_keys)} PO MISMATCH, {updated} detail item(s) changed."
+            )
+            return summaries
+        except Exception as e:
+            # Propagate: an empty result would read as "invoice not found", and the
+            # session belongs to the caller, who decides whether to roll back.
+            self.logger.error(f"{prefix}💥 Error reconciling invoices {invoice_ids}: {e}", exc_info=True)
+            raise
+    # endregion
+
     # endregion (INVOICE)
 
     # region PO LOG
@@ -1285,6 +1430,21 @@ class DatabaseOperations:
             val_filters.append(po_number)
         return self.search_purchase_orders(col_filters, val_filters, session=session)
 
+    def get_purchase_orders_by_keys(self, keys: List[tuple], session: Session = None) -> List[Dict[str, Any]]:
+        """
+        Every PurchaseOrder whose (project_number, po_number) is in `keys`, in one query.
+        """
+        keys = list({(int(p), int(po)) for p, po in keys})
+        if not keys:
+            return []
+        if session is None:
+            with get_db_session() as new_session:
+                return self.get_purchase_orders_by_keys(keys, session=new_session)
+        records = session.query(PurchaseOrder).filter(
+            tuple_(PurchaseOrder.project_number, PurchaseOrder.po_number).in_(keys)
+        ).all()
+        return [self._serialize_record(r) for r in records]
+
     def create_purchase_order_by_keys(self, project_number: int, po_number: int, session: Session = None, **kwargs):
         project_record = self.search_projects(['project_number'], [str(project_number)], session=session)
         if not project_record:
@@ -1900,6 +2060,41 @@ class DatabaseOperations:
     def bulk_delete_xero_bills(self, record_ids: List[int], session: Session = None) -> bool:
         return self.bulk_delete_records(XeroBill, record_ids, session=session)
 
+    def get_xero_bill_snapshot(self, project_number: int, po_number: int = None, session: Session = None) -> tuple:
+        """
+        Every XeroBill and XeroBillLineItem of a project (optionally one PO) as dicts,
+        in one query per table. Returns (bills, line_items).
+        """
+        if session is None:
+            with get_db_session() as new_session:
+                return self.get_xero_bill_snapshot(project_number, po_number, session=new_session)
+        bill_query = session.query(XeroBill).filter(XeroBill.project_number == project_number)
+        line_query = session.query(XeroBillLineItem).filter(XeroBillLineItem.project_number == project_number)
+        if po_number is not None:
+            bill_query = bill_query.filter(XeroBill.po_number == po_number)
+            line_query = line_query.filter(XeroBillLineItem.po_number == po_number)
+        bills = [self._serialize_record(r) for r in bill_query.order_by(XeroBill.id).all()]
+        line_items = [self._serialize_record(r) for r in line_query.order_by(XeroBillLineItem.id).all()]
+        return bills, line_items
+
+    def bulk_insert_xero_bills(self, rows: List[Dict[str, Any]], session: Session = None) -> List[Dict[str, Any]]:
+        """
+        Multi-row INSERT ... RETURNING. Returns {'id', 'project_number', 'po_number', 'detail_number'} per new bill.
+        """
+        if not rows:
+            return []
+        if session is None:
+            with get_db_session() as new_session:
+                return self.bulk_insert_xero_bills(rows, session=new_session)
+        from sqlalchemy import insert
+        result = session.execute(
+            insert(XeroBill).returning(
+                XeroBill.id, XeroBill.project_number, XeroBill.po_number, XeroBill.detail_number
+            ),
+            rows
+        )
+        return [dict(r._mapping) for r in result]
+
     def bulk_xero_bill_has_changes(self, checks: List[Dict[str, Any]], session: Session = None) -> List[bool]:
         return self.bulk_has_changes(XeroBill, checks, session=session)
     # endregion
@@ -2049,6 +2244,19 @@ class DatabaseOperations:
 
     def bulk_xero_bill_line_item_has_changes(self, checks: List[Dict[str, Any]], session: Session = None) -> List[bool]:
         return self.bulk_has_changes(XeroBillLineItem, checks, session=session)
+
+    def bulk_insert_xero_bill_line_items(self, rows: List[Dict[str, Any]], session: Session = None) -> int:
+        """
+        One executemany INSERT (no per-row flush or re-fetch). Returns the number of rows.
+        """
+        if not rows:
+            return 0
+        if session is None:
+            with get_db_session() as new_session:
+                return self.bulk_insert_xero_bill_line_items(rows, session=new_session)
+        from sqlalchemy import insert
+        session.execute(insert(XeroBillLineItem), rows)
+        return len(rows)
     # endregion
 
     # endregion (XERO BILL LINE ITEM)
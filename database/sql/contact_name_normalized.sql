@@ -0,0 +1,9 @@
+-- Unique normalized vendor name (see files_budget/vendor_resolver.py).
+-- Existing duplicates must be merged first; list them with:
+--   SELECT lower(regexp_replace(btrim(name), '\s+', ' ', 'g')) AS normalized, array_agg(id)
+--   FROM contact GROUP BY 1 HAVING count(*) > 1;
+CREATE UNIQUE INDEX IF NOT EXISTS uq_contact_name_normalized
+    ON contact (lower(regexp_replace(btrim(name), '\s+', ' ', 'g')));
+
+-- Incremental resolver refreshes read contacts changed since a watermark
+CREATE INDEX IF NOT EXISTS ix_contact_updated_at ON contact (updated_at);
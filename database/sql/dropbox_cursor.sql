@@ -0,0 +1,25 @@
+-- Named Dropbox list_folder cursors (see files_dropbox/dropbox_cursor_store.py)
+CREATE TABLE IF NOT EXISTS dropbox_cursor (
+    id              BIGSERIAL PRIMARY KEY,
+    name            VARCHAR(512) NOT NULL UNIQUE,
+    cursor          TEXT,
+    last_success_at TIMESTAMP,
+    created_at      TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at      TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Webhook changes recorded once per (path, rev) (see files_dropbox/dropbox_change_consumer.py)
+CREATE TABLE IF NOT EXISTS dropbox_change (
+    id            BIGSERIAL PRIMARY KEY,
+    path_lower    VARCHAR(1024) NOT NULL,
+    rev           VARCHAR(64) NOT NULL,
+    path_display  VARCHAR(1024) NOT NULL,
+    file_type     VARCHAR(32),
+    status        VARCHAR(16) NOT NULL DEFAULT 'recorded',
+    claimed_at    TIMESTAMP,
+    created_at    TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT uq_dropbox_change_path_rev UNIQUE (path_lower, rev)
+);
+
+CREATE INDEX IF NOT EXISTS ix_dropbox_change_status ON dropbox_change (status);
+CREATE INDEX IF NOT EXISTS ix_dropbox_change_created_at ON dropbox_change (created_at);
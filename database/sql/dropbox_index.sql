@@ -0,0 +1,33 @@
+-- Local mirror of the Dropbox namespace (see files_dropbox/dropbox_index.py)
+DO $$ BEGIN
+    CREATE TYPE dropbox_index_tag_enum AS ENUM ('file', 'folder');
+EXCEPTION
+    WHEN duplicate_object THEN NULL;
+END $$;
+
+CREATE TABLE IF NOT EXISTS dropbox_index (
+    id                BIGSERIAL PRIMARY KEY,
+    dropbox_id        VARCHAR(64) UNIQUE,
+    tag               dropbox_index_tag_enum NOT NULL,
+    name              VARCHAR(255) NOT NULL,
+    path_lower        VARCHAR(1024) NOT NULL UNIQUE,
+    path_display      VARCHAR(1024) NOT NULL,
+    parent_path_lower VARCHAR(1024),
+    project_number    INTEGER,
+    po_number         INTEGER,
+    content_hash      VARCHAR(64),
+    rev               VARCHAR(64),
+    server_modified   TIMESTAMP,
+    shared_link       VARCHAR(255),
+    processed_content_hash VARCHAR(64),
+    processed_at      TIMESTAMP,
+    created_at        TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at        TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS ix_dropbox_index_parent_path_lower ON dropbox_index (parent_path_lower);
+CREATE INDEX IF NOT EXISTS ix_dropbox_index_project_po ON dropbox_index (project_number, po_number);
+
+-- Added for the project scanner: skip files whose current content was already processed
+ALTER TABLE dropbox_index ADD COLUMN IF NOT EXISTS processed_content_hash VARCHAR(64);
+ALTER TABLE dropbox_index ADD COLUMN IF NOT EXISTS processed_at TIMESTAMP;
@@ -0,0 +1,11 @@
+-- Per-vendor layouts for local invoice / receipt extraction (see files_dropbox/ocr_service.py)
+CREATE TABLE IF NOT EXISTS vendor_extraction_template (
+    id          BIGSERIAL PRIMARY KEY,
+    doc_type    VARCHAR(20)  NOT NULL,
+    vendor_key  VARCHAR(255) NOT NULL,
+    layout      JSONB        NOT NULL,
+    samples     INTEGER      NOT NULL DEFAULT 1,
+    created_at  TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at  TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT uq_vendor_extraction_template UNIQUE (doc_type, vendor_key)
+);
@@ -0,0 +1,22 @@
+-- Local mirror of Xero SPEND bank transactions (see files_xero/xero_spend_money_index.py)
+CREATE TABLE IF NOT EXISTS xero_spend_money_index (
+    id                  BIGSERIAL PRIMARY KEY,
+    bank_transaction_id VARCHAR(100) NOT NULL UNIQUE,
+    reference           VARCHAR(255),
+    project_number      INTEGER,
+    po_number           BIGINT,
+    detail_number       INTEGER,
+    line_number         INTEGER,
+    status              VARCHAR(45),
+    is_reconciled       BOOLEAN NOT NULL DEFAULT FALSE,
+    contact_xero_id     VARCHAR(100),
+    contact_name        VARCHAR(255),
+    total               NUMERIC(15, 2),
+    date                TIMESTAMP,
+    updated_date_utc    TIMESTAMP,
+    created_at          TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at          TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS ix_xero_spend_money_index_key
+    ON xero_spend_money_index (project_number, po_number, detail_number, line_number);
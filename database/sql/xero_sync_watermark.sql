@@ -0,0 +1,10 @@
+-- Per-entity watermarks for incremental Xero syncs (see files_xero/xero_sync_watermark.py)
+CREATE TABLE IF NOT EXISTS xero_sync_watermark (
+    id                BIGSERIAL PRIMARY KEY,
+    entity            VARCHAR(255) NOT NULL UNIQUE,
+    modified_since    TIMESTAMP,
+    last_success_at   TIMESTAMP,
+    last_full_sync_at TIMESTAMP,
+    created_at        TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at        TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
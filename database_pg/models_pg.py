@@ -2,10 +2,10 @@
 import logging
 from sqlalchemy import (
     Column, String, DateTime, ForeignKey, UniqueConstraint, Index,
-    text, Date, Integer, Numeric, BigInteger
+    text, Date, Integer, Numeric, BigInteger, Text, Boolean, func
 )
 
-from sqlalchemy.dialects.postgresql import ENUM
+from sqlalchemy.dialects.postgresql import ENUM, JSONB
 from sqlalchemy.orm import relationship
 from sqlalchemy.ext.declarative import declarative_base
 #TEST 222
@@ -57,6 +57,17 @@ class Contact(Base):
         cascade='all, delete-orphan'
     )
 
+    # Vendor names are unique once trimmed, whitespace-collapsed and lower-cased,
+    # so vendor_resolver can create-if-missing with INSERT ... ON CONFLICT.
+    __table_args__ = (
+        Index(
+            'uq_contact_name_normalized',
+            func.lower(func.regexp_replace(func.btrim(name), r'\s+', ' ', 'g')),
+            unique=True
+        ),
+        Index('ix_contact_updated_at', 'updated_at'),
+    )
+
     def to_dict(self):
         return {
             'id': self.id,
@@ -753,4 +764,227 @@ class Dropboxfolder(Base):
             'dropbox_path': self.dropbox_path,
             'share_link': self.share_link,
         }
-#endregion
\ No newline at end of file
+#endregion
+
+#region Dropbox Index
+class DropboxIndexEntry(Base):
+    """
+    Local mirror of the Dropbox namespace (folders and files), built by one recursive
+    listing and kept current from the webhook change cursor.
+    """
+    __tablename__ = 'dropbox_index'
+
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    dropbox_id = Column(String(64), nullable=True, unique=True)
+    tag = Column(ENUM('file', 'folder', name='dropbox_index_tag_enum'), nullable=False)
+    name = Column(String(255), nullable=False)
+    path_lower = Column(String(1024), nullable=False, unique=True)
+    path_display = Column(String(1024), nullable=False)
+    parent_path_lower = Column(String(1024), nullable=True)
+    project_number = Column(Integer, nullable=True)
+    po_number = Column(Integer, nullable=True)
+    content_hash = Column(String(64), nullable=True)
+    rev = Column(String(64), nullable=True)
+    server_modified = Column(DateTime, nullable=True)
+    shared_link = Column(String(255), nullable=True)
+    processed_content_hash = Column(String(64), nullable=True)
+    processed_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime, server_default=text('CURRENT_TIMESTAMP'))
+    updated_at = Column(DateTime, server_default=text('CURRENT_TIMESTAMP'), onupdate=text('CURRENT_TIMESTAMP'))
+
+    __table_args__ = (
+        Index('ix_dropbox_index_parent_path_lower', 'parent_path_lower'),
+        Index('ix_dropbox_index_project_po', 'project_number', 'po_number'),
+    )
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'dropbox_id': self.dropbox_id,
+            'tag': self.tag,
+            'name': self.name,
+            'path_lower': self.path_lower,
+            'path_display': self.path_display,
+            'parent_path_lower': self.parent_path_lower,
+            'project_number': self.project_number,
+            'po_number': self.po_number,
+            'content_hash': self.content_hash,
+            'rev': self.rev,
+            'server_modified': self.server_modified,
+            'shared_link': self.shared_link,
+            'processed_content_hash': self.processed_content_hash,
+            'processed_at': self.processed_at,
+            'created_at': self.created_at,
+            'updated_at': self.updated_at
+        }
+#endregion
+
+#region Dropbox Cursor
+class DropboxCursor(Base):
+    """
+    Named Dropbox list_folder cursors, e.g. one per project folder for delta rescans.
+    `last_success_at` is the watermark: the cursor only advances after a clean run.
+    """
+    __tablename__ = 'dropbox_cursor'
+
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    name = Column(String(512), nullable=False, unique=True)
+    cursor = Column(Text, nullable=True)
+    last_success_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime, server_default=text('CURRENT_TIMESTAMP'))
+    updated_at = Column(DateTime, server_default=text('CURRENT_TIMESTAMP'), onupdate=text('CURRENT_TIMESTAMP'))
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'name': self.name,
+            'cursor': self.cursor,
+            'last_success_at': self.last_success_at,
+            'created_at': self.created_at,
+            'updated_at': self.updated_at
+        }
+
+
+class DropboxChange(Base):
+    """
+    One row per file change consumed from the webhook cursor, keyed by (path, rev).
+    Recording is idempotent, so a change is dispatched once even if it is listed again.
+    """
+    __tablename__ = 'dropbox_change'
+    __table_args__ = (
+        UniqueConstraint('path_lower', 'rev', name='uq_dropbox_change_path_rev'),
+        Index('ix_dropbox_change_status', 'status'),
+        Index('ix_dropbox_change_created_at', 'created_at'),
+    )
+
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    path_lower = Column(String(1024), nullable=False)
+    rev = Column(String(64), nullable=False)
+    path_display = Column(String(1024), nullable=False)
+    file_type = Column(String(32), nullable=True)
+    status = Column(String(16), nullable=False, server_default='recorded')  # recorded | claimed | dispatched | skipped
+    claimed_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime, server_default=text('CURRENT_TIMESTAMP'))
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'path_lower': self.path_lower,
+            'rev': self.rev,
+            'path_display': self.path_display,
+            'file_type': self.file_type,
+            'status': self.status,
+            'claimed_at': self.claimed_at,
+            'created_at': self.created_at
+        }
+#endregion
+
+#region Xero Sync Watermark
+class XeroSyncWatermark(Base):
+    """
+    Per-entity watermark for incremental Xero syncs (e.g. 'bills:2416', 'contacts').
+    `modified_since` is the newest UpdatedDateUTC merged so far; `last_full_sync_at`
+    schedules the periodic full reconcile.
+    """
+    __tablename__ = 'xero_sync_watermark'
+
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    entity = Column(String(255), nullable=False, unique=True)
+    modified_since = Column(DateTime, nullable=True)
+    last_success_at = Column(DateTime, nullable=True)
+    last_full_sync_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime, server_default=text('CURRENT_TIMESTAMP'))
+    updated_at = Column(DateTime, server_default=text('CURRENT_TIMESTAMP'), onupdate=text('CURRENT_TIMESTAMP'))
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'entity': self.entity,
+            'modified_since': self.modified_since,
+            'last_success_at': self.last_success_at,
+            'last_full_sync_at': self.last_full_sync_at,
+            'created_at': self.created_at,
+            'updated_at': self.updated_at
+        }
+#endregion
+
+#region Xero Spend Money Index
+class XeroSpendMoneyIndexEntry(Base):
+    """
+    Local mirror of Xero SPEND bank transactions, keyed by BankTransactionID and indexed
+    by the (project, po, detail, line) parsed from their Reference.
+    """
+    __tablename__ = 'xero_spend_money_index'
+
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    bank_transaction_id = Column(String(100), nullable=False, unique=True)
+    reference = Column(String(255), nullable=True)
+    project_number = Column(Integer, nullable=True)
+    po_number = Column(BigInteger, nullable=True)
+    detail_number = Column(Integer, nullable=True)
+    line_number = Column(Integer, nullable=True)
+    status = Column(String(45), nullable=True)
+    is_reconciled = Column(Boolean, nullable=False, server_default=text('false'))
+    contact_xero_id = Column(String(100), nullable=True)
+    contact_name = Column(String(255), nullable=True)
+    total = Column(Numeric(15, 2), nullable=True)
+    date = Column(DateTime, nullable=True)
+    updated_date_utc = Column(DateTime, nullable=True)
+    created_at = Column(DateTime, server_default=text('CURRENT_TIMESTAMP'))
+    updated_at = Column(DateTime, server_default=text('CURRENT_TIMESTAMP'), onupdate=text('CURRENT_TIMESTAMP'))
+
+    __table_args__ = (
+        Index('ix_xero_spend_money_index_key', 'project_number', 'po_number', 'detail_number', 'line_number'),
+    )
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'bank_transaction_id': self.bank_transaction_id,
+            'reference': self.reference,
+            'project_number': self.project_number,
+            'po_number': self.po_number,
+            'detail_number': self.detail_number,
+            'line_number': self.line_number,
+            'status': self.status,
+            'is_reconciled': self.is_reconciled,
+            'contact_xero_id': self.contact_xero_id,
+            'contact_name': self.contact_name,
+            'total': self.total,
+            'date': self.date,
+            'updated_date_utc': self.updated_date_utc,
+            'created_at': self.created_at,
+            'updated_at': self.updated_at
+        }
+#endregion
+
+
+#region 🧾 Extraction Templates
+class VendorExtractionTemplate(Base):
+    """
+    Per-vendor document layout learned from confirmed extractions (see
+    files_dropbox/ocr_service.py LocalExtractor): the labels that precede the
+    total / date / terms and the date format the vendor prints.
+    """
+    __tablename__ = 'vendor_extraction_template'
+    __table_args__ = (UniqueConstraint('doc_type', 'vendor_key', name='uq_vendor_extraction_template'),)
+
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    doc_type = Column(String(20), nullable=False)
+    vendor_key = Column(String(255), nullable=False)
+    layout = Column(JSONB, nullable=False)
+    samples = Column(Integer, nullable=False, server_default='1')
+    created_at = Column(DateTime, server_default=text('CURRENT_TIMESTAMP'))
+    updated_at = Column(DateTime, server_default=text('CURRENT_TIMESTAMP'), onupdate=text('CURRENT_TIMESTAMP'))
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'doc_type': self.doc_type,
+            'vendor_key': self.vendor_key,
+            'layout': self.layout,
+            'samples': self.samples,
+            'created_at': self.created_at,
+            'updated_at': self.updated_at
+        }
+#endregion
@@ -8,6 +8,7 @@ from database.database_util import DatabaseOperations
 from files_dropbox.dropbox_service import DropboxService
 from files_monday.monday_service import monday_service
 from files_xero.xero_services import xero_services
+from files_budget.tax_code_resolver import tax_code_resolver
 from utilities.singleton import SingletonMeta
 # endregion
 
@@ -980,6 +981,30 @@ class BudgetService(metaclass=SingletonMeta):
                         self.logger.info("No contacts found for detail item linking.")
                 except Exception:
                     self.logger.exception("Error fetching contacts for detail item linking.", exc_info=True)
+
+            # 2.4.2.8: Resolve Tax Codes (one resolver call per chunk of account codes)
+            tax_code_map_OG = {}
+            for project_number in unique_project_numbers:
+                account_codes = sorted({
+                    str(d_item.get(field)).strip()
+                    for d_item in detail_items_input
+                    if d_item.get("project_number") == project_number
+                    for field in ("account_code", "account")
+                    if d_item.get(field)
+                })
+                for chunk in chunk_list(account_codes, chunk_size):
+                    resolved = tax_code_resolver.resolve_many(project_number, chunk, session=session)
+                    for code, tax_code in resolved.items():
+                        tax_code_map_OG[(int(project_number), code)] = tax_code
+            self.logger.info(f"🧾 Resolved {len(tax_code_map_OG)} account codes to tax codes.")
+
+            def lookup_tax_code(project_number, account_code):
+                if not account_code or project_number is None:
+                    return None
+                key = (int(project_number), str(account_code).strip())
+                if key in tax_code_map_OG:
+                    return tax_code_map_OG[key]
+                return tax_code_resolver.resolve(project_number, account_code, session=session)
             # endregion
 
             # region 2.4.3: In-Memory Processing for CC/PC and INV/PROF items
@@ -1058,7 +1083,7 @@ class BudgetService(metaclass=SingletonMeta):
                             sm_record["contact_id"] = parent_po["contact_id"]
                         account_code = d_item.get("account_code")
                         if account_code:
-                            sm_record["tax_code"] = self.get_tax_code_from_account_code(account_code)
+                            sm_record["tax_code"] = lookup_tax_code(d_item["project_number"], account_code)
                         spend_money_map_updated[key] = sm_record
                         self.logger.info(f"[SpendMoney: CREATE] Created new spend money for detail {key}")
                     else:
@@ -1080,7 +1105,7 @@ class BudgetService(metaclass=SingletonMeta):
                             account_code = d_item.get("account_code")
                             tax_code = None
                             if account_code:
-                                tax_code = self.get_tax_code_from_account_code(account_code)
+                                tax_code = lookup_tax_code(d_item["project_number"], account_code)
                             differences_found = False
                             if abs(existing_amount - sub_total) > 0.0001:
                                 differences_found = True
@@ -1199,7 +1224,7 @@ class BudgetService(metaclass=SingletonMeta):
                         for s in siblings:
                             s = transform_detail_item(s)
                             account_code = s.get("account_code")
-                            tax_code = self.get_tax_code_from_account_code(account_code)
+                            tax_code = lookup_tax_code(key[0], account_code)
 
                             sub_total = float(s.get("total") or 0.0)
                             line_item = {
@@ -1795,32 +1820,13 @@ class BudgetService(metaclass=SingletonMeta):
             self.logger.exception("Exception in parse_po_log_data.", exc_info=True)
             raise
 
-    def get_tax_code_from_account_code(self, param):
+    def get_tax_code_from_account_code(self, param, project_number=None):
+        """
+        Returns the tax code for an account code in the given project
+        (defaults to the project of the PO log being processed).
+        """
         try:
-            # Fetch the budget map ID for the project
-            project_record = self.db_ops.search_projects(["project_number"], [self.PROJECT_NUMBER])
-            if isinstance(project_record, list):
-                project_record = project_record[0]
-            budget_map_id = project_record.get("budget_map_id")
-
-            budget_account = self.db_ops.search_account_codes(["budget_map_id", "code"], [budget_map_id, param])
-            if isinstance(budget_account, list) and len(budget_account) > 0:
-                budget_account = budget_account[0]
-            else:
-                return None
-            tax_id = budget_account["tax_id"]
-            tax_account = self.db_ops.search_tax_accounts(["id"], [tax_id])
-
-            if not tax_account:
-                self.logger.warning(f"No tax account found for account code: {param}")
-                return None
-
-
-            if isinstance(tax_account, list):
-                tax_account = tax_account[0]
-
-
-            return tax_account["tax_code"]
+            return tax_code_resolver.resolve(project_number or self.PROJECT_NUMBER, param)
         except Exception:
             self.logger.exception("Exception in get_tax_code_from_account_code.", exc_info=True)
             return None
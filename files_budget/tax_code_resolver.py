@@ -0,0 +1,163 @@
+# region 1: Imports
+import logging
+import threading
+import time
+from typing import Dict, Iterable, Optional, Tuple
+
+import redis
+from sqlalchemy import String, and_, cast, func, or_
+from sqlalchemy.orm import Session
+
+from database.db_util import get_db_session
+from database_pg.models_pg import AccountCode, Project, TaxAccount
+from utilities.config import Config
+from utilities.singleton import SingletonMeta
+# endregion
+
+
+# region 2: TaxCodeResolver Class Definition
+class TaxCodeResolver(metaclass=SingletonMeta):
+    """
+    Resolves account codes to tax codes for a project.
+
+    The account_code -> tax_account -> tax_code mapping for a project's budget map
+    and tax ledger is loaded with ONE joined query and kept in memory, so the
+    aggregator and the triggers no longer issue project / account code / tax account
+    lookups for every detail item.
+
+    Each Celery worker process holds its own copy. `invalidate()` (wired to the
+    AccountCode, TaxAccount and BudgetMap audit triggers) clears the local copy and
+    bumps a generation counter in Redis (GENERATION_KEY); every process compares its
+    entries' generation with Redis on lookup, so all workers reload on their next
+    call. If Redis is unreachable, entries still expire after `ttl_seconds`.
+    """
+
+    GENERATION_KEY = 'tax_code_resolver:generation'
+    ALL_PROJECTS = 'all'
+
+    # region 2.1: Constructor
+    def __init__(self, ttl_seconds: int = 300):
+        self.logger = logging.getLogger('budget_logger')
+        self.ttl_seconds = ttl_seconds
+        self.redis = redis.Redis.from_url(Config.REDIS_URL)
+        self._lock = threading.Lock()
+        # project_number -> (loaded_at, generation, {account_code: tax_code})
+        self._cache: Dict[int, tuple] = {}
+        self.logger.info("🧾 TaxCodeResolver initialized!")
+    # endregion
+
+    # region 2.2: Public API
+    def resolve(self, project_number, account_code, session: Session = None) -> Optional[str]:
+        """
+        Returns the tax code for a single account code, or None if it is unmapped.
+        """
+        if not account_code:
+            return None
+        return self.resolve_many(project_number, [account_code], session=session).get(str(account_code).strip())
+
+    def resolve_many(self, project_number, account_codes: Iterable, session: Session = None) -> Dict[str, Optional[str]]:
+        """
+        Resolves many account codes at once. Returns {account_code: tax_code or None}.
+        Loads the project's mapping on the first call (or after invalidation/expiry)
+        and answers every other call from memory.
+        """
+        codes = {str(c).strip() for c in account_codes if c is not None and str(c).strip()}
+        if project_number is None or not codes:
+            return {c: None for c in codes}
+
+        mapping = self._get_project_map(int(project_number), session=session)
+        resolved = {c: mapping.get(c) for c in codes}
+        missing = [c for c, tax_code in resolved.items() if tax_code is None]
+        if missing:
+            self.logger.debug(f"🤷 No tax code for {len(missing)} account code(s) in project {project_number}: {missing}")
+        return resolved
+
+    def invalidate(self, project_number=None) -> None:
+        """
+        Drops the cached mapping for one project, or for every project when
+        project_number is None (AccountCode/TaxAccount/BudgetMap changes can
+        affect any project sharing the map or ledger), in every worker process.
+        """
+        field = self.ALL_PROJECTS if project_number is None else str(int(project_number))
+        try:
+            self.redis.hincrby(self.GENERATION_KEY, field, 1)
+        except redis.RedisError as e:
+            self.logger.warning(f"⚠️ Could not broadcast tax code invalidation; other workers refresh "
+                                f"within {self.ttl_seconds}s: {e}")
+        with self._lock:
+            if project_number is None:
+                self._cache.clear()
+                self.logger.info("🧹 TaxCodeResolver cache cleared for all projects.")
+            else:
+                self._cache.pop(int(project_number), None)
+                self.logger.info(f"🧹 TaxCodeResolver cache cleared for project {project_number}.")
+    # endregion
+
+    # region 2.3: Loading Helpers
+    def _get_project_map(self, project_number: int, session: Session = None) -> Dict[str, Optional[str]]:
+        generation = self._generation(project_number)
+        with self._lock:
+            cached = self._cache.get(project_number)
+            if cached and (time.monotonic() - cached[0]) < self.ttl_seconds and \
+                    (generation is None or cached[1] == generation):
+                return cached[2]
+
+        if session is not None:
+            mapping = self._load_project_map(project_number, session)
+        else:
+            with get_db_session() as new_session:
+                mapping = self._load_project_map(project_number, new_session)
+
+        with self._lock:
+            self._cache[project_number] = (time.monotonic(), generation, mapping)
+        return mapping
+
+    def _generation(self, project_number: int) -> Optional[Tuple]:
+        """
+        Current (all-projects, project) invalidation counters from Redis, or None if
+        Redis is unreachable (the TTL alone then bounds staleness).
+        """
+        try:
+            return tuple(self.redis.hmget(self.GENERATION_KEY, self.ALL_PROJECTS, str(project_number)))
+        except redis.RedisError as e:
+            self.logger.debug(f"⚠️ Tax code generation unavailable, relying on TTL: {e}")
+            return None
+
+    def _load_project_map(self, project_number: int, session: Session) -> Dict[str, Optional[str]]:
+        """
+        One joined query: project -> account codes of its budget map -> tax account
+        (restricted to the project's tax ledger when one is set). The project's map and
+        ledger ids are String columns, so they are compared as text: a non-numeric
+        value matches nothing instead of failing the query.
+        """
+        rows = (
+            session.query(AccountCode.code, TaxAccount.tax_code)
+            .join(Project, func.trim(Project.budget_map_id) == cast(AccountCode.budget_map_id, String))
+            .outerjoin(
+                TaxAccount,
+                and_(
+                    TaxAccount.id == AccountCode.tax_id,
+                    or_(
+                        Project.tax_ledger.is_(None),
+                        func.trim(Project.tax_ledger) == cast(TaxAccount.tax_ledger_id, String)
+                    )
+                )
+            )
+            .filter(Project.project_number == project_number)
+            .all()
+        )
+        mapping = {}
+        for code, tax_code in rows:
+            if code is None:
+                continue
+            key = str(code).strip()
+            # Prefer a mapped tax code if the same code appears more than once
+            if mapping.get(key) is None:
+                mapping[key] = tax_code
+        self.logger.info(f"📥 Loaded {len(mapping)} account code -> tax code mappings for project {project_number}.")
+        return mapping
+    # endregion
+
+# endregion
+
+tax_code_resolver = TaxCodeResolver()
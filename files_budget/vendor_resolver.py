@@ -0,0 +1,320 @@
+# region 1: Imports
+import logging
+import re
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from database.database_util import DatabaseOperations
+from database.db_util import get_db_session
+from database_pg.models_pg import Contact
+from utilities.singleton import SingletonMeta
+# endregion
+
+
+# region 2: Helpers
+def normalize_vendor_name(name: Optional[str]) -> str:
+    """
+    Trimmed, whitespace-collapsed, lower-cased vendor name. Must stay in step with
+    the `uq_contact_name_normalized` index expression on contact.
+    """
+    return re.sub(r'\s+', ' ', (name or '').strip()).lower()
+
+
+def _normalized_name_column():
+    return func.lower(func.regexp_replace(func.btrim(Contact.name), r'\s+', ' ', 'g'))
+# endregion
+
+
+# region 3: VendorResolver Class Definition
+class VendorResolver(metaclass=SingletonMeta):
+    """
+    Resolves vendor names to contact ids from memory.
+
+    Every contact is loaded ONCE into two structures:
+      - a hash index of normalized name -> contact id for exact matches, and
+      - fuzzy buckets keyed by (first character, name length), so the
+        one-edit-away fallback only compares names of length L-1..L+1 that start
+        with the same character instead of scanning every contact.
+
+    The index is kept current incrementally: the contact audit triggers call
+    `refresh()` / `forget()` for a single row, and every `refresh_seconds` the
+    resolver pulls the rows whose updated_at moved past its watermark (each Celery
+    worker process holds its own copy and only one of them receives the audit event).
+    The watermark cannot see deletes or merges made in another process, so a hit is
+    confirmed against the contact table before it is returned (stale ids are dropped
+    and the lookup retried), and the whole index is rebuilt every `rebuild_seconds`.
+
+    `resolve_or_create()` creates missing vendors with INSERT ... ON CONFLICT on the
+    normalized-name unique index, so concurrent workers never create duplicates.
+    """
+
+    # region 3.1: Constructor
+    def __init__(self, refresh_seconds: int = 60, rebuild_seconds: int = 3600):
+        self.logger = logging.getLogger('budget_logger')
+        self.refresh_seconds = refresh_seconds
+        self.rebuild_seconds = rebuild_seconds
+        self._lock = threading.RLock()
+        self._ids_by_name: Dict[str, Set[int]] = {}
+        self._name_by_id: Dict[int, str] = {}
+        self._buckets: Dict[Tuple[str, int], Set[str]] = {}
+        self._loaded = False
+        self._watermark: Optional[datetime] = None
+        self._checked_at = 0.0
+        self._built_at = 0.0
+        self.logger.info("👥 VendorResolver initialized!")
+    # endregion
+
+    # region 3.2: Public API
+    def resolve(self, vendor_name: str, session: Session = None) -> Optional[int]:
+        """
+        Returns the contact id for `vendor_name` (exact normalized match first, then
+        one-edit-away), or None if no contact matches.
+        """
+        return self.resolve_many([vendor_name], session=session).get(vendor_name)
+
+    def resolve_many(self, vendor_names: Iterable[str], session: Session = None) -> Dict[str, Optional[int]]:
+        """
+        Resolves many vendor names at once. Returns {vendor_name: contact_id or None}.
+        All index hits are confirmed with one query; names whose hit was deleted or
+        merged away in another process are dropped from the index and looked up again.
+        """
+        result = {name: None for name in vendor_names}
+        pending = {name: normalize_vendor_name(name) for name in result}
+        pending = {name: normalized for name, normalized in pending.items() if normalized}
+        if not pending:
+            return result
+        self._ensure_current(session=session)
+        while pending:
+            with self._lock:
+                hits = {name: self._lookup(normalized) for name, normalized in pending.items()}
+                hits = {name: self._fuzzy_match(pending[name]) if contact_id is None else contact_id
+                        for name, contact_id in hits.items()}
+            hits = {name: contact_id for name, contact_id in hits.items() if contact_id is not None}
+            existing = self._existing(set(hits.values()), session=session)
+            stale = set(hits.values()) - existing
+            for name, contact_id in hits.items():
+                if contact_id in existing:
+                    result[name] = contact_id
+            if not stale:
+                return result
+            self.logger.info(f"🧹 {len(stale)} contact(s) no longer exist; dropped from the resolver.")
+            with self._lock:
+                for contact_id in stale:
+                    self._remove(contact_id)
+            pending = {name: pending[name] for name, contact_id in hits.items() if contact_id in stale}
+        return result
+
+    def resolve_or_create(self, vendor_name: str, session: Session = None) -> Optional[int]:
+        """
+        Returns the matching contact id, creating a VENDOR contact when none matches.
+        """
+        contact_id = self.resolve(vendor_name, session=session)
+        if contact_id is not None or not normalize_vendor_name(vendor_name):
+            return contact_id
+
+        if session is None:
+            with get_db_session() as new_session:
+                return self._create(vendor_name, new_session)
+        return self._create(vendor_name, session)
+
+    def create_many(self, contacts: List[dict], session: Session) -> Dict[str, Tuple[int, bool]]:
+        """
+        Inserts contacts (dicts of Contact columns, 'name' required) with INSERT ... ON
+        CONFLICT DO NOTHING on the normalized-name index (one statement per column set); the first of several entries
+        with the same normalized name wins. Returns {normalized name: (contact id, created)}
+        where `created` is False for names that already existed. Errors propagate.
+        """
+        rows = {}
+        for contact in contacts:
+            normalized = normalize_vendor_name(contact.get('name'))
+            if normalized and normalized not in rows:
+                rows[normalized] = dict(contact, name=re.sub(r'\s+', ' ', contact['name'].strip()))
+        if not rows:
+            return {}
+
+        # A multi-row VALUES needs the same columns on every row
+        by_columns = {}
+        for row in rows.values():
+            by_columns.setdefault(tuple(sorted(row)), []).append(row)
+        result = {}
+        for batch in by_columns.values():
+            stmt = (
+                insert(Contact)
+                .values(batch)
+                .on_conflict_do_nothing(index_elements=[_normalized_name_column()])
+                .returning(Contact.id, Contact.name)
+            )
+            for contact_id, name in session.execute(stmt):
+                result[normalize_vendor_name(name)] = (contact_id, True)
+        existing = [normalized for normalized in rows if normalized not in result]
+        if existing:
+            query = session.query(Contact.id, Contact.name).filter(_normalized_name_column().in_(existing))
+            for contact_id, name in query:
+                result[normalize_vendor_name(name)] = (contact_id, False)
+        with self._lock:
+            for normalized, (contact_id, created) in result.items():
+                if created:
+                    self._add(contact_id, rows[normalized]['name'])
+        self.logger.info(f"🆕 Created {sum(created for _, created in result.values())} contact(s); "
+                         f"{len(existing)} already existed.")
+        return result
+
+    def refresh(self, contact_id: int, session: Session = None) -> None:
+        """
+        Re-reads one contact (audit create/update event) into the index.
+        """
+        if not self._loaded:
+            return
+        if session is None:
+            with get_db_session() as new_session:
+                return self.refresh(contact_id, session=new_session)
+        row = session.query(Contact.id, Contact.name).filter(Contact.id == contact_id).first()
+        with self._lock:
+            if row is None:
+                self._remove(contact_id)
+            else:
+                self._add(row.id, row.name)
+
+    def forget(self, contact_id: int) -> None:
+        """
+        Drops one contact (audit delete event) from the index.
+        """
+        with self._lock:
+            self._remove(contact_id)
+
+    def invalidate(self) -> None:
+        """
+        Drops the whole index; the next lookup reloads every contact.
+        """
+        with self._lock:
+            self._ids_by_name.clear()
+            self._name_by_id.clear()
+            self._buckets.clear()
+            self._loaded = False
+            self._watermark = None
+        self.logger.info("🧹 VendorResolver index cleared.")
+    # endregion
+
+    # region 3.3: Loading Helpers
+    def _ensure_current(self, session: Session = None) -> None:
+        with self._lock:
+            if self._loaded and (time.monotonic() - self._checked_at) < self.refresh_seconds:
+                return
+            if session is None:
+                with get_db_session() as new_session:
+                    self._load(new_session)
+            else:
+                self._load(session)
+
+    def _load(self, session: Session) -> None:
+        """
+        Full load on first use and every `rebuild_seconds`, otherwise only rows updated
+        since the watermark. Caller holds the lock.
+        """
+        if self._loaded and (time.monotonic() - self._built_at) >= self.rebuild_seconds:
+            self._ids_by_name.clear()
+            self._name_by_id.clear()
+            self._buckets.clear()
+            self._loaded = False
+            self._watermark = None
+        query = session.query(Contact.id, Contact.name, Contact.updated_at)
+        if self._loaded and self._watermark is not None:
+            # >= so rows sharing the watermark's timestamp are not missed
+            query = query.filter(Contact.updated_at >= self._watermark)
+        rows = query.all()
+        for contact_id, name, updated_at in rows:
+            self._add(contact_id, name)
+            if updated_at and (self._watermark is None or updated_at > self._watermark):
+                self._watermark = updated_at
+        if not self._loaded:
+            self._built_at = time.monotonic()
+            self.logger.info(f"📥 Loaded {len(self._ids_by_name)} vendor names into the resolver.")
+        elif rows:
+            self.logger.debug(f"🔄 Refreshed {len(rows)} changed contact(s) in the resolver.")
+        self._loaded = True
+        self._checked_at = time.monotonic()
+
+    def _existing(self, contact_ids: Set[int], session: Session = None) -> Set[int]:
+        """
+        The subset of `contact_ids` still present in the contact table, in one query.
+        """
+        if not contact_ids:
+            return set()
+        if session is None:
+            with get_db_session() as new_session:
+                return self._existing(contact_ids, session=new_session)
+        return {row.id for row in session.query(Contact.id).filter(Contact.id.in_(contact_ids))}
+
+    def _create(self, vendor_name: str, session: Session) -> Optional[int]:
+        normalized = normalize_vendor_name(vendor_name)
+        stmt = (
+            insert(Contact)
+            .values(name=re.sub(r'\s+', ' ', vendor_name.strip()), vendor_type='VENDOR')
+            .on_conflict_do_nothing(index_elements=[_normalized_name_column()])
+            .returning(Contact.id)
+        )
+        contact_id = session.execute(stmt).scalar()
+        if contact_id is None:
+            # Another worker created it first
+            contact_id = session.query(Contact.id).filter(_normalized_name_column() == normalized).scalar()
+        else:
+            self.logger.info(f"🆕 Created vendor contact '{vendor_name}' (id={contact_id}).")
+        if contact_id is not None:
+            with self._lock:
+                self._add(contact_id, vendor_name)
+        return contact_id
+    # endregion
+
+    # region 3.4: Index Helpers
+    def _add(self, contact_id: int, name: str) -> None:
+        normalized = normalize_vendor_name(name)
+        self._remove(contact_id)
+        if not normalized:
+            return
+        self._name_by_id[contact_id] = normalized
+        self._ids_by_name.setdefault(normalized, set()).add(contact_id)
+        self._buckets.setdefault((normalized[0], len(normalized)), set()).add(normalized)
+
+    def _remove(self, contact_id: int) -> None:
+        normalized = self._name_by_id.pop(contact_id, None)
+        if normalized is None:
+            return
+        ids = self._ids_by_name.get(normalized)
+        if ids is not None:
+            ids.discard(contact_id)
+            if ids:
+                return
+            del self._ids_by_name[normalized]
+        bucket = self._buckets.get((normalized[0], len(normalized)))
+        if bucket is not None:
+            bucket.discard(normalized)
+
+    def _lookup(self, normalized: str) -> Optional[int]:
+        # Oldest contact wins when legacy duplicates share a normalized name
+        ids = self._ids_by_name.get(normalized)
+        return min(ids) if ids else None
+
+    def _fuzzy_match(self, normalized: str) -> Optional[int]:
+        first, length = normalized[0], len(normalized)
+        matches = [
+            self._lookup(candidate)
+            for size in (length - 1, length, length + 1)
+            for candidate in self._buckets.get((first, size), ())
+            if DatabaseOperations._is_one_edit_away(normalized, candidate)
+        ]
+        if not matches:
+            return None
+        contact_id = min(matches)
+        self.logger.debug(f"🤏 Fuzzy vendor match for '{normalized}' => contact {contact_id}.")
+        return contact_id
+    # endregion
+
+# endregion
+
+vendor_resolver = VendorResolver()
@@ -7,6 +7,7 @@ import dropbox
 from dropbox import common
 from dropbox.files import FolderMetadata, FileMetadata
 from files_dropbox.dropbox_client import dropbox_client
+from files_dropbox.dropbox_index import dropbox_index
 from dropbox.exceptions import ApiError
 from utilities.singleton import SingletonMeta
 from utilities.config import Config
@@ -22,6 +23,7 @@ class DropboxAPI(metaclass=SingletonMeta):
             except AttributeError as err:
                 self.logger.error('Dropbox API error: {}'.format(err))
                 self.dbx = None
+            self.dropbox_index = dropbox_index
             self.TAX_FORM_REGEX = '(?i)\\b(w9)|(w8-ben)|(w8-bene)|(w8-ben-e)\\b'
 
     def upload_file(self, file_path: str, destination_path: str):
@@ -110,7 +112,9 @@ class DropboxAPI(metaclass=SingletonMeta):
 
     def get_po_tax_form_link(self, project_number: Optional[str]=None, po_number: Optional[str]=None) -> List[Dict[str, str]]:
         """
-        Retrieves PO folders and their shared links based on provided parameters.
+        Retrieves PO folders and their tax form links based on provided parameters.
+        Resolved from the local Dropbox index (see files_dropbox/dropbox_index.py);
+        shared links are created once and then stored on the index entry.
 
         Args:
             project_number (str, optional): The ID of the project. Defaults to None.
@@ -118,110 +122,36 @@ class DropboxAPI(metaclass=SingletonMeta):
 
         Returns:
             List[Dict[str, str]]: A list of dictionaries containing 'po_folder_name',
-                                    'po_folder_path', and 'po_folder_link'.
+                                    'po_folder_path', 'po_tax_form_link' and 'form_type'.
         """
+        if project_number is None and po_number is not None:
+            self.logger.error('[get_po_tax_form_link] - ❗ Invalid combination of parameters provided.')
+            return []
         project_po_data = []
         try:
-            if project_number is None:
-                self.logger.info("[get_po_tax_form_link] - 📁 No project_number provided. Retrieving all PO folders under the '2024' namespace.")
-                all_projects = self.list_all_projects(namespace='2024')
-                if not all_projects:
-                    self.logger.warning("[get_po_tax_form_link] - ⚠️ No projects found under the '2024' namespace.")
-                    return []
-                for project in all_projects:
-                    current_project_number = project['id']
-                    project_folder_path = project['path']
-                    po_base_path = f'{project_folder_path}/1. Purchase Orders'
-                    po_folders = self.list_project_po_folders(po_base_path)
-                    if not po_folders:
-                        self.logger.info(f"[get_po_tax_form_link] - ℹ️ No PO folders found for project_number={current_project_number} at '{po_base_path}'")
-                        continue
-                    for po_folder in po_folders:
-                        files = self.list_files_in_folder(po_folder['path'])
-                        tax_form_link = ''
-                        form_type = ''
-                        for file in files:
-                            match = re.search(self.TAX_FORM_REGEX, file['file_name'].lower(), re.IGNORECASE)
-                            if match:
-                                self.logger.info(f"[get_po_tax_form_link] - 💼 Identified as tax form: {file['file_name']}")
-                                tax_form_link = self.create_share_link(po_folder['path'])
-                                if match.group(1):
-                                    form_type = 'W-9'
-                                elif match.group(2):
-                                    form_type = 'W-8BEN'
-                                elif match.group(3):
-                                    form_type = 'W-8BEN-E'
-                                elif match.group(4):
-                                    form_type = 'W-8BEN-E'
-                                self.logger.info(f"[get_po_tax_form_link] - 💼 Identified as tax form: {file['file_name']} ({form_type})")
-                        project_po_data.append({'po_folder_name': po_folder['name'], 'po_folder_path': po_folder['path'], 'po_tax_form_link': tax_form_link, 'form_type': form_type})
-            elif project_number and po_number is None:
-                self.logger.info(f'[get_po_tax_form_link] - 📁 Retrieving PO folders for project_number={project_number}')
-                project_folder_path = self.find_project_folder(project_number)
-                if not project_folder_path:
-                    self.logger.warning(f'[get_po_tax_form_link] - ⚠️ Unable to find project folder for project_number={project_number}')
-                    return []
-                po_base_path = f'{project_folder_path}/1. Purchase Orders'
-                po_folders = self.list_project_po_folders(po_base_path)
-                if not po_folders:
-                    self.logger.info(f"[get_po_tax_form_link] - ℹ️ No PO folders found for project_number={project_number} at '{po_base_path}'")
-                    return []
-                for po_folder in po_folders:
-                    files = self.list_files_in_folder(po_folder['path'])
-                    tax_form_link = ''
-                    form_type = ''
-                    for file in files:
-                        match = re.search(self.TAX_FORM_REGEX, file['file_name'].lower(), re.IGNORECASE)
-                        if match:
-                            self.logger.info(f"[get_po_tax_form_link] - 💼 Identified as tax form: {file['file_name']}")
-                            tax_form_link = self.create_share_link(po_folder['path'])
-                            if match.group(1):
-                                form_type = 'W-9'
-                            elif match.group(2):
-                                form_type = 'W-8BEN'
-                            elif match.group(3):
-                                form_type = 'W-8BEN-E'
-                            elif match.group(4):
-                                form_type = 'W-8BEN-E'
-                            self.logger.info(f"[get_po_tax_form_link] - 💼 Identified as tax form: {file['file_name']} ({form_type})")
-                    project_po_data.append({'po_folder_name': po_folder['name'], 'po_folder_path': po_folder['path'], 'po_tax_form_link': tax_form_link, 'form_type': form_type})
-            elif project_number and po_number:
-                self.logger.info(f'[get_po_tax_form_link] - 📁 Retrieving PO folder for project_number={project_number} and po_number={po_number}')
-                project_folder_path = self.find_project_folder(project_number)
-                if not project_folder_path:
-                    self.logger.warning(f'[get_po_tax_form_link] - ⚠️ Unable to find project folder for project_number={project_number}')
-                    return []
-                formatted_po_number = f'{int(po_number):02}'
-                self.logger.debug(f'[get_po_tax_form_link] - 📌 Formatted po_number: {formatted_po_number}')
-                po_base_path = f'{project_folder_path}/1. Purchase Orders'
-                po_folders = self.list_project_po_folders(po_base_path)
-                if not po_folders:
-                    self.logger.info(f"[get_po_tax_form_link] - ℹ️ No PO folders found for project_number={project_number} at '{po_base_path}'")
-                    return []
-                specific_po_folder = next((po for po in po_folders if po['name'].startswith(f'{project_number}_{formatted_po_number}')), None)
-                po_path = specific_po_folder['path'] + '/'
-                files = self.list_files_in_folder(po_path)
+            self.dropbox_index.ensure_built()
+            po_folders = self.dropbox_index.get_po_folders(project_number=project_number, po_number=po_number)
+            if not po_folders:
+                self.logger.info(f'[get_po_tax_form_link] - ℹ️ No PO folders indexed for project_number={project_number}, po_number={po_number}')
+                return []
+            for po_folder in po_folders:
                 tax_form_link = ''
                 form_type = ''
-                for file in files:
-                    match = re.search(self.TAX_FORM_REGEX, file['file_name'], re.IGNORECASE)
-                    if match:
-                        self.logger.info(f"[get_po_tax_form_link] - 💼 Identified as tax form: {file['file_name']}")
-                        tax_form_link = self.create_share_link(po_path + file['file_name'])
-                        if match.group(1):
-                            form_type = 'W-9'
-                        elif match.group(2):
-                            form_type = 'W-8BEN'
-                        elif match.group(3):
-                            form_type = 'W-8BEN-E'
-                        elif match.group(4):
-                            form_type = 'W-8BEN-E'
-                        self.logger.info(f"[get_po_tax_form_link] - 💼 Identified as tax form: {file['file_name']} ({form_type})")
+                for file in self.dropbox_index.list_files(po_folder['path_lower']):
+                    match = re.search(self.TAX_FORM_REGEX, file['name'], re.IGNORECASE)
+                    if not match:
                         continue
-                project_po_data.append({'po_folder_name': specific_po_folder['name'], 'po_folder_path': specific_po_folder['path'], 'po_tax_form_link': tax_form_link, 'form_type': form_type})
-            else:
-                self.logger.error('[get_po_tax_form_link] - ❗ Invalid combination of parameters provided.')
-                return []
+                    # A single PO links the tax form itself; listings link the PO folder.
+                    link_path = file['path_lower'] if po_number is not None else po_folder['path_lower']
+                    tax_form_link = self.dropbox_index.get_or_create_link(link_path, self.create_share_link)
+                    if match.group(1):
+                        form_type = 'W-9'
+                    elif match.group(2):
+                        form_type = 'W-8BEN'
+                    else:
+                        form_type = 'W-8BEN-E'
+                    self.logger.info(f"[get_po_tax_form_link] - 💼 Identified as tax form: {file['name']} ({form_type})")
+                project_po_data.append({'po_folder_name': po_folder['name'], 'po_folder_path': po_folder['path_lower'], 'po_tax_form_link': tax_form_link, 'form_type': form_type})
         except Exception as e:
             self.logger.exception(f'[get_po_tax_form_link] - 💥 An error occurred while retrieving PO folders: {e}')
             return []
@@ -231,6 +161,8 @@ class DropboxAPI(metaclass=SingletonMeta):
     def get_project_po_folders_with_link(self, project_number: Optional[str]=None, po_number: Optional[str]=None) -> List[Dict[str, str]]:
         """
         Retrieves PO folders and their shared links based on provided parameters.
+        Resolved from the local Dropbox index (see files_dropbox/dropbox_index.py);
+        shared links are created once and then stored on the index entry.
 
         Args:
             project_number (str, optional): The ID of the project. Defaults to None.
@@ -240,62 +172,19 @@ class DropboxAPI(metaclass=SingletonMeta):
             List[Dict[str, str]]: A list of dictionaries containing 'po_folder_name',
                                     'po_folder_path', and 'po_folder_link'.
         """
+        if project_number is None and po_number is not None:
+            self.logger.error('[get_project_po_folders_with_link] - ❗ Invalid combination of parameters provided.')
+            return []
         project_po_data = []
         try:
-            if project_number is None:
-                self.logger.info("[get_project_po_folders_with_link] - 📁 No project_number provided. Retrieving all PO folders under the '2024' namespace.")
-                all_projects = self.list_all_projects(namespace='2024')
-                if not all_projects:
-                    self.logger.warning("[get_project_po_folders_with_link] - ⚠️ No projects found under the '2024' namespace.")
-                    return []
-                for project in all_projects:
-                    current_project_number = project['id']
-                    project_folder_path = project['path']
-                    po_base_path = f'{project_folder_path}/1. Purchase Orders'
-                    po_folders = self.list_project_po_folders(po_base_path)
-                    if not po_folders:
-                        self.logger.info(f"[get_project_po_folders_with_link] - ℹ️ No PO folders found for project_number={current_project_number} at '{po_base_path}'")
-                        continue
-                    for po_folder in po_folders:
-                        po_link = self.create_share_link(po_folder['path'])
-                        project_po_data.append({'po_folder_name': po_folder['name'], 'po_folder_path': po_folder['path'], 'po_folder_link': po_link})
-            elif project_number and po_number is None:
-                self.logger.info(f'[get_project_po_folders_with_link] - 📁 Retrieving PO folders for project_number={project_number}')
-                project_folder_path = self.find_project_folder(project_number)
-                if not project_folder_path:
-                    self.logger.warning(f'[get_project_po_folders_with_link] - ⚠️ Unable to find project folder for project_number={project_number}')
-                    return []
-                po_base_path = f'{project_folder_path}/1. Purchase Orders'
-                po_folders = self.list_project_po_folders(po_base_path)
-                if not po_folders:
-                    self.logger.info(f"[get_project_po_folders_with_link] - ℹ️ No PO folders found for project_number={project_number} at '{po_base_path}'")
-                    return []
-                for po_folder in po_folders:
-                    po_link = self.create_share_link(po_folder['path'])
-                    project_po_data.append({'po_folder_name': po_folder['name'], 'po_folder_path': po_folder['path'], 'po_folder_link': po_link})
-            elif project_number and po_number:
-                self.logger.info(f'[get_project_po_folders_with_link] - 📁 Retrieving PO folder for project_number={project_number} and po_number={po_number}')
-                project_folder_path = self.find_project_folder(project_number)
-                if not project_folder_path:
-                    self.logger.warning(f'[get_project_po_folders_with_link] - ⚠️ Unable to find project folder for project_number={project_number}')
-                    return []
-                formatted_po_number = f'{int(po_number):02}'
-                self.logger.debug(f'[get_project_po_folders_with_link] - 📌 Formatted po_number: {formatted_po_number}')
-                po_base_path = f'{project_folder_path}/1. Purchase Orders'
-                po_folders = self.list_project_po_folders(po_base_path)
-                if not po_folders:
-                    self.logger.info(f"[get_project_po_folders_with_link] - ℹ️ No PO folders found for project_number={project_number} at '{po_base_path}'")
-                    return []
-                specific_po_folder = next((po for po in po_folders if po['name'].startswith(f'{project_number}_{formatted_po_number}')), None)
-                if specific_po_folder:
-                    po_link = self.create_share_link(specific_po_folder['path'])
-                    project_po_data.append({'po_folder_name': specific_po_folder['name'], 'po_folder_path': specific_po_folder['path'], 'po_folder_link': po_link})
-                else:
-                    self.logger.warning(f'[get_project_po_folders_with_link] - ⚠️ PO folder with po_number={formatted_po_number} not found in project_number={project_number}')
-                    return []
-            else:
-                self.logger.error('[get_project_po_folders_with_link] - ❗ Invalid combination of parameters provided.')
+            self.dropbox_index.ensure_built()
+            po_folders = self.dropbox_index.get_po_folders(project_number=project_number, po_number=po_number)
+            if not po_folders:
+                self.logger.warning(f'[get_project_po_folders_with_link] - ⚠️ No PO folders indexed for project_number={project_number}, po_number={po_number}')
                 return []
+            for po_folder in po_folders:
+                po_link = self.dropbox_index.get_or_create_link(po_folder['path_lower'], self.create_share_link)
+                project_po_data.append({'po_folder_name': po_folder['name'], 'po_folder_path': po_folder['path_lower'], 'po_folder_link': po_link})
         except Exception as e:
             self.logger.exception(f'[get_project_po_folders_with_link] - 💥 An error occurred while retrieving PO folders: {e}')
             return []
@@ -336,7 +225,7 @@ class DropboxAPI(metaclass=SingletonMeta):
 
     def find_project_folder(self, project_number: str, namespace: str='2024') -> Optional[str]:
         """
-        Searches for a folder whose name (or metadata) contains the given project_number under the specified namespace.
+        Looks up the folder for the given project_number in the local Dropbox index.
 
         Args:
             project_number (str): The ID of the project.
@@ -346,14 +235,11 @@ class DropboxAPI(metaclass=SingletonMeta):
             Optional[str]: The path_lower of the matched project folder if found, else None.
         """
         self.logger.info(f"[find_project_folder] - 🔍 Searching for project folder with project_number='{project_number}' in namespace='{namespace}'.")
-        all_projects = self.list_all_projects(namespace=namespace)
-        if not all_projects:
-            self.logger.warning(f"[find_project_folder] - ⚠️ No projects found in namespace='{namespace}'.")
-            return None
-        for project in all_projects:
-            if str(project_number) in project['id']:
-                self.logger.debug(f"[find_project_folder] - ✅ Found project folder: '{project['id']}' at '{project['path']}'")
-                return project['path']
+        self.dropbox_index.ensure_built()
+        project = self.dropbox_index.get_project_folder(project_number)
+        if project:
+            self.logger.debug(f"[find_project_folder] - ✅ Found project folder: '{project['name']}' at '{project['path_lower']}'")
+            return project['path_lower']
         self.logger.warning(f"[find_project_folder] - ⚠️ Project folder with project_number='{project_number}' not found in namespace='{namespace}'.")
         return None
 
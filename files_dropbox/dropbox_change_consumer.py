@@ -0,0 +1,327 @@
+"""
+files_dropbox/dropbox_change_consumer.py
+
+📥 Dropbox Change Consumer
+=========================
+Decouples the Dropbox webhook from file processing.
+
+Flow:
+1. The webhook calls `record_notification()` (persists the notification in Redis)
+   and `enqueue_consumer()`, then acknowledges Dropbox immediately.
+2. The `process_dropbox_notification` Celery task calls `consume()`, which is
+   single-flight across every worker: a pass runs in one DB transaction holding
+   a Postgres advisory lock, reads the cursor row (`dropbox_cursor`), lists the
+   changes, records each changed file once by (path, rev) in `dropbox_change`
+   and saves the new cursor. Notifications that arrive while a pass is running
+   are collapsed into one follow-up pass instead of re-listing the same changes.
+   The notifications a pass covered are removed from Redis only after its
+   transaction commits; if the pass fails they stay, and the consumer re-enqueues
+   itself after RETRY_SECONDS.
+3. Recorded files are claimed in the same transaction and, after commit, fanned
+   out to the `process_dropbox_file` Celery task on their per-type queue
+   (invoices and receipts go to the OCR queue). Failed dispatches go back to
+   'recorded' and the consumer re-enqueues itself to claim them again. A claim
+   that is never confirmed (worker died mid-dispatch) is retried after
+   CLAIM_TIMEOUT_SECONDS.
+"""
+
+# region Imports
+import json
+import logging
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Callable, List, Optional, Tuple
+
+import redis
+from celery import Celery
+from dropbox import files
+from sqlalchemy import func, or_, and_, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from database.db_util import get_db_session
+from database_pg.models_pg import DropboxChange
+from files_dropbox.dropbox_client import dropbox_client
+from files_dropbox.dropbox_cursor_store import dropbox_cursor_store
+from files_dropbox.dropbox_index import dropbox_index
+from utilities.config import Config
+from utilities.singleton import SingletonMeta
+# endregion
+
+
+# region Class Definition
+class DropboxChangeConsumer(metaclass=SingletonMeta):
+    """
+    Persists webhook notifications and consumes Dropbox changes exactly once per (path, rev).
+    """
+
+    # region Constants
+    NOTIFICATIONS_KEY = 'dropbox:webhook:notifications'
+    # pg_try_advisory_xact_lock key shared by every consumer (any bigint, unique in this DB)
+    ADVISORY_LOCK_KEY = 0x64627863  # 'dbxc'
+    CURSOR_NAME_PREFIX = 'webhook:'
+    CLAIM_TIMEOUT_SECONDS = 900
+    RETRY_SECONDS = 60
+    CHANGE_RETENTION_DAYS = 30
+
+    CONSUMER_TASK_NAME = 'server_celery.celery_tasks.process_dropbox_notification'
+    FILE_TASK_NAME = 'server_celery.celery_tasks.process_dropbox_file'
+    INTAKE_QUEUE = 'dropbox_intake'
+    # Invoices and receipts are OCR-bound, so they go to the dedicated OCR queue
+    # (its own worker) and never starve the budget / trigger tasks.
+    FILE_QUEUES = {
+        'po_log': 'dropbox_po_log',
+        'invoice': Config.OCR_QUEUE,
+        'tax_form': 'dropbox_tax_form',
+        'receipt': Config.OCR_QUEUE,
+        'budget': 'dropbox_budget',
+    }
+    # endregion
+
+    # region Initialization
+    def __init__(self):
+        if not hasattr(self, '_initialized'):
+            self.logger = logging.getLogger('dropbox')
+            self.redis = redis.Redis.from_url(Config.REDIS_URL)
+            # Producer-only Celery app: lets the webhook enqueue tasks by name
+            # without importing the worker's task modules.
+            self.celery = Celery('celery_app', broker=Config.REDIS_URL)
+            self.dropbox_client = dropbox_client
+            self.dropbox_index = dropbox_index
+            self.cursor_store = dropbox_cursor_store
+            self.logger.info('📥 Dropbox change consumer initialized.')
+            self._initialized = True
+    # endregion
+
+    # region Intake (webhook side)
+    def record_notification(self, payload: Optional[dict]) -> None:
+        """
+        Persist a webhook notification so the consumer can pick it up later.
+        """
+        entry = json.dumps({'received_at': time.time(), 'payload': payload or {}})
+        self.redis.rpush(self.NOTIFICATIONS_KEY, entry)
+        self.logger.debug('[record_notification] - 📨 Webhook notification persisted.')
+
+    def enqueue_consumer(self, countdown: Optional[float] = None) -> None:
+        """
+        Ask a Celery worker to consume pending notifications (and recorded changes),
+        optionally after `countdown` seconds.
+        """
+        self.celery.send_task(self.CONSUMER_TASK_NAME, queue=self.INTAKE_QUEUE, countdown=countdown)
+        self.logger.debug(f"[enqueue_consumer] - 🚚 Consumer task enqueued{f' (in {countdown:.0f}s)' if countdown else ''}.")
+
+    def queue_for(self, file_type: str) -> str:
+        return self.FILE_QUEUES.get(file_type, 'celery')
+    # endregion
+
+    # region Consumption (worker side)
+    @property
+    def cursor_name(self) -> str:
+        return f'{self.CURSOR_NAME_PREFIX}{self.dropbox_client.member_id}'
+
+    def consume(self, classify: Callable[[str], Optional[str]], dispatch: Callable[[str, str], None]) -> int:
+        """
+        Single-flight consumption of pending notifications.
+
+        `classify(path)` returns a file type (or None to skip) and `dispatch(path, file_type)`
+        hands the file off for processing. Returns the number of files dispatched.
+        If another consumer holds the advisory lock, returns immediately: the running
+        consumer will see this notification in the pending list and run a follow-up pass.
+        Whenever work is left behind (failed pass, failed dispatch, rolled-back
+        transaction) the consumer re-enqueues itself, since no new notification may come.
+        """
+        dispatched = 0
+        while True:
+            pass_ok = True
+            try:
+                with get_db_session() as session:
+                    if not self._try_lock(session):
+                        self.logger.info('[consume] - 🔒 Another consumer is running; notification collapsed into its pass.')
+                        return dispatched
+                    pending = self._pending_notifications()
+                    if pending:
+                        pass_ok = self._run_pass(session, classify)
+                    claimed = self._claim_recorded(session)
+            except Exception:
+                # Rolled back: notifications were not removed, the cursor did not move
+                self.enqueue_consumer(countdown=self.RETRY_SECONDS)
+                raise
+            # Committed: the lock is released and the cursor / claims are durable.
+            if pending and pass_ok:
+                self._ack_notifications(pending)
+
+            failed = 0
+            if claimed:
+                done, failed = self._dispatch_claimed(claimed, dispatch)
+                dispatched += done
+            if not pass_ok or failed:
+                self.logger.warning(f'[consume] - 🔁 Work left for a retry in {self.RETRY_SECONDS}s '
+                                    f'(pass ok={pass_ok}, {failed} failed dispatch(es)).')
+                self.enqueue_consumer(countdown=self.RETRY_SECONDS)
+                return dispatched
+            if not pending and not claimed:
+                # A notification may have landed between the peek and the commit,
+                # while its own consumer task saw the lock as taken. Re-check before leaving.
+                if not self.redis.llen(self.NOTIFICATIONS_KEY):
+                    return dispatched
+
+    def _try_lock(self, session: Session) -> bool:
+        """
+        Transaction-scoped advisory lock: released automatically on commit / rollback,
+        so a crashed consumer can never leave it held.
+        """
+        return bool(session.execute(select(func.pg_try_advisory_xact_lock(self.ADVISORY_LOCK_KEY))).scalar())
+
+    def _pending_notifications(self) -> int:
+        """
+        How many notifications are waiting. They stay in Redis until `_ack_notifications`.
+        """
+        pending = self.redis.llen(self.NOTIFICATIONS_KEY)
+        if pending:
+            self.logger.info(f'[consume] - 📬 {pending} notification(s) collapsed into one pass.')
+        return pending
+
+    def _ack_notifications(self, count: int) -> None:
+        """
+        Remove the `count` oldest notifications once the pass that covered them has
+        committed. Ones that arrived since stay for the next pass.
+        """
+        self.redis.ltrim(self.NOTIFICATIONS_KEY, count, -1)
+
+    def _run_pass(self, session: Session, classify: Callable[[str], Optional[str]]) -> bool:
+        """
+        List changes once from the stored cursor, apply them to the Dropbox index,
+        record the changed files and save the new cursor, all in the caller's (locked)
+        transaction. Returns False if the changes could not be listed; a failure to
+        apply or record them propagates and rolls the whole pass back.
+        """
+        row = self.cursor_store.get(self.cursor_name, session=session)
+        cursor = row['cursor'] if row else None
+        if not cursor:
+            return self._initialize_cursor(session)
+
+        try:
+            (changes, new_cursor) = self.dropbox_client.list_folder_changes(cursor)
+        except Exception as e:
+            self.logger.error(f'[consume] - Failed to fetch folder changes: {e}', exc_info=True)
+            return False
+
+        # Same transaction as the cursor: if the index update fails, the cursor does not move
+        self.dropbox_index.apply_changes(changes, session=session)
+
+        records = {}
+        for change in changes:
+            if isinstance(change, files.FileMetadata):
+                self.logger.info(f'[consume] - File Added: {Path(change.path_display).parts[-1]}')
+                file_type = classify(change.path_display)
+                records[(change.path_lower, change.rev)] = {
+                    'path_lower': change.path_lower,
+                    'rev': change.rev,
+                    'path_display': change.path_display,
+                    'file_type': file_type,
+                    'status': 'recorded' if file_type else 'skipped',
+                }
+            elif isinstance(change, files.DeletedMetadata):
+                self.logger.debug(f'[consume] - DELETE: {change.path_display}')
+            elif not isinstance(change, files.FolderMetadata):
+                self.logger.debug(f'[consume] - Unhandled change type: {type(change)}')
+
+        recorded = 0
+        if records:
+            result = session.execute(
+                insert(DropboxChange).values(list(records.values()))
+                .on_conflict_do_nothing(index_elements=['path_lower', 'rev'])
+            )
+            recorded = result.rowcount
+        self.cursor_store.save(self.cursor_name, new_cursor, session=session)
+        self._prune(session)
+        self.logger.info(
+            f'[consume] - ✅ {len(changes)} change(s) listed, {recorded} new file change(s) recorded '
+            f'({len(records) - recorded} already seen).'
+        )
+        return True
+
+    def _initialize_cursor(self, session: Session) -> bool:
+        """
+        First run: adopt the cursor left by the old file-based store, if any,
+        otherwise start from the latest cursor and seed the index once.
+        Returns False if no cursor could be obtained.
+        """
+        legacy_cursor = self.dropbox_client.load_cursor()
+        if legacy_cursor:
+            self.cursor_store.save(self.cursor_name, legacy_cursor, session=session)
+            self.logger.info('[consume] - 📍 Cursor migrated from the cursor file to the database.')
+            return True
+        self.logger.debug('[consume] - No cursor found. Initializing cursor.')
+        try:
+            result = self.dropbox_client.dbx.files_list_folder_get_latest_cursor('', recursive=True)
+            self.cursor_store.save(self.cursor_name, result.cursor, session=session)
+            self.logger.debug('[consume] - Cursor initialized. No changes to process on first run.')
+            # Changes from here on are applied incrementally; seed the index once.
+            self.dropbox_index.ensure_built()
+            return True
+        except Exception as e:
+            self.logger.error(f'[consume] - Failed to initialize cursor: {e}', exc_info=True)
+            return False
+
+    def _claim_recorded(self, session: Session) -> List[dict]:
+        """
+        Claim every recorded change, plus claims that were never confirmed within
+        CLAIM_TIMEOUT_SECONDS. Returns the claimed rows.
+        """
+        now = datetime.utcnow()
+        stale = now - timedelta(seconds=self.CLAIM_TIMEOUT_SECONDS)
+        result = session.execute(
+            update(DropboxChange)
+            .where(or_(
+                DropboxChange.status == 'recorded',
+                and_(DropboxChange.status == 'claimed', DropboxChange.claimed_at < stale)
+            ))
+            .values(status='claimed', claimed_at=now)
+            .returning(DropboxChange.id, DropboxChange.path_display, DropboxChange.file_type)
+        )
+        return [dict(r._mapping) for r in result]
+
+    def _dispatch_claimed(self, claimed: List[dict], dispatch: Callable[[str, str], None]) -> Tuple[int, int]:
+        """
+        Dispatch claimed changes outside the lock. Failed dispatches go back to
+        'recorded' for the next run to claim. Returns (dispatched, failed).
+        """
+        done, failed = [], []
+        for change in claimed:
+            try:
+                dispatch(change['path_display'], change['file_type'])
+                done.append(change['id'])
+            except Exception as e:
+                self.logger.error(f"[consume] - Failed to dispatch {change['path_display']}: {e}", exc_info=True)
+                failed.append(change['id'])
+        try:
+            with get_db_session() as session:
+                if done:
+                    session.execute(
+                        update(DropboxChange).where(DropboxChange.id.in_(done)).values(status='dispatched')
+                    )
+                if failed:
+                    session.execute(
+                        update(DropboxChange).where(DropboxChange.id.in_(failed)).values(status='recorded')
+                    )
+        except Exception as e:
+            # Unconfirmed claims are retried after CLAIM_TIMEOUT_SECONDS; make sure a consumer runs then.
+            self.logger.error(f'[consume] - Failed to confirm dispatched changes: {e}', exc_info=True)
+            self.enqueue_consumer(countdown=self.CLAIM_TIMEOUT_SECONDS)
+        if claimed:
+            self.logger.info(f'[consume] - 📤 {len(done)} file(s) dispatched, {len(failed)} failed.')
+        return len(done), len(failed)
+
+    def _prune(self, session: Session) -> None:
+        cutoff = datetime.utcnow() - timedelta(days=self.CHANGE_RETENTION_DAYS)
+        session.query(DropboxChange).filter(
+            DropboxChange.status.in_(('dispatched', 'skipped')),
+            DropboxChange.created_at < cutoff
+        ).delete(synchronize_session=False)
+    # endregion
+
+# endregion
+
+dropbox_change_consumer = DropboxChangeConsumer()
@@ -5,7 +5,6 @@ import logging
 import requests
 import files_dropbox
 from dropbox import DropboxTeam, common, files
-import tempfile
 import threading
 from dotenv import load_dotenv
 from utilities.singleton import SingletonMeta
@@ -156,7 +155,8 @@ class DropboxClient(metaclass=SingletonMeta):
 
     def load_cursor(self):
         """
-        Load the cursor for the member.
+        Load the member's cursor from the legacy cursor file. The change consumer
+        keeps its cursor in the `dropbox_cursor` table and only reads this once to migrate.
         """
         cursor_file = self.get_cursor_file_path()
         if not os.path.exists(cursor_file):
@@ -172,22 +172,6 @@ class DropboxClient(metaclass=SingletonMeta):
             self.logger.error(f'[load_cursor] - Error loading cursor for member {self.member_id}: {e}', exc_info=True)
             return None
 
-    def save_cursor(self, cursor):
-        """
-        Save the cursor for the member.
-        """
-        cursor_file = self.get_cursor_file_path()
-        (temp_fd, temp_path) = tempfile.mkstemp()
-        try:
-            with os.fdopen(temp_fd, 'w') as tmp_file:
-                json.dump({'cursor': cursor}, tmp_file)
-            os.replace(temp_path, cursor_file)
-            self.logger.debug(f'[save_cursor] - Saved cursor for member {self.member_id}: {cursor}')
-        except Exception as e:
-            self.logger.error(f'[save_cursor] - Error saving cursor for member {self.member_id}: {e}', exc_info=True)
-            if os.path.exists(temp_path):
-                os.remove(temp_path)
-
     def get_cursor_file_path(self):
         """
         Get the file path for storing the cursor.
@@ -0,0 +1,68 @@
+"""
+files_dropbox/dropbox_cursor_store.py
+
+📍 Dropbox Cursor Store
+======================
+Named Dropbox list_folder cursors persisted in the `dropbox_cursor` table.
+"""
+
+# region Imports
+import logging
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from database.db_util import get_db_session
+from database_pg.models_pg import DropboxCursor
+from utilities.singleton import SingletonMeta
+# endregion
+
+
+# region Class Definition
+class DropboxCursorStore(metaclass=SingletonMeta):
+    """
+    Get / save named cursors. Use the module-level `dropbox_cursor_store`.
+    """
+
+    def __init__(self):
+        if not hasattr(self, '_initialized'):
+            self.logger = logging.getLogger('dropbox')
+            self.logger.info('📍 Dropbox cursor store initialized.')
+            self._initialized = True
+
+    def get(self, name: str, session: Session = None) -> Optional[dict]:
+        """
+        Returns {'cursor', 'last_success_at', ...} for `name`, or None if never saved.
+        """
+        if session is None:
+            with get_db_session() as new_session:
+                return self.get(name, session=new_session)
+        row = session.query(DropboxCursor).filter(DropboxCursor.name == name).first()
+        return row.to_dict() if row else None
+
+    def save(self, name: str, cursor: str, session: Session = None) -> None:
+        """
+        Store `cursor` for `name` and move its watermark (last_success_at) to now.
+        """
+        if session is None:
+            with get_db_session() as new_session:
+                return self.save(name, cursor, session=new_session)
+        now = datetime.utcnow()
+        stmt = insert(DropboxCursor).values(name=name, cursor=cursor, last_success_at=now)
+        session.execute(stmt.on_conflict_do_update(
+            index_elements=['name'],
+            set_={'cursor': stmt.excluded.cursor, 'last_success_at': stmt.excluded.last_success_at, 'updated_at': now}
+        ))
+        self.logger.debug(f'[save] - 📍 Cursor saved for {name}.')
+
+    def delete(self, name: str, session: Session = None) -> None:
+        if session is None:
+            with get_db_session() as new_session:
+                return self.delete(name, session=new_session)
+        session.query(DropboxCursor).filter(DropboxCursor.name == name).delete(synchronize_session=False)
+
+# endregion
+
+dropbox_cursor_store = DropboxCursorStore()
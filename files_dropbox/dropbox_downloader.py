@@ -0,0 +1,193 @@
+"""
+files_dropbox/dropbox_downloader.py
+
+⬇️ Dropbox Downloader
+====================
+Streams Dropbox files to disk with bounded memory.
+
+- The response body is written in CHUNK_SIZE pieces; the whole file is never held in memory.
+- The Dropbox content hash is computed while streaming and compared with the file's
+  metadata, so truncated or corrupted downloads are rejected.
+- Concurrent downloads are capped per host with a semaphore (shared by every thread
+  in the process).
+- `temp_download()` is a context manager that removes the temp file on exit.
+"""
+
+# region Imports
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from files_dropbox.dropbox_client import dropbox_client
+from utilities.config import Config
+from utilities.singleton import SingletonMeta
+# endregion
+
+
+# region Content Hash
+class DropboxContentHasher:
+    """
+    Incremental implementation of Dropbox's content_hash:
+    SHA-256 of the concatenated SHA-256 digests of each 4 MiB block.
+    https://www.dropbox.com/developers/reference/content-hash
+    """
+    BLOCK_SIZE = 4 * 1024 * 1024
+
+    def __init__(self):
+        self._overall = hashlib.sha256()
+        self._block = hashlib.sha256()
+        self._block_pos = 0
+
+    def update(self, data: bytes) -> None:
+        offset = 0
+        while offset < len(data):
+            if self._block_pos == self.BLOCK_SIZE:
+                self._overall.update(self._block.digest())
+                self._block = hashlib.sha256()
+                self._block_pos = 0
+            take = min(len(data) - offset, self.BLOCK_SIZE - self._block_pos)
+            self._block.update(data[offset:offset + take])
+            self._block_pos += take
+            offset += take
+
+    def hexdigest(self) -> str:
+        overall = self._overall.copy()
+        if self._block_pos > 0:
+            overall.update(self._block.digest())
+        return overall.hexdigest()
+# endregion
+
+
+# region Exceptions
+class DropboxDownloadError(Exception):
+    """
+    Raised when a download fails or does not match its Dropbox content hash.
+    """
+# endregion
+
+
+# region Class Definition
+class DropboxDownloader(metaclass=SingletonMeta):
+    """
+    Bounded-memory, hash-verified Dropbox downloads. Use the module-level `dropbox_downloader`.
+    """
+
+    CHUNK_SIZE = 1024 * 1024
+    CONTENT_HOST = 'content.dropboxapi.com'
+    TEMP_DIR = './temp_files'
+
+    # region Initialization
+    def __init__(self):
+        if not hasattr(self, '_initialized'):
+            self.logger = logging.getLogger('dropbox')
+            self.dropbox_client = dropbox_client
+            self.max_per_host = Config.DROPBOX_MAX_CONCURRENT_DOWNLOADS
+            self._host_limits: Dict[str, threading.BoundedSemaphore] = {}
+            self._host_limits_lock = threading.Lock()
+            self.logger.info(f'⬇️ Dropbox downloader initialized (max {self.max_per_host} concurrent per host).')
+            self._initialized = True
+
+    def _host_limit(self, host: str) -> threading.BoundedSemaphore:
+        with self._host_limits_lock:
+            if host not in self._host_limits:
+                self._host_limits[host] = threading.BoundedSemaphore(self.max_per_host)
+            return self._host_limits[host]
+    # endregion
+
+    # region Public API
+    def fetch(self, dropbox_path: str, local_path: str):
+        """
+        Stream `dropbox_path` to `local_path` and verify its content hash.
+        Returns the Dropbox FileMetadata. On any failure the partial file is
+        removed and DropboxDownloadError is raised.
+        """
+        with self._host_limit(self.CONTENT_HOST):
+            self.logger.info(f'[fetch] - 🚀 Streaming download for path: {dropbox_path}')
+            try:
+                metadata, res = self.dropbox_client.dbx.files_download(dropbox_path)
+            except Exception as e:
+                raise DropboxDownloadError(f'Download request failed for {dropbox_path}: {e}') from e
+
+            hasher = DropboxContentHasher()
+            size = 0
+            try:
+                with res, open(local_path, 'wb') as f:
+                    for chunk in res.iter_content(chunk_size=self.CHUNK_SIZE):
+                        if not chunk:
+                            continue
+                        f.write(chunk)
+                        hasher.update(chunk)
+                        size += len(chunk)
+            except Exception as e:
+                self._remove(local_path)
+                raise DropboxDownloadError(f'Streaming failed for {dropbox_path}: {e}') from e
+
+        expected = getattr(metadata, 'content_hash', None)
+        actual = hasher.hexdigest()
+        if expected and expected != actual:
+            self._remove(local_path)
+            raise DropboxDownloadError(
+                f'Content hash mismatch for {dropbox_path}: expected {expected}, got {actual} ({size} bytes).'
+            )
+        self.logger.info(f'[fetch] - 📂 Saved {size} bytes to {local_path}, content hash verified.')
+        return metadata
+
+    @contextmanager
+    def temp_download(self, dropbox_path: str) -> Iterator[str]:
+        """
+        Download to a uniquely named temp file and yield its local path.
+        The file is removed when the block exits, even on error.
+
+            with dropbox_downloader.temp_download(path) as local_path:
+                ...
+        """
+        os.makedirs(self.TEMP_DIR, exist_ok=True)
+        suffix = os.path.splitext(dropbox_path)[1]
+        fd, local_path = tempfile.mkstemp(suffix=suffix, dir=self.TEMP_DIR)
+        os.close(fd)
+        try:
+            self.fetch(dropbox_path, local_path)
+            yield local_path
+        finally:
+            self._remove(local_path)
+
+    def fetch_many(self, items: Iterable[Tuple[str, str]], max_workers: Optional[int] = None) -> List[Tuple[str, Optional[Exception]]]:
+        """
+        Download many (dropbox_path, local_path) pairs concurrently. Concurrency is
+        still bounded by the per-host limit. Returns [(dropbox_path, error or None)].
+        """
+        items = list(items)
+        if not items:
+            return []
+
+        def _one(item):
+            dropbox_path, local_path = item
+            try:
+                self.fetch(dropbox_path, local_path)
+                return dropbox_path, None
+            except DropboxDownloadError as e:
+                self.logger.error(f'[fetch_many] - ❌ {e}')
+                return dropbox_path, e
+
+        with ThreadPoolExecutor(max_workers=max_workers or self.max_per_host) as executor:
+            return list(executor.map(_one, items))
+    # endregion
+
+    # region Helpers
+    def _remove(self, local_path: str) -> None:
+        try:
+            if os.path.exists(local_path):
+                os.remove(local_path)
+                self.logger.debug(f'[temp_download] - 🧹 Temp file removed: {local_path}')
+        except Exception:
+            self.logger.warning(f'[temp_download] - ⚠️ Could not remove temp file {local_path}.', exc_info=True)
+    # endregion
+
+# endregion
+
+dropbox_downloader = DropboxDownloader()
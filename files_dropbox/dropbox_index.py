@@ -0,0 +1,379 @@
+"""
+files_dropbox/dropbox_index.py
+
+🗂️ Dropbox Index
+================
+A persistent local mirror of the Dropbox namespace in the `dropbox_index` table.
+
+- `rebuild()` walks the whole namespace with ONE recursive listing and upserts each
+  page of entries in a single statement.
+- `apply_changes()` is fed by the webhook change consumer with the entries returned
+  by `list_folder_changes`, so the index stays current without re-listing.
+- Project / PO folder, file, tax form and shared-link lookups are plain queries
+  against the table instead of walking the project tree through the API.
+- Shared links are cached on their entry. `warm_shared_links()` loads every existing
+  link in one paged pass. A move or delete drops the entry, which invalidates its link;
+  content edits keep it.
+
+Project folders live at the namespace root and carry the 4-digit project number in
+their name. PO folders live under '<project>/1. Purchase Orders' and are named
+'<project_number>_<po_number>...'. Every entry below a PO folder is tagged with
+that project_number / po_number.
+"""
+
+# region Imports
+import logging
+import re
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional
+
+from dropbox import files
+from sqlalchemy import func, or_, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from database.db_util import get_db_session
+from database_pg.models_pg import DropboxIndexEntry
+from files_dropbox.dropbox_client import dropbox_client
+from utilities.singleton import SingletonMeta
+# endregion
+
+
+# region Class Definition
+class DropboxIndex(metaclass=SingletonMeta):
+    """
+    Local index of Dropbox folders and files. Use the module-level `dropbox_index`.
+    """
+
+    PO_FOLDER_NAME = '1. purchase orders'
+    # pg_advisory_xact_lock key for the first-use build (any bigint, unique in this DB)
+    BUILD_LOCK_KEY = 0x64627869  # 'dbxi'
+    PROJECT_NUMBER_REGEX = re.compile(r'(\d{4})')
+    PO_FOLDER_REGEX = re.compile(r'^(\d{4})_(\d+)')
+
+    # region Initialization
+    def __init__(self):
+        if not hasattr(self, '_initialized'):
+            self.logger = logging.getLogger('dropbox')
+            self.dropbox_client = dropbox_client
+            self.logger.info('🗂️ Dropbox index initialized.')
+            self._initialized = True
+    # endregion
+
+    # region Build & Maintain
+    def rebuild(self, session: Session = None) -> int:
+        """
+        Re-walk the entire namespace with one recursive listing and upsert every page.
+        Rows for paths that no longer exist are removed at the end.
+        Returns the number of entries indexed.
+        """
+        if session is None:
+            with get_db_session() as new_session:
+                return self.rebuild(session=new_session)
+
+        self.logger.info('[rebuild] - 🔄 Rebuilding Dropbox index with one recursive listing...')
+        dbx = self.dropbox_client.dbx
+        seen_paths = set()
+        result = dbx.files_list_folder('', recursive=True)
+        while True:
+            self._upsert_entries(result.entries, session)
+            seen_paths.update(e.path_lower for e in result.entries if not isinstance(e, files.DeletedMetadata))
+            if not result.has_more:
+                break
+            result = dbx.files_list_folder_continue(result.cursor)
+
+        stale_ids = [
+            row_id for row_id, path_lower in session.query(DropboxIndexEntry.id, DropboxIndexEntry.path_lower)
+            if path_lower not in seen_paths
+        ]
+        if stale_ids:
+            session.query(DropboxIndexEntry).filter(DropboxIndexEntry.id.in_(stale_ids)).delete(synchronize_session=False)
+        self.logger.info(f'[rebuild] - ✅ Indexed {len(seen_paths)} entries, removed {len(stale_ids)} stale rows.')
+        self.warm_shared_links(session=session)
+        return len(seen_paths)
+
+    def apply_changes(self, changes: Iterable, session: Session = None) -> None:
+        """
+        Apply entries from `list_folder_changes` (files, folders and deletions) to the index.
+        """
+        changes = list(changes)
+        if not changes:
+            return
+        if session is None:
+            with get_db_session() as new_session:
+                return self.apply_changes(changes, session=new_session)
+
+        deleted = [c.path_lower for c in changes if isinstance(c, files.DeletedMetadata)]
+        if deleted:
+            self._delete_paths(deleted, session)
+        self._upsert_entries(changes, session)
+        self.logger.debug(f'[apply_changes] - 🗂️ Index updated with {len(changes)} change(s), {len(deleted)} deletion(s).')
+
+    def is_empty(self, session: Session = None) -> bool:
+        if session is None:
+            with get_db_session() as new_session:
+                return self.is_empty(session=new_session)
+        return session.query(DropboxIndexEntry.id).first() is None
+
+    def ensure_built(self) -> None:
+        """
+        Build the index on first use. Single-flight across workers: the build runs in
+        one transaction holding an advisory lock; concurrent first callers wait for it
+        and then find the index populated instead of re-walking the namespace.
+        """
+        if not self.is_empty():
+            return
+        with get_db_session() as session:
+            session.execute(select(func.pg_advisory_xact_lock(self.BUILD_LOCK_KEY)))
+            if not self.is_empty(session=session):
+                self.logger.debug('[ensure_built] - 🗂️ Dropbox index was built by another worker.')
+                return
+            self.logger.info('[ensure_built] - 🗂️ Dropbox index is empty; building it now.')
+            self.rebuild(session=session)
+    # endregion
+
+    # region Lookups
+    def get_project_folder(self, project_number, session: Session = None) -> Optional[Dict]:
+        if session is None:
+            with get_db_session() as new_session:
+                return self.get_project_folder(project_number, session=new_session)
+        row = (
+            session.query(DropboxIndexEntry)
+            .filter(
+                DropboxIndexEntry.tag == 'folder',
+                DropboxIndexEntry.parent_path_lower == '',
+                DropboxIndexEntry.project_number == int(project_number)
+            )
+            .first()
+        )
+        return row.to_dict() if row else None
+
+    def get_po_folders(self, project_number=None, po_number=None, session: Session = None) -> List[Dict]:
+        """
+        PO folders, optionally filtered by project and PO. Ordered by project, PO.
+        """
+        if session is None:
+            with get_db_session() as new_session:
+                return self.get_po_folders(project_number, po_number, session=new_session)
+        query = session.query(DropboxIndexEntry).filter(
+            DropboxIndexEntry.tag == 'folder',
+            DropboxIndexEntry.po_number.isnot(None),
+            DropboxIndexEntry.parent_path_lower.like(f'%/{self.PO_FOLDER_NAME}')
+        )
+        if project_number is not None:
+            query = query.filter(DropboxIndexEntry.project_number == int(project_number))
+        if po_number is not None:
+            query = query.filter(DropboxIndexEntry.po_number == int(po_number))
+        rows = query.order_by(DropboxIndexEntry.project_number, DropboxIndexEntry.po_number).all()
+        return [r.to_dict() for r in rows]
+
+    def list_files(self, folder_path_lower: str, session: Session = None) -> List[Dict]:
+        """
+        Files directly inside a folder.
+        """
+        if session is None:
+            with get_db_session() as new_session:
+                return self.list_files(folder_path_lower, session=new_session)
+        rows = (
+            session.query(DropboxIndexEntry)
+            .filter(
+                DropboxIndexEntry.tag == 'file',
+                DropboxIndexEntry.parent_path_lower == folder_path_lower.rstrip('/').lower()
+            )
+            .order_by(DropboxIndexEntry.name)
+            .all()
+        )
+        return [r.to_dict() for r in rows]
+
+    def get_entry(self, path: str = None, dropbox_id: str = None, session: Session = None) -> Optional[Dict]:
+        if session is None:
+            with get_db_session() as new_session:
+                return self.get_entry(path, dropbox_id, session=new_session)
+        query = session.query(DropboxIndexEntry)
+        if dropbox_id:
+            query = query.filter(DropboxIndexEntry.dropbox_id == dropbox_id)
+        elif path:
+            query = query.filter(DropboxIndexEntry.path_lower == path.rstrip('/').lower())
+        else:
+            return None
+        row = query.first()
+        return row.to_dict() if row else None
+
+    def get_or_create_link(self, path: str, create: Callable[[str], Optional[str]]) -> Optional[str]:
+        """
+        Return the stored shared link for `path`, creating it once with `create(path)`
+        and storing it on the entry when missing.
+        """
+        entry = self.get_entry(path=path)
+        if entry and entry.get('shared_link'):
+            return entry['shared_link']
+        link = create(entry['path_display'] if entry else path)
+        if link:
+            self.set_shared_link(path, link)
+        return link
+
+    def set_shared_link(self, path: str, link: Optional[str], session: Session = None) -> None:
+        """
+        Store a shared link on the entry for `path`. Paths that are not indexed yet
+        (e.g. the index was never built) are indexed from their metadata first, so the
+        link is still cached.
+        """
+        if session is None:
+            with get_db_session() as new_session:
+                return self.set_shared_link(path, link, session=new_session)
+        path_lower = path.rstrip('/').lower()
+        updated = session.query(DropboxIndexEntry).filter(
+            DropboxIndexEntry.path_lower == path_lower
+        ).update({'shared_link': link}, synchronize_session=False)
+        if updated or link is None:
+            return
+        try:
+            metadata = self.dropbox_client.dbx.files_get_metadata(path)
+        except Exception as e:
+            self.logger.warning(f'[set_shared_link] - ⚠️ Could not index {path} to cache its link: {e}')
+            return
+        self._upsert_entries([metadata], session)
+        session.query(DropboxIndexEntry).filter(
+            DropboxIndexEntry.path_lower == path_lower
+        ).update({'shared_link': link}, synchronize_session=False)
+
+    def warm_shared_links(self, session: Session = None) -> int:
+        """
+        Page once through every shared link in the namespace (`sharing_list_shared_links`)
+        and store each link on its indexed entry, matched by Dropbox id or path.
+        After a warm-up, re-processing a project makes no link-creation calls.
+        Returns the number of entries updated.
+        """
+        if session is None:
+            with get_db_session() as new_session:
+                return self.warm_shared_links(session=new_session)
+
+        self.logger.info('[warm_shared_links] - 🔗 Warming shared-link cache from sharing_list_shared_links...')
+        dbx = self.dropbox_client.dbx
+        updated = 0
+        result = dbx.sharing_list_shared_links()
+        while True:
+            by_id = {l.id: l.url for l in result.links if getattr(l, 'id', None)}
+            by_path = {l.path_lower: l.url for l in result.links if getattr(l, 'path_lower', None)}
+            if by_id or by_path:
+                rows = session.query(DropboxIndexEntry.id, DropboxIndexEntry.dropbox_id, DropboxIndexEntry.path_lower).filter(
+                    or_(DropboxIndexEntry.dropbox_id.in_(list(by_id)), DropboxIndexEntry.path_lower.in_(list(by_path)))
+                ).all()
+                mappings = [
+                    {'id': row_id, 'shared_link': by_id.get(dropbox_id) or by_path.get(path_lower)}
+                    for row_id, dropbox_id, path_lower in rows
+                ]
+                if mappings:
+                    session.bulk_update_mappings(DropboxIndexEntry, mappings)
+                    updated += len(mappings)
+            if not result.has_more:
+                break
+            result = dbx.sharing_list_shared_links(cursor=result.cursor)
+        self.logger.info(f'[warm_shared_links] - ✅ Cached {updated} shared link(s).')
+        return updated
+    # endregion
+
+    # region Processed Content
+    def processed_hashes(self, paths_lower: List[str], session: Session = None) -> Dict[str, Optional[str]]:
+        """
+        {path_lower: content hash at the last successful processing} for the given paths.
+        """
+        if not paths_lower:
+            return {}
+        if session is None:
+            with get_db_session() as new_session:
+                return self.processed_hashes(paths_lower, session=new_session)
+        rows = session.query(DropboxIndexEntry.path_lower, DropboxIndexEntry.processed_content_hash).filter(
+            DropboxIndexEntry.path_lower.in_(list(paths_lower))
+        ).all()
+        return {path_lower: processed for path_lower, processed in rows}
+
+    def mark_processed(self, metadata, session: Session = None) -> None:
+        """
+        Record that the file's current content (FileMetadata.content_hash) was processed.
+        """
+        if session is None:
+            with get_db_session() as new_session:
+                return self.mark_processed(metadata, session=new_session)
+        self._upsert_entries([metadata], session)
+        session.query(DropboxIndexEntry).filter(
+            DropboxIndexEntry.path_lower == metadata.path_lower
+        ).update(
+            {'processed_content_hash': metadata.content_hash, 'processed_at': datetime.utcnow()},
+            synchronize_session=False
+        )
+    # endregion
+
+    # region Helpers
+    def classify_path(self, path_lower: str) -> Dict[str, Optional[int]]:
+        """
+        Derive project_number / po_number from a lower-cased Dropbox path.
+        """
+        parts = [p for p in path_lower.split('/') if p]
+        project_number = po_number = None
+        if parts:
+            match = self.PROJECT_NUMBER_REGEX.search(parts[0])
+            project_number = int(match.group(1)) if match else None
+        if project_number is not None and len(parts) >= 3 and parts[1] == self.PO_FOLDER_NAME:
+            match = self.PO_FOLDER_REGEX.match(parts[2])
+            if match and int(match.group(1)) == project_number:
+                po_number = int(match.group(2))
+        return {'project_number': project_number, 'po_number': po_number}
+
+    def _row_for(self, entry) -> Optional[Dict]:
+        if isinstance(entry, files.FileMetadata):
+            tag = 'file'
+        elif isinstance(entry, files.FolderMetadata):
+            tag = 'folder'
+        else:
+            return None
+        path_lower = entry.path_lower
+        row = {
+            'dropbox_id': entry.id,
+            'tag': tag,
+            'name': entry.name,
+            'path_lower': path_lower,
+            'path_display': entry.path_display,
+            'parent_path_lower': path_lower.rsplit('/', 1)[0],
+            'content_hash': getattr(entry, 'content_hash', None) if tag == 'file' else None,
+            'rev': getattr(entry, 'rev', None) if tag == 'file' else None,
+            'server_modified': getattr(entry, 'server_modified', None) if tag == 'file' else None,
+        }
+        row.update(self.classify_path(path_lower))
+        return row
+
+    def _upsert_entries(self, entries: Iterable, session: Session) -> None:
+        # Last state wins if a path shows up more than once in a batch
+        rows = list({r['path_lower']: r for r in (self._row_for(e) for e in entries) if r}.values())
+        if not rows:
+            return
+        # A moved entry keeps its id but changes path: drop the old row first.
+        by_id = {r['dropbox_id']: r['path_lower'] for r in rows}
+        session.query(DropboxIndexEntry).filter(
+            DropboxIndexEntry.dropbox_id.in_(list(by_id)),
+            DropboxIndexEntry.path_lower.notin_(list(by_id.values()))
+        ).delete(synchronize_session=False)
+
+        stmt = insert(DropboxIndexEntry).values(rows)
+        update_cols = {
+            c: stmt.excluded[c] for c in (
+                'dropbox_id', 'tag', 'name', 'path_display', 'parent_path_lower',
+                'project_number', 'po_number', 'content_hash', 'rev', 'server_modified'
+            )
+        }
+        session.execute(stmt.on_conflict_do_update(index_elements=['path_lower'], set_=update_cols))
+
+    def _delete_paths(self, paths_lower: List[str], session: Session) -> None:
+        """
+        Delete entries (and everything below them, for folders).
+        """
+        conditions = []
+        for p in paths_lower:
+            conditions.append(DropboxIndexEntry.path_lower == p)
+            conditions.append(DropboxIndexEntry.path_lower.like(f'{p}/%'))
+        session.query(DropboxIndexEntry).filter(or_(*conditions)).delete(synchronize_session=False)
+    # endregion
+
+# endregion
+
+dropbox_index = DropboxIndex()
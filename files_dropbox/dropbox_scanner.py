@@ -0,0 +1,235 @@
+"""
+files_dropbox/dropbox_scanner.py
+
+🔭 Project Scanner
+=================
+Parallel rescans of a project's Dropbox folders for receipts / invoices.
+
+- Listing pages are streamed: files are matched and submitted while later pages
+  are still being fetched, instead of building the whole recursive listing first.
+- Files are filtered by name (regex) and by content: a file whose current
+  content_hash equals the hash recorded at its last successful processing
+  (dropbox_index.processed_content_hash) is skipped.
+- Matched files run on a bounded worker pool (Config.SCAN_MAX_WORKERS). Each stage
+  inside `process_receipt` / `process_invoice` has its own limit: downloads share
+  the per-host semaphore in dropbox_downloader, OCR is capped by the OCR engine's
+  process pool and OpenAI calls by llm_extractor.LLM_SEMAPHORE.
+- Every run returns (and logs) a ScanStats summary with progress and throughput.
+- Delta mode (`delta=True`) keeps one cursor per scanned folder in dropbox_cursor.
+  A full scan stores the folder's `files_list_folder_get_latest_cursor` taken before
+  listing; later delta scans read only entries added or modified since then through
+  `files_list_folder_continue`. The cursor (and its last_success_at watermark) only
+  advances when no file from that folder failed, so failures are retried.
+- `process(path)` returns True when the file was processed, something falsy when
+  there was nothing to do for it (e.g. no matching PO / detail item), and raises
+  on failure. Only failures hold a folder's cursor back; skipped files are neither
+  marked processed nor retried by delta scans (a full scan revisits them).
+"""
+
+# region Imports
+import logging
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field, fields
+from typing import Callable, Iterator, List, Optional, Tuple
+
+from dropbox import files
+from dropbox.exceptions import ApiError
+
+from files_dropbox.dropbox_client import dropbox_client
+from files_dropbox.dropbox_cursor_store import dropbox_cursor_store
+from files_dropbox.dropbox_index import dropbox_index
+from utilities.config import Config
+from utilities.singleton import SingletonMeta
+# endregion
+
+
+# region Stats
+@dataclass
+class ScanStats:
+    scan_name: str
+    delta: bool = False
+    listed: int = 0
+    matched: int = 0
+    skipped_processed: int = 0
+    succeeded: int = 0
+    skipped: int = 0
+    failed: int = 0
+    started_at: float = field(default_factory=time.monotonic)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def add(self, **counts) -> None:
+        with self._lock:
+            for name, value in counts.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started_at
+
+    @property
+    def done(self) -> int:
+        return self.succeeded + self.skipped + self.failed
+
+    def to_dict(self) -> dict:
+        # Not asdict(): it deep-copies every field, and the lock cannot be copied
+        data = {f.name: getattr(self, f.name) for f in fields(self)
+                if not f.name.startswith('_') and f.name != 'started_at'}
+        data['elapsed_seconds'] = round(self.elapsed, 1)
+        data['files_per_minute'] = round(self.done / self.elapsed * 60, 1) if self.elapsed else 0.0
+        return data
+# endregion
+
+
+# region Class Definition
+class ProjectScanner(metaclass=SingletonMeta):
+    """
+    Streams Dropbox listings into a bounded processing pool. Use the module-level `project_scanner`.
+    """
+
+    PROGRESS_EVERY = 25
+
+    # region Initialization
+    def __init__(self):
+        if not hasattr(self, '_initialized'):
+            self.logger = logging.getLogger('dropbox')
+            self.dropbox_client = dropbox_client
+            self.dropbox_index = dropbox_index
+            self.cursor_store = dropbox_cursor_store
+            self.max_workers = Config.SCAN_MAX_WORKERS
+            self.logger.info(f'🔭 Project scanner initialized (max_workers={self.max_workers}).')
+            self._initialized = True
+    # endregion
+
+    # region Public API
+    def scan(self, scan_name: str, folder_paths: List[str], file_regex: str,
+             process: Callable[[str], bool], delta: bool = False) -> dict:
+        """
+        Stream every folder in `folder_paths`, and run `process(path_display)` for each
+        file whose name matches `file_regex` and whose content changed since it was
+        last processed successfully. `process` returns True on success, something
+        falsy to skip the file, and raises on failure.
+        With `delta=True`, folders that have a stored cursor only list what changed
+        since the last clean run. Returns the run's ScanStats as a dict.
+        """
+        stats = ScanStats(scan_name=scan_name, delta=delta)
+        pattern = re.compile(file_regex, re.IGNORECASE)
+        # Backpressure: never hold more than 2x workers of queued files while listing
+        in_flight = threading.BoundedSemaphore(self.max_workers * 2)
+        folder_failures = {folder_path: 0 for folder_path in folder_paths}
+        failures_lock = threading.Lock()
+        next_cursors = {}
+
+        def _run(metadata, folder_path):
+            outcome = 'failed'
+            try:
+                if process(metadata.path_display):
+                    self.dropbox_index.mark_processed(metadata)
+                    outcome = 'succeeded'
+                else:
+                    outcome = 'skipped'
+            except Exception as e:
+                self.logger.error(f'[scan] - ❌ {scan_name}: failed on {metadata.path_display}: {e}', exc_info=True)
+            finally:
+                stats.add(**{outcome: 1})
+                if outcome == 'failed':
+                    with failures_lock:
+                        folder_failures[folder_path] += 1
+                in_flight.release()
+                if stats.done % self.PROGRESS_EVERY == 0:
+                    self._log_progress(stats)
+
+        self.logger.info(f"[scan] - 🔭 {scan_name}: streaming {len(folder_paths)} folder(s) ({'delta' if delta else 'full'})...")
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='scan') as executor:
+            for folder_path in folder_paths:
+                saved = self.cursor_store.get(self._cursor_name(scan_name, folder_path)) if delta else None
+                for page, cursor in self.iter_pages(folder_path, cursor=(saved or {}).get('cursor')):
+                    next_cursors[folder_path] = cursor
+                    candidates = [
+                        e for e in page
+                        if isinstance(e, files.FileMetadata) and pattern.search(e.name)
+                    ]
+                    stats.add(listed=len(page), matched=len(candidates))
+                    processed = self.dropbox_index.processed_hashes([e.path_lower for e in candidates])
+                    for entry in candidates:
+                        if entry.content_hash and processed.get(entry.path_lower) == entry.content_hash:
+                            stats.add(skipped_processed=1)
+                            continue
+                        in_flight.acquire()
+                        executor.submit(_run, entry, folder_path)
+
+        # Every file has finished: advance the cursors of folders that ran clean
+        for folder_path, cursor in next_cursors.items():
+            if not cursor:
+                continue
+            if folder_failures[folder_path]:
+                self.logger.warning(
+                    f'[scan] - ⚠️ {scan_name}: {folder_failures[folder_path]} failure(s) in {folder_path}; '
+                    f'cursor not advanced so they are retried next run.'
+                )
+                continue
+            self.cursor_store.save(self._cursor_name(scan_name, folder_path), cursor)
+
+        summary = stats.to_dict()
+        self.logger.info(f'[scan] - ✅ {scan_name} finished: {summary}')
+        return summary
+
+    def iter_pages(self, folder_path: str, cursor: Optional[str] = None) -> Iterator[Tuple[list, Optional[str]]]:
+        """
+        Yield (entries, cursor_to_store) one API page at a time.
+
+        - With `cursor`: only changes since that cursor (files_list_folder_continue).
+          If Dropbox reset the cursor, falls back to a full listing.
+        - Without: a full recursive listing. The cursor to store is the folder's latest
+          cursor taken before listing, so changes made during the listing are replayed
+          by the next delta run rather than lost.
+        A missing folder yields nothing.
+        """
+        dbx = self.dropbox_client.dbx
+        if cursor:
+            try:
+                result = dbx.files_list_folder_continue(cursor)
+            except ApiError as e:
+                if getattr(e.error, 'is_reset', lambda: False)():
+                    self.logger.warning(f"[iter_pages] - ⚠️ Cursor for '{folder_path}' was reset; running a full listing.")
+                    yield from self.iter_pages(folder_path)
+                    return
+                raise
+            while True:
+                yield result.entries, result.cursor
+                if not result.has_more:
+                    return
+                result = dbx.files_list_folder_continue(result.cursor)
+
+        try:
+            latest_cursor = dbx.files_list_folder_get_latest_cursor(folder_path, recursive=True).cursor
+            result = dbx.files_list_folder(folder_path, recursive=True)
+        except ApiError as e:
+            self.logger.warning(f"[iter_pages] - ⚠️ Could not list '{folder_path}': {e}")
+            return
+        while True:
+            yield result.entries, latest_cursor
+            if not result.has_more:
+                return
+            result = dbx.files_list_folder_continue(result.cursor)
+    # endregion
+
+    # region Helpers
+    @staticmethod
+    def _cursor_name(scan_name: str, folder_path: str) -> str:
+        return f'scan:{scan_name}:{folder_path.lower()}'
+
+    def _log_progress(self, stats: ScanStats) -> None:
+        data = stats.to_dict()
+        self.logger.info(
+            f"[scan] - ⏳ {stats.scan_name}: {data['succeeded']} ok / {data['skipped']} skipped / {data['failed']} failed "
+            f"of {data['matched']} matched ({data['skipped_processed']} unchanged skipped), "
+            f"{data['files_per_minute']} files/min"
+        )
+    # endregion
+
+# endregion
+
+project_scanner = ProjectScanner()
@@ -31,11 +31,15 @@ from files_dropbox.dropbox_api import dropbox_api
 from utilities.config import Config
 from files_dropbox.dropbox_client import dropbox_client
 from files_dropbox.dropbox_util import dropbox_util
+from files_dropbox.dropbox_downloader import dropbox_downloader, DropboxDownloadError
+from files_dropbox.dropbox_index import dropbox_index
+from files_dropbox.dropbox_scanner import project_scanner
 from files_monday.monday_api import monday_api
 from files_monday.monday_util import monday_util
 from files_monday.monday_service import monday_service
 from files_budget.po_log_database_util import po_log_database_util
 from files_budget.po_log_processor import POLogProcessor
+from files_budget.vendor_resolver import vendor_resolver
 from utilities.singleton import SingletonMeta
 from files_dropbox.ocr_service import OCRService
 from database.database_util import DatabaseOperations
@@ -59,6 +63,15 @@ class DropboxService(metaclass=SingletonMeta):
     SHOWBIZ_REGEX = '.mbb'
     PROJECT_NUMBER = ''
 
+    # file_type -> handler method, used by classify_file / dispatch_file
+    FILE_TYPE_HANDLERS = {
+        'po_log': 'po_log_orchestrator',
+        'invoice': 'process_invoice',
+        'tax_form': 'process_tax_form',
+        'receipt': 'process_receipt',
+        'budget': 'process_budget',
+    }
+
     USE_TEMP_FILE = True
     DEBUG_STARTING_PO_NUMBER = 0
     SKIP_DATABASE = False
@@ -90,6 +103,7 @@ class DropboxService(metaclass=SingletonMeta):
             self.po_log_database_util = po_log_database_util
             self.database_util = DatabaseOperations()
             self.ocr_service = OCRService()
+            self.dropbox_downloader = dropbox_downloader
 
             self.logger.info('📦 Dropbox event manager initialized. Ready to manage PO logs and file handling!')
             self._initialized = True
@@ -103,56 +117,96 @@ class DropboxService(metaclass=SingletonMeta):
         """
         file_component = self.dropbox_util.get_last_path_component_generic(path)
         self.logger.info(f'[determine_file_type] - 🔍 Evaluating dropbox file: {file_component}')
+        file_type = self.classify_file(path)
+        if not file_type:
+            return None
+        return self.dispatch_file(path, file_type)
+
+    def classify_file(self, path: str) -> Optional[str]:
+        """
+        Cheap, name-only classification of a Dropbox file.
+        Returns one of FILE_TYPE_HANDLERS' keys, or None if the file is not recognized.
+        """
         filename = os.path.basename(path)
 
         try:
             # Check if PO log
             if self.PO_LOG_FOLDER_NAME in path:
                 project_number_match = re.match(
-                    r'^PO_LOG_(\d{4})[-_]\d{4}-\d{2}-\d{2}_\d{2}-\d{2}-\d{2}\.txt$', 
+                    r'^PO_LOG_(\d{4})[-_]\d{4}-\d{2}-\d{2}_\d{2}-\d{2}-\d{2}\.txt$',
                     filename
                 )
                 if project_number_match:
                     project_number = project_number_match.group(1)
                     self.logger.info(
-                        f'[determine_file_type] - 🗂 Identified a PO Log file for project {project_number}. Dispatching...'
+                        f'[classify_file] - 🗂 Identified a PO Log file for project {project_number}.'
                     )
-                    return self.po_log_orchestrator(path)
+                    return 'po_log'
                 else:
                     self.logger.warning(
-                        f"[determine_file_type] - ⚠️ '{filename}' not matching expected PO Log naming convention."
+                        f"[classify_file] - ⚠️ '{filename}' not matching expected PO Log naming convention."
                     )
-                    return
+                    return None
 
             # Check if Invoice
             if re.search(self.INVOICE_REGEX, filename, re.IGNORECASE):
-                self.logger.info(f'[determine_file_type] - 💰 Recognized invoice pattern for {filename}.')
-                return self.process_invoice(path)
+                self.logger.info(f'[classify_file] - 💰 Recognized invoice pattern for {filename}.')
+                return 'invoice'
 
             # Check if Tax Form
             if re.search(self.TAX_FORM_REGEX, filename, re.IGNORECASE):
-                self.logger.info(f'[determine_file_type] - 💼 Recognized tax form pattern for {filename}.')
-                return self.process_tax_form(path)
+                self.logger.info(f'[classify_file] - 💼 Recognized tax form pattern for {filename}.')
+                return 'tax_form'
 
             # Check if Receipt
             if re.search(self.RECEIPT_REGEX, filename, re.IGNORECASE):
-                self.logger.info(f'[determine_file_type] - 🧾 Recognized receipt pattern for {filename}.')
-                return self.process_receipt(path)
+                self.logger.info(f'[classify_file] - 🧾 Recognized receipt pattern for {filename}.')
+                return 'receipt'
 
             # Check if Budget (.mbb)
             if re.search(self.SHOWBIZ_REGEX, filename, re.IGNORECASE):
-                self.logger.info(f'[determine_file_type] - 📑 Recognized Showbiz budget file for {filename}.')
-                return self.process_budget(path)
+                self.logger.info(f'[classify_file] - 📑 Recognized Showbiz budget file for {filename}.')
+                return 'budget'
 
-            self.logger.debug(f'[determine_file_type] - ❌ No recognized type found for {filename}, ignoring.')
+            self.logger.debug(f'[classify_file] - ❌ No recognized type found for {filename}, ignoring.')
             return None
 
         except Exception as e:
             self.logger.exception(
-                f'[determine_file_type] - 💥 Error while checking dropbox file {filename}: {e}',
+                f'[classify_file] - 💥 Error while checking dropbox file {filename}: {e}',
+                exc_info=True
+            )
+            return None
+
+    def dispatch_file(self, path: str, file_type: str):
+        """
+        Route an already-classified file to its process_* handler. A file the handler
+        processed is marked in the Dropbox index (with the content hash seen before
+        processing), so the next project scan does not send it through OCR again.
+        """
+        handler_name = self.FILE_TYPE_HANDLERS.get(file_type)
+        if not handler_name:
+            self.logger.warning(f"[dispatch_file] - ⚠️ Unknown file type '{file_type}' for {path}. Skipping.")
+            return None
+        try:
+            metadata = self.dropbox_client.dbx.files_get_metadata(path)
+        except Exception as e:
+            self.logger.warning(f'[dispatch_file] - ⚠️ No metadata for {path}; it will not be marked processed: {e}')
+            metadata = None
+        try:
+            result = getattr(self, handler_name)(path)
+        except Exception as e:
+            self.logger.exception(
+                f'[dispatch_file] - 💥 Error while processing {file_type} file {path}: {e}',
                 exc_info=True
             )
             return None
+        if result and getattr(metadata, 'content_hash', None):
+            try:
+                dropbox_index.mark_processed(metadata)
+            except Exception as e:
+                self.logger.warning(f'[dispatch_file] - ⚠️ Could not mark {path} as processed: {e}')
+        return result
     # endregion
 
     # region PO Log Flow
@@ -221,10 +275,6 @@ class DropboxService(metaclass=SingletonMeta):
         )
         pn_int = int(project_number)
 
-        # Preload all DB Contacts (for fuzzy match)
-        all_db_contacts = self.database_util.search_contacts() or []
-        self.logger.info(' 🤝 Loaded existing contacts from the DB.')
-
         # Fetch existing PurchaseOrders for this project_number
         existing_pos = self.database_util.search_purchase_orders(column_names=['project_number'], values=[pn_int])
         if existing_pos is None:
@@ -255,7 +305,7 @@ class DropboxService(metaclass=SingletonMeta):
                     changed = True
                 if (existing_po.get('vendor_name') or '') != vendor_name:
                     changed = True
-                    contact_id = self._find_or_create_contact_in_db(vendor_name, all_db_contacts)
+                    contact_id = vendor_resolver.resolve_or_create(vendor_name)
                 else:
                     contact_id = existing_po.get('contact_id')
 
@@ -275,7 +325,7 @@ class DropboxService(metaclass=SingletonMeta):
                     self.logger.debug(f"⏭ No changes detected for existing PO {po_number}; skipping update.")
             else:
                 self.logger.info(f"🆕 Creating new PO => po_number={po_number}, project={pn_int}")
-                contact_id = self._find_or_create_contact_in_db(vendor_name, all_db_contacts)
+                contact_id = vendor_resolver.resolve_or_create(vendor_name)
                 new_po = self.database_util.create_purchase_order_by_keys(
                     project_number=pn_int,
                     po_number=po_number,
@@ -449,6 +499,8 @@ class DropboxService(metaclass=SingletonMeta):
         """
         Insert or update an 'invoice' record in the DB (plus a share link).
         Other logic (detail item linking, sum checks, etc.) is handled by triggers.
+        Returns True once the invoice is stored, None if it was skipped (unrecognized
+        filename); raises on download / DB failures so the scanner retries the file.
         """
         self.logger.info(f'[process_invoice] - 📄 Recognized invoice file from dropbox: {dropbox_path}')
         filename = os.path.basename(dropbox_path)
@@ -484,19 +536,24 @@ class DropboxService(metaclass=SingletonMeta):
             self.logger.exception('[process_invoice] - 💥 Error getting share link for invoice.', exc_info=True)
             file_share_link = None
 
-        temp_file_path = f'./temp_files/{filename}'
         self.logger.info('[process_invoice] - 🚀 Attempting to download the invoice from dropbox...')
-        if not self.download_file_from_dropbox(dropbox_path, temp_file_path):
-            self.logger.error(
-                f'[process_invoice] - ❌ Could not download invoice from dropbox path: {dropbox_path}'
+        try:
+            with self.dropbox_downloader.temp_download(dropbox_path) as temp_file_path:
+                self.logger.info('[process_invoice] - 🔎 Extracting invoice text using OCR...')
+                extracted_text = self.ocr_service.extract_text(temp_file_path)
+        except DropboxDownloadError:
+            self.logger.exception(
+                f'[process_invoice] - ❌ Could not download invoice from dropbox path: {dropbox_path}',
+                exc_info=True
             )
-            return
+            raise
 
         transaction_date, term, total = None, 30, 0.0
         try:
-            self.logger.info('[process_invoice] - 🔎 Extracting invoice details using OCR + OpenAI analysis...')
-            extracted_text = self.ocr_service.extract_text(temp_file_path)
-            (info, err) = self.ocr_service.extract_info_with_openai(extracted_text)
+            self.logger.info('[process_invoice] - 🔎 Extracting invoice details (local rules first, then OpenAI)...')
+            (info, err) = self.ocr_service.extract_invoice_info(
+                extracted_text, vendor=self._po_vendor_name(project_number, po_number)
+            )
 
             if err or not info:
                 self.logger.warning(f'[process_invoice] - ❌ OCR/AI extraction failed. Using default fallback. Error: {err}')
@@ -568,11 +625,22 @@ class DropboxService(metaclass=SingletonMeta):
                 f'[process_invoice] - 💥 Error updating invoice #{invoice_number} in DB.',
                 exc_info=True
             )
-            self.cleanup_temp_file(temp_file_path)
-            return
+            raise
 
-        self.cleanup_temp_file(temp_file_path)
         self.logger.info(f'[process_invoice] - ✅ Finished invoice processing for dropbox file: {dropbox_path}')
+        return True
+
+    def _po_vendor_name(self, project_number: int, po_number: int) -> Optional[str]:
+        """
+        Vendor name of the PO, used to pick the vendor's learned extraction template.
+        """
+        try:
+            po = self.database_util.search_purchase_order_by_keys(project_number, po_number)
+        except Exception:
+            return None
+        if isinstance(po, list):
+            po = po[0] if po else None
+        return po.get('vendor_name') if po else None
     # endregion
 
     # region Tax Form Flow
@@ -592,15 +660,17 @@ class DropboxService(metaclass=SingletonMeta):
         -----------------
         1) Parse file name (project_number, po_number, detail_number, vendor_name).
         2) Download the receipt file from Dropbox.
-        3) If PDF, try text extraction via PyPDF2. If that fails (or not a PDF), do OCR.
-        4) Use OCRService's 'extract_receipt_info_with_openai' to parse total, date, description.
+        3) Extract text in one pass: PDF text layer where present, OCR only for image-only pages.
+        4) Use OCRService's 'extract_receipt_info' (local rules, OpenAI below the confidence threshold)
+           to parse total, date, description.
         5) Generate file link in Dropbox.
         6) Create or update the 'receipt' table, linking to the appropriate detail item.
         7) Update the corresponding subitem in Monday with the link.
         8) After creation/update, link `receipt_id` to the relevant detail item.
+        Returns True once the receipt is stored, None if it was skipped (unrecognized
+        filename, no matching detail item); raises on failures so the scanner retries it.
         """
         self.logger.info(f'[process_receipt] - 🧾 Recognized a receipt file from dropbox: {dropbox_path}')
-        temp_file_path = f'./temp_files/{os.path.basename(dropbox_path)}'
         filename = os.path.basename(dropbox_path)
 
         is_petty_cash = (
@@ -621,7 +691,6 @@ class DropboxService(metaclass=SingletonMeta):
         group2_str = match.group(2).lstrip('0')
         group3_str = match.group(3).lstrip('0')
         vendor_name = match.group(4)
-        file_ext = match.group(5).lower()
 
         if is_petty_cash:
             po_number_str = '1'
@@ -638,26 +707,16 @@ class DropboxService(metaclass=SingletonMeta):
         line_number_number = int(line_number_str)
 
         self.logger.info('[process_receipt] - 🚀 Attempting to download the receipt file from dropbox...')
-        success = self.download_file_from_dropbox(dropbox_path, temp_file_path)
-        if not success:
-            self.logger.warning(f'[process_receipt] - 🛑 Download failure for receipt: {filename}')
-            return
-
         try:
-            with open(temp_file_path, 'rb') as f:
-                file_data = f.read()
-
-            extracted_text = ''
-            if file_ext == 'pdf':
-                self.logger.debug('[process_receipt] - PDF file detected. Attempting direct PDF text extraction...')
-                extracted_text = self._extract_text_from_pdf(file_data)
-                if not extracted_text.strip():
-                    self.logger.info('[process_receipt] - No text from PDF extraction; using OCR fallback...')
-                    extracted_text = self._extract_text_from_pdf_with_ocr(file_data)
-            else:
-                self.logger.debug('[process_receipt] - Image file detected. Using OCR extraction...')
-                extracted_text = self._extract_text_via_ocr(file_data)
+            # The temp file is removed as soon as text extraction is done
+            with self.dropbox_downloader.temp_download(dropbox_path) as temp_file_path:
+                # One pass: PDF text layer where present, OCR only for image-only pages / images
+                extracted_text = self._extract_text_via_ocr(temp_file_path)
+        except DropboxDownloadError:
+            self.logger.warning(f'[process_receipt] - 🛑 Download failure for receipt: {filename}', exc_info=True)
+            raise
 
+        try:
             parse_failed = False
             if not extracted_text.strip():
                 self.logger.warning(f'[process_receipt] - 🛑 Could not extract any text from receipt: {filename}')
@@ -666,8 +725,8 @@ class DropboxService(metaclass=SingletonMeta):
             ocr_service = OCRService()
             receipt_info = {}
             if not parse_failed:
-                self.logger.debug('[process_receipt] - Using OCRService + OpenAI to interpret receipt text...')
-                receipt_info = ocr_service.extract_receipt_info_with_openai(extracted_text)
+                self.logger.debug('[process_receipt] - Using OCRService (local rules, then OpenAI) to interpret receipt text...')
+                receipt_info = ocr_service.extract_receipt_info(extracted_text, vendor=vendor_name)
                 if not receipt_info:
                     self.logger.warning(
                         f'[process_receipt] - 🛑 AI parse returned empty data for {filename}; marking parse as failed.'
@@ -714,7 +773,6 @@ class DropboxService(metaclass=SingletonMeta):
                 self.logger.warning(
                     f'[process_receipt] - ❗ No matching detail found (project={project_number}, PO={po_number}).'
                 )
-                self.cleanup_temp_file(temp_file_path)
                 return
             elif isinstance(existing_detail, list):
                 existing_detail = existing_detail[0]
@@ -794,11 +852,11 @@ class DropboxService(metaclass=SingletonMeta):
             )
 
             self.logger.info(f'[process_receipt] - ✅ Receipt data fully processed for {dropbox_path}')
-            self.cleanup_temp_file(temp_file_path)
+            return True
 
         except Exception:
             self.logger.exception(f'[process_receipt] - 💥 Error processing receipt {filename}.', exc_info=True)
-            return
+            raise
     # endregion
 
     # region Contact Helpers
@@ -806,6 +864,7 @@ class DropboxService(metaclass=SingletonMeta):
         """
         If the PO record has no contact_id or vendor_name, attempt to find
         an existing contact by vendor_name. If none found, create one.
+        Lookups are served from the in-memory vendor_resolver.
         Returns contact_id or None.
         """
         vendor_name = (po_record.get('vendor_name') or '').strip()
@@ -814,35 +873,9 @@ class DropboxService(metaclass=SingletonMeta):
             return None
 
         self.logger.info(f"🌐 Looking up or creating contact for vendor '{vendor_name}'...")
-        all_contacts = self.database_util.search_contacts()
-        if not all_contacts:
-            all_contacts = []
-
-        fuzzy_matches = self.database_util.find_contact_close_match(vendor_name, all_contacts)
-        if fuzzy_matches:
-            best_match = fuzzy_matches[0]
-            self.logger.info(f"👤 Found fuzzy match => {best_match['name']}")
-            return best_match['id']
-        else:
-            self.logger.info(f"🙅 No fuzzy match for '{vendor_name}'; creating new contact.")
-            created = self.database_util.create_contact(name=vendor_name, vendor_type='Vendor')
-            return created['id'] if created else None
-
-    def _find_or_create_contact_in_db(self, vendor_name: str, all_db_contacts: list) -> Optional[int]:
-        """
-        Helper method to do a quick fuzzy search for an existing contact,
-        or create a new contact if no match. Returns contact_id or None.
-        """
-        if not vendor_name:
-            return None
-
-        fuzzy_matches = self.database_util.find_contact_close_match(vendor_name, all_db_contacts)
-        if fuzzy_matches:
-            best = fuzzy_matches[0]
-            return best['id']
-        else:
-            new_c = self.database_util.create_contact(name=vendor_name, vendor_type='Vendor')
-            return new_c['id'] if new_c else None
+        contact_id = vendor_resolver.resolve_or_create(vendor_name)
+        self.logger.info(f"👤 Vendor '{vendor_name}' => contact {contact_id}")
+        return contact_id
     # endregion
 
     # region Receipt/Detail Matching
@@ -903,17 +936,13 @@ class DropboxService(metaclass=SingletonMeta):
     def download_file_from_dropbox(self, path: str, temp_file_path: str) -> bool:
         """
         Download a file from Dropbox to a local temp_file_path.
+        Streams to disk in chunks and verifies the Dropbox content hash.
+        Prefer `dropbox_downloader.temp_download()` when the file is only needed briefly.
         """
         try:
             self.logger.info(f'[Download File] - 🚀 Initiating download for path: {path}')
-            dbx = self.dropbox_client.dbx
-            self.logger.debug(f'[Download File] - Calling dbx.files_download for {path}')
-            _, res = dbx.files_download(path)
-            file_content = res.content
-
-            with open(temp_file_path, 'wb') as temp_file:
-                temp_file.write(file_content)
-
+            os.makedirs(os.path.dirname(temp_file_path) or '.', exist_ok=True)
+            self.dropbox_downloader.fetch(path, temp_file_path)
             self.logger.info(f'[Download File] - 📂 Saved to {temp_file_path}, download complete!')
             return True
         except Exception:
@@ -954,72 +983,11 @@ class DropboxService(metaclass=SingletonMeta):
         project_number = all_digits[:4]
         return project_number
 
-    def _extract_text_from_pdf(self, file_data: bytes) -> str:
+    def _extract_text_via_ocr(self, file_data) -> str:
         """
-        Attempt direct text extraction with PyPDF2, then fallback to PyMuPDF-based
-        image extraction if minimal text is found.
-        """
-        import PyPDF2
-        import fitz
-        from io import BytesIO
-        from PIL import Image
-        Image.MAX_IMAGE_PIXELS = 200000000
-
-        self.logger.debug('[_extract_text_from_pdf] - Trying PyPDF2 direct extraction...')
-        extracted_text = ''
-        try:
-            pdf_reader = PyPDF2.PdfReader(BytesIO(file_data))
-            text_chunks = []
-            for idx, page in enumerate(pdf_reader.pages, start=1):
-                page_text = page.extract_text() or ''
-                if page_text:
-                    self.logger.debug(f'[_extract_text_from_pdf] - Extracted text from page {idx}.')
-                    text_chunks.append(page_text)
-            extracted_text = '\n'.join(text_chunks)
-
-            if len(extracted_text.strip()) < 20:
-                self.logger.info('[_extract_text_from_pdf] - Minimal text found; fallback to OCR method.')
-                extracted_text = ''
-
-            if extracted_text.strip():
-                return extracted_text
-
-            # Fallback with PyMuPDF to do OCR on embedded images
-            pdf_document = fitz.open(stream=file_data, filetype='pdf')
-            embedded_ocr_results = []
-            for page_idx in range(pdf_document.page_count):
-                page = pdf_document[page_idx]
-                images = page.get_images(full=True)
-                for _, img_info in enumerate(images, start=1):
-                    xref = img_info[0]
-                    base_image = pdf_document.extract_image(xref)
-                    image_data = base_image['image']
-                    try:
-                        Image.open(BytesIO(image_data)).convert('RGB')
-                        text_in_image = self._extract_text_via_ocr(image_data)
-                        embedded_ocr_results.append(text_in_image)
-                    except Exception:
-                        self.logger.exception(
-                            '[_extract_text_from_pdf] - Could not OCR embedded PDF image.',
-                            exc_info=True
-                        )
-            fallback_text = '\n'.join(embedded_ocr_results)
-            return fallback_text
-
-        except Exception:
-            self.logger.exception('[_extract_text_from_pdf] - Error parsing PDF with PyPDF2/fallback.', exc_info=True)
-            return ''
-
-    def _extract_text_from_pdf_with_ocr(self, file_data: bytes) -> str:
-        """
-        A direct OCR approach if PyPDF2 text extraction yields nothing.
-        Reuses _extract_text_via_ocr for convenience.
-        """
-        return self._extract_text_via_ocr(file_data)
-
-    def _extract_text_via_ocr(self, file_data: bytes) -> str:
-        """
-        Use the OCRService to extract text from the provided file data.
+        Text of a receipt PDF or image (bytes or local path). PDFs are opened once;
+        only pages without a text layer are OCR'd, stopping early once the receipt
+        fields are found.
         """
         try:
             return self.ocr_service.extract_text_from_receipt(file_data)
@@ -1163,6 +1131,8 @@ class DropboxService(metaclass=SingletonMeta):
         """
         Demonstrates how to fetch all subitems once from Monday,
         then process them locally to avoid multiple queries.
+        Subitem creates/updates for every PO go out through monday_api.push_subitems
+        and the returned pulse ids are written back in one bulk update.
         """
         self.logger.info('[create_pos_in_monday] - 🌐 Creating/Updating PO records in Monday.com...')
         monday_items = self.monday_api.get_items_in_project(project_id=project_number)
@@ -1269,7 +1239,10 @@ class DropboxService(metaclass=SingletonMeta):
                 po = int(db_item['po_number'])
                 monday_items_map[p_id, po]['column_values'] = itm['column_values']
 
-        # Subitems sync
+        # Subitems sync: gather creates / updates across every PO, then push them in one pipeline
+        subitems_to_create = []
+        subitems_to_update = []
+        pulse_updates = []
         for db_item in processed_items:
             p_id = project_number
             po_no = int(db_item['po_number'])
@@ -1285,9 +1258,6 @@ class DropboxService(metaclass=SingletonMeta):
             if isinstance(sub_items_db, dict):
                 sub_items_db = [sub_items_db]
 
-            subitems_to_create = []
-            subitems_to_update = []
-
             if not sub_items_db:
                 continue
 
@@ -1396,14 +1366,11 @@ class DropboxService(metaclass=SingletonMeta):
                             self.logger.debug(
                                 '[create_pos_in_monday] - Subitem pulse mismatch, updating DB references...'
                             )
-                            self.database_util.update_detail_item_by_keys(
-                                project_number=p_id,
-                                po_number=db_item['po_number'],
-                                detail_number=sdb['detail_number'],
-                                line_number=sdb['line_number'],
-                                pulse_id=sub_pulse_id,
-                                parent_pulse_id=main_monday_id
-                            )
+                            pulse_updates.append({
+                                'id': sdb['id'],
+                                'pulse_id': int(sub_pulse_id),
+                                'parent_pulse_id': int(main_monday_id)
+                            })
                             sdb['pulse_id'] = sub_pulse_id
                             sdb['parent_pulse_id'] = main_monday_id
                 else:
@@ -1413,124 +1380,38 @@ class DropboxService(metaclass=SingletonMeta):
                         'parent_id': main_monday_id
                     })
 
-            if subitems_to_create:
-                self.logger.info(
-                    f'[create_pos_in_monday] - 🆕 Creating {len(subitems_to_create)} new sub-items for PO {po_no}...'
-                )
-                self._batch_create_subitems(subitems_to_create, main_monday_id, p_id, db_item)
-
-            if subitems_to_update:
-                self.logger.info(
-                    f'[create_pos_in_monday] - ✏️ Updating {len(subitems_to_update)} existing sub-items for PO {po_no}...'
-                )
-                self._batch_update_subitems(subitems_to_update, main_monday_id, p_id, db_item)
-
-        self.logger.info('[create_pos_in_monday] - ✅ Completed Monday.com integration for all processed PO data.')
-
-    def _batch_create_subitems(self, subitems_to_create, parent_item_id, project_number, db_item):
-        from concurrent.futures import ThreadPoolExecutor, as_completed
-        chunk_size = 10
-        create_chunks = [
-            subitems_to_create[i:i + chunk_size] 
-            for i in range(0, len(subitems_to_create), chunk_size)
-        ]
-        all_created_subs = []
-
-        with ThreadPoolExecutor() as executor:
-            future_to_index = {}
-            for idx, chunk in enumerate(create_chunks):
-                future = executor.submit(
-                    self.monday_api.batch_create_or_update_subitems,
-                    chunk,
-                    parent_item_id=parent_item_id,
-                    create=True
-                )
-                future_to_index[future] = idx
-
-            for future in as_completed(future_to_index):
-                idx = future_to_index[future]
-                try:
-                    chunk_result = future.result()
-                    self.logger.debug(
-                        f'[_batch_create_subitems] - Subitem create-chunk #{idx + 1} completed.'
-                    )
-                    all_created_subs.extend(chunk_result)
-                except Exception:
-                    self.logger.exception(
-                        f'[_batch_create_subitems] - ❌ Error creating subitems in chunk {idx + 1}.',
-                        exc_info=True
-                    )
-                    raise
-
-        for csub in all_created_subs:
-            db_sub_item = csub['db_sub_item']
-            monday_subitem_id = csub['monday_item_id']
-            self.database_util.update_detail_item_by_keys(
-                project_number,
-                db_item['po_number'],
-                db_sub_item['detail_number'],
-                db_sub_item['line_number'],
-                pulse_id=monday_subitem_id,
-                parent_pulse_id=parent_item_id
+        if subitems_to_create or subitems_to_update:
+            self.logger.info(
+                f'[create_pos_in_monday] - 🚚 Pushing {len(subitems_to_create)} new and '
+                f'{len(subitems_to_update)} changed sub-items for project {project_number}...'
             )
-            db_sub_item['pulse_id'] = monday_subitem_id
-            db_sub_item['parent_pulse_id'] = parent_item_id
-
-    def _batch_update_subitems(self, subitems_to_update, parent_item_id, project_number, db_item):
-        from concurrent.futures import ThreadPoolExecutor, as_completed
-        chunk_size = 10
-        update_chunks = [
-            subitems_to_update[i:i + chunk_size] 
-            for i in range(0, len(subitems_to_update), chunk_size)
-        ]
-        all_updated_subs = []
-
-        with ThreadPoolExecutor() as executor:
-            future_to_index = {}
-            for idx, chunk in enumerate(update_chunks):
-                future = executor.submit(
-                    self.monday_api.batch_create_or_update_subitems,
-                    chunk,
-                    parent_item_id=parent_item_id,
-                    create=False
+            pushed = self.monday_api.push_subitems(subitems_to_create, subitems_to_update)
+            for psub in pushed['results']:
+                db_sub_item = psub['db_sub_item']
+                pulse_updates.append({
+                    'id': db_sub_item['id'],
+                    'pulse_id': int(psub['monday_item_id']),
+                    'parent_pulse_id': int(psub['parent_id'])
+                })
+                db_sub_item['pulse_id'] = psub['monday_item_id']
+                db_sub_item['parent_pulse_id'] = psub['parent_id']
+            if pushed['failed']:
+                self.logger.warning(
+                    f"[create_pos_in_monday] - ⚠️ {len(pushed['failed'])} sub-item(s) failed to sync; they are retried next run."
                 )
-                future_to_index[future] = idx
-
-            for future in as_completed(future_to_index):
-                idx = future_to_index[future]
-                try:
-                    chunk_result = future.result()
-                    self.logger.debug(
-                        f'[_batch_update_subitems] - Subitem update-chunk #{idx + 1} completed.'
-                    )
-                    all_updated_subs.extend(chunk_result)
-                except Exception:
-                    self.logger.exception(
-                        f'[_batch_update_subitems] - ❌ Error updating subitems in chunk {idx + 1}.',
-                        exc_info=True
-                    )
-                    raise
 
-        for usub in all_updated_subs:
-            db_sub_item = usub['db_sub_item']
-            monday_subitem_id = usub['monday_item_id']
-            self.database_util.update_detail_item_by_keys(
-                project_number,
-                db_item['po_number'],
-                db_sub_item['detail_number'],
-                db_sub_item['line_number'],
-                pulse_id=monday_subitem_id,
-                parent_pulse_id=parent_item_id
-            )
-            db_sub_item['pulse_id'] = monday_subitem_id
-            db_sub_item['parent_pulse_id'] = parent_item_id
+        self.database_util.bulk_update_detail_item_pulse_ids(pulse_updates)
+        self.logger.info('[create_pos_in_monday] - ✅ Completed Monday.com integration for all processed PO data.')
     # endregion
 
     # region Project Scanning / syncing procedures
-    def scan_project_receipts(self, project_number: str):
+    def scan_project_receipts(self, project_number: str, delta: bool = False):
         """
         Scans credit-card/vendor receipt folders (1. Purchase Orders) and
         petty-cash receipt folders (3. Petty Cash/1. Crew PC Folders) for the project.
+        Files are streamed through the parallel project scanner; unchanged files that
+        were already processed are skipped. With `delta=True` only entries changed since
+        the last clean scan are listed. Returns the scan stats.
         """
         self.logger.info(
             f'[scan_project_receipts] - 🔎 Initiating dropbox scan for receipts, project={project_number}...'
@@ -1540,92 +1421,54 @@ class DropboxService(metaclass=SingletonMeta):
             self.logger.warning(
                 f"[scan_project_receipts] - ❌ No matching project folder in dropbox for '{project_number}' under 2024."
             )
-            return
+            return None
 
         self.logger.info(
             f'[scan_project_receipts] - 📂 Resolved project folder path: {project_folder_path}'
         )
-        purchase_orders_path = f'{project_folder_path}/1. Purchase Orders'
-        petty_cash_path = f'{project_folder_path}/3. Petty Cash/1. Crew PC Folders'
-
-        self._scan_and_process_receipts_in_folder(purchase_orders_path, project_number)
-        self._scan_and_process_receipts_in_folder(petty_cash_path, project_number)
+        folder_paths = [
+            f'{project_folder_path}/1. Purchase Orders',
+            f'{project_folder_path}/3. Petty Cash/1. Crew PC Folders',
+        ]
+        stats = project_scanner.scan(
+            scan_name=f'receipts:{project_number}',
+            folder_paths=folder_paths,
+            file_regex=self.RECEIPT_REGEX,
+            process=self.process_receipt,
+            delta=delta
+        )
         self.logger.info(
             f'[scan_project_receipts] - ✅ Finished scanning dropbox receipts for project {project_number}.'
         )
+        return stats
 
-    def _scan_and_process_receipts_in_folder(self, folder_path: str, project_number: str):
-        entries = self._list_folder_recursive(folder_path)
-        if not entries:
-            self.logger.debug(
-                f"[_scan_and_process_receipts_in_folder] - No entries found in dropbox folder '{folder_path}'."
-            )
-            return
-
-        for entry in entries:
-            if entry['is_folder']:
-                continue
-            dropbox_path = entry['path_display']
-            file_name = entry['name']
-            if re.search(self.RECEIPT_REGEX, file_name, re.IGNORECASE):
-                self.logger.debug(
-                    f'[_scan_and_process_receipts_in_folder] - 🧾 Found a potential receipt: {dropbox_path}'
-                )
-                self.process_receipt(dropbox_path)
-
-    def _list_folder_recursive(self, folder_path: str):
-        from dropbox import files
-        results = []
-
-        try:
-            dbx = self.dropbox_client.dbx
-            self.logger.info(
-                f'[_list_folder_recursive] - 📁 Recursively listing dropbox folder: {folder_path}'
-            )
-            res = dbx.files_list_folder(folder_path, recursive=True)
-            entries = res.entries
-
-            while res.has_more:
-                res = dbx.files_list_folder_continue(res.cursor)
-                entries.extend(res.entries)
-
-            for e in entries:
-                if isinstance(e, files.FolderMetadata):
-                    results.append({
-                        'name': e.name,
-                        'path_lower': e.path_lower,
-                        'path_display': e.path_display,
-                        'is_folder': True
-                    })
-                elif isinstance(e, files.FileMetadata):
-                    results.append({
-                        'name': e.name,
-                        'path_lower': e.path_lower,
-                        'path_display': e.path_display,
-                        'is_folder': False
-                    })
-        except Exception:
-            self.logger.exception(
-                f'[_list_folder_recursive] - ⚠️ Could not list folder recursively for {folder_path}.',
-                exc_info=True
+    def scan_project_invoices(self, project_number: str, delta: bool = False):
+        """
+        Scans the project's PO folders (1. Purchase Orders) for invoices through the
+        parallel project scanner (`delta=True` lists only changes since the last clean
+        scan). Returns the scan stats.
+        """
+        self.logger.info(
+            f'[scan_project_invoices] - 🔎 Initiating dropbox scan for invoices, project={project_number}...'
+        )
+        project_folder_path = self.dropbox_api.find_project_folder(project_number, namespace='2024')
+        if not project_folder_path:
+            self.logger.warning(
+                f"[scan_project_invoices] - ❌ No matching project folder in dropbox for '{project_number}' under 2024."
             )
-        return results
-
-    def _scan_po_folder_for_invoices(self, folder_path: str, project_number: str, folder_po_number: str):
-        entries = self._list_folder_recursive(folder_path)
-        if not entries:
-            return
+            return None
 
-        for entry in entries:
-            if entry['is_folder']:
-                continue
-            dropbox_path = entry['path_display']
-            file_name = entry['name']
-            if re.search(self.INVOICE_REGEX, file_name, re.IGNORECASE):
-                self.logger.debug(
-                    f'[_scan_po_folder_for_invoices] - Found potential invoice: {dropbox_path}'
-                )
-                self.process_invoice(dropbox_path)
+        stats = project_scanner.scan(
+            scan_name=f'invoices:{project_number}',
+            folder_paths=[f'{project_folder_path}/1. Purchase Orders'],
+            file_regex=self.INVOICE_REGEX,
+            process=self.process_invoice,
+            delta=delta
+        )
+        self.logger.info(
+            f'[scan_project_invoices] - ✅ Finished scanning dropbox invoices for project {project_number}.'
+        )
+        return stats
     # endregion
 
 # region Singleton Instance
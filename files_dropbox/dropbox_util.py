@@ -6,6 +6,7 @@ from typing import Dict
 import dropbox
 from openai import OpenAI
 from files_dropbox.dropbox_client import dropbox_client
+from files_dropbox.dropbox_index import dropbox_index
 from utilities.singleton import SingletonMeta
 
 class DropboxUtil(metaclass=SingletonMeta):
@@ -168,6 +169,25 @@ class DropboxUtil(metaclass=SingletonMeta):
         return Path(path).parts[-1]
 
     def get_file_link(self, dropbox_path: str) -> str:
+        """
+        Return a shared link for the file, from the persistent link cache on the
+        Dropbox index when possible. Only uncached paths reach the Dropbox API;
+        the resulting link is stored for next time.
+        """
+        cached = dropbox_index.get_entry(path=dropbox_path)
+        if cached and cached.get('shared_link'):
+            self.logger.debug(f'[get_file_link] - Cached file link for {dropbox_path}: {cached["shared_link"]}')
+            return cached['shared_link']
+
+        link = self._create_file_link(dropbox_path)
+        if link:
+            try:
+                dropbox_index.set_shared_link(dropbox_path, link)
+            except Exception as e:
+                self.logger.warning(f'[get_file_link] - Could not cache file link for {dropbox_path}: {e}')
+        return link
+
+    def _create_file_link(self, dropbox_path: str) -> str:
         dbx = dropbox_client.dbx
         try:
             result = dbx.sharing_create_shared_link_with_settings(dropbox_path)
@@ -187,7 +207,7 @@ class DropboxUtil(metaclass=SingletonMeta):
         Retrieve an existing shared link for the specified file.
         """
         try:
-            links = dbx.sharing_list_shared_links(path=dropbox_path)
+            links = dbx.sharing_list_shared_links(path=dropbox_path, direct_only=True)
             for link in links.links:
                 if link.path_lower == dropbox_path.lower():
                     self.logger.debug(f'[retrieve_existing_shared_link] - Found existing shared link for {dropbox_path}: {link.url}')
@@ -1,11 +1,9 @@
 import logging
 
 logger = logging.getLogger('dropbox')
-from pathlib import Path
-
-from dropbox import files
 from flask import Blueprint, request, jsonify
 from files_dropbox.dropbox_client import dropbox_client
+from files_dropbox.dropbox_change_consumer import dropbox_change_consumer
 from files_dropbox.dropbox_service import DropboxService
 from utilities.singleton import SingletonMeta
 
@@ -21,70 +19,41 @@ class DropboxWebhookHandler(metaclass=SingletonMeta):
             self.dropbox_service = DropboxService()
 
             self.dropbox_client = dropbox_client
+            self.change_consumer = dropbox_change_consumer
 
             self.logger.info('Dropbox Webhook Handler initialized')
             self._initialized = True
 
     def handle_dropbox_event(self, event):
-        """Handle incoming Dropbox webhook event."""
+        """
+        Handle incoming Dropbox webhook event.
+        Persists the notification and enqueues the Celery consumer, then acknowledges
+        immediately. Listing changes and processing files happens in the worker
+        (see files_dropbox/dropbox_change_consumer.py).
+        If Redis / the broker is unavailable the event is refused with a 503 so Dropbox
+        retries it; processing inline would need the same Redis.
+        """
         self.logger.info('[handle_dropbox_event] - Received Dropbox event.')
-        self.process_event_data(event)
-        return (jsonify({'message': 'Dropbox event processed'}), 200)
+        try:
+            self.change_consumer.record_notification(event)
+            self.change_consumer.enqueue_consumer()
+        except Exception as e:
+            self.logger.error(f'[handle_dropbox_event] - Failed to enqueue Dropbox notification; asking Dropbox to retry: {e}', exc_info=True)
+            return (jsonify({'message': 'Dropbox event not accepted, retry later'}), 503)
+        return (jsonify({'message': 'Dropbox event accepted'}), 200)
 
     def process_event_data(self, event_data):
         """
-        Processes the event data received from Dropbox webhook.
-        Fetches the latest changes since the last cursor,
-        categorizes them by folder/file and event type (added, deleted),
-        logs the changes, and ensures duplicate events with the same cursor are ignored.
+        Synchronously consumes pending Dropbox changes in this process.
+        Uses the same single-flight consumer as the Celery task, so duplicate
+        notifications never re-list the same cursor.
         """
         self.logger.info('[process_event_data] - Starting to process event data...')
-        try:
-            dbx = self.dropbox_client
-            cursor = self.dropbox_client.load_cursor()
-            if not cursor:
-                self.logger.debug('[process_event_data] - No cursor found. Initializing cursor.')
-                try:
-                    result = dbx.list_root_folder('', recursive=True)
-                    self.dropbox_client.save_cursor(result.cursor)
-                    self.logger.debug('[process_event_data] - Cursor initialized. No changes to process on first run.')
-                except Exception as e:
-                    self.logger.error(f'[process_event_data] - Failed to initialize cursor: {e}', exc_info=True)
-                    return
-                return
-            try:
-                (entries, new_cursor) = dbx.list_folder_changes(cursor)
-                changes = entries
-                self.dropbox_client.save_cursor(new_cursor)
-                self.logger.debug('[process_event_data] - Cursor saved to prevent duplicate processing.')
-            except Exception as e:
-                self.logger.error(f'[process_event_data] - Failed to fetch folder changes: {e}', exc_info=True)
-                return
-            categorized_changes = {'files_added': [], 'folders_added': [], 'deleted': []}
-            for change in changes:
-                if isinstance(change, files.FileMetadata):
-                    categorized_changes['files_added'].append({'id': change.id, 'name': change.name, 'path': change.path_display})
-                elif isinstance(change, files.FolderMetadata):
-                    categorized_changes['folders_added'].append({'id': change.id, 'name': change.name, 'path': change.path_display})
-                elif isinstance(change, files.DeletedMetadata):
-                    self.logger.debug(f'[process_event_data] - DELETE: {change}')
-                    categorized_changes['deleted'].append({'id': None, 'name': change.name, 'path': change.path_display})
-                else:
-                    self.logger.debug(f'[process_event_data] - Unhandled change type: {type(change)}')
-                    continue
-            self.logger.info(f"[process_event_data] - Changes ({len(categorized_changes['files_added'])}):")
-            for item in categorized_changes['files_added']:
-                self.logger.info(f"[process_event_data] - File Added: {Path(item['path']).parts[-1]}")
-            for item in categorized_changes['files_added']:
-                self.dropbox_service.determine_file_type(item.get('path'))
-        finally:
-            try:
-                if 'new_cursor' in locals():
-                    self.dropbox_client.save_cursor(new_cursor)
-                    self.logger.debug('[process_event_data] - Cursor successfully updated in the finally block.')
-            except Exception as e:
-                self.logger.error(f'[process_event_data] - Failed to save cursor in the finally block: {e}', exc_info=True)
-
+        self.change_consumer.record_notification(event_data)
+        self.change_consumer.consume(
+            classify=self.dropbox_service.classify_file,
+            dispatch=self.dropbox_service.dispatch_file
+        )
 
 
 dropbox_webhook_handler = DropboxWebhookHandler()
@@ -0,0 +1,321 @@
+"""
+files_dropbox/llm_extractor.py
+
+🧠 LLM Extractor
+================
+Structured invoice / receipt extraction with the chat-completions API.
+
+- OCR text is trimmed to the lines that carry the fields we ask for (totals,
+  dates, terms) plus a few header lines for the vendor, instead of sending the
+  whole document.
+- Results are memoized by a hash of the normalized (trimmed) text, so re-scans of
+  unchanged documents and duplicate uploads never reach the API. Identical texts
+  requested concurrently share a single call.
+- Short receipts are packed together: callers from any thread enqueue their text,
+  and a collector sends up to `Config.LLM_BATCH_MAX_DOCS` receipts that arrive
+  within `Config.LLM_BATCH_WINDOW_SECONDS` in ONE request with a JSON-array
+  response. Anything missing from a batched answer is retried on its own.
+- `Config.OPENAI_BASE_URL` points the client at another chat-completions server
+  (e.g. a local fake in tests).
+"""
+
+# region Imports
+import copy
+import hashlib
+import json
+import logging
+import queue
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import List, Optional, Tuple
+
+from openai import OpenAI
+
+from utilities.config import Config
+from utilities.singleton import SingletonMeta
+# endregion
+
+# Caps concurrent OpenAI calls across every caller in the process
+# (webhook files, project scans), independent of download and OCR limits.
+LLM_SEMAPHORE = threading.BoundedSemaphore(Config.LLM_MAX_CONCURRENCY)
+
+
+# region Prompts
+INVOICE_SYSTEM_PROMPT = (
+    "You are an AI assistant that extracts information from financial documents for a production company / "
+    "digital creative studio. Extract the following details from the text:\n"
+    "Invoice Date (Formatted as YYYY-MM-DD), Total Amount, Payment Term.\n"
+    "Respond with pure, parsable, JSON (no leading or trailing apostrophes) with keys: "
+    "'invoice_date', 'total_amount', 'payment_term' If any fields are empty make their value None"
+)
+
+RECEIPT_INSTRUCTIONS = (
+    "Extract the following details from the text: Total Amount (numbers only, no symbols), "
+    "Date of purchase (format YYYY-MM-DD), and generate a description (summarize to 20 characters maximum). "
+    "If the total is a refund then the value should be negative."
+)
+RECEIPT_SYSTEM_PROMPT = (
+    "You are an AI assistant that extracts information from receipts.\n" + RECEIPT_INSTRUCTIONS +
+    "\nProvide the information in JSON format with keys: 'total_amount', 'description', 'date'."
+)
+RECEIPT_BATCH_SYSTEM_PROMPT = (
+    "You are an AI assistant that extracts information from receipts. You will receive several receipts, "
+    "each starting with a line '### RECEIPT <id>'. For EACH receipt: " + RECEIPT_INSTRUCTIONS +
+    "\nRespond with a JSON object {\"results\": [...]} holding one entry per receipt with keys "
+    "'id', 'total_amount', 'description', 'date'. Use null for fields that are missing."
+)
+# endregion
+
+
+# region Text Trimming
+KEY_LINE_PATTERN = re.compile(
+    r'total|amount|balance|\bdue\b|paid|payment|subtotal|\btax\b|\btip\b|refund|\bdate\b|terms?\b|net\s*\d+|'
+    r'invoice|receipt|\d{1,2}[/-]\d{1,2}[/-]\d{2,4}|\d{4}-\d{2}-\d{2}',
+    re.IGNORECASE
+)
+HEADER_LINES = 5
+CONTEXT_LINES = 1
+TRIM_MIN_CHARS = 1200
+MAX_TRIMMED_CHARS = 4000
+
+
+def trim_text(text: str) -> str:
+    """
+    Keeps the first HEADER_LINES lines (vendor, document title) and every line that
+    mentions totals, dates or terms with CONTEXT_LINES around it. Short texts are
+    returned unchanged.
+    """
+    lines = [line.strip() for line in (text or '').splitlines() if line.strip()]
+    joined = '\n'.join(lines)
+    if len(joined) <= TRIM_MIN_CHARS:
+        return joined
+
+    keep = set(range(min(HEADER_LINES, len(lines))))
+    for i, line in enumerate(lines):
+        if KEY_LINE_PATTERN.search(line):
+            keep.update(range(max(0, i - CONTEXT_LINES), min(len(lines), i + CONTEXT_LINES + 1)))
+    trimmed = '\n'.join(lines[i] for i in sorted(keep))
+    return trimmed[:MAX_TRIMMED_CHARS]
+
+
+def _cache_key(kind: str, text: str) -> str:
+    normalized = ' '.join(text.split()).lower()
+    return hashlib.sha256(f'{kind}\n{normalized}'.encode('utf-8')).hexdigest()
+
+
+def _parse_json(content: str):
+    cleaned = (content or '').replace('```json', '').replace('```', '').strip()
+    return json.loads(cleaned)
+# endregion
+
+
+# region Class Definition
+class LLMExtractor(metaclass=SingletonMeta):
+    """
+    Shared extraction engine. Use the module-level `llm_extractor`.
+    """
+
+    CACHE_MAX_ENTRIES = 5000
+    RECEIPT_BATCH_MAX_CHARS = 2500  # longer receipts are sent on their own
+    RESULT_TIMEOUT_SECONDS = 300
+
+    # region Initialization
+    def __init__(self):
+        if not hasattr(self, '_initialized'):
+            self.logger = logging.getLogger('dropbox')
+            self.client = OpenAI(api_key=Config.OPENAI_API_KEY, base_url=Config.OPENAI_BASE_URL)
+            self.model = Config.LLM_MODEL
+            self.batch_max_docs = max(1, Config.LLM_BATCH_MAX_DOCS)
+            self.batch_window = Config.LLM_BATCH_WINDOW_SECONDS
+            self._cache: "OrderedDict[str, object]" = OrderedDict()
+            self._inflight = {}
+            self._lock = threading.Lock()
+            self._queue: "queue.Queue[Tuple[str, str, Future]]" = queue.Queue()
+            self._collector: Optional[threading.Thread] = None
+            self._pool = ThreadPoolExecutor(max_workers=Config.LLM_MAX_CONCURRENCY, thread_name_prefix='llm')
+            self.stats = {'documents': 0, 'cache_hits': 0, 'requests': 0, 'prompt_tokens': 0,
+                          'completion_tokens': 0, 'seconds': 0.0}
+            self.logger.info(f'🧠 LLM Extractor initialized (model={self.model}, batch={self.batch_max_docs}).')
+            self._initialized = True
+    # endregion
+
+    # region Public API
+    def extract_invoice(self, text: str) -> Tuple[Optional[dict], Optional[str]]:
+        """
+        Returns (info, None) with 'invoice_date', 'total_amount', 'payment_term',
+        or (None, error) like the original OCRService.extract_info_with_openai.
+        """
+        trimmed = trim_text(text)
+        key = _cache_key('invoice', trimmed)
+        future, owner = self._claim(key)
+        if owner:
+            try:
+                content = self._complete(INVOICE_SYSTEM_PROMPT, trimmed, docs=1)
+                self._resolve(key, future, (_parse_json(content), None))
+            except json.JSONDecodeError:
+                self.logger.error('[extract_invoice] - ❌ Failed to parse JSON from OpenAI response')
+                self._resolve(key, future, (None, 'json_decode_error'), cache=False)
+            except Exception as e:
+                self.logger.error(f'[extract_invoice] - ❌ An error occurred: {e}')
+                self._resolve(key, future, (None, 'unknown_error'), cache=False)
+        return copy.deepcopy(future.result(timeout=self.RESULT_TIMEOUT_SECONDS))
+
+    def extract_receipt(self, text: str) -> Optional[dict]:
+        """
+        Returns {'total_amount', 'description', 'date'} or None. Short receipts are
+        batched with others submitted around the same time.
+        """
+        return copy.deepcopy(self._submit_receipt(text).result(timeout=self.RESULT_TIMEOUT_SECONDS))
+
+    def extract_receipts(self, texts: List[str]) -> List[Optional[dict]]:
+        """
+        Extracts many receipts at once; returns results in the same order.
+        """
+        futures = [self._submit_receipt(text) for text in texts]
+        return [copy.deepcopy(f.result(timeout=self.RESULT_TIMEOUT_SECONDS)) for f in futures]
+
+    def clear_cache(self) -> None:
+        with self._lock:
+            self._cache.clear()
+    # endregion
+
+    # region Cache Helpers
+    def _submit_receipt(self, text: str) -> Future:
+        trimmed = trim_text(text)
+        key = _cache_key('receipt', trimmed)
+        future, owner = self._claim(key)
+        if owner:
+            if len(trimmed) > self.RECEIPT_BATCH_MAX_CHARS or self.batch_max_docs == 1:
+                self._pool.submit(self._run_receipt_batch, [(key, trimmed, future)])
+            else:
+                self._queue.put((key, trimmed, future))
+                self._ensure_collector()
+        return future
+
+    def _claim(self, key: str) -> Tuple[Future, bool]:
+        """
+        Returns (future, owner). `owner` is True when the caller must compute the
+        result; otherwise the future is already resolved (cache hit) or another
+        thread is computing the same text.
+        """
+        with self._lock:
+            self.stats['documents'] += 1
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                self.stats['cache_hits'] += 1
+                future = Future()
+                future.set_result(self._cache[key])
+                return future, False
+            if key in self._inflight:
+                self.stats['cache_hits'] += 1
+                return self._inflight[key], False
+            future = Future()
+            self._inflight[key] = future
+            return future, True
+
+    def _resolve(self, key: str, future: Future, result, cache: bool = True) -> None:
+        with self._lock:
+            self._inflight.pop(key, None)
+            if cache and result is not None:
+                self._cache[key] = result
+                while len(self._cache) > self.CACHE_MAX_ENTRIES:
+                    self._cache.popitem(last=False)
+        future.set_result(result)
+    # endregion
+
+    # region Receipt Batching
+    def _ensure_collector(self) -> None:
+        with self._lock:
+            if self._collector is None or not self._collector.is_alive():
+                self._collector = threading.Thread(target=self._collect, name='llm-collector', daemon=True)
+                self._collector.start()
+
+    def _collect(self) -> None:
+        """
+        Groups queued receipts into batches of up to `batch_max_docs`, waiting at
+        most `batch_window` seconds after the first one arrives.
+        """
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.batch_window
+            while len(batch) < self.batch_max_docs:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._pool.submit(self._run_receipt_batch, batch)
+
+    def _run_receipt_batch(self, batch: List[Tuple[str, str, Future]]) -> None:
+        pending = list(batch)
+        if len(batch) > 1:
+            try:
+                body = '\n\n'.join(f'### RECEIPT {i}\n{text}' for i, (_, text, _) in enumerate(batch))
+                content = self._complete(RECEIPT_BATCH_SYSTEM_PROMPT, body, docs=len(batch), json_mode=True)
+                by_id = {}
+                for entry in _parse_json(content).get('results', []):
+                    try:
+                        by_id[int(entry.get('id'))] = entry
+                    except (TypeError, ValueError):
+                        continue
+                pending = []
+                for i, (key, text, future) in enumerate(batch):
+                    entry = by_id.get(i)
+                    if entry is None:
+                        pending.append((key, text, future))
+                        continue
+                    entry.pop('id', None)
+                    self._resolve(key, future, entry)
+                if pending:
+                    self.logger.warning(f'[_run_receipt_batch] - ⚠️ {len(pending)} receipt(s) missing from batch answer; retrying singly.')
+            except Exception as e:
+                self.logger.error(f'[_run_receipt_batch] - ❌ Batched extraction failed ({e}); retrying singly.')
+                pending = list(batch)
+
+        for key, text, future in pending:
+            try:
+                content = self._complete(RECEIPT_SYSTEM_PROMPT, text, docs=1)
+                self._resolve(key, future, _parse_json(content))
+            except json.JSONDecodeError:
+                self.logger.error('[_run_receipt_batch] - ❌ Failed to parse JSON from OpenAI response')
+                self._resolve(key, future, None, cache=False)
+            except Exception as e:
+                self.logger.error(f'[_run_receipt_batch] - ❌ Receipt extraction failed: {e}')
+                self._resolve(key, future, None, cache=False)
+    # endregion
+
+    # region API Call
+    def _complete(self, system_prompt: str, user_content: str, docs: int, json_mode: bool = False) -> str:
+        kwargs = {'response_format': {'type': 'json_object'}} if json_mode else {}
+        started = time.monotonic()
+        with LLM_SEMAPHORE:
+            response = self.client.chat.completions.create(
+                model=self.model,
+                messages=[{'role': 'system', 'content': system_prompt}, {'role': 'user', 'content': user_content}],
+                max_tokens=min(4000, 300 * docs + 200),
+                temperature=0,
+                **kwargs
+            )
+        elapsed = time.monotonic() - started
+        usage = getattr(response, 'usage', None)
+        with self._lock:
+            self.stats['requests'] += 1
+            self.stats['seconds'] += elapsed
+            if usage is not None:
+                self.stats['prompt_tokens'] += usage.prompt_tokens or 0
+                self.stats['completion_tokens'] += usage.completion_tokens or 0
+        self.logger.debug(
+            f'[_complete] - 🧠 {docs} doc(s) in {elapsed:.2f}s, '
+            f'tokens={getattr(usage, "total_tokens", "?")}'
+        )
+        return response.choices[0].message.content.strip()
+    # endregion
+
+# endregion
+
+llm_extractor = LLMExtractor()
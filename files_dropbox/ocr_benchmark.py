@@ -0,0 +1,135 @@
+"""
+files_dropbox/ocr_benchmark.py
+
+⏱️ OCR Benchmark
+================
+Generates a local corpus of synthetic invoice / receipt PDFs and times text
+extraction over it.
+
+Corpus kinds (written with fitz, no external files needed):
+- text:    every page has a text layer (machine-generated vendor PDFs)
+- scanned: every page is an image only (phone scans)
+- mixed:   a text cover page followed by scanned pages
+
+Each document is run through `ocr_engine.extract_document` (single pass, OCR only
+for image-only pages) and, with --compare, through `ocr_engine.ocr_pdf` (OCR of
+every page) for reference.
+
+Usage:
+    python -m files_dropbox.ocr_benchmark --out ./temp_files/ocr_benchmark --count 30 --compare
+"""
+
+# region Imports
+import argparse
+import json
+import os
+import random
+import statistics
+import time
+from typing import List
+
+from files_dropbox.ocr_engine import ocr_engine
+# endregion
+
+KINDS = ('text', 'scanned', 'mixed')
+VENDORS = ('ACME RENTALS LLC', 'SHELL', 'HOME DEPOT', 'B&H PHOTO', 'CRAFT SERVICES CO')
+
+
+# region Corpus
+def _document_lines(rng: random.Random, page: int) -> List[str]:
+    vendor = rng.choice(VENDORS)
+    lines = [vendor, f'Invoice Date: {rng.randint(1, 12):02d}/{rng.randint(1, 28):02d}/2024', 'Terms: Net 30', '']
+    subtotal = 0.0
+    for i in range(rng.randint(8, 25)):
+        amount = round(rng.uniform(5, 900), 2)
+        subtotal += amount
+        lines.append(f'Item {page}-{i:02d} rental / supplies {amount:>12,.2f}')
+    lines += ['', f'Subtotal {subtotal:,.2f}', f'Tax {subtotal * 0.095:,.2f}', f'Total Due: ${subtotal * 1.095:,.2f}']
+    return lines
+
+
+def _add_page(doc, lines: List[str], scanned: bool, dpi: int = 150) -> None:
+    import fitz
+
+    page = doc.new_page(width=612, height=792)
+    page.insert_text((54, 72), '\n'.join(lines), fontsize=10)
+    if scanned:
+        # Replace the text layer with a picture of itself
+        pix = page.get_pixmap(dpi=dpi, colorspace=fitz.csGRAY)
+        page_number = page.number
+        doc.delete_page(page_number)
+        image_page = doc.new_page(pno=page_number, width=612, height=792)
+        image_page.insert_image(image_page.rect, stream=pix.tobytes('png'))
+
+
+def generate_corpus(out_dir: str, count: int = 30, seed: int = 7) -> List[str]:
+    """
+    Writes `count` synthetic PDFs (1-4 pages, kinds cycling text/scanned/mixed)
+    to `out_dir` and returns their paths. The same seed gives the same corpus.
+    """
+    import fitz
+
+    os.makedirs(out_dir, exist_ok=True)
+    rng = random.Random(seed)
+    paths = []
+    for i in range(count):
+        kind = KINDS[i % len(KINDS)]
+        doc = fitz.open()
+        for page in range(rng.randint(1, 4)):
+            scanned = kind == 'scanned' or (kind == 'mixed' and page > 0)
+            _add_page(doc, _document_lines(rng, page), scanned)
+        path = os.path.join(out_dir, f'{kind}_{i:03d}.pdf')
+        doc.save(path)
+        doc.close()
+        paths.append(path)
+    return paths
+# endregion
+
+
+# region Benchmark
+def run_benchmark(paths: List[str], compare: bool = False) -> dict:
+    """
+    Times extract_document over `paths` (and ocr_pdf when `compare`), grouped by corpus kind.
+    """
+    report = {}
+    for path in paths:
+        kind = os.path.basename(path).split('_')[0]
+        entry = report.setdefault(kind, {'documents': 0, 'pages': 0, 'text_pages': 0, 'ocr_pages': 0,
+                                         'skipped_pages': 0, 'page_seconds': [], 'seconds': 0.0,
+                                         'full_ocr_seconds': 0.0})
+        document = ocr_engine.extract_document(path)
+        entry['documents'] += 1
+        entry['seconds'] += document.seconds
+        for page in document.pages:
+            entry['pages'] += 1
+            entry[f'{page.method}_pages'] += 1
+            entry['page_seconds'].append(page.seconds)
+        if compare:
+            started = time.perf_counter()
+            ocr_engine.ocr_pdf(path)
+            entry['full_ocr_seconds'] += time.perf_counter() - started
+
+    for entry in report.values():
+        page_seconds = entry.pop('page_seconds')
+        entry['median_page_seconds'] = round(statistics.median(page_seconds), 4) if page_seconds else 0.0
+        entry['max_page_seconds'] = round(max(page_seconds, default=0.0), 4)
+        entry['seconds'] = round(entry['seconds'], 3)
+        if compare:
+            entry['full_ocr_seconds'] = round(entry['full_ocr_seconds'], 3)
+        else:
+            entry.pop('full_ocr_seconds')
+    return report
+# endregion
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Generate a synthetic PDF corpus and time text extraction.')
+    parser.add_argument('--out', default='./temp_files/ocr_benchmark')
+    parser.add_argument('--count', type=int, default=30)
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--compare', action='store_true', help='also time OCR of every page (ocr_pdf)')
+    args = parser.parse_args()
+
+    corpus = generate_corpus(args.out, count=args.count, seed=args.seed)
+    print(json.dumps(run_benchmark(corpus, compare=args.compare), indent=2))
+    ocr_engine.shutdown()
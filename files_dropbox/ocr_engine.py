@@ -0,0 +1,288 @@
+"""
+files_dropbox/ocr_engine.py
+
+🖨️ OCR Engine
+=============
+Page-level OCR backed by a process pool.
+
+- Pages are rendered with fitz (PyMuPDF) at `Config.OCR_DPI` in grayscale and
+  handed to tesseract inside worker processes, so multi-page documents OCR in
+  parallel instead of one page after another in the calling thread.
+- The pool is shared by every caller in the process and sized to
+  min(Config.OCR_MAX_WORKERS, cpu count), which caps total OCR concurrency no
+  matter how many Celery threads submit work. Workers use the 'spawn' start method.
+- Pages are submitted in windows of `max_workers`. After each window the text of
+  the pages read so far (in page order) is passed to `stop_when`; once it returns
+  True the remaining pages are skipped.
+- `extract_document` is the single entry point for PDFs: the file is opened once
+  with fitz, pages with a text layer are read directly, and only image-only pages
+  are rendered (in the caller) and OCR'd (in the pool). Per-page method and
+  timings are returned with the text.
+"""
+
+# region Imports
+import io
+import logging
+import multiprocessing
+import os
+import re
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Iterable, List, Optional, Tuple, Union
+
+from utilities.config import Config
+from utilities.singleton import SingletonMeta
+# endregion
+
+logger = logging.getLogger('dropbox')
+
+
+# region Field Detection
+AMOUNT_PATTERN = r'(total|amount\s+due|balance\s+due)\b[^\n\d]{0,30}\$?\s*-?[\d,]+\.\d{2}'
+DATE_PATTERN = r'\b(\d{1,2}[/-]\d{1,2}[/-]\d{2,4}|\d{4}-\d{2}-\d{2}|[A-Za-z]{3,9}\.?\s+\d{1,2},?\s+\d{4})\b'
+
+INVOICE_FIELD_PATTERNS = (AMOUNT_PATTERN, DATE_PATTERN)
+RECEIPT_FIELD_PATTERNS = (AMOUNT_PATTERN, DATE_PATTERN)
+
+
+def fields_found(patterns: Iterable[str]) -> Callable[[str], bool]:
+    """
+    Builds a `stop_when` predicate that is satisfied once every pattern matches the text.
+    """
+    compiled = [re.compile(p, re.IGNORECASE) for p in patterns]
+    return lambda text: all(c.search(text) for c in compiled)
+# endregion
+
+
+# region Worker Functions
+# Module-level so they can be pickled into the worker processes.
+# A source is either a local file path (cheap to send to a worker) or raw bytes.
+def _open_pdf(source: Union[str, bytes]):
+    import fitz
+
+    if isinstance(source, str):
+        return fitz.open(source)
+    return fitz.open(stream=source, filetype='pdf')
+
+
+def _ocr_pdf_page(source: Union[str, bytes], page_index: int, dpi: int) -> str:
+    import fitz
+    import pytesseract
+    from PIL import Image
+
+    with _open_pdf(source) as doc:
+        pix = doc[page_index].get_pixmap(dpi=dpi, colorspace=fitz.csGRAY)
+        image = Image.open(io.BytesIO(pix.tobytes('png')))
+    return pytesseract.image_to_string(image)
+
+
+def _ocr_png(png: bytes) -> Tuple[str, float]:
+    import pytesseract
+    from PIL import Image
+
+    started = time.perf_counter()
+    text = pytesseract.image_to_string(Image.open(io.BytesIO(png)))
+    return text, time.perf_counter() - started
+
+
+def _ocr_image(source: Union[str, bytes]) -> str:
+    import pytesseract
+    from PIL import Image
+
+    image = Image.open(source if isinstance(source, str) else io.BytesIO(source))
+    return pytesseract.image_to_string(image)
+# endregion
+
+
+# region Results
+# A page whose text layer has fewer characters than this is treated as image-only
+MIN_TEXT_LAYER_CHARS = 20
+
+
+@dataclass
+class PageResult:
+    index: int
+    method: str  # 'text' (text layer), 'ocr' or 'skipped' (stopped early)
+    chars: int
+    seconds: float
+
+
+@dataclass
+class DocumentText:
+    text: str
+    pages: List[PageResult] = field(default_factory=list)
+    seconds: float = 0.0
+
+    def summary(self) -> dict:
+        counts = {}
+        for page in self.pages:
+            counts[page.method] = counts.get(page.method, 0) + 1
+        return {
+            'pages': len(self.pages),
+            **counts,
+            'seconds': round(self.seconds, 3),
+            'slowest_page_seconds': round(max((p.seconds for p in self.pages), default=0.0), 3),
+        }
+# endregion
+
+
+def _is_pdf(source: Union[str, bytes]) -> bool:
+    if isinstance(source, str):
+        with open(source, 'rb') as f:
+            return f.read(5) == b'%PDF-'
+    return source[:5] == b'%PDF-'
+
+
+# region Class Definition
+class OCREngine(metaclass=SingletonMeta):
+    """
+    Shared process pool for OCR. Use the module-level `ocr_engine` instance.
+    """
+
+    # region Initialization
+    def __init__(self):
+        if not hasattr(self, '_initialized'):
+            self.logger = logger
+            self.max_workers = max(1, min(Config.OCR_MAX_WORKERS, os.cpu_count() or 1))
+            self.dpi = Config.OCR_DPI
+            self._pool: Optional[ProcessPoolExecutor] = None
+            self._pool_lock = threading.Lock()
+            self.logger.info(f'🖨️ OCR Engine initialized (max_workers={self.max_workers}, dpi={self.dpi}).')
+            self._initialized = True
+
+    @property
+    def pool(self) -> ProcessPoolExecutor:
+        # Created lazily so importing this module never starts processes. Workers are
+        # spawned, not forked: a fork from a threaded Celery worker can copy locks held
+        # by other threads (logging, Redis, DB clients) and deadlock the child.
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.max_workers,
+                                                 mp_context=multiprocessing.get_context('spawn'))
+            return self._pool
+
+    def shutdown(self):
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+    # endregion
+
+    # region Public API
+    def ocr_pdf(self, source: Union[str, bytes], stop_when: Optional[Callable[[str], bool]] = None,
+                page_indexes: Optional[List[int]] = None) -> str:
+        """
+        OCR the pages of a PDF (local path or bytes) in parallel and return their
+        text in page order. `page_indexes` restricts OCR to those pages (default: every page).
+        """
+        if page_indexes is None:
+            with _open_pdf(source) as doc:
+                page_indexes = list(range(doc.page_count))
+        if not page_indexes:
+            return ''
+
+        page_texts: List[str] = []
+        for start in range(0, len(page_indexes), self.max_workers):
+            window = page_indexes[start:start + self.max_workers]
+            futures = [self.pool.submit(_ocr_pdf_page, source, idx, self.dpi) for idx in window]
+            for idx, future in zip(window, futures):
+                try:
+                    page_texts.append(future.result())
+                except Exception as e:
+                    self.logger.error(f'[ocr_pdf] - ❌ OCR failed for page {idx + 1}: {e}', exc_info=True)
+                    page_texts.append('')
+
+            remaining = len(page_indexes) - (start + len(window))
+            if remaining and stop_when and stop_when('\n'.join(page_texts)):
+                self.logger.info(
+                    f'[ocr_pdf] - ⏹️ Required fields found after {len(page_texts)} page(s); skipping {remaining} page(s).'
+                )
+                break
+
+        self.logger.debug(f'[ocr_pdf] - OCR finished for {len(page_texts)}/{len(page_indexes)} page(s).')
+        return '\n'.join(page_texts)
+
+    def ocr_image(self, source: Union[str, bytes]) -> str:
+        """
+        OCR a single image (local path or bytes) in the shared pool.
+        """
+        try:
+            return self.pool.submit(_ocr_image, source).result()
+        except Exception as e:
+            self.logger.error(f'[ocr_image] - ❌ OCR failed: {e}', exc_info=True)
+            return ''
+
+    def ocr_document(self, source: Union[str, bytes], stop_when: Optional[Callable[[str], bool]] = None) -> str:
+        """
+        Text of a PDF or image given as a local path or bytes, detected from the file header.
+        """
+        return self.extract_document(source, stop_when=stop_when).text
+
+    def extract_document(self, source: Union[str, bytes],
+                         stop_when: Optional[Callable[[str], bool]] = None) -> DocumentText:
+        """
+        Single-pass extraction. A PDF is opened once with fitz: pages with a text
+        layer are read directly, image-only pages are rendered here and OCR'd in the
+        pool (window by window, skipped once `stop_when` is satisfied). Images are
+        OCR'd whole.
+        """
+        started = time.perf_counter()
+        if not _is_pdf(source):
+            text = self.ocr_image(source)
+            elapsed = time.perf_counter() - started
+            return DocumentText(text=text, pages=[PageResult(0, 'ocr', len(text.strip()), elapsed)], seconds=elapsed)
+
+        import fitz
+
+        page_texts, results = {}, {}
+        with _open_pdf(source) as doc:
+            ocr_indexes = []
+            for page in doc:
+                page_started = time.perf_counter()
+                text = page.get_text('text') or ''
+                if len(text.strip()) >= MIN_TEXT_LAYER_CHARS:
+                    page_texts[page.number] = text
+                    results[page.number] = PageResult(
+                        page.number, 'text', len(text.strip()), time.perf_counter() - page_started
+                    )
+                else:
+                    ocr_indexes.append(page.number)
+
+            for start in range(0, len(ocr_indexes), self.max_workers):
+                if stop_when and page_texts and stop_when(self._join(page_texts)):
+                    break
+                submitted = []
+                for idx in ocr_indexes[start:start + self.max_workers]:
+                    render_started = time.perf_counter()
+                    png = doc[idx].get_pixmap(dpi=self.dpi, colorspace=fitz.csGRAY).tobytes('png')
+                    submitted.append((idx, time.perf_counter() - render_started, self.pool.submit(_ocr_png, png)))
+                for idx, render_seconds, future in submitted:
+                    try:
+                        text, ocr_seconds = future.result()
+                    except Exception as e:
+                        self.logger.error(f'[extract_document] - ❌ OCR failed for page {idx + 1}: {e}', exc_info=True)
+                        text, ocr_seconds = '', 0.0
+                    page_texts[idx] = text
+                    results[idx] = PageResult(idx, 'ocr', len(text.strip()), render_seconds + ocr_seconds)
+
+            for idx in ocr_indexes:
+                results.setdefault(idx, PageResult(idx, 'skipped', 0, 0.0))
+
+        document = DocumentText(
+            text=self._join(page_texts),
+            pages=[results[i] for i in sorted(results)],
+            seconds=time.perf_counter() - started
+        )
+        self.logger.debug(f'[extract_document] - {document.summary()}')
+        return document
+
+    @staticmethod
+    def _join(page_texts: dict) -> str:
+        return '\n'.join(page_texts[i] for i in sorted(page_texts))
+    # endregion
+
+# endregion
+
+ocr_engine = OCREngine()
@@ -1,37 +1,327 @@
-import json
-import os
-import pdfplumber
-import pytesseract
-from PIL import Image
-import io
+import re
+import threading
 import logging
-from openai import OpenAI
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy.dialects.postgresql import insert
+
+from database.db_util import get_db_session
+from database_pg.models_pg import VendorExtractionTemplate
+from files_budget.vendor_resolver import normalize_vendor_name
+from files_dropbox.ocr_engine import ocr_engine, fields_found, INVOICE_FIELD_PATTERNS, RECEIPT_FIELD_PATTERNS
+from files_dropbox.llm_extractor import llm_extractor
+from utilities.config import Config
 from utilities.singleton import SingletonMeta
 logger = logging.getLogger('dropbox')
 
 
+# Amount at the end of a labelled line: "Total Due: $1,234.56", "Refund (12.00)"
+AMOUNT_LINE_PATTERN = re.compile(
+    r'^(?P<label>.*?)[\s:$#]*(?P<neg>\(|-(?=\$?\d))?\$?\s*(?P<amount>\d{1,3}(?:,\d{3})+\.\d{2}|\d+\.\d{2})\)?\s*(?:USD)?\s*$',
+    re.IGNORECASE
+)
+DATE_TOKEN_PATTERN = re.compile(
+    r'\b(\d{1,2}[/-]\d{1,2}[/-]\d{2,4}|\d{4}-\d{2}-\d{2}|[A-Za-z]{3,9}\.?\s+\d{1,2},?\s+\d{4}|\d{1,2}\s+[A-Za-z]{3,9}\s+\d{4})\b'
+)
+DATE_FORMATS = (
+    '%m/%d/%Y', '%m/%d/%y', '%m-%d-%Y', '%m-%d-%y', '%Y-%m-%d',
+    '%B %d, %Y', '%B %d %Y', '%b %d, %Y', '%b %d %Y', '%d %B %Y', '%d %b %Y'
+)
+TERM_PATTERN = re.compile(r'\bnet\s*(\d{1,3})\b', re.IGNORECASE)
+
+STRONG_TOTAL_LABELS = ('grand total', 'total due', 'amount due', 'balance due', 'invoice total',
+                       'total amount', 'amount paid', 'total paid', 'total charged', 'refund')
+EXCLUDED_TOTAL_LABELS = ('subtotal', 'sub total', 'sub-total', 'total tax', 'tax total', 'total discount',
+                         'total items', 'total qty', 'total quantity', 'total savings')
+# Agreeing LLM confirmations before a vendor template may skip the LLM
+TEMPLATE_MIN_SAMPLES = 2
+DATE_LABELS = ('invoice date', 'date of issue', 'issue date', 'transaction date', 'purchase date',
+               'order date', 'date')
+EXCLUDED_DATE_LABELS = ('due date', 'due', 'ship date', 'delivery date', 'expires', 'period')
+
+
+def _normalize_label(label: str) -> str:
+    return re.sub(r'[^a-z ]+', ' ', label.lower()).strip()
+
+
+def _is_total_label(label: str) -> bool:
+    if any(x in label for x in EXCLUDED_TOTAL_LABELS):
+        return False
+    return any(x in label for x in STRONG_TOTAL_LABELS) or label.endswith('total')
+
+
+def _parse_date(token: str) -> Tuple[Optional[datetime], Optional[str]]:
+    token = token.replace('.', '').strip()
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(token, fmt), fmt
+        except ValueError:
+            continue
+    return None, None
+
+
+def _text_quality(text: str) -> float:
+    """
+    Share of characters a machine-generated PDF would produce (letters, digits,
+    whitespace, common punctuation). OCR noise drags this down.
+    """
+    if not text:
+        return 0.0
+    clean = sum(1 for c in text if c.isalnum() or c.isspace() or c in '.,:;$/-#()%&@\'"')
+    return clean / len(text)
+
+
+@dataclass
+class LocalExtraction:
+    total: Optional[float] = None
+    date: Optional[datetime] = None
+    term: Optional[int] = None
+    description: Optional[str] = None
+    confidence: float = 0.0
+    method: str = 'rules'
+    layout: Optional[dict] = None
+
+    def as_invoice_info(self) -> dict:
+        return {
+            'invoice_date': self.date.strftime('%Y-%m-%d') if self.date else None,
+            'total_amount': self.total,
+            'payment_term': f'Net {self.term}' if self.term else None,
+        }
+
+    def as_receipt_info(self) -> dict:
+        return {
+            'total_amount': self.total,
+            'description': self.description,
+            'date': self.date.strftime('%Y-%m-%d') if self.date else None,
+        }
+
+
+class LocalExtractor(metaclass=SingletonMeta):
+    """
+    Rule- and template-based extraction of total / date / terms from document text.
+
+    - Rules: amounts on lines labelled like a total ("Amount Due", "Grand Total",
+      plain "Total"), dates on lines labelled like an issue date, "Net N" terms.
+      Confidence reflects how unambiguous each field was and how clean the text is.
+    - Templates: for a known vendor, the exact labels and date format seen in past
+      confirmed extractions (vendor_extraction_template). A template only scores
+      above the rules (and `min_confidence`) once TEMPLATE_MIN_SAMPLES agreeing
+      confirmations produced the same layout.
+    A result is confirmed (and its layout learned) when the LLM's answer for the
+    same document is found under a label in the text.
+    """
+
+    def __init__(self):
+        if not hasattr(self, '_initialized'):
+            self.logger = logger
+            self.min_confidence = Config.LOCAL_EXTRACTION_MIN_CONFIDENCE
+            self._templates: Optional[Dict[Tuple[str, str], dict]] = None
+            self._lock = threading.Lock()
+            self.stats = {'local': 0, 'llm': 0, 'learned': 0}
+            self._initialized = True
+
+    # region Public API
+    def extract(self, text: str, doc_type: str, vendor: Optional[str] = None) -> LocalExtraction:
+        """
+        Best local extraction for `doc_type` ('invoice' or 'receipt'), template first.
+        """
+        lines = [line.strip() for line in (text or '').splitlines() if line.strip()]
+        quality = _text_quality(text)
+        template = self.get_template(doc_type, vendor) if vendor else None
+        result = self._apply_template(lines, template) if template else None
+        if result is None or result.confidence < self.min_confidence:
+            rules = self._apply_rules(lines)
+            if result is None or rules.confidence > result.confidence:
+                result = rules
+        if quality < 0.95:
+            result.confidence *= quality
+        if doc_type == 'receipt':
+            result.description = (vendor or (lines[0] if lines else ''))[:20] or None
+        return result
+
+    def learn(self, doc_type: str, vendor: Optional[str], text: str, total, date_str: Optional[str]) -> bool:
+        """
+        Records the vendor's layout when the confirmed `total` and `date_str`
+        (YYYY-MM-DD) are found under a label in `text`. Returns True if learned.
+        """
+        vendor_key = normalize_vendor_name(vendor)
+        if not vendor_key:
+            return False
+        try:
+            total = float(total)
+            confirmed_date = datetime.strptime(date_str, '%Y-%m-%d').date() if date_str else None
+        except (TypeError, ValueError):
+            return False
+
+        lines = [line.strip() for line in (text or '').splitlines() if line.strip()]
+        layout = {}
+        # Only labels the rules would read as a total: never e.g. the card line repeating the amount
+        labels = [label for label, amount in self._amount_lines(lines)
+                  if _is_total_label(label) and abs(abs(amount) - abs(total)) < 0.005]
+        if labels:
+            layout['total_label'] = labels[-1]
+        if confirmed_date:
+            for label, parsed, fmt in self._date_lines(lines):
+                # An empty label is fine: receipts often print the date on its own line
+                if parsed.date() == confirmed_date:
+                    layout.update(date_label=label, date_format=fmt)
+                    break
+        if 'total_label' not in layout or 'date_label' not in layout:
+            return False
+
+        existing = self.get_template(doc_type, vendor)
+        same_layout = existing is not None and all(existing.get(k) == v for k, v in layout.items())
+        samples = (existing.get('samples', 1) + 1) if same_layout else 1
+        self._save_template(doc_type, vendor_key, layout, samples)
+        self.stats['learned'] += 1
+        return True
+
+    def get_template(self, doc_type: str, vendor: Optional[str]) -> Optional[dict]:
+        self._ensure_templates()
+        return self._templates.get((doc_type, normalize_vendor_name(vendor)))
+    # endregion
+
+    # region Rules
+    @staticmethod
+    def _amount_lines(lines: List[str]) -> List[Tuple[str, float]]:
+        found = []
+        for line in lines:
+            match = AMOUNT_LINE_PATTERN.match(line)
+            if not match:
+                continue
+            amount = float(match.group('amount').replace(',', ''))
+            label = _normalize_label(match.group('label'))
+            if match.group('neg') or 'refund' in label:
+                amount = -amount
+            found.append((label, amount))
+        return found
+
+    @staticmethod
+    def _date_lines(lines: List[str]) -> List[Tuple[str, datetime, str]]:
+        found = []
+        for line in lines:
+            for token_match in DATE_TOKEN_PATTERN.finditer(line):
+                parsed, fmt = _parse_date(token_match.group(0))
+                if parsed:
+                    found.append((_normalize_label(line[:token_match.start()]), parsed, fmt))
+        return found
+
+    def _apply_rules(self, lines: List[str]) -> LocalExtraction:
+        result = LocalExtraction(method='rules')
+
+        # Total: strongest label wins; agreeing repeats raise confidence, disagreement lowers it
+        strong, weak = [], []
+        for label, amount in self._amount_lines(lines):
+            if not _is_total_label(label):
+                continue
+            (strong if any(x in label for x in STRONG_TOTAL_LABELS) else weak).append(amount)
+        total_conf = 0.0
+        if strong:
+            result.total = strong[-1]
+            total_conf = 0.95 if len(set(strong)) == 1 else 0.6
+        elif weak:
+            result.total = max(weak, key=abs)
+            total_conf = 0.85 if len(set(weak)) == 1 else 0.5
+
+        # Date: labelled issue date first, otherwise the only date in the document
+        labelled, unlabelled = [], []
+        for label, parsed, _ in self._date_lines(lines):
+            if any(x in label for x in EXCLUDED_DATE_LABELS):
+                continue
+            (labelled if any(label.endswith(x) for x in DATE_LABELS) else unlabelled).append(parsed)
+        date_conf = 0.0
+        if labelled:
+            result.date = labelled[0]
+            date_conf = 0.95 if len(set(labelled)) == 1 else 0.75
+        elif unlabelled:
+            result.date = unlabelled[0]
+            date_conf = 0.85 if len(set(unlabelled)) == 1 else 0.4
+
+        term_match = TERM_PATTERN.search('\n'.join(lines))
+        if term_match:
+            result.term = int(term_match.group(1))
+
+        result.confidence = min(total_conf, date_conf)
+        return result
+
+    def _apply_template(self, lines: List[str], template: dict) -> Optional[LocalExtraction]:
+        totals = [amount for label, amount in self._amount_lines(lines) if label == template.get('total_label')]
+        dates = [
+            parsed for label, parsed, fmt in self._date_lines(lines)
+            if label == template.get('date_label') and fmt == template.get('date_format')
+        ]
+        if not totals or not dates:
+            return None
+        term_match = TERM_PATTERN.search('\n'.join(lines))
+        return LocalExtraction(
+            total=totals[-1],
+            date=dates[0],
+            term=int(term_match.group(1)) if term_match else None,
+            # A single unreviewed confirmation must not bypass the LLM on its own
+            confidence=(0.99 if template.get('samples', 1) >= TEMPLATE_MIN_SAMPLES
+                        else min(0.95, self.min_confidence - 0.01)),
+            method='template',
+            layout=template
+        )
+    # endregion
+
+    # region Template Storage
+    def _ensure_templates(self) -> None:
+        with self._lock:
+            if self._templates is not None:
+                return
+            with get_db_session() as session:
+                rows = session.query(VendorExtractionTemplate).all()
+                self._templates = {
+                    (row.doc_type, row.vendor_key): dict(row.layout or {}, samples=row.samples) for row in rows
+                }
+            self.logger.info(f'📐 Loaded {len(self._templates)} vendor extraction template(s).')
+
+    def _save_template(self, doc_type: str, vendor_key: str, layout: dict, samples: int) -> None:
+        with get_db_session() as session:
+            stmt = insert(VendorExtractionTemplate).values(
+                doc_type=doc_type, vendor_key=vendor_key, layout=layout, samples=samples
+            )
+            session.execute(stmt.on_conflict_do_update(
+                constraint='uq_vendor_extraction_template',
+                set_={'layout': stmt.excluded.layout, 'samples': stmt.excluded.samples, 'updated_at': datetime.utcnow()}
+            ))
+        with self._lock:
+            self._templates[(doc_type, vendor_key)] = dict(layout, samples=samples)
+        self.logger.info(f"📐 Learned {doc_type} layout for '{vendor_key}' ({samples} sample(s)).")
+    # endregion
+
+
+local_extractor = LocalExtractor()
+
+
 class OCRService():
 
     def __init__(self):
         if not hasattr(self, '_initialized'):
             self.logger = logger
-            self.client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+            self.llm_extractor = llm_extractor
+            self.local_extractor = local_extractor
             self.logger.info('OCR Service initialized')
             self._initialized = True
 
-    def extract_text_from_file(self, file_data: bytes) -> str:
-        """Extract text from a file (invoice, receipt, or W-9)."""
+    def extract_text_from_file(self, file_data, stop_when=None) -> str:
+        """
+        Extract text from a file (invoice, receipt, or W-9), given as bytes or a local path.
+        PDFs are OCR'd page by page in the shared OCR process pool; `stop_when(text)`
+        ends OCR early once it returns True.
+        """
         try:
-            image = Image.open(io.BytesIO(file_data))
-            text = pytesseract.image_to_string(image)
-            return text
+            return ocr_engine.ocr_document(file_data, stop_when=stop_when)
         except Exception as e:
             logger.error(f'OCR extraction failed: {e}')
             return ''
 
-    def extract_text_from_invoice(self, file_data: bytes) -> str:
+    def extract_text_from_invoice(self, file_data) -> str:
         """Extract text specifically from an invoice file."""
-        return self.extract_text_from_file(file_data)
+        return self.extract_text_from_file(file_data, stop_when=fields_found(INVOICE_FIELD_PATTERNS))
 
     def parse_invoice_details(self, text_data: str) -> dict:
         """Parse invoice details from extracted text."""
@@ -59,61 +349,82 @@ class OCRService():
                 details['tax_id'] = lines[i + 1].strip()
         return details
 
-    def extract_text_from_receipt(self, file_data: bytes) -> str:
+    def extract_text_from_receipt(self, file_data) -> str:
         """Extract text from a receipt."""
-        return self.extract_text_from_file(file_data)
+        return self.extract_text_from_file(file_data, stop_when=fields_found(RECEIPT_FIELD_PATTERNS))
 
     def parse_receipt_details(self, text_data: str) -> dict:
         """Parse receipt details from extracted text."""
         details = {}
         return details
 
-    def extract_info_with_openai(self, text):
-        messages = [{'role': 'system', 'content': "You are an AI assistant that extracts information from financial documents for a production company / digital creative studio. Extract the following details from the text:\n                   Invoice Date (Formatted as YYYY-MM-DD),  Total Amount, Payment Term.\n                   Respond with pure, parsable, JSON (no leading or trailing apostrophes) with keys: 'invoice_date', 'total_amount', 'payment_term' If any fields are empty make their value None"}, {'role': 'user', 'content': text}]
-        response = self.client.chat.completions.create(model='gpt-3.5-turbo', messages=messages, max_tokens=1000, temperature=0)
-        extracted_info = response.choices[0].message.content.strip()
+    def extract_invoice_info(self, text, vendor=None):
+        """
+        Returns (info, error) like extract_info_with_openai. Tries the local
+        rule/template extractor first and only calls the LLM when its confidence
+        is below Config.LOCAL_EXTRACTION_MIN_CONFIDENCE.
+        """
+        local = self.local_extractor.extract(text, 'invoice', vendor)
+        if local.confidence >= self.local_extractor.min_confidence:
+            self.local_extractor.stats['local'] += 1
+            self.logger.info(f'⚡ Invoice extracted locally ({local.method}, confidence={local.confidence:.2f}).')
+            return (local.as_invoice_info(), None)
+
+        self.local_extractor.stats['llm'] += 1
+        (info, err) = self.extract_info_with_openai(text)
+        if info and not err:
+            self._learn('invoice', vendor, text, info.get('total_amount'), info.get('invoice_date'))
+        return (info, err)
+
+    def extract_receipt_info(self, text, vendor=None):
+        """
+        Returns {'total_amount', 'description', 'date'} or None, locally when
+        confident enough, otherwise via extract_receipt_info_with_openai.
+        """
+        local = self.local_extractor.extract(text, 'receipt', vendor)
+        if local.confidence >= self.local_extractor.min_confidence:
+            self.local_extractor.stats['local'] += 1
+            self.logger.info(f'⚡ Receipt extracted locally ({local.method}, confidence={local.confidence:.2f}).')
+            return local.as_receipt_info()
+
+        self.local_extractor.stats['llm'] += 1
+        info = self.extract_receipt_info_with_openai(text)
+        if info:
+            self._learn('receipt', vendor, text, info.get('total_amount'), info.get('date'))
+        return info
+
+    def _learn(self, doc_type, vendor, text, total, date_str):
         try:
-            info = json.loads(extracted_info)
-            return (info, None)
-        except json.JSONDecodeError:
-            logging.error('Failed to parse JSON from OpenAI response')
-            return (None, 'json_decode_error')
+            self.local_extractor.learn(doc_type, vendor, text, total, date_str)
         except Exception as e:
-            logging.error(f'An error occurred in extract_info_with_openai: {e}')
-            return (None, 'unknown_error')
+            self.logger.warning(f'Could not learn {doc_type} layout for {vendor}: {e}')
+
+    def extract_info_with_openai(self, text):
+        """
+        Returns (info, error) with 'invoice_date', 'total_amount', 'payment_term'.
+        Trimmed and memoized by the shared llm_extractor.
+        """
+        return self.llm_extractor.extract_invoice(text)
 
     def extract_receipt_info_with_openai(self, text):
-        messages = [{'role': 'system', 'content': "You are an AI assistant that extracts information from receipts.\n                    Extract the following details from the text: \n                    Total Amount (numbers only, no symbols), \n                    Date of purchase (format YYYY-MM-DD), and \n                    generate a description (summarize to 20 characters maximum). \n                    If the total is a refund then the value should be negative. \n                    Provide the information in JSON format with keys: 'total_amount', 'description', 'date'."}, {'role': 'user', 'content': text}]
-        response = self.client.chat.completions.create(model='gpt-3.5-turbo', messages=messages, max_tokens=1000, temperature=0)
-        extracted_info = response.choices[0].message.content.strip()
-        extracted_info_clean = extracted_info.replace('```json', '').replace('```', '').strip()
-        try:
-            info = json.loads(extracted_info_clean)
-            return info
-        except json.JSONDecodeError:
-            logging.error('Failed to parse JSON from OpenAI response')
-            return None
+        """
+        Returns {'total_amount', 'description', 'date'} or None. Receipts are
+        trimmed, memoized and batched with concurrent receipts by llm_extractor.
+        """
+        return self.llm_extractor.extract_receipt(text)
 
     def extract_text(self, local_file_path: str) -> str:
         """
-        Extracts text from a PDF or image file using OCR or direct PDF text extraction.
+        Extracts text from a PDF or image file in a single pass: the PDF text layer is
+        read directly and only image-only pages are OCR'd (see ocr_engine.extract_document).
 
         :param local_file_path: The local file path of the document or image.
         :return: A string containing all text extracted from the file.
         """
-        (_, ext) = os.path.splitext(local_file_path.lower())
-        text_content = ''
         try:
-            if ext == '.pdf':
-                logging.info(f'🔎 [OCRService] Processing PDF with pdfplumber: {local_file_path}')
-                with pdfplumber.open(local_file_path) as pdf:
-                    for page in pdf.pages:
-                        page_text = page.extract_text() or ''
-                        text_content += page_text + '\n'
-            else:
-                logging.info(f'🔎 [OCRService] Processing image with pytesseract: {local_file_path}')
-                image = Image.open(local_file_path)
-                text_content = pytesseract.image_to_string(image)
+            document = ocr_engine.extract_document(local_file_path, stop_when=fields_found(INVOICE_FIELD_PATTERNS))
+            logging.info(f'🔎 [OCRService] Extracted {local_file_path}: {document.summary()}')
+            return document.text.strip()
         except Exception as e:
             logging.error(f'❌ [OCRService] Failed to extract text from file {local_file_path}: {e}', exc_info=True)
-        return text_content.strip()
\ No newline at end of file
+            return ''
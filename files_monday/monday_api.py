@@ -5,6 +5,7 @@ import time
 import concurrent.futures
 import random
 import threading
+from collections import deque
 from dotenv import load_dotenv
 import requests
 
@@ -51,6 +52,12 @@ class MondayAPI(metaclass=SingletonMeta):
     MINIMUM_COMPLEXITY_THRESHOLD = int(100000)
     WAIT_TIME_FOR_COMPLEXITY_RESET = 20  # seconds
 
+    # Packing for push_subitems: complexity budget per request and the starting
+    # estimate for one subitem mutation (refined from each response's complexity.query).
+    SUBITEM_MUTATION_BUDGET = 1000000
+    SUBITEM_MUTATION_COST_ESTIMATE = 30000
+    MAX_SUBITEM_MUTATIONS_PER_REQUEST = 50
+
     # region 3.1: Initialization
     def __init__(self):
         """
@@ -490,6 +497,102 @@ class MondayAPI(metaclass=SingletonMeta):
                 '''
             mutations.append(mutation.strip())
         return "mutation {" + " ".join(mutations) + "}"
+
+    def push_subitems(self, creates: list, updates: list) -> dict:
+        """
+        Project-wide subitem push. Creates and updates from every PO are packed
+        together into aliased mutations sized to a complexity budget, and sent with
+        at most `max_concurrent_subitem_requests` requests in flight.
+
+        Each operation is a dict with 'db_sub_item', 'column_values' and 'parent_id'
+        (plus 'monday_item_id' for updates). Returns
+        {'results': [operation + {'monday_item_id', 'mutation_type'}], 'failed': [operation, ...]}.
+        """
+        pending = deque([(True, op) for op in creates] + [(False, op) for op in updates])
+        total = len(pending)
+        results, failed = [], []
+        cost_estimate = self.SUBITEM_MUTATION_COST_ESTIMATE
+        self.logger.info(f"Pushing {len(creates)} subitem create(s) and {len(updates)} update(s)...")
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_concurrent_subitem_requests) as executor:
+            running = {}
+            while pending or running:
+                # Pack the next requests with the latest per-mutation cost estimate
+                while pending and len(running) < self.max_concurrent_subitem_requests:
+                    size = max(1, min(self.MAX_SUBITEM_MUTATIONS_PER_REQUEST,
+                                      self.SUBITEM_MUTATION_BUDGET // cost_estimate))
+                    chunk = [pending.popleft() for _ in range(min(size, len(pending)))]
+                    fragments = [
+                        self._subitem_mutation_fragment(f"{'c' if create else 'u'}_{i}", op, create)
+                        for i, (create, op) in enumerate(chunk)
+                    ]
+                    query = "mutation {" + " ".join(fragments) + "}"
+                    running[executor.submit(self._make_request, query, None)] = chunk
+
+                done, _ = concurrent.futures.wait(running, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    chunk = running.pop(future)
+                    try:
+                        resp = future.result()
+                    except Exception as e:
+                        self.logger.error(f"Subitem push request with {len(chunk)} mutation(s) failed: {e}")
+                        resp = None
+                    data = (resp or {}).get("data") or {}
+                    query_cost = (data.get("complexity") or {}).get("query")
+                    if query_cost:
+                        cost_estimate = max(1, int(query_cost) // len(chunk))
+                    for i, (create, op) in enumerate(chunk):
+                        sub_result = data.get(f"{'c' if create else 'u'}_{i}")
+                        if not sub_result or not sub_result.get("id"):
+                            failed.append(op)
+                            continue
+                        results.append(dict(
+                            op,
+                            monday_item_id=sub_result["id"],
+                            mutation_type="create" if create else "update"
+                        ))
+
+        self.logger.info(f"Subitem push finished: {len(results)}/{total} succeeded, {len(failed)} failed.")
+        return {"results": results, "failed": failed}
+
+    def _subitem_mutation_fragment(self, alias: str, subitem: dict, create: bool) -> str:
+        """
+        One aliased create_subitem / change_multiple_column_values call. Uses the
+        operation's prepared 'column_values' when present.
+        """
+        db_sub_item = subitem.get("db_sub_item", {})
+        column_values = subitem.get("column_values")
+        if column_values is None:
+            column_values = self.monday_util.subitem_column_values_formatter(
+                project_id=db_sub_item.get("project_number"),
+                po_number=db_sub_item.get("po_number"),
+                detail_number=db_sub_item.get("detail_number"),
+                line_number=db_sub_item.get("line_number"),
+                description=db_sub_item.get("description"),
+                quantity=db_sub_item.get("quantity"),
+                rate=db_sub_item.get("rate"),
+                date=db_sub_item.get("transaction_date"),
+                due_date=db_sub_item.get("due_date"),
+                account_number=db_sub_item.get("account_code"),
+                link=db_sub_item.get("file_link"),
+                ot=db_sub_item.get("ot"),
+                fringes=db_sub_item.get("fringes"),
+                status=db_sub_item.get("state")
+            )
+        if not isinstance(column_values, str):
+            column_values = json.dumps(column_values)
+        # json.dumps yields a correctly escaped GraphQL string literal
+        column_values_arg = json.dumps(column_values)
+        if create:
+            item_name = json.dumps(db_sub_item.get("description") or f"Subitem {db_sub_item.get('detail_number')}")
+            return (
+                f'{alias}: create_subitem(parent_item_id: {subitem.get("parent_id")}, '
+                f'item_name: {item_name}, column_values: {column_values_arg}) {{ id }}'
+            )
+        return (
+            f'{alias}: change_multiple_column_values(board_id: {self.SUBITEM_BOARD_ID}, '
+            f'item_id: {subitem.get("monday_item_id")}, column_values: {column_values_arg}) {{ id }}'
+        )
     # endregion
 
     # region 3.6: Fetch Methods
@@ -3,6 +3,7 @@ import os
 import time
 import logging
 from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
 
 from dotenv import load_dotenv
 from xero.auth import OAuth2Credentials
@@ -13,6 +14,9 @@ from xero.exceptions import (
 )
 
 from database_pg.models_pg import DetailItem
+from files_xero.xero_bulk_writer import XeroBulkWriter
+from files_xero.xero_rate_governor import xero_rate_governor, RateObservingAuth, XeroThrottled
+from files_xero.xero_token_broker import xero_token_broker
 from utilities.singleton import SingletonMeta
 
 # Configure a logger for Xero operations
@@ -27,6 +31,9 @@ class XeroAPI(metaclass=SingletonMeta):
     and new methods to create/update SPEND transactions for improved functionality.
     """
 
+    # Contact names per raw OR-filter lookup (keeps the query string well under URL limits)
+    NAME_FILTER_CHUNK = 25
+
     # region 1️⃣ Initialization & Environment
     def __init__(self):
         """
@@ -58,14 +65,14 @@ class XeroAPI(metaclass=SingletonMeta):
         # Logger for Xero operations
         self.logger = logging.getLogger('xero_logger')
 
-        # Prepare a default token dict
+        # Prepare a default token dict. Its freshness is unknown, so it counts as expired:
+        # the first call takes the shared token from the broker (seeding it from .env if empty).
         current_time = time.time()
-        default_expires_in = 1800  # 30 minutes
         token_dict = {
             'access_token': self.access_token,
             'refresh_token': self.refresh_token,
-            'expires_in': default_expires_in,
-            'expires_at': current_time + default_expires_in,
+            'expires_in': 0,
+            'expires_at': current_time,
             'token_type': 'Bearer',
             'scope': self.scope.split()
         }
@@ -80,9 +87,13 @@ class XeroAPI(metaclass=SingletonMeta):
         if self.tenant_id:
             self.credentials.tenant_id = self.tenant_id
 
+        self.rate_governor = xero_rate_governor
+        self.token_broker = xero_token_broker
+        self.bulk_writer = XeroBulkWriter(self)
+
         from xero import Xero  # Re-import for clarity
         self.xero = Xero(self.credentials)
-        self._refresh_token_if_needed()
+        self._install_rate_observer()
 
         self.logger.info('🚀 - XeroAPI initialized.')
         self._initialized = True
@@ -91,51 +102,58 @@ class XeroAPI(metaclass=SingletonMeta):
 
     # region 2️⃣ Token Refresh & Retry Logic
     def _refresh_token_if_needed(self, force=False):
-        # If not forced and token isn't expired, skip
-        if not force and not self.credentials.expired():
+        """
+        Make sure the credentials carry a live token. Refreshing goes through the shared
+        token broker (one refresh across all workers); the new token is swapped into the
+        existing credentials, so `self.xero` is not rebuilt. `force` (after a 401) marks
+        the current access token as rejected.
+        """
+        # If not forced and token isn't close to expiry, skip
+        if not force and not self.credentials.expired(seconds=self.token_broker.refresh_margin):
             self.logger.debug('[XeroAPI] Token still valid, no refresh needed.')
             return
 
-        self.logger.debug('[XeroAPI] 🔑 Refreshing token...')
+        self.logger.debug('[XeroAPI] 🔑 Fetching shared token...')
         try:
-            self.credentials.refresh()
-            self.logger.info('[XeroAPI] 🔄 Token refresh successful!')
-
-            # If your code sets tenant explicitly, do so after refreshing:
-            if not self.credentials.tenant_id:
-                tenants = self.credentials.get_tenants()
-                if tenants:
-                    self.credentials.tenant_id = tenants[0]['tenantId']
-                    self.logger.debug(f'[XeroAPI] 🏢 Tenant set to {self.credentials.tenant_id}')
-
-            # Re-init the Xero client with the new token
-            from xero import Xero
-            self.xero = Xero(self.credentials)
-
-            # Optional: store tokens in env (though not strictly needed inside the same process)
-            new_token = self.credentials.token
-            os.environ['XERO_ACCESS_TOKEN'] = new_token.get('access_token', '')
-            os.environ['XERO_REFRESH_TOKEN'] = new_token.get('refresh_token', '')
+            rejected = (self.credentials.token or {}).get('access_token') if force else None
+            self.token_broker.install(self.credentials, rejected_access_token=rejected)
+            self._install_rate_observer()
+            self.logger.info('[XeroAPI] 🔄 Token ready.')
 
         except XeroException as e:
             self.logger.error(f'[XeroAPI] ❌ Error refreshing token: {e}')
             raise e
 
+    def _install_rate_observer(self):
+        """
+        Let the rate governor read X-MinLimit-Remaining / X-DayLimit-Remaining from every
+        response. Re-applied whenever the credentials build a new OAuth2 object.
+        """
+        oauth = getattr(self.credentials, '_oauth', None)
+        if oauth is not None and not isinstance(oauth, RateObservingAuth):
+            self.credentials._oauth = RateObservingAuth(oauth, self.rate_governor)
+
     def _retry_on_unauthorized(self, func, *args, **kwargs):
         """
         Retry logic for certain Xero exceptions (Unauthorized, RateLimit, etc.).
+        Every attempt runs inside a rate-governor slot. A 429 whose Retry-After is longer
+        than the governor's inline wait raises XeroThrottled instead of sleeping, so
+        Celery tasks can re-queue themselves with a countdown.
         """
         max_retries = 3
         for attempt in range(1, max_retries + 1):
             try:
                 self.logger.debug(f'[XeroAPI] Attempt {attempt} => {func.__name__}')
-                return func(*args, **kwargs)
+                with self.rate_governor.slot():
+                    return func(*args, **kwargs)
             except XeroUnauthorized:
                 self.logger.warning('[XeroAPI] ⚠️ Unauthorized, attempting force-refresh.')
                 self._refresh_token_if_needed(force=True)
-            except XeroRateLimitExceeded:
-                self.logger.warning(f'[XeroAPI] 🔃 Rate limit on attempt {attempt}, sleeping 65s...')
-                time.sleep(65)
+            except XeroRateLimitExceeded as e:
+                retry_after = self.rate_governor.throttled(getattr(e, 'response', None))
+                if retry_after > self.rate_governor.max_inline_wait:
+                    raise XeroThrottled(retry_after, 'retry-after') from e
+                self.logger.warning(f'[XeroAPI] 🔃 Rate limit on attempt {attempt}, retrying in {retry_after:.0f}s.')
             except XeroException as e:
                 self.logger.error(f'[XeroAPI] ❌ XeroException: {e}')
                 raise e
@@ -195,6 +213,8 @@ class XeroAPI(metaclass=SingletonMeta):
                 return results[0]
             self.logger.info(f'[XeroAPI - contact {name}] ℹ️ - No match in Xero.')
             return None
+        except XeroThrottled:
+            raise
         except XeroException as e:
             self.logger.error(f'[XeroAPI - contact {name}] ❌ - XeroException: {str(e)}')
             return None
@@ -202,17 +222,25 @@ class XeroAPI(metaclass=SingletonMeta):
             self.logger.error(f'[XeroAPI - contact {name}] 💥 - Unexpected: {str(e)}')
             return None
 
-    def get_all_contacts(self):
+    def get_all_contacts(self, since: datetime = None):
+        """
+        All contacts, or with `since` only those modified after it (If-Modified-Since).
+        """
         self._refresh_token_if_needed()
         function_name = 'get_all_contacts'
-        self.logger.info(f'[XeroAPI] 📇 - Fetching all contacts...')
+        self.logger.info(f'[XeroAPI] 📇 - Fetching all contacts{f" modified since {since}" if since else ""}...')
         try:
-            contacts = self._retry_on_unauthorized(self.xero.contacts.all)
+            if since:
+                contacts = self._retry_on_unauthorized(self.xero.contacts.filter, since=since)
+            else:
+                contacts = self._retry_on_unauthorized(self.xero.contacts.all)
             if not contacts:
                 self.logger.info(f'[XeroAPI] ℹ️ - No contacts found.')
                 return []
             self.logger.debug(f'[XeroAPI] ✅ - Retrieved {len(contacts)} contacts.')
             return contacts
+        except XeroThrottled:
+            raise
         except XeroException as e:
             self.logger.error(f'[XeroAPI] ❌ - XeroException retrieving all contacts: {str(e)}')
             return []
@@ -220,6 +248,18 @@ class XeroAPI(metaclass=SingletonMeta):
             self.logger.error(f'[XeroAPI] 💥 - Unexpected: {str(e)}')
             return []
 
+    def get_contacts_page(self, page: int, since: datetime = None) -> list:
+        """
+        One page (100) of contacts, oldest UpdatedDateUTC first; with `since`, only those
+        modified after it. XeroException propagates so a resumable sync can stop cleanly.
+        """
+        self._refresh_token_if_needed()
+        self.logger.debug(f'[XeroAPI] 📇 - Fetching contacts page {page}{f" modified since {since}" if since else ""}...')
+        filter_kwargs = {'page': page, 'order': 'UpdatedDateUTC ASC'}
+        if since:
+            filter_kwargs['since'] = since
+        return self._retry_on_unauthorized(self.xero.contacts.filter, **filter_kwargs) or []
+
     def create_contact(self, contact_data: dict):
         self._refresh_token_if_needed()
         function_name = 'create_contact'
@@ -228,6 +268,8 @@ class XeroAPI(metaclass=SingletonMeta):
             created = self._retry_on_unauthorized(self.xero.contacts.put, [contact_data])
             self.logger.debug(f'[XeroAPI] ✅ - Created contact: {created}')
             return created
+        except XeroThrottled:
+            raise
         except XeroException as e:
             self.logger.error(f'[XeroAPI] ❌ - XeroException creating contact: {str(e)}')
             return None
@@ -247,6 +289,8 @@ class XeroAPI(metaclass=SingletonMeta):
                 return None
             self.logger.debug(f'[XeroAPI - contactID {cid}] 🔍 - Updated: {updated}')
             return updated
+        except XeroThrottled:
+            raise
         except XeroException as e:
             self.logger.error(f'[XeroAPI - contactID {cid}] ❌ - XeroException: {str(e)}')
             return None
@@ -255,48 +299,42 @@ class XeroAPI(metaclass=SingletonMeta):
             return None
 
     def update_contact_with_retry(self, contact_data, max_retries=3):
+        """
+        Update one contact. Rate limits are scheduled by the rate governor; a long
+        wait raises XeroThrottled for the calling task to re-queue.
+        """
         function_name = 'update_contact_with_retry'
         cid = contact_data.get('ContactID')
-        self.logger.info(
-            f'[XeroAPI - contactID {cid}] 🔄 - Updating with up to {max_retries} retries.')
+        self.logger.info(f'[XeroAPI - contactID {cid}] 🔄 - Updating contact (governed).')
         self._refresh_token_if_needed()
-        for attempt in range(1, max_retries + 1):
-            try:
-                updated = self.xero.contacts.save(contact_data)
-                return updated
-            except XeroRateLimitExceeded:
-                self.logger.warning(
-                    f'[XeroAPI - contactID {cid}] 🔃 - Rate limit. Attempt {attempt} of {max_retries}.')
-                time.sleep(65)
-            except XeroException as xe:
-                self.logger.error(f'[XeroAPI - contactID {cid}] ❌ - XeroException: {xe}')
-                return None
-            except Exception as e:
-                self.logger.error(f'[XeroAPI - contactID {cid}] 💥 - Unexpected: {str(e)}')
-                return None
-        self.logger.error(f'[XeroAPI - contactID {cid}] ❌ - Failed after multiple retries.')
-        return None
+        try:
+            return self._retry_on_unauthorized(self.xero.contacts.save, contact_data)
+        except XeroThrottled:
+            raise
+        except XeroException as xe:
+            self.logger.error(f'[XeroAPI - contactID {cid}] ❌ - XeroException: {xe}')
+            return None
+        except Exception as e:
+            self.logger.error(f'[XeroAPI - contactID {cid}] 💥 - Unexpected: {str(e)}')
+            return None
 
     def update_contacts_with_retry(self, contacts_data: list[dict], max_retries=3):
+        """
+        Batch update of contacts through the rate governor (see update_contact_with_retry).
+        """
         function_name = 'update_contacts_with_retry'
         self.logger.info(f'[XeroAPI] 🔄 - Batch update of {len(contacts_data)} contact(s)...')
         self._refresh_token_if_needed()
-        for attempt in range(1, max_retries + 1):
-            try:
-                updated = self.xero.contacts.save(contacts_data)
-                return updated
-            except XeroRateLimitExceeded:
-                self.logger.warning(
-                    f'[XeroAPI] 🔃 - Rate limit on attempt {attempt}. Sleeping 65s...')
-                time.sleep(65)
-            except XeroException as xe:
-                self.logger.error(f'[XeroAPI] ❌ - XeroException in batch contact update: {xe}')
-                return None
-            except Exception as e:
-                self.logger.error(f'[XeroAPI] 💥 - Unexpected: {str(e)}')
-                return None
-        self.logger.error(f'[XeroAPI] ❌ - Failed after multiple retries.')
-        return None
+        try:
+            return self._retry_on_unauthorized(self.xero.contacts.save, contacts_data)
+        except XeroThrottled:
+            raise
+        except XeroException as xe:
+            self.logger.error(f'[XeroAPI] ❌ - XeroException in batch contact update: {xe}')
+            return None
+        except Exception as e:
+            self.logger.error(f'[XeroAPI] 💥 - Unexpected: {str(e)}')
+            return None
 
     # endregion
 
@@ -312,6 +350,8 @@ class XeroAPI(metaclass=SingletonMeta):
                 [payload]
             )
             return result
+        except XeroThrottled:
+            raise
         except XeroException as e:
             self.logger.error(f'❌ XeroException: {e}')
             return None
@@ -319,18 +359,15 @@ class XeroAPI(metaclass=SingletonMeta):
             self.logger.error(f'💥 Unexpected error: {e}')
             return None
 
-    def create_invoice_bulk(self, payloads: list):
+    def create_invoice_bulk(self, payloads: list) -> dict:
+        """
+        Create ACCPAY invoices in chunks with per-element validation (see XeroBulkWriter).
+        Returns {'created': {InvoiceNumber: invoice}, 'failed': {InvoiceNumber: [errors]},
+        'unsent': [InvoiceNumber], 'retry_after': seconds or None}.
+        """
         self._refresh_token_if_needed()
         self.logger.info(f'Creating {len(payloads)} ACCPAY invoices in Xero in bulk.')
-        try:
-            result = self._retry_on_unauthorized(self.xero.invoices.put, payloads)
-            return result
-        except XeroException as e:
-            self.logger.error(f'❌ XeroException: {e}')
-            return None
-        except Exception as e:
-            self.logger.error(f'💥 Unexpected error: {e}')
-            return None
+        return self.bulk_writer.put('invoices', payloads, reference_key='InvoiceNumber')
 
     def update_invoice(self, xero_id: str, changes: dict):
         self._refresh_token_if_needed()
@@ -349,6 +386,8 @@ class XeroAPI(metaclass=SingletonMeta):
                 self.xero.invoices.save, invoice_obj
             )
             return updated
+        except XeroThrottled:
+            raise
         except XeroException as e:
             self.logger.error(f'[update_invoice] ❌ XeroException: {e}')
             return None
@@ -379,6 +418,8 @@ class XeroAPI(metaclass=SingletonMeta):
             )
             self.logger.info(f'[delete_invoice] - Invoice {invoice_id} set to DELETED successfully.')
             return deleted_resp
+        except XeroThrottled:
+            raise
         except XeroException as e:
             self.logger.error(f'[delete_invoice] ❌ XeroException: {e}')
             return None
@@ -401,6 +442,8 @@ class XeroAPI(metaclass=SingletonMeta):
             if full_inv.get('Status') == 'DELETED':
                 return None
             return full_inv
+        except XeroThrottled:
+            raise
         except XeroException as e:
             self.logger.error(f'[get_invoice_details] ❌ XeroException: {e}')
             return None
@@ -429,6 +472,8 @@ class XeroAPI(metaclass=SingletonMeta):
             else:
                 self.logger.warning(f'[add_line_item_to_invoice] - No response from Xero after saving invoice.')
                 return {}
+        except XeroThrottled:
+            raise
         except XeroException as e:
             self.logger.error(f'[add_line_item_to_invoice] - XeroException: {e}')
             return {}
@@ -466,6 +511,8 @@ class XeroAPI(metaclass=SingletonMeta):
             else:
                 self.logger.warning(f'[update_line_item_in_invoice] - No response from Xero after saving invoice.')
                 return {}
+        except XeroThrottled:
+            raise
         except XeroException as e:
             self.logger.error(f'[update_line_item_in_invoice] - XeroException: {e}')
             return {}
@@ -532,6 +579,8 @@ class XeroAPI(metaclass=SingletonMeta):
             self.logger.debug(
                 f'[XeroAPI - reference {reference}] 🔍 - Xero response: {created_invoice}')
             return created_invoice
+        except XeroThrottled:
+            raise
         except XeroException as e:
             self.logger.error(f'[XeroAPI - reference {reference}] ❌ - XeroException: {str(e)}')
             return None
@@ -554,6 +603,8 @@ class XeroAPI(metaclass=SingletonMeta):
             self.logger.debug(
                 f'[XeroAPI - invoice_id {invoice_id}] 🔍 - Updated invoice: {updated_invoices}')
             return updated_invoices
+        except XeroThrottled:
+            raise
         except XeroException as e:
             self.logger.error(f'[XeroAPI - invoice_id {invoice_id}] ❌ - XeroException: {str(e)}')
             return None
@@ -564,15 +615,23 @@ class XeroAPI(metaclass=SingletonMeta):
     # endregion
 
     # region 5.3 🔹 Bill Retrieval
-    def get_bills_by_reference(self, reference_str: str):
+    def get_bills_by_reference(self, reference_str: str, since: datetime = None):
+        """
+        Full ACCPAY invoices whose InvoiceNumber contains `reference_str`; with `since`,
+        only those modified after it (If-Modified-Since).
+        """
         self._refresh_token_if_needed()
-        self.logger.info(f'- Searching for ACCPAY invoices using Reference="{reference_str}"')
+        self.logger.info(f'- Searching for ACCPAY invoices using Reference="{reference_str}"'
+                         f'{f" modified since {since}" if since else ""}')
 
         try:
             raw_filter = f'Type=="ACCPAY" AND InvoiceNumber!=null AND InvoiceNumber.Contains("{reference_str}") AND Status!="DELETED"'
             self.logger.debug(f'Using raw filter => {raw_filter}')
 
-            invoices = self._retry_on_unauthorized(self.xero.invoices.filter, raw=raw_filter)
+            filter_kwargs = {'raw': raw_filter}
+            if since:
+                filter_kwargs['since'] = since
+            invoices = self._retry_on_unauthorized(self.xero.invoices.filter, **filter_kwargs)
 
             if not invoices:
                 self.logger.info(f'- No results for reference="{reference_str}". Returning [].')
@@ -592,6 +651,8 @@ class XeroAPI(metaclass=SingletonMeta):
 
             return detailed_invoices
 
+        except XeroThrottled:
+            raise
         except XeroException as e:
             self.logger.error(f'❌ XeroException: {e}')
             return []
@@ -633,6 +694,8 @@ class XeroAPI(metaclass=SingletonMeta):
             self.logger.debug(f'- Filtered out DELETED. Found {len(results)} invoice(s).')
             return results
 
+        except XeroThrottled:
+            raise
         except XeroException as e:
             self.logger.error(f'❌ XeroException: {e}')
             return []
@@ -745,6 +808,8 @@ class XeroAPI(metaclass=SingletonMeta):
             self.logger.debug(
                 f'[XeroAPI - detail_item {detail_item_id}] 🔍 - Xero response: {created}')
             return created
+        except XeroThrottled:
+            raise
         except XeroException as e:
             self.logger.error(f'[XeroAPI - detail_item {detail_item_id}] ❌ - XeroException: {str(e)}')
             return None
@@ -774,6 +839,8 @@ class XeroAPI(metaclass=SingletonMeta):
             if created:
                 self.logger.debug(f'[create_spend_money_in_xero] => {created}')
             return created
+        except XeroThrottled:
+            raise
         except XeroException as e:
             self.logger.error(f'[create_spend_money_in_xero] ❌ - XeroException: {str(e)}')
             return None
@@ -803,6 +870,8 @@ class XeroAPI(metaclass=SingletonMeta):
             self.logger.debug(
                 f'[XeroAPI - spend_money {xero_spend_money_id}] 🔍 - Updated: {updated}')
             return updated
+        except XeroThrottled:
+            raise
         except XeroException as e:
             self.logger.error(
                 f'[XeroAPI - spend_money {xero_spend_money_id}] ❌ - XeroException: {str(e)}')
@@ -826,6 +895,8 @@ class XeroAPI(metaclass=SingletonMeta):
         try:
             response = self._retry_on_unauthorized(self.xero.banktransactions.put, [voided_tx])
             return response
+        except XeroThrottled:
+            raise
         except XeroException as e:
             self.logger.error(f'[XeroAPI] ❌ - XeroException creating VOIDED spend money: {str(e)}')
             return None
@@ -834,65 +905,74 @@ class XeroAPI(metaclass=SingletonMeta):
             return None
 
     # region 6.1 Bulk Spend Money Methods
-    def create_spend_money_bulk(self, spend_money_records: list[dict]):
+    def create_spend_money_bulk(self, spend_money_records: list[dict]) -> dict:
         """
-        Create multiple spend money transactions in Xero in a single API call.
+        Create spend money transactions in Xero in chunks with per-element validation.
         spend_money_records: list of dictionaries representing spend money transactions.
-        Returns the response from Xero.
+        Returns the XeroBulkWriter result keyed by Reference (see `spend_money_reference`).
         """
         self._refresh_token_if_needed()
-        #format spend_money_records into Xero Payload  for Spend Money
-        formatted_records = []
-        for spend_money_record in spend_money_records:
-            formatted_records.append({
-                'Type' : 'SPEND',
-                'Contact' : {'Name': spend_money_record.get('vendor', 'Unknown Vendor')},
-                'LineItems' : [{
-                        'Description': spend_money_record.get('description', 'No description'),
-                        'Quantity': 1,
-                        'UnitAmount': float(spend_money_record.get('amount', 0.0)),
-                        'TaxType': 'NONE',
-                        'AccountCode': spend_money_record.get('tax_code', 'Unknown Account')
-                }],
-            'Status' : (spend_money_record.get('state') or 'DRAFT').upper()
-            })
+        formatted_records = [self._spend_money_payload(r) for r in spend_money_records]
+        self.logger.info(f'[create_spend_money_bulk] Creating {len(spend_money_records)} spend money transactions in bulk...')
+        return self.bulk_writer.put('banktransactions', formatted_records, reference_key='Reference')
 
+    def _spend_money_payload(self, spend_money_record: dict) -> dict:
+        """
+        Xero SPEND BankTransaction payload for a SpendMoney record.
+        """
+        return {
+            'Type': 'SPEND',
+            'Reference': self.spend_money_reference(spend_money_record),
+            'Contact': {'Name': spend_money_record.get('vendor', 'Unknown Vendor')},
+            'LineItems': [{
+                'Description': spend_money_record.get('description', 'No description'),
+                'Quantity': 1,
+                'UnitAmount': float(spend_money_record.get('amount', 0.0)),
+                'TaxType': 'NONE',
+                'AccountCode': spend_money_record.get('tax_code', 'Unknown Account')
+            }],
+            'Status': (spend_money_record.get('state') or 'DRAFT').upper()
+        }
 
-        self.logger.info(f'[create_spend_money_bulk] Creating {len(spend_money_records)} spend money transactions in bulk...')
-        try:
-            response = self._retry_on_unauthorized(self.xero.banktransactions.put, formatted_records)
-            self.logger.debug(f'[create_spend_money_bulk] Bulk creation response: {response}')
-            return response
-        except XeroException as e:
-            self.logger.error(f'[create_spend_money_bulk] ❌ - XeroException: {str(e)}')
-            return None
-        except Exception as e:
-            self.logger.error(f'[create_spend_money_bulk] 💥 - Unexpected error: {str(e)}')
-            return None
+    @staticmethod
+    def spend_money_reference(spend_money_record: dict) -> str:
+        """
+        Reference stored on the SPEND transaction ("project_po_detail_line"), read back by
+        the spend money sync and used to match bulk responses.
+        """
+        return spend_money_record.get('xero_spend_money_reference_number') or '_'.join(
+            str(spend_money_record.get(k)) for k in ('project_number', 'po_number', 'detail_number', 'line_number'))
 
-    def update_spend_money_bulk(self, spend_money_records: list[dict]):
+    def update_spend_money_bulk(self, spend_money_records: list[dict]) -> dict:
         """
-        Update multiple spend money transactions in Xero in a single API call.
-        spend_money_records: list of dictionaries representing spend money transactions with updated data.
-        Returns the response from Xero.
+        Update existing spend money transactions (records with `xero_spend_money_id`) in
+        Xero in chunks with per-element validation.
+        Returns the XeroBulkWriter result keyed by BankTransactionID.
         """
         self._refresh_token_if_needed()
-        self.logger.info(f'{len(spend_money_records)} spend money transactions in bulk...')
-        try:
-            response = self._retry_on_unauthorized(self.xero.banktransactions.save, spend_money_records)
-            self.logger.debug(f'Bulk update response: {response}')
-            return response
-        except XeroException as e:
-            self.logger.error(f'❌ - XeroException: {str(e)}')
-            return None
-        except Exception as e:
-            self.logger.error(f'💥 - Unexpected error: {str(e)}')
-            return None
+        formatted_records = [dict(self._spend_money_payload(r), BankTransactionID=r['xero_spend_money_id'])
+                             for r in spend_money_records]
+        self.logger.info(f'[update_spend_money_bulk] Updating {len(spend_money_records)} spend money transactions in bulk...')
+        return self.bulk_writer.put('banktransactions', formatted_records, reference_key='BankTransactionID',
+                                    method='post')
     # endregion
 
     # endregion
 
-    def get_spend_money_by_reference(self, project_id: int = None, po_number: int = None, detail_number: int = None):
+    def get_spend_money_page(self, page: int, since: datetime = None) -> list:
+        """
+        One page (100) of SPEND transactions, oldest UpdatedDateUTC first; with `since`, only
+        those modified after it. Feeds the spend money index; XeroException propagates.
+        """
+        self._refresh_token_if_needed()
+        self.logger.debug(f'- Fetching SPEND transactions page {page}{f" modified since {since}" if since else ""}')
+        filter_kwargs = {'raw': 'Type=="SPEND"', 'page': page, 'order': 'UpdatedDateUTC ASC'}
+        if since:
+            filter_kwargs['since'] = since
+        return self._retry_on_unauthorized(self.xero.banktransactions.filter, **filter_kwargs) or []
+
+    def get_spend_money_by_reference(self, project_id: int = None, po_number: int = None, detail_number: int = None,
+                                     since: datetime = None):
         """
         Retrieve SPEND transactions from Xero that match a specific reference constructed
         from the provided project_id, po_number, and detail_number.
@@ -901,6 +981,7 @@ class XeroAPI(metaclass=SingletonMeta):
           project_id (int): The project ID component of the reference.
           po_number (int, optional): The purchase order number component of the reference.
           detail_number (int, optional): The detail number component of the reference.
+          since (datetime, optional): Only transactions modified after this (If-Modified-Since).
 
         Returns:
           list: A list of spend money transaction dictionaries that match the constructed reference,
@@ -934,13 +1015,18 @@ class XeroAPI(metaclass=SingletonMeta):
         try:
             raw_filter = f'Type=="SPEND" AND Reference!=null AND Reference.Contains("{reference_str}")'
             self.logger.debug(f'Using raw filter: {raw_filter}')
-            spend_transactions = self._retry_on_unauthorized(self.xero.banktransactions.filter, raw=raw_filter)
+            filter_kwargs = {'raw': raw_filter}
+            if since:
+                filter_kwargs['since'] = since
+            spend_transactions = self._retry_on_unauthorized(self.xero.banktransactions.filter, **filter_kwargs)
             if not spend_transactions:
                 self.logger.info(f'- No SPEND transactions found for Reference="{reference_str}". Returning [].')
                 return []
             results = [tx for tx in spend_transactions if tx.get('Status', '').upper() != 'VOIDED']
             self.logger.debug(f'- Found {len(results)} SPEND transaction(s) for Reference="{reference_str}".')
             return results
+        except XeroThrottled:
+            raise
         except Exception as e:
             self.logger.error(f'- Unexpected error while retrieving SPEND transactions: {e}')
             return []
@@ -959,6 +1045,8 @@ class XeroAPI(metaclass=SingletonMeta):
                 try:
                     result = future.result()
                     results.append(result)
+                except XeroThrottled:
+                    raise
                 except Exception as e:
                     self.logger.error(f'[XeroAPI] 💥 - Thread exception: {str(e)}')
         self.logger.info(f'[XeroAPI] ✅ - Batch completed with {len(results)} result(s).')
@@ -970,6 +1058,50 @@ class XeroAPI(metaclass=SingletonMeta):
     # (Legacy code commented out)
     # endregion
 
+    def get_contacts_by_names(self, names: list) -> list:
+        """
+        Contacts whose Name is in `names`, one raw OR-filter call per NAME_FILTER_CHUNK names.
+        """
+        self._refresh_token_if_needed()
+        contacts = []
+        names = sorted({n for n in names if n})
+        for i in range(0, len(names), self.NAME_FILTER_CHUNK):
+            chunk = names[i:i + self.NAME_FILTER_CHUNK]
+            conditions = " OR ".join('Name=="{}"'.format(n.replace('"', '\\"')) for n in chunk)
+            try:
+                found = self._retry_on_unauthorized(self.xero.contacts.filter, raw=conditions)
+            except XeroThrottled:
+                raise
+            except XeroException as e:
+                self.logger.error(f'[XeroAPI] ❌ - XeroException looking up {len(chunk)} contact names: {e}')
+                continue
+            contacts.extend(found or [])
+        self.logger.debug(f'[XeroAPI] 🔎 - {len(contacts)} of {len(names)} contact names found in Xero.')
+        return contacts
+
+    def ensure_contacts_bulk(self, payloads: list) -> dict:
+        """
+        Xero ContactIDs for new-contact payloads (each with a Name): names that already
+        exist in Xero are reused, the rest are created with one bulk writer call.
+        Returns {lower-cased name: ContactID}; names that could not be created are absent.
+        """
+        by_name = {p['Name'].strip().lower(): p for p in payloads if p.get('Name')}
+        contact_ids = {
+            c['Name'].strip().lower(): c['ContactID']
+            for c in self.get_contacts_by_names([p['Name'] for p in by_name.values()])
+            if c.get('Name') and c.get('ContactID')
+        }
+        to_create = [p for name, p in by_name.items() if name not in contact_ids]
+        if to_create:
+            self.logger.info(f'[XeroAPI] 👤 - Creating {len(to_create)} contacts in Xero in bulk.')
+            result = self.bulk_writer.put('contacts', to_create, reference_key='Name')
+            for name, created in result['created'].items():
+                if created.get('ContactID'):
+                    contact_ids[name.strip().lower()] = created['ContactID']
+            for name, errors in result['failed'].items():
+                self.logger.error(f"[XeroAPI] ❌ - Contact '{name}' not created: {'; '.join(errors)}")
+        return contact_ids
+
     def upsert_contacts_batch(self, contacts: list[dict]):
         """
         Attempts to upsert a batch of contacts in Xero (update if xero_id present,
@@ -1015,6 +1147,8 @@ class XeroAPI(metaclass=SingletonMeta):
                     results.extend(updated_list)
             except KeyError as e:
                 self.logger.error(f"⛔ KeyError during update batch: {update_contacts}. Error: {e}")
+            except XeroThrottled:
+                raise
             except Exception as e:
                 self.logger.error(
                     f"⛔ Unexpected exception while updating contacts in Xero. Error: {e}"
@@ -1046,7 +1180,9 @@ class XeroAPI(metaclass=SingletonMeta):
 
                 # Use filter instead of all(..., where=...) to query by name.
                 try:
-                    found = self.xero.contacts.filter(Name=contact_name)
+                    found = self._retry_on_unauthorized(self.xero.contacts.filter, Name=contact_name)
+                except XeroThrottled:
+                    raise
                 except Exception as e:
                     self.logger.error(
                         f"⛔ Error querying Xero for existing contact by name='{contact_name}'. Error: {e}"
@@ -1085,6 +1221,8 @@ class XeroAPI(metaclass=SingletonMeta):
                     self.logger.error(
                         f"⛔ KeyError during create batch: {to_create_contacts}. Error: {e}"
                     )
+                except XeroThrottled:
+                    raise
                 except Exception as e:
                     self.logger.error(
                         f"⛔ Unexpected exception while creating contacts in Xero. Error: {e}"
@@ -0,0 +1,331 @@
+"""
+files_xero/xero_async_client.py
+
+⚡ Xero Async Client
+====================
+asyncio access to the hot Xero endpoints (Invoices, BankTransactions, Contacts),
+alongside the synchronous pyxero client in XeroAPI. Large syncs can keep many
+requests in flight from one thread instead of one thread per request.
+
+- Requests are built by pyxero's own managers (`xero_api.xero.<endpoint>`): the same
+  URLs, `where` filters, If-Modified-Since headers and XML bodies. Only the transport
+  differs: one pooled aiohttp session per client (keep-alive connections, gzip).
+- Responses go through pyxero's parser, so callers get the same dicts (dates as
+  datetime, ...) XeroServices already consumes; error statuses raise the same
+  pyxero exceptions (XeroBadRequest, XeroNotFound, ...).
+- At most XERO_CONCURRENT_LIMIT requests per client are in flight (asyncio.Semaphore),
+  and each one books a rate-governor slot like `XeroAPI._retry_on_unauthorized`:
+  per-minute / daily budget, cross-process concurrency lease, Retry-After after a
+  429, and XeroThrottled once the wait is longer than the inline budget. The
+  governor's Redis round-trips run in the default executor, off the event loop.
+- The token is read from `xero_api.credentials`; refreshing (ahead of expiry, or
+  after a 401) goes through the shared token broker, once per client at a time.
+
+Usage:
+    async with XeroAsyncClient() as client:
+        contacts, bills = await asyncio.gather(
+            client.contacts.filter_all(order='UpdatedDateUTC ASC'),
+            client.invoices.get_many(invoice_ids))
+
+From synchronous code (services, Celery tasks): `run(lambda client: ...)`.
+"""
+
+# region Imports
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import Awaitable, Callable, Iterable, List, Optional
+from urllib.parse import parse_qs
+from xml.parsers.expat import ExpatError
+
+import aiohttp
+import redis
+import requests
+from requests.structures import CaseInsensitiveDict
+from xero.exceptions import (
+    XeroBadRequest,
+    XeroException,
+    XeroExceptionUnknown,
+    XeroForbidden,
+    XeroInternalError,
+    XeroNotAvailable,
+    XeroNotFound,
+    XeroNotImplemented,
+    XeroRateLimitExceeded,
+    XeroTenantIdNotSet,
+    XeroUnauthorized,
+)
+
+from files_xero.xero_api import xero_api as default_xero_api
+from files_xero.xero_rate_governor import XeroThrottled
+from utilities.config import Config
+# endregion
+
+
+# region Client
+class XeroAsyncClient:
+    """
+    Pooled asyncio Xero client. Use as `async with XeroAsyncClient() as client:`.
+    """
+
+    # region Constants
+    ENDPOINTS = ('invoices', 'banktransactions', 'contacts')
+    MAX_ATTEMPTS = 3
+    PAGE_SIZE = 100
+    REQUEST_TIMEOUT_SECONDS = 60.0
+    KEEPALIVE_SECONDS = 30.0
+    # endregion
+
+    # region Initialization
+    def __init__(self, xero_api=None, concurrency: int = None):
+        self.xero_api = xero_api or default_xero_api
+        self.concurrency = concurrency or Config.XERO_CONCURRENT_LIMIT
+        self.logger = logging.getLogger('xero_logger')
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._token_lock: Optional[asyncio.Lock] = None
+        for endpoint in self.ENDPOINTS:
+            setattr(self, endpoint, XeroAsyncManager(self, endpoint))
+
+    @property
+    def governor(self):
+        return self.xero_api.rate_governor
+
+    async def __aenter__(self):
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        self._token_lock = asyncio.Lock()
+        self._session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=self.concurrency, keepalive_timeout=self.KEEPALIVE_SECONDS),
+            timeout=aiohttp.ClientTimeout(total=self.REQUEST_TIMEOUT_SECONDS),
+            headers={'Accept': 'application/json', 'Accept-Encoding': 'gzip, deflate'},
+        )
+        self.logger.debug(f'[XeroAsyncClient] ⚡ Session opened ({self.concurrency} concurrent).')
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+    # endregion
+
+    # region Requests
+    async def request(self, manager, uri: str, params: dict, method: str, body=None, headers: dict = None):
+        """
+        Send one pyxero-built request (see `XeroAsyncManager`) with the same retry rules
+        as `XeroAPI._retry_on_unauthorized`; returns the parsed response, or None after
+        MAX_ATTEMPTS. XeroThrottled and other XeroExceptions propagate.
+        """
+        if self._session is None:
+            raise RuntimeError('XeroAsyncClient used outside `async with`.')
+        for attempt in range(1, self.MAX_ATTEMPTS + 1):
+            access_token = await self._ensure_token()
+            try:
+                self.logger.debug(f'[XeroAsyncClient] Attempt {attempt} => {method.upper()} {uri}')
+                async with self._slot():
+                    return await self._send(manager, uri, params, method, body, headers, access_token)
+            except XeroUnauthorized:
+                self.logger.warning('[XeroAsyncClient] ⚠️ Unauthorized, attempting force-refresh.')
+                await self._ensure_token(rejected_access_token=access_token)
+            except XeroRateLimitExceeded as e:
+                retry_after = await asyncio.to_thread(self.governor.throttled, e.response)
+                if retry_after > self.governor.max_inline_wait:
+                    raise XeroThrottled(retry_after, 'retry-after') from e
+                self.logger.warning(f'[XeroAsyncClient] 🔃 Rate limit on attempt {attempt}, '
+                                    f'retrying in {retry_after:.0f}s.')
+            except XeroException as e:
+                self.logger.error(f'[XeroAsyncClient] ❌ XeroException: {e}')
+                raise
+
+        self.logger.error('[XeroAsyncClient] ❌ Failed Xero API call after max retries.')
+        return None
+
+    async def _send(self, manager, uri: str, params: dict, method: str, body, headers: Optional[dict],
+                    access_token: str):
+        credentials = self.xero_api.credentials
+        if not credentials.tenant_id:
+            raise XeroTenantIdNotSet
+        request_headers = {'Content-Type': 'application/xml', 'User-Agent': manager.user_agent,
+                           'Authorization': f'Bearer {access_token}', 'Xero-tenant-id': credentials.tenant_id}
+        request_headers.update(headers or {})
+        query = {key: str(value) for key, value in (params or {}).items()}
+
+        async with self._session.request(method.upper(), uri, params=query, data=body,
+                                         headers=request_headers) as http_response:
+            response = _as_requests_response(http_response.status, http_response.headers,
+                                             await http_response.read(), str(http_response.url))
+        await asyncio.to_thread(self.governor.observe, response.headers)
+
+        if response.status_code == 200:
+            if not response.headers.get('content-type', '').startswith('application/json'):
+                return response.content
+            return manager._parse_api_response(response, manager.name)
+        if response.status_code == 204:
+            return response.content
+        _raise_for_status(response)
+
+    @asynccontextmanager
+    async def _slot(self):
+        """
+        Async counterpart of `XeroRateGovernor.slot()`: local semaphore first, then the
+        per-minute / daily booking and a cross-process concurrency lease.
+        """
+        max_wait = self.governor.max_inline_wait
+        async with self._semaphore:
+            lease = None
+            try:
+                delay, reason = await asyncio.to_thread(self.governor.reserve, max_wait)
+                if reason:
+                    raise XeroThrottled(delay, reason)
+                if delay > 0:
+                    self.logger.debug(f'[_slot] - ⏳ Waiting {delay:.2f}s for the next booked Xero slot.')
+                    await asyncio.sleep(delay)
+                lease = await asyncio.to_thread(self.governor._acquire_concurrency, max_wait)
+            except redis.RedisError as e:
+                self.logger.warning(f'[_slot] - ⚠️ Rate governor unavailable, calling Xero ungoverned: {e}')
+            try:
+                yield
+            finally:
+                if lease:
+                    await asyncio.to_thread(self.governor._release_concurrency, lease)
+
+    async def _ensure_token(self, rejected_access_token: Optional[str] = None) -> str:
+        """
+        Access token to send. Refreshes through XeroAPI (i.e. the token broker) when it is
+        close to expiry, or when `rejected_access_token` got a 401 and is still current;
+        concurrent requests share one refresh.
+        """
+        credentials = self.xero_api.credentials
+        margin = self.xero_api.token_broker.refresh_margin
+        async with self._token_lock:
+            current = (credentials.token or {}).get('access_token')
+            if rejected_access_token and current == rejected_access_token:
+                await asyncio.to_thread(self.xero_api._refresh_token_if_needed, True)
+            elif credentials.expired(seconds=margin):
+                await asyncio.to_thread(self.xero_api._refresh_token_if_needed)
+            return (credentials.token or {}).get('access_token')
+    # endregion
+
+# endregion
+
+
+# region Endpoint Managers
+class XeroAsyncManager:
+    """
+    Async mirror of a pyxero manager (`xero.invoices`, ...): same arguments, same results.
+    """
+
+    def __init__(self, client: XeroAsyncClient, endpoint: str):
+        self.client = client
+        self.endpoint = endpoint
+
+    @property
+    def pyxero(self):
+        # Looked up per call: XeroAPI may swap `xero` (or its credentials) at runtime
+        return getattr(self.client.xero_api.xero, self.endpoint)
+
+    async def _call(self, built: tuple):
+        uri, params, method, body, headers, _ = built
+        return await self.client.request(self.pyxero, uri, params, method, body, headers)
+
+    async def get(self, id: str) -> Optional[list]:
+        return await self._call(self.pyxero._get(id))
+
+    async def all(self) -> Optional[list]:
+        return await self._call(self.pyxero._all())
+
+    async def filter(self, **kwargs) -> Optional[list]:
+        return await self._call(self.pyxero._filter(**kwargs))
+
+    async def put(self, data, summarize_errors: bool = True) -> Optional[list]:
+        return await self._call(self.pyxero.save_or_put(data, method='put', summarize_errors=summarize_errors))
+
+    async def save(self, data, summarize_errors: bool = True) -> Optional[list]:
+        return await self._call(self.pyxero.save_or_put(data, method='post', summarize_errors=summarize_errors))
+
+    async def get_many(self, ids: Iterable[str]) -> List[dict]:
+        """
+        Full records for `ids`, fetched concurrently (replaces a get() per id in a loop).
+        Missing ids are left out; order follows `ids`.
+        """
+        results = await asyncio.gather(*(self._get_or_none(record_id) for record_id in ids))
+        return [result[0] for result in results if result]
+
+    async def _get_or_none(self, record_id: str) -> Optional[list]:
+        try:
+            return await self.get(record_id)
+        except XeroNotFound:
+            self.client.logger.debug(f'[XeroAsyncClient] 🔍 {self.endpoint} {record_id} not found; skipped.')
+            return None
+
+    async def filter_all(self, **kwargs) -> List[dict]:
+        """
+        Every page of `filter(**kwargs)`, fetched `client.concurrency` pages at a time
+        until a short page comes back. Pass an `order` so pages are stable.
+        """
+        window = self.client.concurrency
+        records, page = [], 1
+        while True:
+            pages = await asyncio.gather(*(self.filter(page=number, **kwargs)
+                                           for number in range(page, page + window)))
+            for batch in pages:
+                batch = batch or []
+                records.extend(batch)
+                if len(batch) < self.client.PAGE_SIZE:
+                    return records
+            page += window
+
+# endregion
+
+
+# region Helpers
+def run(work: Callable[[XeroAsyncClient], Awaitable], **client_kwargs):
+    """
+    Run `work(client)` to completion from synchronous code, on a fresh event loop with its own client.
+    """
+    async def main():
+        async with XeroAsyncClient(**client_kwargs) as client:
+            return await work(client)
+
+    return asyncio.run(main())
+
+
+def _as_requests_response(status: int, headers, content: bytes, url: str) -> requests.Response:
+    """
+    Wrap an aiohttp result in a requests.Response, which pyxero's parser, its
+    exceptions and the rate governor all expect.
+    """
+    response = requests.Response()
+    response.status_code = status
+    response.headers = CaseInsensitiveDict(headers)
+    response._content = content
+    response.encoding = 'utf-8'
+    response.url = url
+    return response
+
+
+def _raise_for_status(response: requests.Response) -> None:
+    """
+    Raise the exception pyxero raises for a non-2xx response.
+    """
+    status = response.status_code
+    if status == 400:
+        try:
+            raise XeroBadRequest(response)
+        except (ValueError, ExpatError):
+            raise XeroExceptionUnknown(response, msg='Unable to parse Xero API response')
+    if status == 429:
+        limit_reason = response.headers.get('X-Rate-Limit-Problem') or 'unknown'
+        raise XeroRateLimitExceeded(response, {
+            'oauth_problem': ['rate limit exceeded: ' + limit_reason],
+            'oauth_problem_advice': ['please wait before retrying the xero api, '
+                                     'the limit exceeded is: ' + limit_reason],
+        })
+    if status == 503:
+        payload = parse_qs(response.text)
+        if payload:
+            raise XeroRateLimitExceeded(response, payload)
+        raise XeroNotAvailable(response)
+    errors = {401: XeroUnauthorized, 403: XeroForbidden, 404: XeroNotFound,
+              500: XeroInternalError, 501: XeroNotImplemented}
+    raise errors.get(status, XeroExceptionUnknown)(response)
+# endregion
@@ -14,6 +14,7 @@ from xero import Xero
 from xero.auth import OAuth2Credentials
 from xero.constants import XeroScopes
 from dotenv import load_dotenv, set_key
+from files_xero.xero_token_broker import xero_token_broker
 load_dotenv('../.env')
 os.environ['OAUTHLIB_INSECURE_TRANSPORT'] = '1'
 logging.basicConfig(level=logging.DEBUG)
@@ -54,7 +55,8 @@ def xero_callback():
     logger.info('Saving tokens to .env file...')
     set_key('../.env', 'XERO_ACCESS_TOKEN', token_data.get('access_token', ''))
     set_key('../.env', 'XERO_REFRESH_TOKEN', token_data.get('refresh_token', ''))
-    logger.info('Tenant set. Tokens verified, stored in .env, and ready to use!')
+    xero_token_broker.publish(token_data, credentials.tenant_id)
+    logger.info('Tenant set. Tokens verified, stored in .env and the token broker, and ready to use!')
     return '<h2>Authorization Successful!</h2><p>Your tokens are now saved in .env. You can now make Xero API calls with fresh tokens.</p>'
 
 @app.route('/xero_api')
@@ -0,0 +1,220 @@
+"""
+files_xero/xero_bulk_writer.py
+
+📦 Xero Bulk Writer
+===================
+Chunked, partial-failure-aware PUTs to Xero (invoices, bank transactions, ...).
+
+- Payloads are split into XERO_BULK_CHUNK_SIZE chunks and sent concurrently
+  (XERO_BULK_MAX_WORKERS threads); every call still goes through
+  `XeroAPI._retry_on_unauthorized`, i.e. a rate-governor slot.
+- Each chunk is sent with summarizeErrors=false, so Xero validates every element
+  on its own: one bad bill no longer fails (or shifts) the other 49.
+- Responses are matched back to payloads by reference (e.g. InvoiceNumber), not
+  by position.
+- Elements that fail in transit (the whole chunk errored, or the element is
+  missing from the response) are re-sent, alone, up to XERO_BULK_MAX_ATTEMPTS.
+  Validation errors are final: the same payload would fail the same way.
+- PUTs are not idempotent: after a 5xx, timeout or dropped connection Xero may
+  have committed the chunk anyway. Before such elements are re-sent they are
+  looked up by reference; ones Xero already has count as created, and ones that
+  cannot be checked are reported failed instead of risking a duplicate.
+- `method='post'` sends the chunks as POSTs (create-or-update by ID, e.g. contact
+  updates) with the same per-element validation.
+- If the governor throttles a chunk (XeroThrottled), no further chunks are sent;
+  the unsent references are returned with `retry_after` so callers keep what
+  was created and leave the rest for the next run.
+"""
+
+# region Imports
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Set
+
+import requests
+from xero.exceptions import (
+    XeroBadRequest,
+    XeroException,
+    XeroForbidden,
+    XeroNotFound,
+    XeroRateLimitExceeded,
+    XeroUnauthorized,
+)
+
+from files_xero.xero_rate_governor import XeroThrottled
+from utilities.config import Config
+# endregion
+
+
+# region Class Definition
+class XeroBulkWriter:
+    """
+    Bulk PUT helper bound to a XeroAPI instance (see `XeroAPI.bulk_writer`).
+    """
+
+    # References per raw OR-filter lookup of in-doubt elements
+    LOOKUP_CHUNK = 25
+    # Errors where Xero certainly did not commit anything
+    REJECTED_ERRORS = (XeroBadRequest, XeroUnauthorized, XeroForbidden, XeroNotFound, XeroRateLimitExceeded)
+
+    def __init__(self, xero_api, chunk_size: int = None, max_workers: int = None, max_attempts: int = None):
+        self.xero_api = xero_api
+        self.chunk_size = chunk_size or Config.XERO_BULK_CHUNK_SIZE
+        self.max_workers = max_workers or Config.XERO_BULK_MAX_WORKERS
+        self.max_attempts = max_attempts or Config.XERO_BULK_MAX_ATTEMPTS
+        self.logger = logging.getLogger('xero_logger')
+
+    def put(self, endpoint: str, payloads: List[dict], reference_key: str, method: str = 'put') -> dict:
+        """
+        PUT (or POST) `payloads` to `xero.<endpoint>` and return:
+          {'created': {ref: element}, 'failed': {ref: [error, ...]},
+           'unsent': [ref, ...], 'retry_after': seconds or None}
+        """
+        result = {'created': {}, 'failed': {}, 'unsent': [], 'retry_after': None}
+        by_ref = {}
+        for payload in payloads:
+            ref = payload.get(reference_key)
+            if not ref:
+                self.logger.warning(f'[put] - ⚠️ {endpoint} payload without {reference_key}; skipping: {payload}')
+                continue
+            if ref in by_ref:
+                result['failed'][ref] = [f'Duplicate {reference_key} in batch']
+                continue
+            by_ref[ref] = payload
+
+        pending = list(by_ref)
+        in_doubt = set()
+        for attempt in range(1, self.max_attempts + 1):
+            pending = self._settle_in_doubt(endpoint, pending, in_doubt, reference_key, result, method)
+            if not pending:
+                break
+            # First attempt in full chunks; retries element by element so one bad payload can't sink others
+            size = self.chunk_size if attempt == 1 else 1
+            chunks = [pending[i:i + size] for i in range(0, len(pending), size)]
+            self.logger.info(f'[put] - 📦 {endpoint}: sending {len(pending)} element(s) in {len(chunks)} chunk(s) '
+                             f'(attempt {attempt}/{self.max_attempts}).')
+            pending = []
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                futures = [(refs, executor.submit(self._put_chunk, endpoint, [by_ref[r] for r in refs], refs,
+                                                  reference_key, result, method, in_doubt))
+                           for refs in chunks]
+                for refs, future in futures:
+                    pending.extend(future.result())
+            if result['retry_after'] is not None:
+                result['unsent'] = self._settle_in_doubt(endpoint, pending, in_doubt, reference_key, result, method)
+                pending = []
+                break
+
+        pending = self._settle_in_doubt(endpoint, pending, in_doubt, reference_key, result, method)
+        for ref in pending:
+            result['failed'].setdefault(ref, ['No response from Xero after retries'])
+        self.logger.info(f'[put] - ✅ {endpoint}: {len(result["created"])} created, {len(result["failed"])} failed, '
+                         f'{len(result["unsent"])} unsent.')
+        return result
+
+    def _put_chunk(self, endpoint: str, chunk: List[dict], refs: List[str], reference_key: str,
+                   result: dict, method: str = 'put', in_doubt: Set[str] = None) -> List[str]:
+        """
+        Send one chunk; record created / failed elements in `result` and return the refs to retry.
+        Refs Xero may have committed without answering for them are added to `in_doubt`.
+        """
+        in_doubt = set() if in_doubt is None else in_doubt
+        if result['retry_after'] is not None:
+            return refs
+        manager = getattr(self.xero_api.xero, endpoint)
+        try:
+            if method == 'post':
+                # pyxero's save() has no summarize_errors; decorate its save_or_put the way save() is
+                response = self.xero_api._retry_on_unauthorized(
+                    manager._get_data(manager.save_or_put), chunk, method='post', summarize_errors=False)
+            else:
+                response = self.xero_api._retry_on_unauthorized(manager.put, chunk, summarize_errors=False)
+        except XeroThrottled as e:
+            result['retry_after'] = max(result['retry_after'] or 0.0, e.retry_after)
+            self.logger.warning(f'[_put_chunk] - 🚦 {endpoint} throttled; holding {len(refs)} element(s).')
+            return refs
+        except self.REJECTED_ERRORS as e:
+            self.logger.error(f'[_put_chunk] - ❌ {endpoint} chunk of {len(refs)} rejected: {e}')
+            return refs
+        except (XeroException, requests.RequestException) as e:
+            self.logger.error(f'[_put_chunk] - ❌ {endpoint} chunk of {len(refs)} failed in transit: {e}')
+            in_doubt.update(refs)
+            return refs
+        if not response:
+            return refs
+
+        answered = set()
+        for position, element in enumerate(response):
+            # Xero echoes the reference; fall back to position (Xero keeps request order) if it doesn't
+            ref = element.get(reference_key) or (refs[position] if position < len(refs) else None)
+            if ref not in refs:
+                self.logger.warning(f'[_put_chunk] - ⚠️ Unmatched {endpoint} element in response: {ref}')
+                continue
+            answered.add(ref)
+            errors = element_errors(element)
+            if errors:
+                result['failed'][ref] = errors
+                self.logger.warning(f'[_put_chunk] - ⚠️ {endpoint} {ref} rejected: {errors}')
+            else:
+                result['created'][ref] = element
+        unanswered = [ref for ref in refs if ref not in answered]
+        in_doubt.update(unanswered)
+        return unanswered
+
+    def _settle_in_doubt(self, endpoint: str, pending: List[str], in_doubt: Set[str], reference_key: str,
+                         result: dict, method: str) -> List[str]:
+        """
+        Before in-doubt PUT elements are re-sent (or handed back as unsent), look them up
+        in Xero by reference. Found ones are recorded as created; if the lookup itself
+        fails they are recorded as failed. Returns the refs that are safe to send again.
+        """
+        doubtful = [ref for ref in pending if ref in in_doubt]
+        if not doubtful:
+            return pending
+        in_doubt.difference_update(doubtful)
+        if method != 'put':
+            # POSTs update by ID: sending one again is harmless
+            return pending
+        try:
+            existing = self._find_existing(endpoint, doubtful, reference_key)
+        except (XeroThrottled, XeroException, requests.RequestException) as e:
+            self.logger.error(f'[_settle_in_doubt] - ❌ Could not check {len(doubtful)} {endpoint} element(s) '
+                              f'in Xero; not re-sending them: {e}')
+            for ref in doubtful:
+                result['failed'][ref] = [f'Unconfirmed after a transport error; not re-sent to avoid a duplicate ({e})']
+            return [ref for ref in pending if ref not in doubtful]
+
+        result['created'].update(existing)
+        if existing:
+            self.logger.info(f'[_settle_in_doubt] - 🔎 {len(existing)} {endpoint} element(s) were committed by Xero '
+                             f'despite the error; not re-sending them.')
+        return [ref for ref in pending if ref not in existing]
+
+    def _find_existing(self, endpoint: str, refs: List[str], reference_key: str) -> Dict[str, dict]:
+        """
+        {ref: element} for the refs that already exist (and are not deleted / voided) in Xero.
+        """
+        manager = getattr(self.xero_api.xero, endpoint)
+        found = {}
+        for i in range(0, len(refs), self.LOOKUP_CHUNK):
+            chunk = refs[i:i + self.LOOKUP_CHUNK]
+            raw = ' OR '.join('{}=="{}"'.format(reference_key, str(ref).replace('"', '\\"')) for ref in chunk)
+            for element in self.xero_api._retry_on_unauthorized(manager.filter, raw=raw) or []:
+                ref = element.get(reference_key)
+                if ref in chunk and element.get('Status') not in ('DELETED', 'VOIDED'):
+                    found[ref] = element
+        return found
+
+# endregion
+
+
+# region Helpers
+def element_errors(element: dict) -> Optional[List[str]]:
+    """
+    Validation messages of one summarizeErrors=false response element, or None if it was accepted.
+    """
+    errors = [e.get('Message', str(e)) for e in element.get('ValidationErrors') or []]
+    if errors or element.get('HasErrors') or element.get('StatusAttributeString') == 'ERROR':
+        return errors or ['Rejected by Xero']
+    return None
+# endregion
@@ -0,0 +1,245 @@
+"""
+files_xero/xero_contact_sync.py
+
+👥 Xero Contact Sync
+====================
+Full contact reconcile between the DB and Xero, resumable after an interruption.
+
+1. Pull: Xero contacts are read page by page (oldest UpdatedDateUTC first) and each
+   page is merged into the DB by normalized name (see `normalize_vendor_name`) in one
+   transaction: local contacts are linked to their ContactID with one bulk UPDATE,
+   missing ones are inserted with ON CONFLICT DO NOTHING on the normalized-name index
+   (`VendorResolver.create_many`). The page's newest UpdatedDateUTC is saved as the
+   run's checkpoint (the 'contacts:checkpoint' sync watermark) in the same
+   transaction, so a page whose merge fails is rolled back with its checkpoint.
+2. Push: local contacts still without a xero_id are created in Xero through the
+   bulk writer (limit-sized chunks, concurrent, under the rate governor) in batches
+   of XERO_CONTACT_SYNC_BATCH_SIZE; each batch's new ContactIDs are committed
+   before the next batch is sent.
+3. Finish: the 'contacts' watermark is advanced as a full sync and the checkpoint
+   is dropped.
+
+A run that stops part-way (throttled, worker killed, Xero error) leaves everything
+merged or created so far in the DB. The next run pulls only contacts modified
+since the checkpoint, and the push step only sees contacts that are still unlinked.
+"""
+
+# region Imports
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+
+from xero.exceptions import XeroException
+
+from database.db_util import get_db_session
+from database_pg.models_pg import Contact
+from files_budget.vendor_resolver import normalize_vendor_name, vendor_resolver
+from utilities.config import Config
+# endregion
+
+
+# region Class Definition
+class XeroContactSync:
+    """
+    Contact sync engine bound to XeroServices (see `XeroServices.contact_sync`).
+    """
+
+    CHECKPOINT_ENTITY = 'contacts:checkpoint'
+    PAGE_SIZE = 100
+
+    def __init__(self, services, batch_size: int = None):
+        self.services = services
+        self.batch_size = batch_size or Config.XERO_CONTACT_SYNC_BATCH_SIZE
+        self.logger = logging.getLogger('xero_logger')
+
+    @property
+    def xero_api(self):
+        return self.services.xero_api
+
+    @property
+    def db_ops(self):
+        return self.services.db_ops
+
+    @property
+    def watermarks(self):
+        return self.services.sync_watermarks
+
+    # region Reconcile
+    def interrupted(self) -> bool:
+        """True if a previous reconcile stopped part-way and left a checkpoint."""
+        return self.watermarks.get(self.CHECKPOINT_ENTITY) is not None
+
+    def reconcile(self) -> dict:
+        """
+        Pull, push and finish (see module docstring). Returns a summary; `retry_after`
+        or `error` set means the run stopped early and the next one resumes it.
+        """
+        summary = {'mode': 'full', 'resumed': False, 'pulled': 0, 'linked': 0, 'created_local': 0,
+                   'created_xero': 0, 'failed': {}, 'unsent': 0, 'retry_after': None, 'error': None}
+        checkpoint = self.watermarks.get(self.CHECKPOINT_ENTITY)
+        since = None
+        if checkpoint and checkpoint.get('modified_since'):
+            since = checkpoint['modified_since'] - self.watermarks.overlap
+            summary['resumed'] = True
+            self.logger.info(f'[reconcile] - 👥 Resuming contact sync from checkpoint {since}.')
+
+        try:
+            self._pull(since, summary)
+        except XeroException as e:
+            summary['error'] = str(e)
+            self.logger.error(f'[reconcile] - ❌ Contact pull stopped at the checkpoint: {e}')
+            return summary
+
+        unlinked = [c for c in _as_list(self.db_ops.search_contacts())
+                    if (c.get('name') or '').strip() and not (c.get('xero_id') or '').strip()]
+        pushed = self.push(unlinked)
+        summary.update(created_xero=pushed['created'], failed=pushed['failed'], unsent=pushed['unsent'],
+                       retry_after=pushed['retry_after'])
+
+        if summary['retry_after'] is None:
+            with get_db_session() as session:
+                checkpoint = self.watermarks.get(self.CHECKPOINT_ENTITY, session=session)
+                newest = checkpoint.get('modified_since') if checkpoint else None
+                self.watermarks.advance('contacts', [{'UpdatedDateUTC': newest}] if newest else [], full=True,
+                                        session=session)
+                self.watermarks.reset(self.CHECKPOINT_ENTITY, session=session)
+        self.logger.info(f'[reconcile] - ✅ Contact sync => {summary}')
+        return summary
+
+    def _pull(self, since, summary: dict) -> None:
+        """
+        Merge Xero contacts into the DB page by page, checkpointing after each page.
+        """
+        db_by_name = self.by_name(self.db_ops.search_contacts())
+
+        page = 1
+        while True:
+            contacts = self.xero_api.get_contacts_page(page, since=since)
+            if contacts:
+                with get_db_session() as session:
+                    linked, created = self.merge(contacts, db_by_name, session)
+                    self.watermarks.advance(self.CHECKPOINT_ENTITY, contacts, session=session)
+                summary['pulled'] += len(contacts)
+                summary['linked'] += linked
+                summary['created_local'] += created
+                self.logger.info(f'[_pull] - 👥 Page {page}: {len(contacts)} Xero contact(s), '
+                                 f'{linked} linked, {created} created locally.')
+            if len(contacts) < self.PAGE_SIZE:
+                return
+            page += 1
+
+    @staticmethod
+    def by_name(contacts) -> dict:
+        """{normalized name: contact dict} of DB contacts; the first of a name wins."""
+        db_by_name = {}
+        for contact in _as_list(contacts):
+            normalized = normalize_vendor_name(contact.get('name'))
+            if normalized:
+                db_by_name.setdefault(normalized, contact)
+        return db_by_name
+
+    def merge(self, xero_contacts: List[dict], db_by_name: dict, session) -> tuple:
+        """
+        Xero -> DB by normalized name: one conflict-safe INSERT for missing contacts, one
+        bulk UPDATE for links (including names another worker inserted meanwhile).
+        `db_by_name` (see `by_name`) is updated so later pages see the result.
+        Errors propagate so the caller's transaction rolls back. Returns (linked, created).
+        """
+        links, new_contacts = [], []
+        for xero_contact in xero_contacts:
+            name = (xero_contact.get('Name') or '').strip()
+            normalized = normalize_vendor_name(name)
+            if not normalized or not xero_contact.get('ContactID'):
+                continue
+            db_contact = db_by_name.get(normalized)
+            if db_contact is None:
+                db_contact = {'name': name, 'xero_id': xero_contact['ContactID']}
+                new_contacts.append(db_contact)
+                db_by_name[normalized] = db_contact
+            elif db_contact.get('xero_id') != xero_contact['ContactID'] and db_contact.get('id'):
+                links.append({'id': db_contact['id'], 'xero_id': xero_contact['ContactID']})
+                db_contact['xero_id'] = xero_contact['ContactID']
+
+        created = 0
+        for normalized, (contact_id, was_created) in vendor_resolver.create_many(new_contacts, session).items():
+            db_contact = db_by_name[normalized]
+            db_contact['id'] = contact_id
+            if was_created:
+                created += 1
+            else:
+                links.append({'id': contact_id, 'xero_id': db_contact['xero_id']})
+        self.db_ops.bulk_update_mappings(Contact, links, session=session)
+        return len(links), created
+    # endregion
+
+    # region Push
+    def push(self, contacts: List[dict]) -> dict:
+        """
+        Create (no xero_id) and update (xero_id) local contacts in Xero, both at once, in
+        batches of `batch_size`; ContactIDs of each batch's creates are committed before
+        the next batch. Stops at the first throttle, counting the rest as `unsent`.
+        """
+        summary = {'created': 0, 'updated': 0, 'failed': {}, 'unsent': 0, 'retry_after': None}
+        creates = [c for c in contacts if not (c.get('xero_id') or '').strip()]
+        updates = [c for c in contacts if (c.get('xero_id') or '').strip()]
+        total = max(len(creates), len(updates))
+
+        for start in range(0, total, self.batch_size):
+            create_batch = creates[start:start + self.batch_size]
+            update_batch = updates[start:start + self.batch_size]
+            by_name, create_payloads = {}, []
+            for contact in create_batch:
+                payload = self.services._convert_contact_to_xero_schema(contact)
+                if payload['Name'] not in by_name:
+                    by_name[payload['Name']] = contact
+                    create_payloads.append(payload)
+            update_payloads = [self.services._convert_contact_to_xero_schema(c) for c in update_batch]
+
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                created_future = executor.submit(self._send, create_payloads, 'Name', 'put')
+                updated_future = executor.submit(self._send, update_payloads, 'ContactID', 'post')
+                created, updated = created_future.result(), updated_future.result()
+
+            links = [{'id': by_name[name]['id'], 'xero_id': element['ContactID']}
+                     for name, element in created['created'].items()
+                     if element.get('ContactID') and by_name[name].get('id')]
+            if links:
+                with get_db_session() as session:
+                    self.db_ops.bulk_update_mappings(Contact, links, session=session)
+
+            summary['created'] += len(created['created'])
+            summary['updated'] += len(updated['created'])
+            summary['failed'].update(created['failed'])
+            summary['failed'].update(updated['failed'])
+            summary['unsent'] += len(created['unsent']) + len(updated['unsent'])
+            retry_after = [r for r in (created['retry_after'], updated['retry_after']) if r is not None]
+            if retry_after:
+                summary['retry_after'] = max(retry_after)
+                summary['unsent'] += (len(creates[start + self.batch_size:]) +
+                                      len(updates[start + self.batch_size:]))
+                self.logger.warning(f'[push] - 🚦 Contact push throttled; {summary["unsent"]} contact(s) left '
+                                    f'for the next run (retry in {summary["retry_after"]:.0f}s).')
+                break
+
+        for ref, errors in summary['failed'].items():
+            self.logger.error(f"[push] - ❌ Contact '{ref}' rejected by Xero: {'; '.join(errors)}")
+        self.logger.info(f'[push] - 👥 Contacts pushed => created={summary["created"]}, '
+                         f'updated={summary["updated"]}, failed={len(summary["failed"])}, '
+                         f'unsent={summary["unsent"]}.')
+        return summary
+
+    def _send(self, payloads: List[dict], reference_key: str, method: str) -> dict:
+        if not payloads:
+            return {'created': {}, 'failed': {}, 'unsent': [], 'retry_after': None}
+        return self.xero_api.bulk_writer.put('contacts', payloads, reference_key, method=method)
+    # endregion
+
+# endregion
+
+
+# region Helpers
+def _as_list(records) -> list:
+    if not records:
+        return []
+    return records if isinstance(records, list) else [records]
+# endregion
@@ -0,0 +1,356 @@
+"""
+files_xero/xero_rate_governor.py
+
+🚦 Xero Rate Governor
+=====================
+Process-wide (Redis-backed) scheduling of Xero API calls against the tenant limits:
+
+- per-minute calls: GCRA token bucket (XERO_MINUTE_LIMIT per 60s). A caller books
+  the earliest free slot and waits only if that slot is near (<= max inline wait).
+- concurrent calls: leases (XERO_CONCURRENT_LIMIT), expired after LEASE_SECONDS in
+  case a worker dies mid-call.
+- daily quota: calls per UTC day (XERO_DAILY_LIMIT).
+
+Xero's response headers keep the model honest: `X-MinLimit-Remaining` /
+`X-DayLimit-Remaining` are folded into the buckets on every response (see
+`RateObservingAuth`), and a 429's `Retry-After` blocks every caller until it passes.
+
+When the wait is longer than the inline budget, `slot()` raises `XeroThrottled`
+instead of sleeping; Celery tasks re-queue themselves with that countdown (see
+`XeroThrottleTask` in server_celery/celery_server.py).
+
+Time comes from `clock` (SystemClock / FakeClock) and state from `store`
+(RedisStateStore / MemoryStateStore), so the governor can be tested offline.
+"""
+
+# region Imports
+import json
+import logging
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Optional, Tuple
+
+import redis
+
+from utilities.config import Config
+from utilities.singleton import SingletonMeta
+# endregion
+
+
+# region Exceptions
+class XeroThrottled(Exception):
+    """
+    Raised instead of sleeping when the next Xero slot is more than the inline wait away.
+    """
+
+    def __init__(self, retry_after: float, reason: str = 'minute'):
+        super().__init__(f'Xero rate limit ({reason}): retry in {retry_after:.1f}s')
+        self.retry_after = retry_after
+        self.reason = reason
+# endregion
+
+
+# region Clocks
+class SystemClock:
+    def time(self) -> float:
+        return time.time()
+
+    def sleep(self, seconds: float) -> None:
+        if seconds > 0:
+            time.sleep(seconds)
+
+
+class FakeClock:
+    """
+    Manual clock for tests: `sleep` records the wait and advances time instantly.
+    """
+
+    def __init__(self, start: float = 1_700_000_000.0):
+        self.now = start
+        self.sleeps = []
+
+    def time(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.sleeps.append(seconds)
+        self.advance(seconds)
+
+    def advance(self, seconds: float) -> None:
+        self.now += max(0.0, seconds)
+# endregion
+
+
+# region State Stores
+class MemoryStateStore:
+    """
+    In-process state (tests, or a single process without Redis).
+    """
+
+    def __init__(self):
+        self._states = {}
+        self._lock = threading.Lock()
+
+    def transact(self, key: str, fn: Callable[[dict], Tuple[object, dict]]):
+        with self._lock:
+            result, state = fn(dict(self._states.get(key, {})))
+            self._states[key] = state
+            return result
+
+
+class RedisStateStore:
+    """
+    State in one Redis hash per tenant, updated with WATCH/MULTI so every worker
+    process sees the same buckets. `ttl_seconds=None` keeps the hash indefinitely.
+    """
+    STATE_TTL_SECONDS = 2 * 86400
+
+    def __init__(self, client: redis.Redis, ttl_seconds: Optional[int] = STATE_TTL_SECONDS):
+        self.client = client
+        self.ttl_seconds = ttl_seconds
+
+    def transact(self, key: str, fn: Callable[[dict], Tuple[object, dict]]):
+        with self.client.pipeline() as pipe:
+            while True:
+                try:
+                    pipe.watch(key)
+                    state = {k.decode(): v.decode() for k, v in pipe.hgetall(key).items()}
+                    result, new_state = fn(state)
+                    pipe.multi()
+                    pipe.delete(key)
+                    if new_state:
+                        pipe.hset(key, mapping={k: str(v) for k, v in new_state.items()})
+                        if self.ttl_seconds:
+                            pipe.expire(key, self.ttl_seconds)
+                    pipe.execute()
+                    return result
+                except redis.WatchError:
+                    continue
+# endregion
+
+
+# region Governor
+class XeroRateGovernor(metaclass=SingletonMeta):
+    """
+    Schedules Xero calls across every process. Use the module-level `xero_rate_governor`.
+    """
+
+    # region Constants
+    WINDOW_SECONDS = 60.0
+    DEFAULT_RETRY_AFTER_SECONDS = 60.0
+    LEASE_SECONDS = 120.0
+    CONCURRENCY_POLL_SECONDS = 0.25
+    # endregion
+
+    # region Initialization
+    def __init__(self):
+        if not hasattr(self, '_initialized'):
+            self.logger = logging.getLogger('xero_logger')
+            self.store = RedisStateStore(redis.Redis.from_url(Config.REDIS_URL))
+            self.clock = SystemClock()
+            self.minute_limit = Config.XERO_MINUTE_LIMIT
+            self.concurrent_limit = Config.XERO_CONCURRENT_LIMIT
+            self.daily_limit = Config.XERO_DAILY_LIMIT
+            self.max_inline_wait = Config.XERO_MAX_INLINE_WAIT_SECONDS
+            self.key = f"xero:rate:{Config.XERO_TENANT_ID or 'default'}"
+            self.logger.info('🚦 Xero rate governor initialized.')
+            self._initialized = True
+
+    @property
+    def interval(self) -> float:
+        """Emission interval: one call per `interval` seconds on average."""
+        return self.WINDOW_SECONDS / self.minute_limit
+
+    @property
+    def burst_tolerance(self) -> float:
+        return self.WINDOW_SECONDS - self.interval
+    # endregion
+
+    # region Scheduling
+    @contextmanager
+    def slot(self, max_wait: Optional[float] = None):
+        """
+        Holds one Xero call slot for the duration of the block. Waits inline for a
+        booked slot up to `max_wait` seconds, otherwise raises XeroThrottled.
+        If Redis is unavailable the call goes ahead ungoverned.
+        """
+        max_wait = self.max_inline_wait if max_wait is None else max_wait
+        token = None
+        try:
+            delay, reason = self.reserve(max_wait)
+            if reason:
+                raise XeroThrottled(delay, reason)
+            if delay > 0:
+                self.logger.debug(f'[slot] - ⏳ Waiting {delay:.2f}s for the next booked Xero slot.')
+                self.clock.sleep(delay)
+            token = self._acquire_concurrency(max_wait)
+        except redis.RedisError as e:
+            self.logger.warning(f'[slot] - ⚠️ Rate governor unavailable, calling Xero ungoverned: {e}')
+        try:
+            yield
+        finally:
+            if token:
+                self._release_concurrency(token)
+
+    def reserve(self, max_wait: float) -> Tuple[float, Optional[str]]:
+        """
+        Books the earliest per-minute / daily slot if it starts within `max_wait`.
+        Returns (delay, None) when booked, or (delay, reason) without booking.
+        """
+        def plan(state: dict):
+            now = self.clock.time()
+            day, day_used = self._day_usage(state, now)
+            if day_used >= self.daily_limit:
+                return (self._seconds_to_utc_midnight(now), 'day'), state
+            tat = float(state.get('tat', 0.0))
+            blocked_until = float(state.get('blocked_until', 0.0))
+            start = max(now, tat - self.burst_tolerance, blocked_until)
+            delay = start - now
+            if delay > max_wait:
+                reason = 'retry-after' if blocked_until >= start else 'minute'
+                return (delay, reason), state
+            state.update(tat=max(tat, start) + self.interval, day=day, day_used=day_used + 1)
+            return (delay, None), state
+
+        return self.store.transact(self.key, plan)
+
+    def _acquire_concurrency(self, max_wait: float) -> str:
+        token = uuid.uuid4().hex
+        waited = 0.0
+
+        def take(state: dict):
+            now = self.clock.time()
+            leases = {t: exp for t, exp in json.loads(state.get('leases', '{}')).items() if exp > now}
+            acquired = len(leases) < self.concurrent_limit
+            if acquired:
+                leases[token] = now + self.LEASE_SECONDS
+            state['leases'] = json.dumps(leases)
+            return acquired, state
+
+        while not self.store.transact(self.key, take):
+            if waited >= max_wait:
+                raise XeroThrottled(self.CONCURRENCY_POLL_SECONDS * 4, 'concurrent')
+            self.clock.sleep(self.CONCURRENCY_POLL_SECONDS)
+            waited += self.CONCURRENCY_POLL_SECONDS
+        return token
+
+    def _release_concurrency(self, token: str) -> None:
+        def release(state: dict):
+            leases = json.loads(state.get('leases', '{}'))
+            leases.pop(token, None)
+            state['leases'] = json.dumps(leases)
+            return None, state
+
+        try:
+            self.store.transact(self.key, release)
+        except redis.RedisError as e:
+            self.logger.warning(f'[slot] - ⚠️ Failed to release Xero concurrency lease (expires on its own): {e}')
+    # endregion
+
+    # region Feedback from Xero
+    def observe(self, headers) -> None:
+        """
+        Fold Xero's remaining-call headers into the buckets. Only ever tightens them.
+        """
+        minute_remaining = _int_header(headers, 'X-MinLimit-Remaining')
+        day_remaining = _int_header(headers, 'X-DayLimit-Remaining')
+        if minute_remaining is None and day_remaining is None:
+            return
+
+        def tighten(state: dict):
+            now = self.clock.time()
+            if minute_remaining is not None:
+                # GCRA state that leaves exactly `minute_remaining` immediate calls
+                floor_tat = now + self.burst_tolerance + self.interval - minute_remaining * self.interval
+                state['tat'] = max(float(state.get('tat', 0.0)), floor_tat)
+            if day_remaining is not None:
+                day, day_used = self._day_usage(state, now)
+                state.update(day=day, day_used=max(day_used, self.daily_limit - day_remaining))
+            return None, state
+
+        try:
+            self.store.transact(self.key, tighten)
+        except redis.RedisError as e:
+            self.logger.warning(f'[observe] - ⚠️ Could not record Xero rate headers: {e}')
+
+    def throttled(self, response=None) -> float:
+        """
+        Record a 429 from Xero: every caller is held back until Retry-After passes.
+        Returns the number of seconds to wait.
+        """
+        headers = getattr(response, 'headers', None) or {}
+        retry_after = _int_header(headers, 'Retry-After')
+        retry_after = float(retry_after) if retry_after is not None else self.DEFAULT_RETRY_AFTER_SECONDS
+        problem = headers.get('X-Rate-Limit-Problem', 'unknown')
+        self.observe(headers)
+
+        def block(state: dict):
+            until = self.clock.time() + retry_after
+            state['blocked_until'] = max(float(state.get('blocked_until', 0.0)), until)
+            return None, state
+
+        try:
+            self.store.transact(self.key, block)
+        except redis.RedisError as e:
+            self.logger.warning(f'[throttled] - ⚠️ Could not record Xero Retry-After: {e}')
+        self.logger.warning(f'[throttled] - 🔃 Xero rate limit ({problem}); holding calls for {retry_after:.0f}s.')
+        return retry_after
+    # endregion
+
+    # region Helpers
+    def _day_usage(self, state: dict, now: float) -> Tuple[str, int]:
+        today = datetime.fromtimestamp(now, tz=timezone.utc).strftime('%Y-%m-%d')
+        if state.get('day') != today:
+            return today, 0
+        return today, int(state.get('day_used', 0))
+
+    @staticmethod
+    def _seconds_to_utc_midnight(now: float) -> float:
+        current = datetime.fromtimestamp(now, tz=timezone.utc)
+        midnight = (current + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+        return (midnight - current).total_seconds()
+    # endregion
+
+# endregion
+
+
+# region Response Observation
+class RateObservingAuth:
+    """
+    requests auth wrapper around the Xero OAuth2 object: registers a response hook
+    so the governor sees the rate-limit headers of every Xero response.
+    """
+
+    def __init__(self, auth, governor: XeroRateGovernor):
+        self.auth = auth
+        self.governor = governor
+
+    def __call__(self, request):
+        request = self.auth(request)
+        request.register_hook('response', self._observe)
+        return request
+
+    def __getattr__(self, name):
+        return getattr(self.auth, name)
+
+    def _observe(self, response, *args, **kwargs):
+        try:
+            self.governor.observe(response.headers)
+        except Exception as e:
+            self.governor.logger.debug(f'[observe] - Ignoring rate header error: {e}')
+        return response
+
+
+def _int_header(headers, name: str) -> Optional[int]:
+    try:
+        value = headers.get(name)
+        return int(float(value)) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+# endregion
+
+
+xero_rate_governor = XeroRateGovernor()
@@ -1,27 +1,50 @@
 import datetime
 import logging
 import re
-from decimal import Decimal, ROUND_HALF_UP
+import time
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
 
-from sqlalchemy.exc import IntegrityError
+from xero.exceptions import XeroException
 
 from database.database_util import DatabaseOperations
+from database.db_util import get_db_session
+from database_pg.models_pg import Contact, DetailItem, XeroBill, XeroBillLineItem
+from files_budget.vendor_resolver import normalize_vendor_name, vendor_resolver
 from files_xero.xero_api import xero_api
+from files_xero.xero_contact_sync import XeroContactSync
+from files_xero.xero_rate_governor import XeroThrottled
+from files_xero.xero_spend_money_index import xero_spend_money_index
+from files_xero.xero_sync_watermark import xero_sync_watermarks
 from utilities.singleton import SingletonMeta
 
 #TODO new bill line items need to be full dicts not just IDs
 #TODO add tax code, date, and description to Spend Item sync
 
-def parse_reference(reference):
-    parts = reference.split("_")
-    if len(parts) == 3:
-        parts.append("1")
-    elif len(parts) != 4:
-        raise ValueError(
-            f"Expected 3 or 4 segments separated by underscores, got {len(parts)} segments: {parts}")
-
-    project_str, po_str, detail_str, line_number = parts
-    return project_str, po_str, detail_str, line_number
+def _differs(current, new) -> bool:
+    """
+    Column-aware comparison for the bill loader: 2 == Decimal('2.00') == '2',
+    and a datetime equals a date column holding the same day.
+    """
+    if current is None or new is None:
+        return current is not new
+    if isinstance(new, datetime.datetime) and not isinstance(current, datetime.datetime) \
+            and isinstance(current, datetime.date):
+        new = new.date()
+    if isinstance(current, datetime.date) or isinstance(new, datetime.date):
+        return current != new
+    try:
+        return Decimal(str(current)) != Decimal(str(new))
+    except (InvalidOperation, ValueError):
+        return str(current) != str(new)
+
+
+def _as_list(records) -> list:
+    """
+    Normalise a DatabaseOperations search result (None / dict / list) to a list.
+    """
+    if not records:
+        return []
+    return [records] if isinstance(records, dict) else records
 
 
 class XeroServices(metaclass=SingletonMeta):
@@ -36,6 +59,9 @@ class XeroServices(metaclass=SingletonMeta):
         self.logger = logging.getLogger('xero_logger')
         self.logger.setLevel(logging.DEBUG)
         self.xero_api = xero_api
+        self.sync_watermarks = xero_sync_watermarks
+        self.contact_sync = XeroContactSync(self)
+        self.spend_money_index = xero_spend_money_index
 
         # We'll store staged contacts here until we do a batch upsert.
         # Each item is a local DB dict (has at least 'id', 'name', optional 'xero_id').
@@ -80,31 +106,30 @@ class XeroServices(metaclass=SingletonMeta):
             # Optionally format records to create into Spend Money format for Xero API
             # records_to_create = self.xero_api.format_spend_money_bulk(records_to_create)
             self.logger.info(f"Attempting bulk creation for {len(records_to_create)} new SpendMoney records in Xero.")
-            bulk_create_response = self.xero_api.create_spend_money_bulk(records_to_create)
-            if not bulk_create_response:
-                self.logger.warning("No valid response from Xero after bulk spend money creation.")
-            else:
-                for record, response in zip(records_to_create, bulk_create_response):
-                    spend_money_id = record.get('id')
-                    if response and response.get('xero_spend_money_id'):
-                        new_xero_spend_money_id = response['xero_spend_money_id']
-                        self.db_ops.update_spend_money(
-                            spend_money_id,
-                            xero_spend_money_id=new_xero_spend_money_id,
-                            session=session
-                        )
-                        self.logger.info(
-                            f"Successfully created SpendMoney record {spend_money_id} in Xero => xero_spend_money_id={new_xero_spend_money_id}"
-                        )
-                        updated_spend_money.append({
-                            "id": spend_money_id,
-                            "xero_spend_money_id": new_xero_spend_money_id,
-                            "xero_link": f"https://go.xero.com/Bank/ViewTransaction.aspx?bankTransactionID={new_xero_spend_money_id}"
-                        })
-                    else:
-                        self.logger.warning(
-                            f"Failed to create SpendMoney record {spend_money_id} in Xero. Response: {response}"
-                        )
+            bulk_create_result = self.xero_api.create_spend_money_bulk(records_to_create)
+            records_by_reference = {self.xero_api.spend_money_reference(r): r for r in records_to_create}
+            for reference, created in bulk_create_result['created'].items():
+                spend_money_id = records_by_reference[reference].get('id')
+                new_xero_spend_money_id = created.get('BankTransactionID')
+                if not new_xero_spend_money_id:
+                    self.logger.warning(f"Xero returned no BankTransactionID for SpendMoney {spend_money_id}: {created}")
+                    continue
+                link = f"https://go.xero.com/Bank/ViewTransaction.aspx?bankTransactionID={new_xero_spend_money_id}"
+                self.db_ops.update_spend_money(
+                    spend_money_id,
+                    xero_spend_money_id=new_xero_spend_money_id,
+                    xero_link=link,
+                    session=session
+                )
+                self.logger.info(
+                    f"Successfully created SpendMoney record {spend_money_id} in Xero => xero_spend_money_id={new_xero_spend_money_id}"
+                )
+                updated_spend_money.append({
+                    "id": spend_money_id,
+                    "xero_spend_money_id": new_xero_spend_money_id,
+                    "xero_link": link
+                })
+            self._log_bulk_leftovers('SpendMoney', bulk_create_result)
         else:
             self.logger.info("No new SpendMoney records to create in Xero.")
 
@@ -112,31 +137,19 @@ class XeroServices(metaclass=SingletonMeta):
         if records_to_update:
             self.logger.info(
                 f"Attempting bulk update for {len(records_to_update)} existing SpendMoney records in Xero.")
-            bulk_update_response = self.xero_api.update_spend_money_bulk(records_to_update)
-            if not bulk_update_response:
-                self.logger.warning("No valid response from Xero after bulk spend money update.")
-            else:
-                for record, response in zip(records_to_update, bulk_update_response):
-                    spend_money_id = record.get('id')
-                    if response and response.get('xero_spend_money_id'):
-                        updated_xero_spend_money_id = response['xero_spend_money_id']
-                        self.db_ops.update_spend_money(
-                            spend_money_id,
-                            xero_spend_money_id=updated_xero_spend_money_id,
-                            session=session
-                        )
-                        self.logger.info(
-                            f"Successfully updated SpendMoney record {spend_money_id} in Xero => xero_spend_money_id={updated_xero_spend_money_id}"
-                        )
-                        updated_spend_money.append({
-                            "id": spend_money_id,
-                            "xero_spend_money_id": updated_xero_spend_money_id,
-                            "xero_link": f"https://go.xero.com/Bank/ViewTransaction.aspx?bankTransactionID={updated_xero_spend_money_id}"
-                        })
-                    else:
-                        self.logger.warning(
-                            f"Failed to update SpendMoney record {spend_money_id} in Xero. Response: {response}"
-                        )
+            bulk_update_result = self.xero_api.update_spend_money_bulk(records_to_update)
+            records_by_xero_id = {r['xero_spend_money_id']: r for r in records_to_update}
+            for xero_spend_money_id in bulk_update_result['created']:
+                spend_money_id = records_by_xero_id[xero_spend_money_id].get('id')
+                self.logger.info(
+                    f"Successfully updated SpendMoney record {spend_money_id} in Xero => xero_spend_money_id={xero_spend_money_id}"
+                )
+                updated_spend_money.append({
+                    "id": spend_money_id,
+                    "xero_spend_money_id": xero_spend_money_id,
+                    "xero_link": f"https://go.xero.com/Bank/ViewTransaction.aspx?bankTransactionID={xero_spend_money_id}"
+                })
+            self._log_bulk_leftovers('SpendMoney', bulk_update_result)
         else:
             self.logger.info("No existing SpendMoney records require an update in Xero.")
 
@@ -203,41 +216,33 @@ class XeroServices(metaclass=SingletonMeta):
     #                XERO BILLS (CREATE/UPDATE/DELETE)
     # ─────────────────────────────────────────────────────────────
     def handle_xero_bill_create_bulk(self, new_bills: list, new_bill_line_items: list, session):
+        """
+        Push new bills to Xero. Contacts are resolved for the whole batch up front
+        (`_resolve_bill_contacts`) and line items grouped by bill key in one pass, so
+        building the payloads is linear in bills + line items.
+        """
         self.logger.info(f"Pushing {len(new_bills)} bills to Xero.")
+        contact_by_po = self._resolve_bill_contacts(new_bills, session)
+
+        if isinstance(new_bill_line_items, dict):
+            new_bill_line_items = [new_bill_line_items]
+        lines_by_bill = {}
+        for li in new_bill_line_items or []:
+            lines_by_bill.setdefault((li["project_number"], li["po_number"], li["detail_number"]), []).append(li)
+
         payloads = []
+        bills_by_reference = {}
         for bill in new_bills:
             # Build basic payload
             project_number = bill.get("project_number")
             po_number = bill.get("po_number")
             detail_number = bill.get("detail_number")
-            if bill.get("contact_xero_id"):
-                contact_xero_id = bill.get("contact_xero_id")
-            else:
-                po_record = self.db_ops.search_purchase_order_by_keys(project_number=project_number, po_number=po_number)
-                if isinstance(po_record, list):
-                    po_record = po_record[0]
-                if not po_record:
-                    self.logger.warning(
-                        f"Failed to find Purchase Order record for project_number={project_number} and po_number={po_number}"
-                    )
-                    continue
-
-                contact_id = po_record.get("contact_id")
-                contact_record = self.db_ops.search_contacts(["id"], [contact_id])
-                if isinstance(contact_record, list):
-                    contact_record = contact_record[0]
-                if not contact_record:
-                    self.logger.warning(f"Failed to find Contact record for contact_id={contact_id}")
-                    continue
-
-                contact_xero_id = contact_record.get("xero_id")
-                if not contact_xero_id:
-                    self.logger.warning(f"Contact record lacks Xero ID for contact_id={contact_id}")
-                    self.logger.info(f"Creating Contact in Xero for contact_id={contact_id}")
-                    contact_xero_id = self.xero_api.create_contact(contact_record)
-                    if not contact_xero_id:
-                        self.logger.warning("Failed to create Contact in Xero.")
-                        continue
+            contact_xero_id = bill.get("contact_xero_id") or contact_by_po.get((project_number, po_number))
+            if not contact_xero_id:
+                self.logger.warning(
+                    f"No Xero contact for project_number={project_number}, po_number={po_number}; skipping bill."
+                )
+                continue
 
             # Convert the stored strings/dates to date objects
             due_date_raw = bill.get("due_date")
@@ -273,22 +278,15 @@ class XeroServices(metaclass=SingletonMeta):
                 "Contact": {"ContactID": contact_xero_id},
             }
 
-            # Fetch raw line items and transform them for Xero
-            line_items_raw = new_bill_line_items
-            if line_items_raw:
-                if isinstance(line_items_raw, dict):
-                    line_items_raw = [line_items_raw]
-                xero_line_items = []
-                for li in line_items_raw:
-                    #make sure line item matches bill key
-                    if (li["project_number"], li["po_number"], li["detail_number"]) == (project_number, po_number, detail_number):
-                        xero_line_items.append({
-                            'Description': li.get('description'),
-                            'Quantity': li.get('quantity', Decimal('1')),
-                            'UnitAmount': li.get('unit_amount', Decimal('0')),
-                            'AccountCode': str(li.get('tax_code', '0000')),
-                            'LineAmount': li.get('quantity', Decimal('1')) * li.get('unit_amount', Decimal('0')),
-                        })
+            # Transform this bill's line items for Xero
+            if new_bill_line_items:
+                xero_line_items = [{
+                    'Description': li.get('description'),
+                    'Quantity': li.get('quantity', Decimal('1')),
+                    'UnitAmount': li.get('unit_amount', Decimal('0')),
+                    'AccountCode': str(li.get('tax_code', '0000')),
+                    'LineAmount': li.get('quantity', Decimal('1')) * li.get('unit_amount', Decimal('0')),
+                } for li in lines_by_bill.get((project_number, po_number, detail_number), [])]
                 payload["LineItems"] = xero_line_items
                 if len(xero_line_items) == 0:
                     self.logger.debug(f"No LineItems to add to bill item {project_number}_{po_number}_{detail_number}.")
@@ -297,17 +295,17 @@ class XeroServices(metaclass=SingletonMeta):
                 self.logger.warning(f"Bill ID {bill_reference_number}: No line items found in DB.")
 
             payloads.append(payload)
+            bills_by_reference.setdefault(bill_reference_number, bill)
 
         self.logger.info(f"Sending bulk payload for {len(payloads)} bills.")
         result = self.xero_api.create_invoice_bulk(payloads)
         self.logger.debug(f"Bulk create invoice response: {result}")
-        if not result:
-            self.logger.error("Bulk invoice creation in Xero failed.")
-            return []
+        self._log_bulk_leftovers('Bill', result)
 
         updated_bills = []
-        # Update local DB with new Xero IDs
-        for bill, inv in zip(new_bills, result):
+        # Update local DB with new Xero IDs, matched on InvoiceNumber
+        for reference, inv in result['created'].items():
+            bill = bills_by_reference[reference]
             try:
                 new_xero_id = inv.get("InvoiceID")
                 link = f"https://go.xero.com/AccountsPayable/View.aspx?invoiceId={new_xero_id}"
@@ -322,6 +320,58 @@ class XeroServices(metaclass=SingletonMeta):
                 self.logger.error(f"Bill ID {bill['id']}: Error parsing invoice response: {e}")
         return updated_bills
 
+    def _resolve_bill_contacts(self, bills: list, session) -> dict:
+        """
+        {(project_number, po_number): contact Xero ID} for the bills without contact_xero_id:
+        one query for their POs, one for the POs' contacts, and one batched Xero call
+        (see XeroAPI.ensure_contacts_bulk) for contacts that have no Xero ID yet, which
+        are then linked locally.
+        """
+        po_keys = {(b.get("project_number"), b.get("po_number")) for b in bills if not b.get("contact_xero_id")}
+        if not po_keys:
+            return {}
+        purchase_orders = self.db_ops.get_purchase_orders_by_keys(po_keys, session=session)
+        contact_id_by_po = {(po["project_number"], po["po_number"]): po.get("contact_id") for po in purchase_orders}
+        for key in po_keys - set(contact_id_by_po):
+            self.logger.warning(f"Failed to find Purchase Order record for project_number={key[0]} and po_number={key[1]}")
+
+        contact_ids = sorted({c for c in contact_id_by_po.values() if c})
+        contacts = {c["id"]: c for c in _as_list(self.db_ops.search_contacts(["id"], [contact_ids], session=session))}
+        missing_xero = [c for c in contacts.values() if not c.get("xero_id")]
+        if missing_xero:
+            self.logger.info(f"Creating {len(missing_xero)} Contact(s) in Xero for this bill batch.")
+            created = self.xero_api.ensure_contacts_bulk([self._convert_contact_to_xero_schema(c) for c in missing_xero])
+            links = []
+            for contact in missing_xero:
+                xero_id = created.get((contact.get("name") or "Unnamed Contact").strip().lower())
+                if xero_id:
+                    contact["xero_id"] = xero_id
+                    links.append({"id": contact["id"], "xero_id": xero_id})
+                else:
+                    self.logger.warning(f"Failed to create Contact in Xero for contact_id={contact['id']}")
+            self.db_ops.bulk_update_mappings(Contact, links, session=session)
+
+        resolved = {}
+        for key, contact_id in contact_id_by_po.items():
+            contact = contacts.get(contact_id)
+            if not contact:
+                self.logger.warning(f"Failed to find Contact record for contact_id={contact_id}")
+            elif contact.get("xero_id"):
+                resolved[key] = contact["xero_id"]
+        return resolved
+
+    def _log_bulk_leftovers(self, label: str, result: dict):
+        """
+        Log the elements of a XeroBulkWriter result that were rejected or never sent;
+        they keep no Xero ID locally, so the next push picks them up again.
+        """
+        for reference, errors in result['failed'].items():
+            self.logger.error(f"{label} {reference}: rejected by Xero => {'; '.join(errors)}")
+        if result['unsent']:
+            self.logger.warning(
+                f"{len(result['unsent'])} {label} record(s) not sent (Xero throttled, retry in "
+                f"{result['retry_after']:.0f}s): {result['unsent']}")
+
     def create_xero_bill_in_xero(self, xero_bill: dict):
         bill_id = xero_bill["id"]
         self.logger.info(f'[create_xero_bill_in_xero] => BillID={bill_id}')
@@ -447,376 +497,357 @@ class XeroServices(metaclass=SingletonMeta):
         else:
             self.logger.warning("Could not set to DELETED.")
 
-    def load_xero_bills(self, project_number: int, po_number: int = None):
+    def load_xero_bills(self, project_number: int, po_number: int = None, incremental: bool = False) -> dict:
         """
         Loads Xero bills (ACCPAY invoices) and their line items for a given project_number
-        and (optionally) a po_number into the local database.
+        and (optionally) a po_number into the local database, set-based:
+
+          1. stage: parse the Xero payloads into bill rows keyed by
+             (project_number, po_number, detail_number) plus their line rows
+          2. fetch: existing bills, bill line items and detail items, one query each
+          3. plan: inserts / updates / deletes in memory (unchanged rows are skipped)
+          4. apply: bulk writes in a single transaction
 
         Assumes that each bill's 'InvoiceNumber' is formatted as "projectNumber_poNumber_detailNumber".
-        Uses the local database operations (self.db_ops) to search, create, or update records.
+        Whole-project loads keep the 'bills:<project>' sync watermark; with `incremental`
+        only bills modified since it are fetched, unless a full reconcile is due.
+        Returns counts and per-phase timings (seconds).
         """
-        self.logger.info(f"load_xero_bills => project_number={project_number}, po_number={po_number}")
+        self.logger.info(f"load_xero_bills => project_number={project_number}, po_number={po_number}, "
+                         f"incremental={incremental}")
+        watermark_entity = f"bills:{int(project_number)}" if po_number is None else None
+        since = self.sync_watermarks.since(watermark_entity) if incremental and watermark_entity else None
         self.logger.info("Retrieving Xero bills from Xero...")
+        timings = {}
+        started = time.perf_counter()
 
-        xero_bills = self.xero_api.get_bills_by_reference(project_number)
+        xero_bills = self.xero_api.get_bills_by_reference(project_number, since=since)
+        timings['xero_fetch'] = time.perf_counter() - started
         if not xero_bills:
             self.logger.info("No Xero bills retrieved.")
-            return []
-
+            return self._xero_bill_load_summary({}, timings, full=since is None)
+
+        phase = time.perf_counter()
+        staged_bills, staged_lines = self._stage_xero_bills(xero_bills, int(project_number), po_number)
+        timings['stage'] = time.perf_counter() - phase
+
+        with get_db_session() as session:
+            phase = time.perf_counter()
+            bills, line_items = self.db_ops.get_xero_bill_snapshot(int(project_number), po_number, session=session)
+            detail_items = self.db_ops.search_detail_items(['project_number'], [int(project_number)], session=session)
+            if isinstance(detail_items, dict):
+                detail_items = [detail_items]
+            timings['db_fetch'] = time.perf_counter() - phase
+
+            phase = time.perf_counter()
+            plan = self._plan_xero_bill_sync(staged_bills, staged_lines, bills, line_items, detail_items or [])
+            timings['plan'] = time.perf_counter() - phase
+
+            phase = time.perf_counter()
+            bill_ids = dict(plan['bill_ids'])
+            for new_bill in self.db_ops.bulk_insert_xero_bills(plan['bill_inserts'], session=session):
+                bill_ids[(new_bill['project_number'], new_bill['po_number'], new_bill['detail_number'])] = new_bill['id']
+            line_rows = [
+                dict({k: v for k, v in line.items() if k != 'bill_key'}, parent_id=bill_ids[line['bill_key']])
+                for line in plan['line_inserts']
+            ]
+            self.db_ops.bulk_update_mappings(XeroBill, plan['bill_updates'], session=session)
+            self.db_ops.bulk_update_mappings(XeroBillLineItem, plan['line_updates'], session=session)
+            self.db_ops.bulk_insert_xero_bill_line_items(line_rows, session=session)
+            if plan['line_deletes']:
+                self.db_ops.bulk_delete_records(XeroBillLineItem, plan['line_deletes'], session=session)
+            self.db_ops.bulk_update_mappings(DetailItem, plan['detail_item_updates'], session=session)
+            if watermark_entity:
+                self.sync_watermarks.advance(watermark_entity, xero_bills, full=since is None, session=session)
+            timings['apply'] = time.perf_counter() - phase
+
+        timings['total'] = time.perf_counter() - started
+        summary = self._xero_bill_load_summary(plan, timings, unchanged_bills=len(staged_bills)
+                                               - len(plan['bill_inserts']) - len(plan['bill_updates']),
+                                               full=since is None)
+        self.logger.info(f"✅ load_xero_bills => {summary}")
+        return summary
+
+    def _stage_xero_bills(self, xero_bills: list, project_number: int, po_number: int = None) -> tuple:
+        """
+        Parse Xero bill payloads into ({bill_key: bill_row}, [line_row]) for one project
+        (and PO, when given). Bills whose InvoiceNumber cannot be parsed are skipped.
+        """
+        staged_bills = {}
+        lines_by_bill = {}
         for bill in xero_bills:
             reference = bill.get("InvoiceNumber", "")
             parts = reference.split("_")
             if len(parts) == 2:
                 parts.append("1")
-            local_project_number = None
-            local_po_number = None
-            detail_number = None
-            if len(parts) >= 3:
-                try:
-                    local_project_number = int(parts[0])
-                    local_po_number = int(parts[1])
-                    detail_number = int(parts[2])
-                except ValueError:
-                    self.logger.warning(f"Invalid detail_number in reference: {reference}")
+            try:
+                key = (int(parts[0]), int(parts[1]), int(parts[2]))
+            except (ValueError, IndexError):
+                self.logger.warning(f"Invalid detail_number in reference: {reference}")
+                continue
+            if key[0] != project_number or (po_number is not None and key[1] != int(po_number)):
+                continue
 
             xero_invoice_id = bill.get("InvoiceID")
-            xero_link = (f"https://go.xero.com/AccountsPayable/View.aspx?invoiceId={xero_invoice_id}"
-                         if xero_invoice_id else None)
-
-            # Extract additional fields from the Xero bill
-            bill_date = bill.get("Date") or bill.get("transaction_date")
-            bill_due_date = bill.get("DueDate") or bill.get("due_date")
-            contact_data = bill.get("Contact", {})
-            xero_contact_id = contact_data.get("ContactID")
             bill_status = bill.get("state", "DRAFT")
             if bill.get("IsReconciled") or \
                     (bill.get("state") == "PAID" and bill.get("AmountDue", 0) == 0) or \
                     bill.get("FullyPaidOnDate"):
                 bill_status = "RECONCILED"
+            staged_bills[key] = {
+                "project_number": key[0],
+                "po_number": key[1],
+                "detail_number": key[2],
+                "xero_id": xero_invoice_id,
+                "xero_link": (f"https://go.xero.com/AccountsPayable/View.aspx?invoiceId={xero_invoice_id}"
+                              if xero_invoice_id else None),
+                "transaction_date": bill.get("Date") or bill.get("transaction_date"),
+                "due_date": bill.get("DueDate") or bill.get("due_date"),
+                "contact_xero_id": (bill.get("Contact") or {}).get("ContactID"),
+                "state": bill_status,
+            }
+            # A later payload for the same key replaces the earlier one, lines included
+            lines_by_bill[key] = []
+            for idx, li in enumerate(bill.get("LineItems", []), start=1):
+                lines_by_bill[key].append({
+                    "bill_key": key,
+                    "description": li.get("Description", ""),
+                    "quantity": li.get("Quantity", 1),
+                    "unit_amount": Decimal(li.get("UnitAmount", 0)).quantize(Decimal("0.00"), rounding=ROUND_HALF_UP),
+                    "tax_code": li.get("AccountCode", ""),
+                    "xero_bill_line_id": li.get("LineItemID", str(idx)),
+                    "parent_xero_id": xero_invoice_id,
+                })
+        staged_lines = [line for lines in lines_by_bill.values() for line in lines]
+        return staged_bills, staged_lines
 
-            # Upsert the Xero bill record in the local database.
-            local_bill = self.db_ops.search_xero_bill_by_keys(local_project_number, local_po_number, detail_number)
-            if local_bill:
-                if isinstance(local_bill, list):
-                    local_bill = local_bill[0]
-                local_bill_id = local_bill['id']
-                self.db_ops.update_xero_bill(
-                    local_bill_id,
-                    xero_id=xero_invoice_id,
-                    xero_link=xero_link,
-                    transaction_date=bill_date,
-                    due_date=bill_due_date,
-                    contact_xero_id=xero_contact_id,
-                    state=bill_status
-                )
-                self.logger.info(f"Updated local bill ID {local_bill_id} with Xero invoice {xero_invoice_id}")
+    @staticmethod
+    def _plan_xero_bill_sync(staged_bills: dict, staged_lines: list, bills: list, line_items: list,
+                             detail_items: list) -> dict:
+        """
+        Diff staged Xero data against the local rows. Pure: no DB or API access.
+
+        - bills match on (project_number, po_number, detail_number)
+        - a Xero line matches a detail item on (project, po, detail, sub_total == unit amount),
+          which gives its line_number; local line items then match on (bill key, line_number),
+          or on xero_bill_line_id when no detail item matched
+        - local line items that came from Xero (xero_bill_line_id set) but are no longer on
+          their bill are deleted
+        """
+        bill_by_key = {}
+        for bill in bills:
+            bill_by_key.setdefault((bill["project_number"], bill["po_number"], bill["detail_number"]), bill)
+
+        detail_by_amount = {}
+        for item in detail_items:
+            sub_total = item.get("sub_total")
+            if sub_total is None:
+                continue
+            amount_key = (item["project_number"], item["po_number"], item["detail_number"],
+                          Decimal(sub_total).quantize(Decimal("0.00"), rounding=ROUND_HALF_UP))
+            detail_by_amount.setdefault(amount_key, item)
+
+        lines_by_number = {}
+        lines_by_xero_id = {}
+        for line in line_items:
+            key = (line["project_number"], line["po_number"], line["detail_number"])
+            lines_by_number.setdefault((key, line["line_number"]), []).append(line)
+            if line.get("xero_bill_line_id"):
+                lines_by_xero_id.setdefault((key, line["xero_bill_line_id"]), []).append(line)
+
+        plan = {
+            "bill_ids": {},
+            "bill_inserts": [],
+            "bill_updates": [],
+            "line_inserts": [],
+            "line_updates": [],
+            "line_deletes": [],
+            "detail_item_updates": [],
+        }
+        for key, row in staged_bills.items():
+            current = bill_by_key.get(key)
+            if current is None:
+                plan["bill_inserts"].append(row)
+                continue
+            plan["bill_ids"][key] = current["id"]
+            changes = {f: v for f, v in row.items() if _differs(current.get(f), v)}
+            if changes:
+                plan["bill_updates"].append(dict(changes, id=current["id"]))
+
+        line_updates = {}
+        detail_updates = {}
+        matched_line_ids = set()
+        for line in staged_lines:
+            key = line["bill_key"]
+            detail_item = detail_by_amount.get(key + (line["unit_amount"],))
+            line_number = detail_item["line_number"] if detail_item else None
+            if detail_item and detail_item.get("xero_id") != line["xero_bill_line_id"]:
+                detail_updates[detail_item["id"]] = line["xero_bill_line_id"]
+
+            fields = {k: v for k, v in line.items() if k != "bill_key"}
+            fields["line_number"] = line_number
+            if line_number is not None:
+                targets = lines_by_number.get((key, line_number), [])
             else:
-                local_bill = self.db_ops.create_xero_bill_by_keys(
-                    local_project_number,
-                    local_po_number,
-                    detail_number,
-                    xero_id=xero_invoice_id,
-                    xero_link=xero_link,
-                    transaction_date=bill_date,
-                    due_date=bill_due_date,
-                    contact_xero_id=xero_contact_id,
-                    state=bill_status
-                )
-                local_bill_id = local_bill['id']
-                self.logger.info(f"Created new local bill for Reference {reference} with ID {local_bill_id}")
-
-            # Process each line item in the bill.
-            line_items = bill.get("LineItems", [])
-            for idx, li in enumerate(line_items, start=1):
-                # Extract fields from the Xero line item.
-                line_item_id = li.get("LineItemID", idx)
-                description = li.get("Description", "")
-                quantity = li.get("Quantity", 1)
-                unit_amount = Decimal(li.get("UnitAmount", 0)).quantize(Decimal("0.00"), rounding=ROUND_HALF_UP)
-                tax_code = li.get("AccountCode", "")
-
-                # Attempt to find a matching detail item using project, PO, detail number, unit amount, and description.
-                matching_detail_item = self.db_ops.search_detail_items(
-                    ["project_number", "po_number", "detail_number", "sub_total"],
-                    [local_project_number, local_po_number, detail_number, unit_amount]
-                )
-                if matching_detail_item:
-                    if isinstance(matching_detail_item, list):
-                        matching_detail_item = matching_detail_item[0]
-                    # Update the detail item with the Xero line item ID and parent Xero bill ID.
-                    self.db_ops.update_detail_item(
-                        matching_detail_item['id'],
-                        xero_id=line_item_id,
-                    )
-                    self.logger.debug(
-                        f"Updated detail item ID {matching_detail_item['id']} with xero_id {line_item_id} "
-                    )
-                    line_number = matching_detail_item["line_number"]
+                targets = lines_by_xero_id.get((key, line["xero_bill_line_id"]), [])
 
-                else:
-                    self.logger.debug(
-                        f"No matching detail item found for project {local_project_number}, PO {local_po_number}, "
-                        f"detail {detail_number}, unit_amount {unit_amount}"
-                    )
-                    line_number = None
-
-
-                # Process the corresponding Xero bill line item.
-                local_li = self.db_ops.search_xero_bill_line_item_by_keys(
-                    local_project_number,
-                    local_po_number,
-                    detail_number,
-                    line_number
-                )
-                if local_li:
-                    if not isinstance(local_li, list):
-                        local_li = [local_li]
-                    for li_ in local_li:
-                        self.db_ops.update_xero_bill_line_item(
-                            li_['id'],
-                            description=description,
-                            quantity=quantity,
-                            unit_amount=unit_amount,
-                            tax_code=tax_code,
-                            xero_bill_line_id=line_item_id,
-                            parent_xero_id=xero_invoice_id,
-                            line_number=line_number
-                        )
-                        self.logger.info(
-                            f"Updated local bill line item ID {li_['id']} with xero_bill_line_id {line_item_id} "
-                            f"and parent_xero_id {xero_invoice_id} for bill Reference {reference}"
-                        )
-                else:
-                    self.db_ops.create_xero_bill_line_item_by_keys(
-                        parent_id=local_bill_id,
-                        project_number=local_project_number,
-                        po_number=local_po_number,
-                        detail_number=detail_number,
-                        line_number=line_number,
-                        description=description,
-                        quantity=quantity,
-                        unit_amount=unit_amount,
-                        tax_code=tax_code,
-                        xero_bill_line_id=line_item_id,
-                        parent_xero_id=xero_invoice_id
-                    )
-                    self.logger.info(
-                        f"Created new line item for bill Reference {reference} with xero_bill_line_id {line_item_id} "
-                        f"and parent_xero_id {xero_invoice_id}"
-                    )
-
-        return "Success"
+            if not targets:
+                plan["line_inserts"].append(dict(fields, bill_key=key, project_number=key[0],
+                                                 po_number=key[1], detail_number=key[2]))
+                continue
+            for target in targets:
+                matched_line_ids.add(target["id"])
+                changes = {f: v for f, v in fields.items() if _differs(target.get(f), v)}
+                if changes:
+                    line_updates.setdefault(target["id"], {"id": target["id"]}).update(changes)
+
+        plan["line_updates"] = list(line_updates.values())
+        plan["detail_item_updates"] = [{"id": i, "xero_id": x} for i, x in detail_updates.items()]
+        plan["line_deletes"] = [
+            line["id"] for line in line_items
+            if line.get("xero_bill_line_id")
+            and line["id"] not in matched_line_ids
+            and (line["project_number"], line["po_number"], line["detail_number"]) in staged_bills
+        ]
+        return plan
+
+    @staticmethod
+    def _xero_bill_load_summary(plan: dict, timings: dict, unchanged_bills: int = 0, full: bool = True) -> dict:
+        return {
+            "mode": "full" if full else "incremental",
+            "bills_inserted": len(plan.get("bill_inserts", [])),
+            "bills_updated": len(plan.get("bill_updates", [])),
+            "bills_unchanged": unchanged_bills,
+            "line_items_inserted": len(plan.get("line_inserts", [])),
+            "line_items_updated": len(plan.get("line_updates", [])),
+            "line_items_deleted": len(plan.get("line_deletes", [])),
+            "detail_items_linked": len(plan.get("detail_item_updates", [])),
+            "timings": {phase: round(seconds, 4) for phase, seconds in timings.items()},
+        }
 
     # ─────────────────────────────────────────────────────────────
     #                  SPEND MONEY LOADING
     # ─────────────────────────────────────────────────────────────
-    def load_spend_money_transactions(self, project_id: int = None, po_number: int = None, detail_number: int = None):
+    def load_spend_money_transactions(self, project_id: int = None, po_number: int = None, detail_number: int = None,
+                                      incremental: bool = False) -> dict:
+        """
+        Merge SPEND transactions into spend_money from the local spend money index:
+        the index is refreshed with one paged fetch of SPEND transactions (only those
+        modified since its watermark with `incremental`), contacts are resolved in a
+        few queries, then rows are inserted / updated with one SQL join each
+        (see XeroSpendMoneyIndex.reconcile).
+        """
         self.logger.info(
-            f'load_spend_money_transactions => project={project_id}, po={po_number}, detail={detail_number}')
-        self.logger.info('Retrieving SPEND transactions from Xero...')
-        xero_spend_transactions = self.xero_api.get_spend_money_by_reference(
-            project_id=project_id,
-            po_number=po_number,
-            detail_number=detail_number
-        )
-        self.logger.debug(f'get_spend_money_by_reference => {xero_spend_transactions}')
-        if not xero_spend_transactions:
-            self.logger.info('No SPEND transactions returned from Xero.')
-            return
-        for tx in xero_spend_transactions:
-            current_state = 'RECONCILED' if tx.get('IsReconciled', False) else tx.get('Status', 'DRAFT')
-            if current_state == 'DELETED':
-                self.logger.info(f'SKIPPING DELETED transaction => {tx.get("InvoiceNumber")}')
-                continue
-            reference_number = tx.get('InvoiceNumber')
-            bank_transaction_id = tx.get('BankTransactionID')
-            xero_link = f'https://go.xero.com/Bank/ViewTransaction.aspx?bankTransactionID={bank_transaction_id}'
-            existing_spend = self.db_ops.search_spend_money(['xero_spend_money_reference_number'], [reference_number])
-            self.logger.debug(f'existing_spend => {existing_spend}')
-            # Build the kwargs for record creation or update.
-            # These keys should match the SpendMoney model fields.
-            # Extract the reference string from the tx variable (e.g., "2416_02_01_01")
-            reference = tx.get("Reference", "")
-            try:
-                # Split the reference by underscores into three parts
-                project_str, po_str, detail_str, line_number = parse_reference(reference)
-
-                # Convert the parts to integers (this removes any leading zeros)
-                project_number = int(project_str)
-                po_number = int(po_str)
-                detail_number = int(detail_str)
-                line_number = int(line_number)
-
-            except ValueError:
-                # In case the reference is missing or not properly formatted,
-                # you might want to set defaults or handle the error appropriately.
-                #skip this spend money receipt
-                continue
-
+            f'load_spend_money_transactions => project={project_id}, po={po_number}, detail={detail_number}, '
+            f'incremental={incremental}')
+        summary = {'mode': 'full' if not incremental else 'incremental', 'created': 0, 'updated': 0, 'unchanged': 0}
+        if project_id is None:
+            self.logger.warning('No project provided; nothing to load.')
+            return summary
 
+        try:
+            summary['mode'] = self.spend_money_index.refresh(full=not incremental)['mode']
+        except XeroException as e:
+            # Reconcile from what the index already holds; the next refresh catches up
+            self.logger.error(f'Failed to refresh the spend money index => {e}')
+            summary['error'] = str(e)
+
+        with get_db_session() as session:
+            indexed = self.spend_money_index.lookup(project_id, po_number, detail_number, session=session)
+            self._resolve_spend_money_contacts(
+                [{'_contact_xero_id': row['contact_xero_id'], '_contact_name': row['contact_name'] or 'Unnamed Contact'}
+                 for row in indexed], session)
+            result = self.spend_money_index.reconcile(project_id, po_number, detail_number, session=session)
+        summary.update(created=result['created'], updated=result['updated'], unchanged=result['unchanged'])
+        self.logger.info(f'✅ load_spend_money_transactions => {summary}')
+        return summary
+
+    def _resolve_spend_money_contacts(self, rows, session) -> dict:
+        """
+        Map each Xero ContactID on the staged rows to a local contact id: by xero_id, then by
+        normalized name (linking the Xero ID if the contact has none), otherwise a new local
+        contact inserted with ON CONFLICT DO NOTHING. A few queries in total.
+        """
+        wanted = {row['_contact_xero_id']: row['_contact_name'] for row in rows if row['_contact_xero_id']}
+        if not wanted:
+            return {}
+        contact_ids = {
+            c['xero_id']: c['id']
+            for c in _as_list(self.db_ops.search_contacts(['xero_id'], [list(wanted)], session=session))
+        }
+        missing = {xero_id: name for xero_id, name in wanted.items() if xero_id not in contact_ids}
+        if not missing:
+            return contact_ids
+
+        # One conflict-safe INSERT for names not in the DB yet; existing names come back with their ids
+        resolved = vendor_resolver.create_many([{'name': name, 'xero_id': xero_id} for xero_id, name in missing.items()],
+                                               session)
+        existing_ids = [contact_id for contact_id, created in resolved.values() if not created]
+        unlinked = {c['id'] for c in _as_list(self.db_ops.search_contacts(['id'], [existing_ids], session=session))
+                    if not (c.get('xero_id') or '').strip()} if existing_ids else set()
+        links = []
+        for xero_id, name in missing.items():
+            match = resolved.get(normalize_vendor_name(name))
+            if match is None:
+                continue
+            contact_id, created = match
+            contact_ids[xero_id] = contact_id
+            if created:
+                self.logger.info(f"No contact found for Xero ID {xero_id}. Created a new contact.")
+            elif contact_id in unlinked:
+                links.append({'id': contact_id, 'xero_id': xero_id})
+                unlinked.discard(contact_id)
+        self.db_ops.bulk_update_mappings(Contact, links, session=session)
+        return contact_ids
 
-            # Attempt to find the contact based on the Xero contact ID
-            contact_record = self.db_ops.search_contacts(["xero_id"], [tx["Contact"]["ContactID"]])
-
-            if not contact_record:
-                self.logger.info(f"No contact found for Xero ID {tx['Contact']['ContactID']}. Creating a new contact.")
-                # Prepare the new contact data using the provided name or a fallback if the name is missing
-                name = tx["Contact"].get("Name", "Unnamed Contact")
-                xero_id = tx["Contact"]["ContactID"]
-                # Create the new contact record in the DB using keyword arguments
-                contact_record = self.db_ops.create_contact(name=name, xero_id=xero_id)
-
-            # Extract the local contact ID from the returned contact record
-            if isinstance(contact_record, list):
-                contact_id = contact_record[0]["id"]
-            else:
-                contact_id = contact_record["id"]
-
-            spend_kwargs = {
-                "project_number": project_number,
-                "po_number": po_number,
-                "detail_number": detail_number,
-                "line_number": line_number,
-                "state": current_state,
-                "xero_spend_money_id": bank_transaction_id,
-                "xero_link": xero_link,
-                "contact_id": contact_id,
-                "amount": tx.get("Total", 0),
-            }
-
-            # Attempt to locate an existing SpendMoney record using the unique keys.
-            existing_record = self.db_ops.search_spend_money_by_keys(
-                project_number=project_number,
-                po_number=po_number,
-                detail_number=detail_number,
-                line_number=line_number
-            )
-
-            if not existing_record:
-                # No record exists, so create a new one.
-                new_record = self.db_ops.create_spend_money(**spend_kwargs)
-                self.logger.info(f"Created new SpendMoney record with ID {new_record.get('id')}.")
-            else:
-                # If there are multiple records, assume the first is the one to update.
-                record = existing_record if isinstance(existing_record, dict) else existing_record[0]
-
-                # Use spend_money_has_changes to check if any fields have changed.
-                if self.db_ops.spend_money_has_changes(
-                        record_id=record.get("id"),
-                        **spend_kwargs
-                ):
-                    updated_record = self.db_ops.update_spend_money(record.get("id"), **spend_kwargs)
-                    self.logger.info(f"Updated SpendMoney record with ID {updated_record.get('id')}.")
-                else:
-                    self.logger.info(
-                        f"SpendMoney record with ID {record.get('id')} exists and no changes were detected.")
     # ─────────────────────────────────────────────────────────────
     #             POPULATE LOCAL CONTACTS WITH XERO IDS
     # ─────────────────────────────────────────────────────────────
-    def populate_xero_contacts(self):
-        self.logger.info('populate_xero_contacts => retrieving local DB and Xero contacts...')
-        # Retrieve all contacts from the local DB.
-        db_contacts = self.db_ops.search_contacts()
-        self.logger.info(f'Found {len(db_contacts)} contacts locally.')
+    def populate_xero_contacts(self, incremental: bool = False):
+        """
+        Two-way contact reconcile by name: link local contacts to Xero IDs, create local
+        contacts missing from Xero in Xero, and Xero contacts missing locally in the DB.
+        Runs through XeroContactSync, which checkpoints and resumes interrupted runs.
+
+        With `incremental`, and unless the periodic full reconcile is due (see the
+        'contacts' sync watermark), only Xero contacts modified since the last run are
+        merged into the DB (see `_merge_changed_xero_contacts`). An interrupted full
+        reconcile is always resumed first.
+        """
+        since = self.sync_watermarks.since('contacts') if incremental else None
+        if since is not None and not self.contact_sync.interrupted():
+            return self._merge_changed_xero_contacts(since)
 
-        # Build a set of local contact names (in lower-case) for easy lookup.
-        db_contact_names = {contact.get('name', '').strip().lower() for contact in db_contacts if contact.get('name')}
+        return self.contact_sync.reconcile()
 
-        self.logger.info('Retrieving all contacts from Xero...')
+    def _merge_changed_xero_contacts(self, since) -> dict:
+        """
+        Xero -> DB merge of contacts modified after `since`: link local contacts by
+        normalized name (bulk update) and create the missing ones (bulk insert), in one transaction with
+        the watermark. Pushing local-only contacts to Xero is left to the full reconcile.
+        """
+        summary = {'mode': 'incremental', 'changed': 0, 'linked': 0, 'created': 0}
         try:
-            all_xero_contacts = self.xero_api.get_all_contacts()
-            self.logger.debug(f'get_all_contacts => {len(all_xero_contacts)} contacts')
+            changed = self.xero_api.get_all_contacts(since=since)
+        except XeroThrottled:
+            raise
         except Exception as xe:
-            self.logger.error(f'Failed to retrieve contacts from Xero => {xe}')
-            return
-
-        # Build a dictionary of Xero contacts mapping lower-case name to the contact object.
-        xero_contacts_dict = {
-            c['Name'].strip().lower(): c for c in all_xero_contacts if c.get('Name')
-        }
-
-        # Prepare a list to accumulate local contacts that need to be created in Xero.
-        contacts_to_create = []
-
-        # Process each local DB contact.
-        for db_contact in db_contacts:
-            contact_name = db_contact.get('name', '').strip()
-            if not contact_name:
-                continue
-            lower_name = contact_name.lower()
-
-            if lower_name in xero_contacts_dict:
-                # Match found in Xero: update the local record with the Xero_ID.
-                xero_contact = xero_contacts_dict[lower_name]
-                xero_id = xero_contact['ContactID']
-                if db_contact.get('xero_id') != xero_id:
-                    try:
-                        self.db_ops.update_contact(db_contact['id'], xero_id=xero_id)
-                        self.logger.info(f"Linked local contact '{contact_name}' => XeroID={xero_id}")
-                    except IntegrityError as ie:
-                        self.logger.warning(
-                            f"IntegrityError while updating contact '{contact_name}' with XeroID {xero_id}: {ie}. Skipping update.")
-            else:
-                # No match found in Xero: stage this contact for bulk creation.
-                self.logger.info(f"Local contact '{contact_name}' not found in Xero. Staging for bulk creation...")
-                contacts_to_create.append(db_contact)
-
-        # Bulk create new contacts in chunks.
-        if contacts_to_create:
-            chunk_size = 50  # Adjust chunk size as needed.
-            self.logger.info(f"Bulk creating {len(contacts_to_create)} contacts in chunks of {chunk_size}...")
-            for i in range(0, len(contacts_to_create), chunk_size):
-                chunk = contacts_to_create[i:i + chunk_size]
-                # Convert each local DB contact to a Xero-friendly payload.
-                payloads = [self._convert_contact_to_xero_schema(contact) for contact in chunk]
-                try:
-                    # Bulk create contacts via the Xero API.
-                    api_result = self.xero_api._retry_on_unauthorized(
-                        self.xero_api.xero.contacts.put,
-                        payloads
-                    )
-                    if api_result:
-                        # Iterate over the chunk and corresponding API result.
-                        for db_contact, created_contact in zip(chunk, api_result):
-                            new_xero_id = created_contact.get('ContactID')
-                            if new_xero_id:
-                                try:
-                                    self.db_ops.update_contact(db_contact['id'], xero_id=new_xero_id)
-                                    self.logger.info(
-                                        f"Created and linked new Xero contact for local contact '{db_contact.get('name', '').strip()}' => XeroID={new_xero_id}"
-                                    )
-                                except IntegrityError as ie:
-                                    self.logger.warning(
-                                        f"IntegrityError while updating contact '{db_contact.get('name', '').strip()}' with new XeroID {new_xero_id}: {ie}. Skipping update.")
-                                # Update our Xero contacts dictionary so subsequent lookups work as expected.
-                                xero_contacts_dict[db_contact.get('name', '').strip().lower()] = {
-                                    'Name': db_contact.get('name', '').strip(),
-                                    'ContactID': new_xero_id
-                                }
-                            else:
-                                self.logger.error(
-                                    f"Failed to create Xero contact for local contact '{db_contact.get('name', '').strip()}'.")
-                    else:
-                        self.logger.error("Bulk creation API call returned no result.")
-                except Exception as e:
-                    self.logger.error(f"⛔ Exception during bulk creation of contacts: {e}")
-        else:
-            self.logger.info("No new contacts need to be created in Xero.")
-
-        # Now check for any Xero contacts that are missing from the local DB.
-        for name_lower, xero_contact in xero_contacts_dict.items():
-            if name_lower not in db_contact_names:
-                self.logger.info(
-                    f"Xero contact '{xero_contact.get('Name')}' not found in local DB. Creating new local contact record..."
-                )
-                created_contact = self.db_ops.create_contact(name=xero_contact.get('Name'),
-                                                             xero_id=xero_contact.get('ContactID'))
-                if created_contact:
-                    self.logger.info(
-                        f"Added new local contact '{xero_contact.get('Name')}' with XeroID={xero_contact.get('ContactID')}"
-                    )
-                else:
-                    self.logger.error(f"Failed to create local contact for Xero contact '{xero_contact.get('Name')}'.")
+            self.logger.error(f'Failed to retrieve changed contacts from Xero => {xe}')
+            return summary
+        changed_by_name = {normalize_vendor_name(c['Name']): c for c in changed or [] if (c.get('Name') or '').strip()}
+        summary['changed'] = len(changed_by_name)
+        if not changed_by_name:
+            self.logger.info(f'No Xero contacts changed since {since}.')
+            return summary
+
+        with get_db_session() as session:
+            db_by_name = self.contact_sync.by_name(self.db_ops.search_contacts(session=session))
+            linked, created = self.contact_sync.merge(list(changed_by_name.values()), db_by_name, session)
+            self.sync_watermarks.advance('contacts', changed, session=session)
+
+        summary.update(linked=linked, created=created)
+        self.logger.info(f'✅ populate_xero_contacts (incremental) => {summary}')
+        return summary
     # ─────────────────────────────────────────────────────────────
     #                CONTACT VALIDATION
     # ─────────────────────────────────────────────────────────────
@@ -893,11 +924,12 @@ class XeroServices(metaclass=SingletonMeta):
             )
             self.logger.info("🌀 [COMPLETED] [STATUS=Success] Staged contact for upsert.")
 
-    def execute_batch_upsert_contacts(self, contacts: list[dict], chunk_size: int = 50) -> None:
+    def execute_batch_upsert_contacts(self, contacts: list[dict]) -> dict:
         """
         Executes a batched 'upsert' (create or update) of contacts in Xero.
-        - Splits into create vs. update lists
-        - Optionally processes in chunks if lists are large
+        - Creates (no xero_id) and updates (xero_id) are pushed concurrently in
+          limit-sized chunks under the rate governor (see XeroContactSync.push)
+        - New ContactIDs are saved locally batch by batch
         - Logs success/failure counts
         """
         self.logger.info("🌀 [START] Performing batched Xero contact upserts...")
@@ -906,46 +938,11 @@ class XeroServices(metaclass=SingletonMeta):
         if total_contacts == 0:
             self.logger.info("🌀 No contacts provided => nothing to process.")
             self.logger.info("🌀 [COMPLETED] [STATUS=Success] No contacts upserted.")
-            return
+            return {'created': 0, 'updated': 0, 'failed': {}, 'unsent': 0, 'retry_after': None}
 
-        # Separate into create vs. update
-        create_list = []
-        update_list = []
-        for c in contacts:
-            try:
-                if c.get("xero_id"):
-                    update_list.append(c)
-                else:
-                    create_list.append(c)
-            except Exception as e:
-                self.logger.error(f"⛔ Error sorting contact => {c}, Error: {e}")
-
-        self.logger.info(
-            f"🌀 Split {total_contacts} staged contacts => create_list={len(create_list)}, update_list={len(update_list)}."
-        )
-
-        success_count = 0
-        fail_count = 0
-
-        # CREATE
-        if create_list:
-            for i in range(0, len(create_list), chunk_size):
-                subset = create_list[i: i + chunk_size]
-                chunk_success = self.process_chunk("create", subset)
-                success_count += chunk_success
-                fail_count += (len(subset) - chunk_success)
-        else:
-            self.logger.info("🌀 No contacts to create in Xero.")
-
-        # UPDATE
-        if update_list:
-            for i in range(0, len(update_list), chunk_size):
-                subset = update_list[i: i + chunk_size]
-                chunk_success = self.process_chunk("update", subset)
-                success_count += chunk_success
-                fail_count += (len(subset) - chunk_success)
-        else:
-            self.logger.info("🌀 No contacts to update in Xero.")
+        result = self.contact_sync.push(contacts)
+        success_count = result['created'] + result['updated']
+        fail_count = total_contacts - success_count
 
         # Summary
         self.logger.info(f"🌀 Upsert summary => success={success_count}, fails={fail_count}, total={total_contacts}")
@@ -959,6 +956,7 @@ class XeroServices(metaclass=SingletonMeta):
         self.logger.info(
             f"🌀 [COMPLETED] [STATUS={status_str}] Done with batched contact upserts."
         )
+        return result
 
     # ─────────────────────────────────────────────────────────────
     #       Convert DB Contact -> Xero Contact (Partial Logic)
@@ -1028,41 +1026,6 @@ class XeroServices(metaclass=SingletonMeta):
 
         return xero_contact
 
-    def process_chunk(self, mode: str, data_chunk: list[dict]) -> int:
-        """
-        mode='create' => xero.contacts.put(...) (requires Name, unique AccountNumber)
-        mode='update' => xero.contacts.save(...) partial update, skipping Name + AccountNumber
-        """
-        # Transform each contact from your DB format -> Xero format
-        xero_contacts = [self._convert_contact_to_xero_schema(c) for c in data_chunk]
-
-        chunk_success = 0
-        self.logger.info(
-            f"🌀 Sending {len(xero_contacts)} contacts to Xero in one '{mode}' batch call..."
-        )
-
-        try:
-            if mode == "create":
-                result = self.xero_api._retry_on_unauthorized(
-                    self.xero_api.xero.contacts.put,
-                    xero_contacts
-                )
-            else:  # mode == 'update'
-                result = self.xero_api._retry_on_unauthorized(
-                    self.xero_api.xero.contacts.save,
-                    xero_contacts
-                )
-
-            if result:
-                chunk_success = len(result)
-                self.logger.info(
-                    f"🌀 Successfully completed '{mode}' => {chunk_success} upserted."
-                )
-        except Exception as e:
-            self.logger.error(f"⛔ Exception during '{mode}' batch => {e}")
-
-        return chunk_success
-
 
 # Singleton instance
 xero_services = XeroServices()
\ No newline at end of file
@@ -0,0 +1,242 @@
+"""
+files_xero/xero_spend_money_index.py
+
+🧾 Xero Spend Money Index
+=========================
+A local mirror of Xero SPEND bank transactions in the `xero_spend_money_index` table.
+
+- `refresh()` pages through every SPEND transaction (oldest UpdatedDateUTC first) and
+  upserts each page in one statement. It is incremental through the
+  'spend_money_index' sync watermark; the periodic full pass also drops rows whose
+  transaction no longer comes back from Xero.
+- Rows carry the (project, po, detail, line) parsed from the Reference, so per-detail
+  lookups (`lookup()`) are index hits instead of Reference.Contains queries to Xero.
+- `reconcile()` merges the index into `spend_money` with one UPDATE ... FROM join and
+  one INSERT ... SELECT: for each key the newest live transaction (not DELETED /
+  VOIDED) wins, and contacts are matched on contact.xero_id.
+"""
+
+# region Imports
+import logging
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import and_, case, func, or_, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from database.db_util import get_db_session
+from database_pg.models_pg import Contact, SpendMoney, XeroSpendMoneyIndexEntry
+from files_xero.xero_api import xero_api
+from files_xero.xero_sync_watermark import updated_date_utc, xero_sync_watermarks
+from utilities.singleton import SingletonMeta
+# endregion
+
+
+# region Class Definition
+class XeroSpendMoneyIndex(metaclass=SingletonMeta):
+    """
+    Local index of Xero SPEND transactions. Use the module-level `xero_spend_money_index`.
+    """
+
+    WATERMARK_ENTITY = 'spend_money_index'
+    PAGE_SIZE = 100
+    EXCLUDED_STATUSES = ('DELETED', 'VOIDED')
+    XERO_LINK_PREFIX = 'https://go.xero.com/Bank/ViewTransaction.aspx?bankTransactionID='
+    UPSERT_COLUMNS = ('reference', 'project_number', 'po_number', 'detail_number', 'line_number', 'status',
+                      'is_reconciled', 'contact_xero_id', 'contact_name', 'total', 'date', 'updated_date_utc')
+
+    # region Initialization
+    def __init__(self):
+        if not hasattr(self, '_initialized'):
+            self.logger = logging.getLogger('xero_logger')
+            self.xero_api = xero_api
+            self.watermarks = xero_sync_watermarks
+            self.logger.info('🧾 Xero spend money index initialized.')
+            self._initialized = True
+    # endregion
+
+    # region Build & Maintain
+    def refresh(self, full: bool = False) -> dict:
+        """
+        Pull SPEND transactions modified since the watermark (all of them when `full` or a
+        full reconcile is due) into the index, one transaction per page.
+        XeroException propagates; pages already stored stay stored.
+        """
+        since = None if full else self.watermarks.since(self.WATERMARK_ENTITY)
+        summary = {'mode': 'full' if since is None else 'incremental', 'fetched': 0, 'removed': 0}
+        seen = set()
+        page = 1
+        while True:
+            transactions = self.xero_api.get_spend_money_page(page, since=since)
+            if transactions:
+                with get_db_session() as session:
+                    seen.update(self._upsert(transactions, session))
+                    self.watermarks.advance(self.WATERMARK_ENTITY, transactions, session=session)
+                summary['fetched'] += len(transactions)
+            if len(transactions) < self.PAGE_SIZE:
+                break
+            page += 1
+
+        if since is None:
+            with get_db_session() as session:
+                stale = session.query(XeroSpendMoneyIndexEntry).filter(
+                    XeroSpendMoneyIndexEntry.bank_transaction_id.notin_(seen)) if seen else \
+                    session.query(XeroSpendMoneyIndexEntry)
+                summary['removed'] = stale.delete(synchronize_session=False)
+                self.watermarks.advance(self.WATERMARK_ENTITY, [], full=True, session=session)
+        self.logger.info(f'[refresh] - 🧾 Spend money index => {summary}')
+        return summary
+
+    def _upsert(self, transactions: Iterable[dict], session: Session) -> List[str]:
+        """
+        Upsert one page of BankTransactions on bank_transaction_id; returns the ids stored.
+        """
+        rows = {}
+        for tx in transactions:
+            bank_transaction_id = tx.get('BankTransactionID')
+            if not bank_transaction_id:
+                continue
+            key = reference_key(tx.get('Reference')) or (None, None, None, None)
+            contact = tx.get('Contact') or {}
+            rows[bank_transaction_id] = {
+                'bank_transaction_id': bank_transaction_id,
+                'reference': tx.get('Reference'),
+                'project_number': key[0],
+                'po_number': key[1],
+                'detail_number': key[2],
+                'line_number': key[3],
+                'status': tx.get('Status'),
+                'is_reconciled': bool(tx.get('IsReconciled')),
+                'contact_xero_id': contact.get('ContactID'),
+                'contact_name': contact.get('Name'),
+                'total': tx.get('Total'),
+                'date': tx.get('Date'),
+                'updated_date_utc': updated_date_utc(tx),
+            }
+        if rows:
+            stmt = insert(XeroSpendMoneyIndexEntry).values(list(rows.values()))
+            set_ = {column: stmt.excluded[column] for column in self.UPSERT_COLUMNS}
+            set_['updated_at'] = func.now()
+            session.execute(stmt.on_conflict_do_update(index_elements=['bank_transaction_id'], set_=set_))
+        return list(rows)
+    # endregion
+
+    # region Lookups
+    def lookup(self, project_number, po_number=None, detail_number=None, line_number=None,
+               live_only: bool = True, session: Session = None) -> List[Dict]:
+        """
+        Indexed SPEND transactions for a project / PO / detail / line, newest first.
+        """
+        if session is None:
+            with get_db_session() as new_session:
+                return self.lookup(project_number, po_number, detail_number, line_number, live_only,
+                                   session=new_session)
+        query = session.query(XeroSpendMoneyIndexEntry).filter(
+            *self._key_filters(project_number, po_number, detail_number, line_number))
+        if live_only:
+            query = query.filter(self._live())
+        rows = query.order_by(XeroSpendMoneyIndexEntry.updated_date_utc.desc().nulls_last()).all()
+        return [row.to_dict() for row in rows]
+    # endregion
+
+    # region Reconcile
+    def reconcile(self, project_number, po_number=None, detail_number=None, session: Session = None) -> dict:
+        """
+        Merge the index into spend_money for a project (optionally one PO / detail) with
+        one UPDATE ... FROM and one INSERT ... SELECT. Contacts must already carry the
+        Xero ContactIDs (see XeroServices._resolve_spend_money_contacts).
+        """
+        if session is None:
+            with get_db_session() as new_session:
+                return self.reconcile(project_number, po_number, detail_number, session=new_session)
+
+        index = XeroSpendMoneyIndexEntry
+        key_columns = (index.project_number, index.po_number, index.detail_number, index.line_number)
+        latest = (
+            select(*key_columns, index.bank_transaction_id, index.total, index.contact_xero_id,
+                   case((index.is_reconciled, 'RECONCILED'), else_=func.coalesce(index.status, 'DRAFT'))
+                   .label('state'))
+            .where(*self._key_filters(project_number, po_number, detail_number), index.line_number.isnot(None),
+                   self._live())
+            .distinct(*key_columns)
+            .order_by(*key_columns, index.updated_date_utc.desc().nulls_last())
+            .subquery('latest')
+        )
+        key_match = and_(SpendMoney.project_number == latest.c.project_number,
+                         SpendMoney.po_number == latest.c.po_number,
+                         SpendMoney.detail_number == latest.c.detail_number,
+                         SpendMoney.line_number == latest.c.line_number)
+        values = {
+            'state': latest.c.state,
+            'xero_spend_money_id': latest.c.bank_transaction_id,
+            'xero_link': func.concat(self.XERO_LINK_PREFIX, latest.c.bank_transaction_id),
+            'amount': func.coalesce(latest.c.total, 0),
+            'contact_id': select(Contact.id).where(Contact.xero_id == latest.c.contact_xero_id)
+                                            .limit(1).scalar_subquery(),
+        }
+
+        changed = or_(*[getattr(SpendMoney, column).is_distinct_from(value) for column, value in values.items()])
+        updated = session.execute(
+            update(SpendMoney).where(key_match, changed).values(**values)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        created = session.execute(
+            insert(SpendMoney).from_select(
+                ['project_number', 'po_number', 'detail_number', 'line_number', *values],
+                select(latest.c.project_number, latest.c.po_number, latest.c.detail_number, latest.c.line_number,
+                       *values.values())
+                .where(~select(SpendMoney.id).where(key_match).exists())
+            )
+        ).rowcount
+        indexed = session.execute(select(func.count()).select_from(latest)).scalar() or 0
+
+        summary = {'indexed': indexed, 'created': created, 'updated': updated,
+                   'unchanged': max(0, indexed - created - updated)}
+        self.logger.info(f'[reconcile] - 🧾 spend_money for project {project_number} => {summary}')
+        return summary
+    # endregion
+
+    # region Helpers
+    @staticmethod
+    def _key_filters(project_number, po_number=None, detail_number=None, line_number=None) -> list:
+        index = XeroSpendMoneyIndexEntry
+        filters = [index.project_number == int(project_number)]
+        for column, value in ((index.po_number, po_number), (index.detail_number, detail_number),
+                              (index.line_number, line_number)):
+            if value is not None:
+                filters.append(column == int(value))
+        return filters
+
+    def _live(self):
+        status = XeroSpendMoneyIndexEntry.status
+        return or_(status.is_(None), func.upper(status).notin_(self.EXCLUDED_STATUSES))
+    # endregion
+
+# endregion
+
+
+# region Reference Parsing
+def parse_reference(reference):
+    parts = reference.split("_")
+    if len(parts) == 3:
+        parts.append("1")
+    elif len(parts) != 4:
+        raise ValueError(
+            f"Expected 3 or 4 segments separated by underscores, got {len(parts)} segments: {parts}")
+
+    project_str, po_str, detail_str, line_number = parts
+    return project_str, po_str, detail_str, line_number
+
+
+def reference_key(reference: Optional[str]) -> Optional[Tuple[int, int, int, int]]:
+    """
+    (project, po, detail, line) of a 'project_po_detail[_line]' reference, or None if malformed.
+    """
+    try:
+        return tuple(int(part) for part in parse_reference(reference or ''))
+    except ValueError:
+        return None
+# endregion
+
+
+xero_spend_money_index = XeroSpendMoneyIndex()
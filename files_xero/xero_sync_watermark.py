@@ -0,0 +1,129 @@
+"""
+files_xero/xero_sync_watermark.py
+
+🌊 Xero Sync Watermarks
+=======================
+Per-entity watermarks for incremental Xero syncs, persisted in `xero_sync_watermark`.
+
+- `since(entity)` returns the datetime to send as If-Modified-Since (the newest
+  UpdatedDateUTC merged so far, minus XERO_SYNC_OVERLAP_SECONDS for clock skew),
+  or None when a full reconcile is due: never synced, or the last full sync is
+  older than XERO_FULL_RECONCILE_HOURS.
+- `advance(entity, records, full)` moves the watermark to the newest UpdatedDateUTC
+  in `records`. Pass the same session as the merge so both commit together.
+
+Records re-read because of the overlap are harmless: the merges are idempotent.
+"""
+
+# region Imports
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, Optional
+
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from database.db_util import get_db_session
+from database_pg.models_pg import XeroSyncWatermark
+from utilities.config import Config
+from utilities.singleton import SingletonMeta
+# endregion
+
+
+# region Class Definition
+class XeroSyncWatermarkStore(metaclass=SingletonMeta):
+    """
+    Get / advance sync watermarks. Use the module-level `xero_sync_watermarks`.
+    """
+
+    def __init__(self):
+        if not hasattr(self, '_initialized'):
+            self.logger = logging.getLogger('xero_logger')
+            self.full_reconcile_interval = timedelta(hours=Config.XERO_FULL_RECONCILE_HOURS)
+            self.overlap = timedelta(seconds=Config.XERO_SYNC_OVERLAP_SECONDS)
+            self.logger.info('🌊 Xero sync watermark store initialized.')
+            self._initialized = True
+
+    def get(self, entity: str, session: Session = None) -> Optional[dict]:
+        if session is None:
+            with get_db_session() as new_session:
+                return self.get(entity, session=new_session)
+        row = session.query(XeroSyncWatermark).filter(XeroSyncWatermark.entity == entity).first()
+        return row.to_dict() if row else None
+
+    def since(self, entity: str, session: Session = None) -> Optional[datetime]:
+        """
+        If-Modified-Since for the next sync of `entity`, or None for a full reconcile.
+        """
+        watermark = self.get(entity, session=session)
+        if not watermark or not watermark.get('modified_since') or not watermark.get('last_full_sync_at'):
+            self.logger.info(f'[since] - 🌊 No watermark for {entity}; running a full reconcile.')
+            return None
+        if datetime.utcnow() - watermark['last_full_sync_at'] >= self.full_reconcile_interval:
+            self.logger.info(f'[since] - 🌊 Full reconcile due for {entity} '
+                             f'(last one at {watermark["last_full_sync_at"]}).')
+            return None
+        since = watermark['modified_since'] - self.overlap
+        self.logger.info(f'[since] - 🌊 Incremental sync of {entity}: records modified since {since}.')
+        return since
+
+    def advance(self, entity: str, records: Iterable[dict], full: bool = False, session: Session = None) -> None:
+        """
+        Move the watermark of `entity` to the newest UpdatedDateUTC in `records` (never backwards).
+        """
+        if session is None:
+            with get_db_session() as new_session:
+                return self.advance(entity, records, full=full, session=new_session)
+        now = datetime.utcnow()
+        newest = max((d for d in (updated_date_utc(r) for r in records) if d), default=None)
+        values = {'entity': entity, 'modified_since': newest or now, 'last_success_at': now}
+        if full:
+            values['last_full_sync_at'] = now
+        stmt = insert(XeroSyncWatermark).values(**values)
+        set_ = {'last_success_at': stmt.excluded.last_success_at, 'updated_at': now}
+        if newest is not None:
+            set_['modified_since'] = _greatest(XeroSyncWatermark.modified_since, stmt.excluded.modified_since)
+        if full:
+            set_['last_full_sync_at'] = stmt.excluded.last_full_sync_at
+        session.execute(stmt.on_conflict_do_update(index_elements=['entity'], set_=set_))
+        self.logger.debug(f'[advance] - 🌊 Watermark for {entity} => {newest} (full={full}).')
+
+    def reset(self, entity: str, session: Session = None) -> None:
+        """
+        Drop the watermark of `entity` (e.g. a finished run's checkpoint).
+        """
+        if session is None:
+            with get_db_session() as new_session:
+                return self.reset(entity, session=new_session)
+        session.query(XeroSyncWatermark).filter(XeroSyncWatermark.entity == entity).delete()
+        self.logger.debug(f'[reset] - 🌊 Watermark for {entity} dropped.')
+
+# endregion
+
+
+# region Helpers
+def updated_date_utc(record: dict) -> Optional[datetime]:
+    """
+    A Xero record's UpdatedDateUTC as a naive UTC datetime (pyxero may hand back
+    an aware datetime or, for raw payloads, an ISO string).
+    """
+    value = record.get('UpdatedDateUTC') if isinstance(record, dict) else None
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value.replace('Z', '+00:00'))
+        except ValueError:
+            return None
+    if not isinstance(value, datetime):
+        return None
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _greatest(column, excluded):
+    return func.greatest(func.coalesce(column, excluded), excluded)
+# endregion
+
+
+xero_sync_watermarks = XeroSyncWatermarkStore()
@@ -0,0 +1,167 @@
+"""
+files_xero/xero_token_broker.py
+
+🔑 Xero Token Broker
+====================
+One OAuth2 token for every worker process, kept in Redis next to the rate governor.
+
+Xero rotates the refresh token on every refresh, so two processes refreshing the
+same token at once leave one of them holding a dead refresh token (and a burst of
+XeroUnauthorized retries). The broker makes refreshing a shared, locked operation:
+
+- The current token (and tenant id) lives in one Redis hash per tenant, with no TTL.
+  An empty store is seeded from the process's own (.env) token.
+- A token within XERO_TOKEN_REFRESH_MARGIN_SECONDS of expiry is refreshed ahead of
+  time by whichever process takes the lock (a lease in the same hash, expiring
+  after LOCK_SECONDS in case the holder dies); the others poll until the new token
+  is published and adopt it.
+- After a 401 the caller passes the rejected access token: if another process has
+  already replaced it, the newer token is adopted without refreshing again.
+- Tokens are installed on the existing OAuth2Credentials in place, so Xero
+  managers built on them keep working; nothing is reconstructed.
+
+If Redis is unavailable the process refreshes on its own, as before.
+"""
+
+# region Imports
+import json
+import logging
+import uuid
+from typing import Optional
+
+import redis
+
+from files_xero.xero_rate_governor import RedisStateStore, SystemClock
+from utilities.config import Config
+from utilities.singleton import SingletonMeta
+# endregion
+
+
+# region Class Definition
+class XeroTokenBroker(metaclass=SingletonMeta):
+    """
+    Shares and refreshes the Xero token across processes. Use the module-level `xero_token_broker`.
+    """
+
+    # region Constants
+    LOCK_SECONDS = 30.0
+    POLL_SECONDS = 0.25
+    # endregion
+
+    # region Initialization
+    def __init__(self):
+        if not hasattr(self, '_initialized'):
+            self.logger = logging.getLogger('xero_logger')
+            self.store = RedisStateStore(redis.Redis.from_url(Config.REDIS_URL), ttl_seconds=None)
+            self.clock = SystemClock()
+            self.refresh_margin = Config.XERO_TOKEN_REFRESH_MARGIN_SECONDS
+            self.key = f"xero:token:{Config.XERO_TENANT_ID or 'default'}"
+            self.logger.info('🔑 Xero token broker initialized.')
+            self._initialized = True
+    # endregion
+
+    # region Token
+    def install(self, credentials, rejected_access_token: Optional[str] = None) -> dict:
+        """
+        Put the current shared token on `credentials` (in place) and return it, refreshing
+        first if it is close to expiry or is `rejected_access_token` (i.e. just got a 401).
+        """
+        owner = uuid.uuid4().hex
+        try:
+            while True:
+                action, token, tenant_id = self.store.transact(
+                    self.key, lambda state: self._plan(state, credentials, rejected_access_token, owner))
+                if action == 'use':
+                    self._adopt(credentials, token, tenant_id)
+                    return token
+                if action == 'refresh':
+                    return self._refresh(credentials, token, tenant_id, owner)
+                self.logger.debug('[install] - ⏳ Another worker is refreshing the Xero token; waiting.')
+                self.clock.sleep(self.POLL_SECONDS)
+        except redis.RedisError as e:
+            self.logger.warning(f'[install] - ⚠️ Token broker unavailable, refreshing locally: {e}')
+            token = credentials.refresh()
+            self._ensure_tenant(credentials)
+            return token
+
+    def publish(self, token: dict, tenant_id: Optional[str] = None) -> None:
+        """
+        Replace the shared token, e.g. after re-authorizing (see xero_auth.py).
+        """
+        def replace(state: dict):
+            state['token'] = json.dumps(token)
+            if tenant_id:
+                state['tenant_id'] = tenant_id
+            return None, state
+
+        self.store.transact(self.key, replace)
+        self.logger.info('[publish] - 🔑 Shared Xero token replaced.')
+
+    def _plan(self, state: dict, credentials, rejected_access_token: Optional[str], owner: str):
+        """
+        One atomic look at the shared state: use the token, take the lock to refresh it, or wait.
+        """
+        now = self.clock.time()
+        if state.get('token'):
+            token = json.loads(state['token'])
+        else:
+            token = dict(credentials.token)
+            state['token'] = json.dumps(token)
+        tenant_id = state.get('tenant_id') or credentials.tenant_id
+
+        stale = float(token.get('expires_at') or 0) - now < self.refresh_margin
+        rejected = bool(rejected_access_token) and token.get('access_token') == rejected_access_token
+        if not stale and not rejected:
+            return ('use', token, tenant_id), state
+        if float(state.get('lock_until', 0)) > now and state.get('lock_owner') != owner:
+            return ('wait', token, tenant_id), state
+        state.update(lock_owner=owner, lock_until=now + self.LOCK_SECONDS)
+        return ('refresh', token, tenant_id), state
+
+    def _refresh(self, credentials, token: dict, tenant_id: Optional[str], owner: str) -> dict:
+        """
+        Refresh from the shared token (its refresh token is the only live one) and publish the result.
+        """
+        new_token = None
+        try:
+            self._adopt(credentials, token, tenant_id)
+            new_token = credentials.refresh()
+            self._ensure_tenant(credentials)
+            self.logger.info('[_refresh] - 🔄 Xero token refreshed and shared.')
+            return new_token
+        finally:
+            def publish(state: dict):
+                if new_token:
+                    state['token'] = json.dumps(new_token)
+                    if credentials.tenant_id:
+                        state['tenant_id'] = credentials.tenant_id
+                if state.get('lock_owner') == owner:
+                    state.pop('lock_owner', None)
+                    state.pop('lock_until', None)
+                return None, state
+
+            try:
+                self.store.transact(self.key, publish)
+            except redis.RedisError as e:
+                # The refresh already spent the old refresh token: never fall back to refreshing again.
+                # Other workers will get a 401 on the old token and take the lock once it expires.
+                self.logger.error(f'[_refresh] - ❌ Could not share the refreshed Xero token: {e}')
+
+    def _adopt(self, credentials, token: dict, tenant_id: Optional[str]) -> None:
+        if credentials.token != token:
+            credentials._init_oauth(token)
+        if tenant_id and not credentials.tenant_id:
+            credentials.tenant_id = tenant_id
+
+    def _ensure_tenant(self, credentials) -> None:
+        if not credentials.tenant_id:
+            tenants = credentials.get_tenants()
+            if tenants:
+                credentials.tenant_id = tenants[0]['tenantId']
+                self.logger.debug(f'[_ensure_tenant] - 🏢 Tenant set to {credentials.tenant_id}')
+    # endregion
+
+# endregion
+
+
+xero_token_broker = XeroTokenBroker()
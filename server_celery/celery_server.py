@@ -15,6 +15,7 @@ from database.db_util import initialize_database
 from utilities.config import Config
 from dotenv import load_dotenv
 from server_celery.logging_setup import clear_log_files
+from files_xero.xero_rate_governor import XeroThrottled
 
 load_dotenv("../.env")
 
@@ -22,11 +23,26 @@ load_dotenv("../.env")
 logger = logging.getLogger('admin_logger')
 clear_log_files()
 
+class XeroThrottleTask(Task):
+    """
+    Default task class: when the Xero rate governor says the next slot is too far
+    away (XeroThrottled), re-queue the task with that countdown instead of sleeping
+    in the worker.
+    """
+
+    def __call__(self, *args, **kwargs):
+        try:
+            return super().__call__(*args, **kwargs)
+        except XeroThrottled as e:
+            logger.warning(f'🚦 {self.name} throttled by Xero ({e.reason}); retrying in {e.retry_after:.0f}s.')
+            raise self.retry(exc=e, countdown=e.retry_after, max_retries=Config.XERO_THROTTLE_MAX_RETRIES)
+
 # 3. Create the Celery app instance
 celery_app = Celery(
     'celery_app',
-    broker='redis://localhost:6379/5',
-    backend='redis://localhost:6379/5'
+    broker=Config.REDIS_URL,
+    backend=Config.REDIS_URL,
+    task_cls=XeroThrottleTask
 )
 
 # 4. Update Celery configuration and prevent it from hijacking the root logger
@@ -35,6 +51,11 @@ celery_app.conf.update(
     worker_concurrency=4,
     broker_transport_options={'visibility_timeout': 3600},
     worker_hijack_root_logger=False,  # Prevent Celery from overriding your loggers
+    # Dropbox intake runs on its own queues so a burst of webhook files never
+    # starves the DB trigger tasks on the default 'celery' queue.
+    task_routes={
+        'server_celery.celery_tasks.process_dropbox_notification': {'queue': 'dropbox_intake'},
+    },
 )
 
 celery_app.conf.enable_utc = True
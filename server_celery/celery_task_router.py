@@ -5,7 +5,8 @@ from server_celery.triggers.budget_triggers import handle_project_create, handle
     handle_purchase_order_create, handle_purchase_order_update, handle_purchase_order_delete, handle_detail_item_create, \
     handle_detail_item_update, handle_detail_item_delete, handle_po_log_create
 from server_celery.triggers.invoice_receipt_triggers import handle_invoice_create_or_update, handle_invoice_delete, handle_receipt_create, handle_receipt_update, handle_receipt_delete
-from server_celery.triggers.contact_triggers import handle_contact_create, handle_contact_update, handle_contact_delete, handle_tax_account_create, handle_tax_account_update, handle_tax_account_delete, handle_account_code_create, handle_account_code_update, handle_account_code_delete
+from server_celery.triggers.contact_triggers import handle_contact_create, handle_contact_update, handle_contact_delete, handle_tax_account_create, handle_tax_account_update, handle_tax_account_delete, handle_account_code_create, handle_account_code_update, handle_account_code_delete, handle_budget_map_create, handle_budget_map_update, handle_budget_map_delete
+from server_celery.triggers.dropbox_triggers import handle_dropbox_notification, handle_dropbox_file
 
 class CeleryTaskService(metaclass=SingletonMeta):
     """
@@ -125,4 +126,19 @@ class CeleryTaskService(metaclass=SingletonMeta):
     def account_code_trigger_on_delete(self, account_code_id: int):
         return handle_account_code_delete(account_code_id)
 
+    def budget_map_trigger_on_create(self, budget_map_id: int):
+        return handle_budget_map_create(budget_map_id)
+
+    def budget_map_trigger_on_update(self, budget_map_id: int):
+        return handle_budget_map_update(budget_map_id)
+
+    def budget_map_trigger_on_delete(self, budget_map_id: int):
+        return handle_budget_map_delete(budget_map_id)
+
+    def dropbox_notification_trigger(self):
+        return handle_dropbox_notification()
+
+    def dropbox_file_trigger(self, path: str, file_type: str):
+        return handle_dropbox_file(path, file_type)
+
 celery_task_service = CeleryTaskService()
\ No newline at end of file
@@ -305,6 +305,48 @@ def process_account_code_delete(account_code_id: int):
         logger.error(f'💥 Problem in process_account_code_delete({account_code_id}): {e}', exc_info=True)
         raise
 
+@shared_task
+def process_budget_map_create(budget_map_id: int):
+    logger = logging.getLogger('budget_logger')
+
+    logger.info(f'🚀 Starting process_budget_map_create shared task. budget_map_id={budget_map_id}.')
+    try:
+        trigger_service = celery_task_service
+        trigger_service.budget_map_trigger_on_create(budget_map_id)
+        logger.info(f'🎉 Done processing newly created BudgetMap #{budget_map_id}.')
+        return f'BudgetMap {budget_map_id} created successfully!'
+    except Exception as e:
+        logger.error(f'💥 Problem in process_budget_map_create({budget_map_id}): {e}', exc_info=True)
+        raise
+
+@shared_task
+def process_budget_map_update(budget_map_id: int):
+    logger = logging.getLogger('budget_logger')
+
+    logger.info(f'🔄 Handling updated BudgetMap id={budget_map_id}.')
+    try:
+        trigger_service = celery_task_service
+        trigger_service.budget_map_trigger_on_update(budget_map_id)
+        logger.info(f'🎉 Done updating BudgetMap #{budget_map_id}.')
+        return f'BudgetMap {budget_map_id} updated successfully!'
+    except Exception as e:
+        logger.error(f'💥 Problem in process_budget_map_update({budget_map_id}): {e}', exc_info=True)
+        raise
+
+@shared_task
+def process_budget_map_delete(budget_map_id: int):
+    logger = logging.getLogger('budget_logger')
+
+    logger.info(f'🗑️ Handling deleted BudgetMap id={budget_map_id}.')
+    try:
+        trigger_service = celery_task_service
+        trigger_service.budget_map_trigger_on_delete(budget_map_id)
+        logger.info(f'✅ BudgetMap #{budget_map_id} deletion handled.')
+        return f'BudgetMap {budget_map_id} deletion processed!'
+    except Exception as e:
+        logger.error(f'💥 Problem in process_budget_map_delete({budget_map_id}): {e}', exc_info=True)
+        raise
+
 @shared_task
 def process_receipt_create(receipt_id: int):
     logger = logging.getLogger('invoice_logger')
@@ -550,4 +592,39 @@ def process_po_log_create(po_log_id: int):
         return 'PO Log [NEW] task completed successfully!'
     except Exception as e:
         logger.error(f'💥 Problem in process_po_log_new(): {e}', exc_info=True)
-        raise
\ No newline at end of file
+        raise
+
+@shared_task
+def process_dropbox_notification():
+    """
+    The Celery task for Dropbox webhook notifications.
+    Single-flight: concurrent notifications collapse into one cursor pass.
+    """
+    logger = logging.getLogger('dropbox')
+
+    logger.info('📥 Starting process_dropbox_notification shared task.')
+    try:
+        trigger_service = celery_task_service
+        dispatched = trigger_service.dropbox_notification_trigger()
+        logger.info(f'🎉 Done with Dropbox notification. {dispatched} file(s) dispatched.')
+        return f'Dropbox notification processed, {dispatched} file(s) dispatched!'
+    except Exception as e:
+        logger.error(f'💥 Problem in process_dropbox_notification(): {e}', exc_info=True)
+        raise
+
+@shared_task
+def process_dropbox_file(path: str, file_type: str):
+    """
+    The Celery task for a single classified Dropbox file.
+    """
+    logger = logging.getLogger('dropbox')
+
+    logger.info(f'📄 Starting process_dropbox_file shared task. file_type={file_type}, path={path}.')
+    try:
+        trigger_service = celery_task_service
+        trigger_service.dropbox_file_trigger(path, file_type)
+        logger.info(f'🎉 Done with Dropbox {file_type} file: {path}')
+        return f'Dropbox {file_type} file processed successfully!'
+    except Exception as e:
+        logger.error(f'💥 Problem in process_dropbox_file({path}, {file_type}): {e}', exc_info=True)
+        raise
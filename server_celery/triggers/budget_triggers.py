@@ -21,6 +21,7 @@ from files_xero.xero_services import xero_services  # for Xero calls
 from files_dropbox.dropbox_service import DropboxService  # for links and files
 from files_monday.monday_service import monday_service  # for Monday upserts
 from files_budget.budget_service import budget_service  # aggregator checks + date-range updates
+from files_budget.tax_code_resolver import tax_code_resolver  # cached account code -> tax code
 
 # endregion
 
@@ -485,25 +486,33 @@ def handle_detail_item_delete(detail_item_id: int) -> None:
 # endregion
 
 # region 🪻PROJECT TRIGGERS
-def handle_project_update():
-    return None
+def handle_project_update(project_id: int) -> None:
+    """
+    Triggered when a Project is updated. Its budget_map_id / tax_ledger decide how bills
+    resolve tax codes, so the cached mapping for the project is dropped in every worker.
+    """
+    logger.info(f"🪻 Project UPDATE trigger fired! project_id={project_id}")
+    project = db_ops.search_projects(['id'], [project_id])
+    if isinstance(project, list):
+        project = project[0] if project else None
+    if project and project.get('project_number') is not None:
+        tax_code_resolver.invalidate(project['project_number'])
+    else:
+        logger.warning(f"❌ Project {project_id} not found; dropping the tax code cache for every project.")
+        tax_code_resolver.invalidate()
 
 
-def handle_project_create():
+def handle_project_create(project_id: int) -> None:
     return None
 
 
-def handle_project_delete():
+def handle_project_delete(project_id: int) -> None:
     return None
 
 
 # endregion
 
 # region HELPER FUNCTIONS
-def _get_tax_from_detail(detail_item: dict) -> int:
-    account_code = detail_item["account_code"]
-    budget_map_id = db_ops.search_projects(["project_number"], detail_item["project_number"])["budget_map_id"]
-    tax_code_id = db_ops.search_tax_accounts(["budget_map_id", "code"], [budget_map_id, account_code])["tax_id"]
-    tax_code = db_ops.search_tax_accounts(['id'], tax_code_id)
-    return tax_code
+def _get_tax_from_detail(detail_item: dict):
+    return tax_code_resolver.resolve(detail_item.get("project_number"), detail_item.get("account_code"))
 # endregion
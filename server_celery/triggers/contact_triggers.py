@@ -1,40 +1,54 @@
 import logging
 from database.database_util import DatabaseOperations
+from files_budget.tax_code_resolver import tax_code_resolver
+from files_budget.vendor_resolver import vendor_resolver
 db_ops = DatabaseOperations()
 logger = logging.getLogger('database_logger')
 
 def handle_contact_create(contact_id: int) -> None:
     logger.info(f'[CONTACT CREATE] contact_id={contact_id}')
-    pass
+    vendor_resolver.refresh(contact_id)
 
 def handle_contact_update(contact_id: int) -> None:
     logger.info(f'[CONTACT UPDATE] contact_id={contact_id}')
-    pass
+    vendor_resolver.refresh(contact_id)
 
 def handle_contact_delete(contact_id: int) -> None:
     logger.info(f'[CONTACT DELETE] contact_id={contact_id}')
-    pass
+    vendor_resolver.forget(contact_id)
 
 def handle_tax_account_create(tax_account_id: int) -> None:
     logger.info(f'[TAX ACCOUNT CREATE] id={tax_account_id}')
-    pass
+    tax_code_resolver.invalidate()
 
 def handle_tax_account_update(tax_account_id: int) -> None:
     logger.info(f'[TAX ACCOUNT UPDATE] id={tax_account_id}')
-    pass
+    tax_code_resolver.invalidate()
 
 def handle_tax_account_delete(tax_account_id: int) -> None:
     logger.info(f'[TAX ACCOUNT DELETE] id={tax_account_id}')
-    pass
+    tax_code_resolver.invalidate()
 
 def handle_account_code_create(account_code_id: int) -> None:
     logger.info(f'[ACCOUNT CODE CREATE] id={account_code_id}')
-    pass
+    tax_code_resolver.invalidate()
 
 def handle_account_code_update(account_code_id: int) -> None:
     logger.info(f'[ACCOUNT CODE UPDATE] id={account_code_id}')
-    pass
+    tax_code_resolver.invalidate()
 
 def handle_account_code_delete(account_code_id: int) -> None:
     logger.info(f'[ACCOUNT CODE DELETE] id={account_code_id}')
-    pass
\ No newline at end of file
+    tax_code_resolver.invalidate()
+
+def handle_budget_map_create(budget_map_id: int) -> None:
+    logger.info(f'[BUDGET MAP CREATE] id={budget_map_id}')
+    tax_code_resolver.invalidate()
+
+def handle_budget_map_update(budget_map_id: int) -> None:
+    logger.info(f'[BUDGET MAP UPDATE] id={budget_map_id}')
+    tax_code_resolver.invalidate()
+
+def handle_budget_map_delete(budget_map_id: int) -> None:
+    logger.info(f'[BUDGET MAP DELETE] id={budget_map_id}')
+    tax_code_resolver.invalidate()
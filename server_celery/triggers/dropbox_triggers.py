@@ -0,0 +1,50 @@
+"""
+server_celery/triggers/dropbox_triggers.py
+
+Holds trigger functions for:
+  - Dropbox webhook notifications (single-flight change consumer)
+  - Individual Dropbox files (classified by name, processed on their own queue)
+"""
+
+import logging
+
+# region 🔧 Imports
+from files_dropbox.dropbox_change_consumer import dropbox_change_consumer
+from files_dropbox.dropbox_service import DropboxService
+# endregion
+
+# region 🏗️ Setup
+logger = logging.getLogger('dropbox')
+# endregion
+
+
+# region 📥 DROPBOX NOTIFICATION
+def handle_dropbox_notification() -> int:
+    """
+    Consumes every pending webhook notification in one pass and fans the changed
+    files out to `process_dropbox_file` on their per-type queue.
+    """
+    # Imported here: celery_tasks imports the router, which imports this module.
+    from server_celery.celery_tasks import process_dropbox_file
+
+    dropbox_service = DropboxService()
+
+    def dispatch(path: str, file_type: str):
+        queue = dropbox_change_consumer.queue_for(file_type)
+        logger.info(f'📤 Dispatching {file_type} file to queue "{queue}": {path}')
+        process_dropbox_file.apply_async(args=[path, file_type], queue=queue)
+
+    dispatched = dropbox_change_consumer.consume(classify=dropbox_service.classify_file, dispatch=dispatch)
+    logger.info(f'✅ Dropbox notification handled. {dispatched} file(s) dispatched.')
+    return dispatched
+# endregion
+
+
+# region 📄 DROPBOX FILE
+def handle_dropbox_file(path: str, file_type: str):
+    """
+    Runs the DropboxService handler for an already-classified file.
+    """
+    logger.info(f'📄 Processing Dropbox {file_type} file: {path}')
+    return DropboxService().dispatch_file(path, file_type)
+# endregion
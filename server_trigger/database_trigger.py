@@ -42,6 +42,7 @@ from server_celery.celery_tasks import (
     process_xero_bill_line_item_create, process_xero_bill_line_item_update, process_xero_bill_line_item_delete,
     process_bank_transaction_create, process_bank_transaction_update, process_bank_transaction_delete,
     process_account_code_create, process_account_code_update, process_account_code_delete,
+    process_budget_map_create, process_budget_map_update, process_budget_map_delete,
     process_receipt_create, process_receipt_update, process_receipt_delete,
     process_spend_money_create, process_spend_money_update, process_spend_money_delete,
     process_tax_account_create, process_tax_account_update, process_tax_account_delete,
@@ -79,6 +80,9 @@ TASK_ROUTING = {
     ('account_code', 'INSERT'): lambda rid: process_account_code_create.delay(rid),
     ('account_code', 'UPDATE'): lambda rid: process_account_code_update.delay(rid),
     ('account_code', 'DELETE'): lambda rid: process_account_code_delete.delay(rid),
+    ('budget_map', 'INSERT'): lambda rid: process_budget_map_create.delay(rid),
+    ('budget_map', 'UPDATE'): lambda rid: process_budget_map_update.delay(rid),
+    ('budget_map', 'DELETE'): lambda rid: process_budget_map_delete.delay(rid),
     ('receipt', 'INSERT'): lambda rid: process_receipt_create.delay(rid),
     ('receipt', 'UPDATE'): lambda rid: process_receipt_update.delay(rid),
     ('receipt', 'DELETE'): lambda rid: process_receipt_delete.delay(rid),
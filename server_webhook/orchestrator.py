@@ -59,29 +59,30 @@ class Orchestrator:
 
     def sync_spend_money_items(self):
         """
-        Retrieve spend money transactions from Xero for a single run.
+        Retrieve spend money transactions changed in Xero since the last run (periodically
+        a full reconcile; see files_xero/xero_sync_watermark.py).
         """
         self.logger.info('[sync_spend_money_items] - Syncing spend money transactions...')
-        result = self.xero_services.load_spend_money_transactions(project_id='2416')
+        result = self.xero_services.load_spend_money_transactions(project_id='2416', incremental=True)
         return result
 
     def sync_contacts(self):
         """
-        Retrieve and populate Xero contacts in a single run.
+        Merge Xero contacts changed since the last run (periodically a full two-way reconcile).
         """
         self.logger.info('[sync_contacts] - Syncing Xero contacts...')
-        result = self.xero_services.populate_xero_contacts()
+        result = self.xero_services.populate_xero_contacts(incremental=True)
         return result
 
     def sync_xero_bills(self):
         """
-        Retrieve Xero bills in a single run.
+        Retrieve Xero bills changed since the last run (periodically a full reconcile).
         """
         self.logger.info('[sync_xero_bills] - Syncing Xero bills...')
-        result = self.xero_services.load_xero_bills('2416')
+        result = self.xero_services.load_xero_bills('2416', incremental=True)
         return result
 
-    def scan_project_receipts(self, project_number: str):
+    def scan_project_receipts(self, project_number: str, delta: bool = False):
         """
         Calls the dropbox_service to scan a specific project folder for receipts
         and process each receipt into the database.
@@ -89,14 +90,17 @@ class Orchestrator:
         self.logger.info(f'[scan_project_receipts] - 📂 Orchestrator: scanning receipts for project {project_number}.')
         from files_dropbox.dropbox_service import DropboxService
         dropbox_service = DropboxService()
-        dropbox_service.scan_project_receipts(project_number)
+        return dropbox_service.scan_project_receipts(project_number, delta=delta)
 
-    def scan_project_invoices(self, project_number: str):
+    def scan_project_invoices(self, project_number: str, delta: bool = False):
         """
         Calls the dropbox_service to scan a specific project folder for invoices
         and process each invoice into the database.
         """
         self.logger.info(f'[scan_project_invoices] - 📂 Orchestrator: scanning invoice for project {project_number}.')
+        from files_dropbox.dropbox_service import DropboxService
+        dropbox_service = DropboxService()
+        return dropbox_service.scan_project_invoices(project_number, delta=delta)
 
     # New function: clear_po_log_data
     def clear_po_log_data(self, project_number):
@@ -0,0 +1,93 @@
+# fake_chat_server.py
+"""
+Minimal local stand-in for the OpenAI chat-completions endpoint.
+
+Answers receipt prompts deterministically from the request text: the total is the
+first number after 'TOTAL', the date the first YYYY-MM-DD. Batched prompts
+('### RECEIPT <id>' sections) get a {"results": [...]} answer. Every request is
+recorded in `server.requests`.
+"""
+import json
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+TOTAL_PATTERN = re.compile(r'TOTAL\D*(-?[\d.]+)', re.IGNORECASE)
+DATE_PATTERN = re.compile(r'\d{4}-\d{2}-\d{2}')
+SECTION_PATTERN = re.compile(r'^### RECEIPT (\d+)$', re.MULTILINE)
+
+
+def _fields(text: str) -> dict:
+    total = TOTAL_PATTERN.search(text)
+    date = DATE_PATTERN.search(text)
+    return {
+        'total_amount': float(total.group(1)) if total else None,
+        'description': text.strip().splitlines()[0][:20] if text.strip() else None,
+        'date': date.group(0) if date else None,
+    }
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        self.server.requests.append(body)
+        user_text = body['messages'][-1]['content']
+
+        sections = SECTION_PATTERN.split(user_text)
+        if len(sections) > 1:
+            # ['', id0, text0, id1, text1, ...]
+            results = [
+                dict(_fields(text), id=int(receipt_id))
+                for receipt_id, text in zip(sections[1::2], sections[2::2])
+                if int(receipt_id) not in self.server.drop_ids
+            ]
+            content = json.dumps({'results': results})
+        else:
+            content = json.dumps(_fields(user_text))
+
+        payload = json.dumps({
+            'id': 'chatcmpl-fake',
+            'object': 'chat.completion',
+            'created': 0,
+            'model': body.get('model'),
+            'choices': [{'index': 0, 'finish_reason': 'stop',
+                         'message': {'role': 'assistant', 'content': content}}],
+            'usage': {'prompt_tokens': len(user_text) // 4, 'completion_tokens': len(content) // 4,
+                      'total_tokens': (len(user_text) + len(content)) // 4},
+        }).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+class FakeChatServer:
+    def __init__(self):
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+        self.httpd.requests = []
+        self.httpd.drop_ids = set()
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        return f'http://127.0.0.1:{self.httpd.server_address[1]}/v1'
+
+    @property
+    def requests(self) -> list:
+        return self.httpd.requests
+
+    @property
+    def drop_ids(self) -> set:
+        return self.httpd.drop_ids
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
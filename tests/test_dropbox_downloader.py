@@ -0,0 +1,66 @@
+# test_dropbox_downloader.py
+import hashlib
+import os
+import pytest
+from unittest.mock import MagicMock
+from files_dropbox.dropbox_downloader import DropboxContentHasher, DropboxDownloader, DropboxDownloadError
+
+
+def _content_hash(data: bytes) -> str:
+    block = DropboxContentHasher.BLOCK_SIZE
+    digests = b''.join(hashlib.sha256(data[i:i + block]).digest() for i in range(0, len(data), block))
+    return hashlib.sha256(digests).hexdigest()
+
+
+class TestDropboxContentHasher:
+    def test_empty(self):
+        assert DropboxContentHasher().hexdigest() == hashlib.sha256(b'').hexdigest()
+
+    def test_chunking_does_not_change_hash(self):
+        data = os.urandom(DropboxContentHasher.BLOCK_SIZE * 2 + 12345)
+        hasher = DropboxContentHasher()
+        for i in range(0, len(data), 999_999):
+            hasher.update(data[i:i + 999_999])
+        assert hasher.hexdigest() == _content_hash(data)
+
+
+class TestDropboxDownloader:
+    @pytest.fixture(autouse=True)
+    def setup_downloader(self, tmp_path):
+        self.downloader = DropboxDownloader()
+        self.mock_dbx = MagicMock()
+        self.downloader.dropbox_client = MagicMock(dbx=self.mock_dbx)
+        self.downloader.TEMP_DIR = str(tmp_path)
+        self.tmp_path = tmp_path
+
+    def _fake_download(self, data: bytes, content_hash: str):
+        metadata = MagicMock(content_hash=content_hash)
+        response = MagicMock()
+        response.iter_content.return_value = [data[i:i + 1000] for i in range(0, len(data), 1000)]
+        self.mock_dbx.files_download.return_value = (metadata, response)
+
+    def test_fetch_streams_and_verifies(self):
+        data = b'receipt bytes' * 500
+        self._fake_download(data, _content_hash(data))
+        local_path = str(self.tmp_path / 'out.pdf')
+
+        self.downloader.fetch('/remote/receipt.pdf', local_path)
+
+        with open(local_path, 'rb') as f:
+            assert f.read() == data
+
+    def test_fetch_rejects_hash_mismatch(self):
+        self._fake_download(b'truncated', 'not-the-hash')
+        local_path = str(self.tmp_path / 'out.pdf')
+
+        with pytest.raises(DropboxDownloadError):
+            self.downloader.fetch('/remote/receipt.pdf', local_path)
+        assert not os.path.exists(local_path)
+
+    def test_temp_download_removes_file(self):
+        data = b'invoice'
+        self._fake_download(data, _content_hash(data))
+
+        with self.downloader.temp_download('/remote/invoice.pdf') as local_path:
+            assert os.path.exists(local_path)
+        assert not os.path.exists(local_path)
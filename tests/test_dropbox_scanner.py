@@ -0,0 +1,74 @@
+# test_dropbox_scanner.py
+import pytest
+from unittest.mock import MagicMock
+from dropbox import files
+from files_dropbox.dropbox_scanner import ProjectScanner
+
+
+def _file(folder: str, name: str, content_hash: str = None):
+    entry = MagicMock(spec=files.FileMetadata)
+    entry.name = name
+    entry.path_display = f'{folder}/{name}'
+    entry.path_lower = entry.path_display.lower()
+    entry.content_hash = content_hash or f'hash-{name}'
+    return entry
+
+
+class FakeCursorStore:
+    def __init__(self):
+        self.rows = {}
+
+    def get(self, name, session=None):
+        return self.rows.get(name)
+
+    def save(self, name, cursor, session=None):
+        self.rows[name] = {'cursor': cursor}
+
+
+class TestProjectScanner:
+    @pytest.fixture(autouse=True)
+    def setup_scanner(self, monkeypatch):
+        self.scanner = ProjectScanner()
+        self.listings = {}
+        dbx = MagicMock()
+        dbx.files_list_folder_get_latest_cursor.side_effect = \
+            lambda path, recursive: MagicMock(cursor=f'latest:{path}')
+        dbx.files_list_folder.side_effect = lambda path, recursive: self._page(path, 0)
+        dbx.files_list_folder_continue.side_effect = lambda cursor: self._page(*cursor.split('#'))
+        self.index = MagicMock()
+        self.index.processed_hashes.return_value = {}
+        self.cursor_store = FakeCursorStore()
+        monkeypatch.setattr(self.scanner, 'dropbox_client', MagicMock(dbx=dbx))
+        monkeypatch.setattr(self.scanner, 'dropbox_index', self.index)
+        monkeypatch.setattr(self.scanner, 'cursor_store', self.cursor_store)
+        monkeypatch.setattr(self.scanner, 'max_workers', 4)
+
+    def _page(self, path, number):
+        pages = self.listings[path]
+        number = int(number)
+        return MagicMock(entries=pages[number], has_more=number + 1 < len(pages), cursor=f'{path}#{number + 1}')
+
+    def test_scan_streams_every_page_and_advances_clean_cursors(self):
+        self.listings['/p/clean'] = [[_file('/p/clean', f'{i} Receipt.pdf') for i in range(20)],
+                                     [_file('/p/clean', f'{i} Receipt.pdf') for i in range(20, 30)] +
+                                     [_file('/p/clean', 'notes.txt')]]
+        self.listings['/p/broken'] = [[_file('/p/broken', 'bad Receipt.pdf'), _file('/p/broken', 'ok Receipt.pdf'),
+                                       _file('/p/broken', 'done Receipt.pdf', content_hash='same')]]
+        self.listings['/p/unmatched'] = [[_file('/p/unmatched', 'no detail Receipt.pdf')]]
+        self.index.processed_hashes.side_effect = \
+            lambda paths: {p: 'same' for p in paths if p.endswith('done receipt.pdf')}
+
+        def process(path):
+            if path.endswith('bad Receipt.pdf'):
+                raise RuntimeError('download failed')
+            return None if 'no detail' in path else True
+
+        stats = self.scanner.scan('receipts:2416', ['/p/clean', '/p/broken', '/p/unmatched'], 'receipt', process,
+                                  delta=True)
+
+        assert (stats['listed'], stats['matched'], stats['skipped_processed']) == (35, 34, 1)
+        assert (stats['succeeded'], stats['skipped'], stats['failed']) == (31, 1, 1)
+        assert self.index.mark_processed.call_count == 31
+        # A skipped file does not hold the cursor back; a failed one does
+        assert self.cursor_store.rows == {'scan:receipts:2416:/p/clean': {'cursor': 'latest:/p/clean'},
+                                          'scan:receipts:2416:/p/unmatched': {'cursor': 'latest:/p/unmatched'}}
@@ -0,0 +1,64 @@
+# test_llm_extractor.py
+import pytest
+from openai import OpenAI
+from files_dropbox.llm_extractor import llm_extractor, trim_text
+from tests.fake_chat_server import FakeChatServer
+
+
+def _receipt(n: int) -> str:
+    return f'Store {n}\n2024-03-0{n}\nCoffee\nTOTAL {n}.50'
+
+
+class TestTrimText:
+    def test_short_text_unchanged(self):
+        assert trim_text(' Store \n\nTOTAL 4.50 ') == 'Store\nTOTAL 4.50'
+
+    def test_long_text_keeps_header_and_key_lines(self):
+        filler = [f'item line {i} lorem ipsum dolor sit amet' for i in range(200)]
+        text = '\n'.join(['ACME RENTALS'] + filler + ['Payment Terms: Net 30', 'Total Due $1,200.00'])
+        trimmed = trim_text(text)
+        assert trimmed.startswith('ACME RENTALS')
+        assert 'Total Due $1,200.00' in trimmed and 'Net 30' in trimmed
+        assert 'item line 100 ' not in trimmed
+        assert len(trimmed) < len(text) // 5
+
+
+class TestLLMExtractor:
+    @pytest.fixture(autouse=True)
+    def fake_server(self):
+        with FakeChatServer() as server:
+            original_client = llm_extractor.client
+            llm_extractor.client = OpenAI(api_key='test', base_url=server.base_url)
+            llm_extractor.clear_cache()
+            self.server = server
+            yield
+            llm_extractor.client = original_client
+            llm_extractor.clear_cache()
+
+    def test_receipts_are_batched_in_one_request(self):
+        results = llm_extractor.extract_receipts([_receipt(n) for n in range(1, 5)])
+
+        assert [r['total_amount'] for r in results] == [1.5, 2.5, 3.5, 4.5]
+        assert results[2]['date'] == '2024-03-03'
+        assert len(self.server.requests) == 1
+
+    def test_repeated_text_is_memoized(self):
+        first = llm_extractor.extract_receipt(_receipt(1))
+        second = llm_extractor.extract_receipt('  ' + _receipt(1).replace('\n', '\n\n'))
+
+        assert first == second
+        assert len(self.server.requests) == 1
+
+    def test_missing_batch_entry_is_retried_alone(self):
+        self.server.drop_ids.add(1)
+
+        results = llm_extractor.extract_receipts([_receipt(n) for n in range(1, 4)])
+
+        assert [r['total_amount'] for r in results] == [1.5, 2.5, 3.5]
+        assert len(self.server.requests) == 2
+
+    def test_invoice_returns_info_and_error_tuple(self):
+        info, error = llm_extractor.extract_invoice('ACME\nInvoice 2024-01-31\nTOTAL 99.00')
+
+        assert error is None
+        assert info['total_amount'] == 99.0
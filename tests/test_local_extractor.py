@@ -0,0 +1,65 @@
+# test_local_extractor.py
+import pytest
+from datetime import datetime
+from files_dropbox.ocr_service import local_extractor
+
+INVOICE_TEXT = """ACME RENTALS LLC
+Invoice Date: 01/31/2024
+Due Date: 03/01/2024
+Terms: Net 30
+Camera package 1,000.00
+Subtotal 1,000.00
+Tax 95.00
+Total Due: $1,095.00"""
+
+RECEIPT_TEXT = """SHELL
+03/02/2024 10:41
+TOTAL $45.67
+VISA 45.67"""
+
+
+class TestLocalExtractor:
+    @pytest.fixture(autouse=True)
+    def setup_extractor(self, monkeypatch):
+        # No DB: start with no templates and keep learned ones in memory
+        monkeypatch.setattr(local_extractor, '_templates', {})
+        monkeypatch.setattr(
+            local_extractor, '_save_template',
+            lambda doc_type, key, layout, samples: local_extractor._templates.__setitem__(
+                (doc_type, key), dict(layout, samples=samples))
+        )
+
+    def test_rules_extract_invoice(self):
+        result = local_extractor.extract(INVOICE_TEXT, 'invoice')
+
+        assert result.total == 1095.0
+        assert result.date == datetime(2024, 1, 31)
+        assert result.term == 30
+        assert result.confidence >= local_extractor.min_confidence
+
+    def test_conflicting_totals_fall_below_threshold(self):
+        text = 'Invoice Date: 01/31/2024\nAmount Due 10.00\nAmount Due 20.00'
+
+        assert local_extractor.extract(text, 'invoice').confidence < local_extractor.min_confidence
+
+    def test_learned_template_prefers_total_label(self):
+        assert local_extractor.learn('receipt', 'Shell', RECEIPT_TEXT, 45.67, '2024-03-02')
+
+        template = local_extractor.get_template('receipt', 'shell')
+        assert template['total_label'] == 'total'
+        # One unreviewed confirmation is not enough for the template to win
+        assert local_extractor.extract(RECEIPT_TEXT, 'receipt', 'Shell').method == 'rules'
+
+        assert local_extractor.learn('receipt', 'Shell', RECEIPT_TEXT, 45.67, '2024-03-02')
+        result = local_extractor.extract(RECEIPT_TEXT, 'receipt', 'Shell')
+        assert result.method == 'template' and result.confidence >= local_extractor.min_confidence
+        assert result.as_receipt_info() == {'total_amount': 45.67, 'description': 'Shell', 'date': '2024-03-02'}
+
+    def test_single_confirmation_stays_below_threshold(self):
+        text = 'Tip line\n03/02/2024\nPaid 45.67'
+        assert not local_extractor.learn('receipt', 'Cafe', text + '\nVISA 45.67', 45.67, '2024-03-02')
+
+        local_extractor._templates[('receipt', 'cafe')] = {'total_label': 'paid', 'date_label': '',
+                                                          'date_format': '%m/%d/%Y', 'samples': 1}
+        result = local_extractor.extract(text, 'receipt', 'Cafe')
+        assert result.method == 'template' and result.confidence < local_extractor.min_confidence
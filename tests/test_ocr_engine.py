@@ -0,0 +1,42 @@
+# test_ocr_engine.py
+import pytest
+from concurrent.futures import Future
+from unittest.mock import MagicMock
+from files_dropbox.ocr_benchmark import generate_corpus
+from files_dropbox.ocr_engine import OCREngine
+
+
+def _done(value):
+    future = Future()
+    future.set_result(value)
+    return future
+
+
+class TestExtractDocument:
+    @pytest.fixture(autouse=True)
+    def setup_engine(self, tmp_path, monkeypatch):
+        self.engine = OCREngine()
+        self.pool = MagicMock()
+        self.pool.submit.side_effect = lambda fn, *args: _done(('OCR PAGE TEXT', 0.01))
+        monkeypatch.setattr(OCREngine, 'pool', property(lambda engine: self.pool))
+        self.paths = {p.split('/')[-1].split('_')[0]: p for p in generate_corpus(str(tmp_path), count=6)}
+
+    def test_text_layer_pages_are_not_ocred(self):
+        document = self.engine.extract_document(self.paths['text'])
+
+        assert 'Total Due' in document.text
+        assert {page.method for page in document.pages} == {'text'}
+        self.pool.submit.assert_not_called()
+
+    def test_only_image_pages_are_ocred(self):
+        document = self.engine.extract_document(self.paths['mixed'])
+
+        methods = [page.method for page in document.pages]
+        assert methods[0] == 'text' and len(methods) > 1
+        assert self.pool.submit.call_count == methods.count('ocr') == len(methods) - 1
+
+    def test_stop_when_skips_remaining_ocr(self):
+        document = self.engine.extract_document(self.paths['mixed'], stop_when=lambda text: 'Total Due' in text)
+
+        assert all(page.method in ('text', 'skipped') for page in document.pages)
+        self.pool.submit.assert_not_called()
@@ -0,0 +1,75 @@
+# test_vendor_resolver.py
+import time
+import pytest
+from unittest.mock import MagicMock
+from sqlalchemy.dialects import postgresql
+from files_budget.vendor_resolver import VendorResolver, normalize_vendor_name
+
+
+class TestVendorResolver:
+    @pytest.fixture(autouse=True)
+    def setup_resolver(self, monkeypatch):
+        self.resolver = VendorResolver()
+        self.resolver.invalidate()
+        self.contacts = {1: 'Acme Rentals', 2: 'Bobs Grip', 3: 'acme  rentals ', 4: 'Kodak'}
+        for contact_id, name in self.contacts.items():
+            self.resolver._add(contact_id, name)
+        self.lookups = []
+
+        def existing(contact_ids, session=None):
+            self.lookups.append(set(contact_ids))
+            return {contact_id for contact_id in contact_ids if contact_id in self.contacts}
+        monkeypatch.setattr(self.resolver, '_existing', existing)
+        # Pretend the index is freshly loaded so lookups never hit the DB
+        self.resolver._loaded = True
+        self.resolver._checked_at = time.monotonic()
+        yield
+        self.resolver.invalidate()
+
+    def test_normalize(self):
+        assert normalize_vendor_name('  Acme   Rentals ') == 'acme rentals'
+
+    def test_exact_match_prefers_oldest_duplicate(self):
+        assert self.resolver.resolve('ACME RENTALS') == 1
+
+    def test_fuzzy_match_one_edit(self):
+        assert self.resolver.resolve("Bob's Grip") == 2
+        assert self.resolver.resolve('Kodac') == 4
+
+    def test_no_match(self):
+        assert self.resolver.resolve('Panavision') is None
+
+    def test_forget_falls_back_to_duplicate(self):
+        self.resolver.forget(1)
+        assert self.resolver.resolve('acme rentals') == 3
+        self.resolver.forget(3)
+        assert self.resolver.resolve('acme rentals') is None
+
+    def test_contact_deleted_elsewhere_is_dropped_on_hit(self):
+        # Deleted by another process: no audit event reached this one
+        del self.contacts[1]
+        assert self.resolver.resolve('acme rentals') == 3
+        assert 1 not in self.resolver._name_by_id
+
+    def test_resolve_many_confirms_hits_in_one_query(self):
+        del self.contacts[1]
+        result = self.resolver.resolve_many(['ACME RENTALS', 'Kodac', 'Panavision', ''])
+
+        assert result == {'ACME RENTALS': 3, 'Kodac': 4, 'Panavision': None, '': None}
+        # One query for every hit, one more to re-check the name whose hit was stale
+        assert self.lookups == [{1, 4}, {3}]
+
+    def test_create_many_is_conflict_safe(self):
+        session = MagicMock()
+        session.execute.side_effect = [[(5, 'New Vendor')], []]
+        session.query.return_value.filter.return_value = [(1, 'Acme Rentals')]
+
+        result = self.resolver.create_many([{'name': ' New   Vendor', 'xero_id': 'x-1'},
+                                            {'name': 'ACME rentals'}, {'name': 'new vendor'}], session)
+
+        assert result == {'new vendor': (5, True), 'acme rentals': (1, False)}
+        assert session.execute.call_count == 2
+        sql = str(session.execute.call_args_list[0][0][0].compile(dialect=postgresql.dialect()))
+        assert 'ON CONFLICT' in sql and 'DO NOTHING' in sql and 'RETURNING' in sql
+        self.contacts[5] = 'New Vendor'
+        assert self.resolver.resolve('new vendor') == 5
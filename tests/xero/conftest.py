@@ -0,0 +1,27 @@
+# conftest.py
+import pytest
+from files_xero.xero_api import xero_api
+from files_xero.xero_rate_governor import FakeClock, MemoryStateStore
+from tests.xero.fake_xero_server import FakeXeroServer
+
+
+@pytest.fixture
+def xero_emulator(monkeypatch):
+    """
+    A FakeXeroServer on a fake clock (`server.clock`) wired into `xero_api`, with the rate
+    governor on an in-memory store and its own fake clock, allowing 1000 calls a minute
+    and the server's concurrent limit. Yields the server.
+    """
+    server = FakeXeroServer(minute_limit=1000, clock=FakeClock()).__enter__()
+    credentials = server.credentials()
+    monkeypatch.setattr(xero_api, 'credentials', credentials)
+    monkeypatch.setattr(xero_api, 'xero', server.client(credentials))
+    xero_api._install_rate_observer()
+    governor = xero_api.rate_governor
+    monkeypatch.setattr(governor, 'store', MemoryStateStore())
+    monkeypatch.setattr(governor, 'clock', FakeClock())
+    monkeypatch.setattr(governor, 'minute_limit', 1000)
+    monkeypatch.setattr(governor, 'concurrent_limit', server.concurrent_limit)
+    monkeypatch.setattr(governor, 'max_inline_wait', 5.0)
+    yield server
+    server.__exit__(None, None, None)
@@ -0,0 +1,502 @@
+# fake_xero_server.py
+"""
+Local stand-in for the Xero Accounting API (Invoices, BankTransactions, Contacts).
+
+Speaks the same wire format pyxero uses against api.xero.com, so `XeroAPI` can be
+pointed at it by swapping its credentials (see `credentials()` / `client()`):
+
+- GET list with `where` filters (==, !=, Contains/StartsWith/EndsWith, Guid(...),
+  AND/OR, parentheses), `page` (100 per page) and `If-Modified-Since`
+- GET by ID, PUT (create) and POST (create or update by ID) with XML bodies
+- `summarizeErrors=false`: per-element StatusAttributeString / ValidationErrors;
+  otherwise one invalid element fails the whole request with a 400
+- per-minute, daily and concurrent limits: 429 with Retry-After and
+  X-Rate-Limit-Problem, and X-MinLimit-Remaining / X-DayLimit-Remaining on every
+  response
+- gzip-compressed responses when the client sends `Accept-Encoding: gzip`
+- fixed `latency` per request, and `fail_next` to inject status codes (500, 401, ...)
+
+Rate windows and UpdatedDateUTC use `clock` (pass a FakeClock for deterministic
+runs). Every request is recorded in `server.requests`.
+
+Run standalone for manual load tests:
+    python -m tests.xero.fake_xero_server --port 8765 --minute-limit 60 --latency 0.05
+"""
+import argparse
+import gzip
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+from xml.etree.ElementTree import fromstring
+
+from xero.utils import isplural
+
+API_PREFIX = '/api.xro/2.0/'
+PAGE_SIZE = 100
+ID_FIELDS = {'Invoices': 'InvoiceID', 'BankTransactions': 'BankTransactionID', 'Contacts': 'ContactID'}
+DEFAULT_STATUS = {'Invoices': 'DRAFT', 'BankTransactions': 'AUTHORISED', 'Contacts': 'ACTIVE'}
+
+
+# region Where filters
+TOKEN_PATTERN = re.compile(
+    r'\s*(?:(?P<op>\|\||&&|==|!=|\(|\))|(?P<str>"(?:[^"\\]|\\.)*")|(?P<num>-?\d+(?:\.\d+)?)|(?P<ident>[A-Za-z_][\w.]*))'
+)
+STRING_METHODS = {
+    'contains': lambda field, value: value in field,
+    'startswith': lambda field, value: field.startswith(value),
+    'endswith': lambda field, value: field.endswith(value),
+}
+
+
+def _tokenize(expression: str) -> list:
+    tokens, position = [], 0
+    expression = expression.strip()
+    while position < len(expression):
+        match = TOKEN_PATTERN.match(expression, position)
+        if not match or match.end() == position:
+            raise ValueError(f'Cannot parse where clause at: {expression[position:]}')
+        kind = match.lastgroup
+        value = match.group(kind)
+        if kind == 'str':
+            value = value[1:-1].replace('\\"', '"')
+        elif kind == 'ident' and value.upper() in ('AND', 'OR'):
+            kind, value = 'op', '&&' if value.upper() == 'AND' else '||'
+        tokens.append((kind, value))
+        position = match.end()
+    return tokens
+
+
+def _field(record: dict, path: str):
+    value = record
+    for part in path.split('.'):
+        value = value.get(part) if isinstance(value, dict) else None
+    return value
+
+
+def _normalise(value):
+    if isinstance(value, str):
+        return value.replace('-', '').casefold() if _looks_like_guid(value) else value.casefold()
+    return value
+
+
+def _looks_like_guid(value: str) -> bool:
+    return bool(re.fullmatch(r'[0-9a-fA-F]{8}-?[0-9a-fA-F]{4}-?[0-9a-fA-F]{4}-?[0-9a-fA-F]{4}-?[0-9a-fA-F]{12}', value))
+
+
+class _WhereParser:
+    """
+    Recursive descent over Xero `where` clauses; `parse()` returns a record predicate.
+    """
+
+    def __init__(self, expression: str):
+        self.tokens = _tokenize(expression)
+        self.position = 0
+
+    def parse(self):
+        predicate = self._or()
+        if self.position != len(self.tokens):
+            raise ValueError(f'Unexpected token {self.tokens[self.position]}')
+        return predicate
+
+    def _peek(self):
+        return self.tokens[self.position] if self.position < len(self.tokens) else (None, None)
+
+    def _take(self, expected=None):
+        token = self._peek()
+        if expected is not None and token[1] != expected:
+            raise ValueError(f'Expected {expected}, got {token}')
+        self.position += 1
+        return token
+
+    def _or(self):
+        parts = [self._and()]
+        while self._peek() == ('op', '||'):
+            self._take()
+            parts.append(self._and())
+        return lambda record: any(p(record) for p in parts)
+
+    def _and(self):
+        parts = [self._factor()]
+        while self._peek() == ('op', '&&'):
+            self._take()
+            parts.append(self._factor())
+        return lambda record: all(p(record) for p in parts)
+
+    def _factor(self):
+        if self._peek() == ('op', '('):
+            self._take('(')
+            predicate = self._or()
+            self._take(')')
+            return predicate
+        kind, path = self._take()
+        if kind != 'ident':
+            raise ValueError(f'Expected a field, got {path}')
+        head, _, method = path.rpartition('.')
+        if head and method.casefold() in STRING_METHODS and self._peek() == ('op', '('):
+            self._take('(')
+            value = self._value()
+            self._take(')')
+            test = STRING_METHODS[method.casefold()]
+            return lambda record: isinstance(_field(record, head), str) and test(_field(record, head), value)
+        op = self._take()[1]
+        value = self._value()
+        if op not in ('==', '!='):
+            raise ValueError(f'Unsupported operator {op}')
+        expected = _normalise(value)
+
+        def compare(record):
+            equal = _normalise(_field(record, path)) == expected
+            return equal if op == '==' else not equal
+        return compare
+
+    def _value(self):
+        kind, value = self._take()
+        if kind == 'str':
+            return value
+        if kind == 'num':
+            return float(value)
+        if kind == 'ident' and value.casefold() == 'null':
+            return None
+        if kind == 'ident' and value.casefold() in ('true', 'false'):
+            return value.casefold() == 'true'
+        if kind == 'ident' and value.casefold() == 'guid':
+            self._take('(')
+            guid = self._take()[1]
+            self._take(')')
+            return guid
+        raise ValueError(f'Unsupported value {value}')
+
+
+def parse_where(expression: str):
+    return _WhereParser(expression).parse()
+# endregion
+
+
+# region Wire format helpers
+def _xml_to_dict(element) -> dict:
+    record = {}
+    for child in element:
+        if len(child):
+            if isplural(child.tag):
+                record[child.tag] = [_xml_to_dict(item) for item in child]
+            else:
+                record[child.tag] = _xml_to_dict(child)
+        else:
+            record[child.tag] = child.text
+    return record
+
+
+def _xero_date(timestamp: float) -> str:
+    return f'/Date({int(timestamp * 1000)}+0000)/'
+
+
+def _number(value, default=0.0) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return default
+# endregion
+
+
+# region Handler
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        self._dispatch('GET')
+
+    def do_PUT(self):
+        self._dispatch('PUT')
+
+    def do_POST(self):
+        self._dispatch('POST')
+
+    def _dispatch(self, method):
+        emulator = self.server.emulator
+        url = urlparse(self.path)
+        params = {k: v[0] for k, v in parse_qs(url.query).items()}
+        body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        emulator.requests.append({'method': method, 'path': url.path, 'params': params,
+                                  'if_modified_since': self.headers.get('If-Modified-Since'),
+                                  'accept_encoding': self.headers.get('Accept-Encoding')})
+
+        status, payload, headers = emulator.admit()
+        try:
+            if status is None:
+                if emulator.latency:
+                    time.sleep(emulator.latency)
+                status, payload = emulator.handle(method, url.path, params, body, self.headers)
+        finally:
+            emulator.release()
+
+        data = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        if 'gzip' in (self.headers.get('Accept-Encoding') or ''):
+            data = gzip.compress(data)
+            self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in dict(headers, **emulator.remaining_headers()).items():
+            self.send_header(name, str(value))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+# endregion
+
+
+# region Server
+class _SystemClock:
+    def time(self) -> float:
+        return time.time()
+
+
+class FakeXeroServer:
+    def __init__(self, minute_limit: int = 60, daily_limit: int = 5000, concurrent_limit: int = 5,
+                 latency: float = 0.0, clock=None, port: int = 0):
+        self.minute_limit = minute_limit
+        self.daily_limit = daily_limit
+        self.concurrent_limit = concurrent_limit
+        self.latency = latency
+        self.clock = clock or _SystemClock()
+        self.requests = []
+        self.fail_next = []
+        self.store = {endpoint: {} for endpoint in ID_FIELDS}
+        self._lock = threading.Lock()
+        self._minute_calls = deque()
+        self._day = None
+        self._day_calls = 0
+        self._in_flight = 0
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', port), _Handler)
+        self.httpd.emulator = self
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    # region Wiring
+    @property
+    def base_url(self) -> str:
+        """Replaces https://api.xero.com as `credentials.base_url`."""
+        return f'http://127.0.0.1:{self.httpd.server_address[1]}'
+
+    def credentials(self, tenant_id: str = 'fake-tenant'):
+        from xero.auth import OAuth2Credentials
+        # The emulator is plain http; requests-oauthlib refuses bearer tokens over http otherwise
+        os.environ.setdefault('OAUTHLIB_INSECURE_TRANSPORT', '1')
+        token = {'access_token': 'fake-access-token', 'refresh_token': 'fake-refresh-token',
+                 'token_type': 'Bearer', 'expires_in': 86400, 'expires_at': time.time() + 86400}
+        credentials = OAuth2Credentials(client_id='fake', client_secret='fake', token=token, tenant_id=tenant_id)
+        credentials.base_url = self.base_url
+        return credentials
+
+    def client(self, credentials=None):
+        from xero import Xero
+        return Xero(credentials or self.credentials())
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+    # endregion
+
+    # region Data
+    def seed(self, endpoint: str, records: list) -> list:
+        """Store records as if created through the API (IDs, Status, totals and UpdatedDateUTC filled in)."""
+        with self._lock:
+            return [self._store(endpoint, dict(record)) for record in records]
+
+    def records(self, endpoint: str) -> list:
+        with self._lock:
+            return list(self.store[endpoint].values())
+
+    def _store(self, endpoint: str, record: dict) -> dict:
+        id_field = ID_FIELDS[endpoint]
+        record.setdefault(id_field, str(uuid.uuid4()))
+        record.setdefault('Status', DEFAULT_STATUS[endpoint])
+        if endpoint != 'Contacts':
+            for index, line in enumerate(record.get('LineItems') or []):
+                line.setdefault('LineItemID', str(uuid.uuid4()))
+                line['LineAmount'] = _number(line.get('Quantity'), 1.0) * _number(line.get('UnitAmount'))
+            record['Total'] = record['SubTotal'] = sum(line['LineAmount'] for line in record.get('LineItems') or [])
+        record['UpdatedDateUTC'] = self.clock.time()
+        self.store[endpoint][record[id_field]] = record
+        return record
+    # endregion
+
+    # region Rate limits
+    def admit(self):
+        """
+        Count the call against the limits. Returns (None, None, {}) to proceed, or a 429.
+        """
+        with self._lock:
+            failure = self.fail_next.pop(0) if self.fail_next else None
+            if failure:
+                return failure, {'Type': 'InjectedFailure', 'Message': f'Injected HTTP {failure}'}, {}
+            now = self.clock.time()
+            while self._minute_calls and self._minute_calls[0] <= now - 60:
+                self._minute_calls.popleft()
+            today = datetime.fromtimestamp(now, tz=timezone.utc).date()
+            if today != self._day:
+                self._day, self._day_calls = today, 0
+
+            problem, retry_after = None, None
+            if self._in_flight >= self.concurrent_limit:
+                problem, retry_after = 'concurrent', 1
+            elif len(self._minute_calls) >= self.minute_limit:
+                problem, retry_after = 'minute', max(1, int(self._minute_calls[0] + 60 - now + 0.999))
+            elif self._day_calls >= self.daily_limit:
+                midnight = datetime.combine(today + timedelta(days=1), datetime.min.time(), tzinfo=timezone.utc)
+                problem, retry_after = 'day', max(1, int(midnight.timestamp() - now))
+            if problem:
+                self._in_flight += 1  # balanced by release()
+                return 429, {'Type': 'RateLimitExceeded', 'Message': f'Rate limit exceeded: {problem}'}, {
+                    'Retry-After': retry_after, 'X-Rate-Limit-Problem': problem}
+
+            self._minute_calls.append(now)
+            self._day_calls += 1
+            self._in_flight += 1
+            return None, None, {}
+
+    def release(self):
+        with self._lock:
+            self._in_flight -= 1
+
+    def remaining_headers(self) -> dict:
+        with self._lock:
+            return {'X-MinLimit-Remaining': max(0, self.minute_limit - len(self._minute_calls)),
+                    'X-DayLimit-Remaining': max(0, self.daily_limit - self._day_calls)}
+    # endregion
+
+    # region Endpoints
+    def handle(self, method: str, path: str, params: dict, body: bytes, headers) -> tuple:
+        if not headers.get('Authorization') or not headers.get('Xero-tenant-id'):
+            return 401, {'Type': 'Unauthorized', 'Message': 'Missing token or tenant'}
+        if not path.startswith(API_PREFIX):
+            return 404, {'Type': 'NotFound', 'Message': path}
+        parts = path[len(API_PREFIX):].strip('/').split('/')
+        endpoint = parts[0]
+        if endpoint not in ID_FIELDS:
+            return 404, {'Type': 'NotFound', 'Message': f'Unknown endpoint {endpoint}'}
+
+        if method == 'GET':
+            return self._get(endpoint, parts[1] if len(parts) > 1 else None, params, headers)
+        try:
+            root = fromstring(body)
+        except Exception as e:
+            return 400, {'Type': 'PostDataInvalidException', 'Message': f'Invalid XML: {e}', 'Elements': []}
+        items = [_xml_to_dict(child) for child in root] if isplural(root.tag) else [_xml_to_dict(root)]
+        return self._write(endpoint, items, method, params.get('summarizeErrors', 'true') != 'false')
+
+    def _get(self, endpoint: str, record_id, params: dict, headers) -> tuple:
+        with self._lock:
+            records = list(self.store[endpoint].values())
+        if record_id:
+            records = [r for r in records if _normalise(r[ID_FIELDS[endpoint]]) == _normalise(record_id)]
+            if not records:
+                return 404, {'Type': 'NotFound', 'Message': f'{endpoint} {record_id} not found'}
+        if headers.get('If-Modified-Since'):
+            since = parsedate_to_datetime(headers['If-Modified-Since']).replace(tzinfo=timezone.utc).timestamp()
+            records = [r for r in records if r['UpdatedDateUTC'] > since]
+        if params.get('where'):
+            try:
+                predicate = parse_where(params['where'])
+            except ValueError as e:
+                return 400, {'Type': 'QueryParseException', 'Message': str(e), 'Elements': []}
+            records = [r for r in records if predicate(r)]
+        if params.get('page'):
+            page = max(1, int(params['page']))
+            records = records[(page - 1) * PAGE_SIZE:page * PAGE_SIZE]
+        return 200, self._envelope(endpoint, [self._render(r) for r in records])
+
+    def _write(self, endpoint: str, items: list, method: str, summarize_errors: bool) -> tuple:
+        with self._lock:
+            checked = [(item, self._validate(endpoint, item, method)) for item in items]
+            if summarize_errors and any(errors for _, errors in checked):
+                return 400, {'ErrorNumber': 10, 'Type': 'ValidationException',
+                             'Message': 'A validation exception occurred',
+                             'Elements': [dict(item, ValidationErrors=[{'Message': m} for m in errors])
+                                          for item, errors in checked]}
+            results = []
+            for item, errors in checked:
+                if errors:
+                    results.append(dict(item, StatusAttributeString='ERROR', HasErrors=True,
+                                        ValidationErrors=[{'Message': m} for m in errors]))
+                    continue
+                existing = self.store[endpoint].get(item.get(ID_FIELDS[endpoint])) if method == 'POST' else None
+                record = self._store(endpoint, dict(existing or {}, **self._resolve_contact(endpoint, item)))
+                results.append(dict(self._render(record), StatusAttributeString='OK'))
+        return 200, self._envelope(endpoint, results)
+
+    def _validate(self, endpoint: str, item: dict, method: str) -> list:
+        errors = []
+        if endpoint == 'Contacts':
+            name = (item.get('Name') or '').strip()
+            updating = method == 'POST' and item.get('ContactID') in self.store['Contacts']
+            if not name and not updating:
+                errors.append('The contact name must be specified.')
+            elif name and any((c.get('Name') or '').casefold() == name.casefold()
+                              and c['ContactID'] != item.get('ContactID')
+                              for c in self.store['Contacts'].values()):
+                errors.append(f'The contact name {name} is already assigned to another contact. '
+                              f'The contact name must be unique across all active contacts.')
+            return errors
+        contact = item.get('Contact') or {}
+        if not contact.get('ContactID') and not contact.get('Name'):
+            errors.append('A Contact must be specified for this type of transaction')
+        elif contact.get('ContactID') and contact['ContactID'] not in self.store['Contacts']:
+            errors.append(f"Contact {contact['ContactID']} could not be found")
+        if not item.get('Type'):
+            errors.append(f'{endpoint[:-1]} Type must be specified')
+        if endpoint == 'BankTransactions' and not item.get('LineItems'):
+            errors.append('At least one line item must be specified')
+        return errors
+
+    def _resolve_contact(self, endpoint: str, item: dict) -> dict:
+        """Like Xero, a Contact given only by Name is matched by name or created."""
+        contact = item.get('Contact')
+        if endpoint == 'Contacts' or not contact or contact.get('ContactID'):
+            if contact and contact.get('ContactID'):
+                item['Contact'] = dict(self.store['Contacts'][contact['ContactID']])
+            return item
+        name = contact['Name'].strip()
+        match = next((c for c in self.store['Contacts'].values()
+                      if (c.get('Name') or '').casefold() == name.casefold()), None)
+        item['Contact'] = dict(match or self._store('Contacts', {'Name': name}))
+        return item
+
+    def _render(self, record: dict) -> dict:
+        rendered = dict(record, UpdatedDateUTC=_xero_date(record['UpdatedDateUTC']))
+        if isinstance(rendered.get('Contact'), dict) and 'UpdatedDateUTC' in rendered['Contact']:
+            rendered['Contact'] = dict(rendered['Contact'],
+                                       UpdatedDateUTC=_xero_date(rendered['Contact']['UpdatedDateUTC']))
+        return rendered
+
+    def _envelope(self, endpoint: str, records: list) -> dict:
+        return {'Id': str(uuid.uuid4()), 'Status': 'OK', 'ProviderName': 'fake-xero',
+                'DateTimeUTC': _xero_date(self.clock.time()), endpoint: records}
+    # endregion
+# endregion
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Serve a local Xero API stand-in.')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--minute-limit', type=int, default=60)
+    parser.add_argument('--daily-limit', type=int, default=5000)
+    parser.add_argument('--concurrent-limit', type=int, default=5)
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds added to every request')
+    args = parser.parse_args()
+    server = FakeXeroServer(minute_limit=args.minute_limit, daily_limit=args.daily_limit,
+                            concurrent_limit=args.concurrent_limit, latency=args.latency, port=args.port)
+    print(f'Fake Xero API on {server.base_url}{API_PREFIX}')
+    server.httpd.serve_forever()
@@ -6,6 +6,7 @@ import pytest
 from unittest.mock import MagicMock, patch
 from xero.exceptions import XeroException, XeroUnauthorized, XeroRateLimitExceeded
 from xero_api import XeroAPI
+from files_xero.xero_rate_governor import xero_rate_governor, MemoryStateStore, FakeClock, XeroThrottled
 from dotenv import load_dotenv
 
 # --- Fake helper classes for testing utility methods ---
@@ -740,53 +741,45 @@ class TestXeroAPI:
 
 # --- Additional tests for private methods (outside of TestXeroAPI) ---
 
+class FakeCredentials:
+    def __init__(self, refresh_error=None):
+        self.tenant_id = None
+        self.token = {'access_token': 'old_access', 'refresh_token': 'old_refresh', 'expires_at': time.time() - 1}
+        self.base_url = "https://api.xero.com"  # Added base_url for testing.
+        self._oauth = None
+        self.refresh_error = refresh_error
+    def expired(self, seconds=30):
+        return self.token['expires_at'] - time.time() < seconds
+    def _init_oauth(self, token):
+        self.token = token
+    def refresh(self):
+        if self.refresh_error:
+            raise self.refresh_error
+        self._init_oauth({'access_token': 'new_access', 'refresh_token': 'new_refresh',
+                          'expires_at': time.time() + 1800})
+        return self.token
+    def get_tenants(self):
+        return [{'tenantId': 'tenant123'}]
+
 def test_refresh_token_if_needed_success(monkeypatch):
     # Create a new instance so that our autouse patches do not interfere.
     api = XeroAPI()
-    # Create a fake credentials object.
-    class FakeCredentials:
-        def __init__(self):
-            self._expired = True
-            self.tenant_id = None
-            self.token = {}
-            self.base_url = "https://api.xero.com"  # Added base_url for testing.
-        def expired(self):
-            return self._expired
-        def refresh(self):
-            self._expired = False
-            self.token = {'access_token': 'new_access', 'refresh_token': 'new_refresh'}
-        def get_tenants(self):
-            return [{'tenantId': 'tenant123'}]
     fake_creds = FakeCredentials()
-    api.credentials = fake_creds
-    # Monkey-patch the Xero client creation.
-    class FakeXeroClient:
-        def __init__(self, credentials):
-            self.credentials = credentials
-    monkeypatch.setattr(api, 'xero', FakeXeroClient(fake_creds))
+    monkeypatch.setattr(api, 'credentials', fake_creds)
+    monkeypatch.setattr(api.token_broker, 'store', MemoryStateStore())
+    original_xero = api.xero
     # Call _refresh_token_if_needed with force True.
     api._refresh_token_if_needed(force=True)
     assert fake_creds.expired() is False
     assert fake_creds.tenant_id == 'tenant123'
-    assert os.environ.get('XERO_ACCESS_TOKEN') == 'new_access'
-    assert os.environ.get('XERO_REFRESH_TOKEN') == 'new_refresh'
+    assert fake_creds.token['access_token'] == 'new_access'
+    # The token is swapped in place; the client is not rebuilt
+    assert api.xero is original_xero
 
 def test_refresh_token_if_needed_failure(monkeypatch):
     api = XeroAPI()
-    class FakeCredentials:
-        def __init__(self):
-            self._expired = True
-            self.tenant_id = None
-            self.token = {}
-            self.base_url = "https://api.xero.com"
-        def expired(self):
-            return self._expired
-        def refresh(self):
-            raise XeroException("Refresh failed")
-        def get_tenants(self):
-            return []
-    fake_creds = FakeCredentials()
-    api.credentials = fake_creds
+    monkeypatch.setattr(api, 'credentials', FakeCredentials(refresh_error=XeroException("Refresh failed")))
+    monkeypatch.setattr(api.token_broker, 'store', MemoryStateStore())
     with pytest.raises(XeroException):
         api._refresh_token_if_needed(force=True)
 
@@ -804,29 +797,47 @@ def test_retry_on_unauthorized_success_after_retry(monkeypatch):
     assert result == "success"
     assert call_count["count"] == 2
 
-def test_retry_on_rate_limit(monkeypatch):
+def _rate_limited(retry_after):
+    response = FakeResponse()
+    response.headers["Retry-After"] = str(retry_after)
+    return XeroRateLimitExceeded(
+        response,
+        payload={
+            "oauth_problem": ["rate_limit_exceeded"],
+            "oauth_problem_advice": ["Please wait and try again"]
+        }
+    )
+
+@pytest.fixture
+def fake_governor(monkeypatch):
+    monkeypatch.setattr(xero_rate_governor, "store", MemoryStateStore())
+    monkeypatch.setattr(xero_rate_governor, "clock", FakeClock())
+    return xero_rate_governor
+
+def test_retry_on_rate_limit(fake_governor):
     call_count = {"count": 0}
     def fake_func():
         call_count["count"] += 1
         if call_count["count"] < 2:
-            raise XeroRateLimitExceeded(
-                FakeResponse(),
-                payload={
-                    "oauth_problem": ["rate_limit_exceeded"],
-                    "oauth_problem_advice": ["Please wait and try again"]
-                }
-            )
+            raise _rate_limited(retry_after=2)
         return "success"
-    sleep_called = {"called": False}
-    def fake_sleep(seconds):
-        sleep_called["called"] = True
-    monkeypatch.setattr(time, "sleep", fake_sleep)
     api = XeroAPI()
     api._refresh_token_if_needed = lambda force=False: None
     result = api._retry_on_unauthorized(fake_func)
     assert result == "success"
     assert call_count["count"] == 2
-    assert sleep_called["called"] is True
+    # The short Retry-After is waited out on the governor's clock, not in time.sleep
+    assert fake_governor.clock.sleeps == [2.0]
+
+def test_long_rate_limit_raises_throttled(fake_governor):
+    def fake_func():
+        raise _rate_limited(retry_after=60)
+    api = XeroAPI()
+    api._refresh_token_if_needed = lambda force=False: None
+    with pytest.raises(XeroThrottled) as excinfo:
+        api._retry_on_unauthorized(fake_func)
+    assert excinfo.value.retry_after == 60
+    assert fake_governor.clock.sleeps == []
 
 def test_retry_on_max_retries(monkeypatch):
     def fake_func():
@@ -0,0 +1,68 @@
+# test_xero_async_client.py
+import asyncio
+import pytest
+
+pytest.importorskip('aiohttp')
+
+from datetime import datetime
+from files_xero.xero_api import xero_api
+from files_xero.xero_async_client import run
+from files_xero.xero_rate_governor import XeroThrottled
+
+
+class TestXeroAsyncClient:
+    @pytest.fixture(autouse=True)
+    def setup_emulator(self, xero_emulator):
+        self.server = xero_emulator
+        self.clock = xero_emulator.clock
+
+    def test_reads_match_pyxero_dict_shapes(self):
+        self.server.seed('Contacts', [{'Name': f'Vendor {i}'} for i in range(250)])
+        invoice = self.server.seed('Invoices', [{'Type': 'ACCPAY', 'InvoiceNumber': '2416_1_1',
+                                                 'Contact': {'Name': 'Vendor 1'}}])[0]
+
+        async def work(client):
+            return await asyncio.gather(client.contacts.filter_all(order='UpdatedDateUTC ASC'),
+                                        client.invoices.get_many([invoice['InvoiceID']]))
+
+        contacts, invoices = run(work)
+
+        assert len(contacts) == 250 and len({c['ContactID'] for c in contacts}) == 250
+        assert invoices == xero_api.xero.invoices.get(invoice['InvoiceID'])
+        assert isinstance(invoices[0]['UpdatedDateUTC'], datetime)
+        assert all('gzip' in r['accept_encoding'] for r in self.server.requests)
+
+    def test_get_many_skips_unknown_ids(self):
+        invoices = self.server.seed('Invoices', [{'Type': 'ACCPAY', 'InvoiceNumber': f'2416_1_{i}',
+                                                  'Contact': {'Name': 'Vendor 1'}} for i in range(2)])
+        unknown = '00000000-0000-0000-0000-000000000000'
+
+        found = run(lambda client: client.invoices.get_many([invoices[1]['InvoiceID'], unknown,
+                                                             invoices[0]['InvoiceID']]))
+
+        assert [i['InvoiceNumber'] for i in found] == ['2416_1_1', '2416_1_0']
+
+    def test_writes_report_per_element_errors(self):
+        payloads = [{'Type': 'SPEND', 'Reference': f'2416_1_{i}', 'Contact': {'Name': 'Vendor'},
+                     'BankAccount': {'Code': '1000'},
+                     'LineItems': [{'Description': 'Camera', 'Quantity': 1, 'UnitAmount': 10}]}
+                    for i in range(3)]
+        del payloads[1]['Contact']
+
+        created = run(lambda client: client.banktransactions.put(payloads, summarize_errors=False))
+
+        assert [e.get('StatusAttributeString') for e in created] == ['OK', 'ERROR', 'OK']
+        assert self.server.requests[-1]['params']['summarizeErrors'] == 'false'
+
+    def test_retry_after_raises_throttled(self):
+        self.server.minute_limit = 2
+
+        async def work(client):
+            await asyncio.gather(*(client.contacts.all() for _ in range(2)))
+            await client.contacts.all()
+
+        with pytest.raises(XeroThrottled) as excinfo:
+            run(work)
+
+        assert excinfo.value.retry_after == 60
+        assert len(self.server.requests) == 3
@@ -0,0 +1,66 @@
+# test_xero_bill_loader.py
+import datetime
+import pytest
+from decimal import Decimal
+from files_xero.xero_services import XeroServices
+
+
+def _xero_bill(reference, invoice_id, lines):
+    return {
+        "InvoiceNumber": reference,
+        "InvoiceID": invoice_id,
+        "Date": datetime.datetime(2024, 3, 1),
+        "Contact": {"ContactID": "c-1"},
+        "LineItems": [
+            {"LineItemID": line_id, "Description": "Camera", "Quantity": 1, "UnitAmount": amount, "AccountCode": "5300"}
+            for line_id, amount in lines
+        ],
+    }
+
+
+class TestXeroBillLoader:
+    @pytest.fixture(autouse=True)
+    def setup_services(self):
+        self.services = XeroServices()
+
+    def test_stage_skips_other_projects_and_bad_references(self):
+        bills, lines = self.services._stage_xero_bills([
+            _xero_bill("2416_04_01", "inv-1", [("li-1", 100)]),
+            _xero_bill("12416_04_01", "inv-2", [("li-2", 50)]),
+            _xero_bill("2416_xx", "inv-3", []),
+        ], 2416)
+
+        assert list(bills) == [(2416, 4, 1)]
+        assert [line["xero_bill_line_id"] for line in lines] == ["li-1"]
+        assert lines[0]["unit_amount"] == Decimal("100.00")
+
+    def test_plan_inserts_updates_and_deletes(self):
+        bills, lines = self.services._stage_xero_bills([
+            _xero_bill("2416_04_01", "inv-1", [("li-1", 100), ("li-new", 7)]),
+            _xero_bill("2416_04_02", "inv-2", [("li-3", 20)]),
+        ], 2416)
+        existing_bills = [{
+            "id": 10, "project_number": 2416, "po_number": 4, "detail_number": 1, "xero_id": "inv-1",
+            "xero_link": "https://go.xero.com/AccountsPayable/View.aspx?invoiceId=inv-1",
+            "transaction_date": datetime.date(2024, 3, 1), "due_date": None, "contact_xero_id": "c-1",
+            "state": "DRAFT",
+        }]
+        existing_lines = [
+            {"id": 100, "project_number": 2416, "po_number": 4, "detail_number": 1, "line_number": 1,
+             "description": "Camera", "quantity": Decimal("1"), "unit_amount": Decimal("100"), "tax_code": 5300,
+             "xero_bill_line_id": "li-1", "parent_xero_id": "inv-1"},
+            {"id": 101, "project_number": 2416, "po_number": 4, "detail_number": 1, "line_number": 2,
+             "description": "Removed in Xero", "quantity": 1, "unit_amount": 5, "tax_code": 5300,
+             "xero_bill_line_id": "li-gone", "parent_xero_id": "inv-1"},
+        ]
+        detail_items = [{"id": 7, "project_number": 2416, "po_number": 4, "detail_number": 1, "line_number": 1,
+                         "sub_total": Decimal("100.00"), "xero_id": None}]
+
+        plan = XeroServices._plan_xero_bill_sync(bills, lines, existing_bills, existing_lines, detail_items)
+
+        # The existing bill and its matched line are unchanged, so nothing is rewritten
+        assert plan["bill_updates"] == [] and plan["line_updates"] == []
+        assert [row["detail_number"] for row in plan["bill_inserts"]] == [2]
+        assert sorted(line["xero_bill_line_id"] for line in plan["line_inserts"]) == ["li-3", "li-new"]
+        assert plan["line_deletes"] == [101]
+        assert plan["detail_item_updates"] == [{"id": 7, "xero_id": "li-1"}]
@@ -0,0 +1,47 @@
+# test_xero_bill_push.py
+import datetime
+import pytest
+from decimal import Decimal
+from unittest.mock import MagicMock
+from files_xero.xero_services import XeroServices
+
+
+class TestXeroBillPush:
+    @pytest.fixture(autouse=True)
+    def setup_services(self, monkeypatch):
+        self.services = XeroServices()
+        self.db_ops = MagicMock()
+        self.xero_api = MagicMock()
+        monkeypatch.setattr(self.services, 'db_ops', self.db_ops)
+        monkeypatch.setattr(self.services, 'xero_api', self.xero_api)
+
+    def test_contacts_resolved_once_per_batch(self):
+        bills = [{"id": i, "project_number": 2416, "po_number": po, "detail_number": i,
+                  "transaction_date": datetime.date(2024, 3, 1), "due_date": None}
+                 for i, po in enumerate([1, 1, 2, 3], start=1)]
+        lines = [{"project_number": 2416, "po_number": b["po_number"], "detail_number": b["detail_number"],
+                  "description": "Camera", "quantity": Decimal("1"), "unit_amount": Decimal("10"), "tax_code": 5300}
+                 for b in bills]
+        self.db_ops.get_purchase_orders_by_keys.return_value = [
+            {"project_number": 2416, "po_number": 1, "contact_id": 11},
+            {"project_number": 2416, "po_number": 2, "contact_id": 12},
+        ]
+        self.db_ops.search_contacts.return_value = [
+            {"id": 11, "name": "Linked Vendor", "xero_id": "x-11"},
+            {"id": 12, "name": "New Vendor", "xero_id": None},
+        ]
+        self.xero_api.ensure_contacts_bulk.return_value = {"new vendor": "x-12"}
+        self.xero_api.create_invoice_bulk.return_value = {"created": {}, "failed": {}, "unsent": [], "retry_after": None}
+
+        self.services.handle_xero_bill_create_bulk(bills, lines, session=MagicMock())
+
+        self.db_ops.get_purchase_orders_by_keys.assert_called_once()
+        self.db_ops.search_contacts.assert_called_once()
+        self.xero_api.ensure_contacts_bulk.assert_called_once()
+        self.db_ops.bulk_update_mappings.assert_called_once()
+        assert self.db_ops.bulk_update_mappings.call_args.args[1] == [{"id": 12, "xero_id": "x-12"}]
+
+        payloads = self.xero_api.create_invoice_bulk.call_args.args[0]
+        # PO 3 has no purchase order record, so its bill is skipped
+        assert [(p["InvoiceNumber"], p["Contact"]["ContactID"], len(p["LineItems"])) for p in payloads] == [
+            ("2416_1_1", "x-11", 1), ("2416_1_2", "x-11", 1), ("2416_2_3", "x-12", 1)]
@@ -0,0 +1,120 @@
+# test_xero_bulk_writer.py
+import requests
+from unittest.mock import MagicMock
+from xero.exceptions import XeroException
+from files_xero.xero_bulk_writer import XeroBulkWriter
+from files_xero.xero_rate_governor import XeroThrottled
+
+
+class FakeXeroAPI:
+    """
+    Stands in for XeroAPI: `_retry_on_unauthorized` just calls through, and
+    `xero.invoices.put` answers per element like summarizeErrors=false.
+    """
+
+    def __init__(self, put):
+        self.xero = MagicMock()
+        self.xero.invoices.put.side_effect = put
+
+    def _retry_on_unauthorized(self, func, *args, **kwargs):
+        return func(*args, **kwargs)
+
+
+def _invoice(ref):
+    return {"InvoiceNumber": ref, "Type": "ACCPAY"}
+
+
+def _accept(chunk, summarize_errors=True):
+    assert summarize_errors is False
+    # Respond in reverse order: matching must not rely on position
+    return [{"InvoiceNumber": p["InvoiceNumber"], "InvoiceID": f"id-{p['InvoiceNumber']}",
+             "StatusAttributeString": "OK"} for p in reversed(chunk)]
+
+
+class TestXeroBulkWriter:
+    def test_chunks_and_matches_by_reference(self):
+        api = FakeXeroAPI(_accept)
+        writer = XeroBulkWriter(api, chunk_size=2, max_workers=2, max_attempts=3)
+
+        result = writer.put("invoices", [_invoice(f"2416_1_{i}") for i in range(5)], reference_key="InvoiceNumber")
+
+        assert api.xero.invoices.put.call_count == 3
+        assert {ref: inv["InvoiceID"] for ref, inv in result["created"].items()} == {
+            f"2416_1_{i}": f"id-2416_1_{i}" for i in range(5)}
+        assert result["failed"] == {} and result["unsent"] == []
+
+    def test_validation_errors_are_per_element_and_final(self):
+        def put(chunk, summarize_errors=True):
+            return [dict(p, StatusAttributeString="ERROR", ValidationErrors=[{"Message": "Contact missing"}])
+                    if p["InvoiceNumber"] == "bad" else dict(p, InvoiceID="ok")
+                    for p in chunk]
+
+        api = FakeXeroAPI(put)
+        result = XeroBulkWriter(api, chunk_size=50).put(
+            "invoices", [_invoice("a"), _invoice("bad"), _invoice("b")], reference_key="InvoiceNumber")
+
+        assert sorted(result["created"]) == ["a", "b"]
+        assert result["failed"] == {"bad": ["Contact missing"]}
+        assert api.xero.invoices.put.call_count == 1
+
+    def test_failed_chunk_retries_only_its_elements(self):
+        calls = []
+
+        def put(chunk, summarize_errors=True):
+            calls.append([p["InvoiceNumber"] for p in chunk])
+            if len(calls) == 1:
+                raise XeroException(MagicMock(status_code=500, text="boom"))
+            return _accept(chunk, summarize_errors)
+
+        api = FakeXeroAPI(put)
+        api.xero.invoices.filter.return_value = []
+        result = XeroBulkWriter(api, chunk_size=2, max_workers=1).put(
+            "invoices", [_invoice("a"), _invoice("b"), _invoice("c")], reference_key="InvoiceNumber")
+
+        assert calls == [["a", "b"], ["c"], ["a"], ["b"]]
+        assert sorted(result["created"]) == ["a", "b", "c"]
+        api.xero.invoices.filter.assert_called_once_with(raw='InvoiceNumber=="a" OR InvoiceNumber=="b"')
+
+    def test_in_transit_failure_is_looked_up_before_resending(self):
+        calls = []
+
+        def put(chunk, summarize_errors=True):
+            calls.append([p["InvoiceNumber"] for p in chunk])
+            if len(calls) == 1:
+                raise requests.ConnectionError("connection reset")
+            return _accept(chunk, summarize_errors)
+
+        api = FakeXeroAPI(put)
+        # Xero committed "a" before the connection dropped
+        api.xero.invoices.filter.return_value = [{"InvoiceNumber": "a", "InvoiceID": "id-a", "Status": "DRAFT"}]
+        result = XeroBulkWriter(api, chunk_size=2, max_workers=1).put(
+            "invoices", [_invoice("a"), _invoice("b")], reference_key="InvoiceNumber")
+
+        assert calls == [["a", "b"], ["b"]]
+        assert {ref: inv["InvoiceID"] for ref, inv in result["created"].items()} == {"a": "id-a", "b": "id-b"}
+
+    def test_unverifiable_in_transit_failure_is_not_resent(self):
+        calls = []
+
+        def put(chunk, summarize_errors=True):
+            calls.append([p["InvoiceNumber"] for p in chunk])
+            raise XeroException(MagicMock(status_code=503, text="unavailable"))
+
+        api = FakeXeroAPI(put)
+        api.xero.invoices.filter.side_effect = XeroThrottled(30.0, "minute")
+        result = XeroBulkWriter(api, chunk_size=2, max_workers=1).put(
+            "invoices", [_invoice("a"), _invoice("b")], reference_key="InvoiceNumber")
+
+        assert calls == [["a", "b"]]
+        assert sorted(result["failed"]) == ["a", "b"] and result["created"] == {}
+
+    def test_throttle_returns_unsent_references(self):
+        def put(chunk, summarize_errors=True):
+            raise XeroThrottled(42.0, "minute")
+
+        result = XeroBulkWriter(FakeXeroAPI(put), chunk_size=2, max_workers=1).put(
+            "invoices", [_invoice("a"), _invoice("b"), _invoice("c")], reference_key="InvoiceNumber")
+
+        assert result["created"] == {} and result["failed"] == {}
+        assert sorted(result["unsent"]) == ["a", "b", "c"]
+        assert result["retry_after"] == 42.0
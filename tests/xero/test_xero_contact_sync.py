@@ -0,0 +1,158 @@
+# test_xero_contact_sync.py
+import contextlib
+import datetime
+import pytest
+from unittest.mock import MagicMock
+from files_budget.vendor_resolver import normalize_vendor_name
+from files_xero import xero_contact_sync, xero_services
+from files_xero.xero_api import xero_api
+from files_xero.xero_services import XeroServices
+from files_xero.xero_sync_watermark import updated_date_utc
+
+
+class FakeDb:
+    """
+    Contacts table in memory with the bulk operations the sync engine uses.
+    """
+
+    def __init__(self, contacts):
+        self.contacts = [dict(c, id=i) for i, c in enumerate(contacts, start=1)]
+
+    def search_contacts(self, column_names=None, values=None, session=None):
+        contacts = [dict(c) for c in self.contacts]
+        for column, wanted in zip(column_names or [], values or []):
+            contacts = [c for c in contacts if c.get(column) in wanted]
+        return contacts
+
+    def bulk_update_mappings(self, model, mappings, session=None):
+        by_id = {c['id']: c for c in self.contacts}
+        for mapping in mappings:
+            by_id[mapping['id']].update(mapping)
+        return len(mappings)
+
+    def create_many(self, items, session=None):
+        """VendorResolver.create_many against this table (unique on the normalized name)."""
+        result = {}
+        for item in items:
+            normalized = normalize_vendor_name(item['name'])
+            existing = next((c for c in self.contacts if normalize_vendor_name(c['name']) == normalized), None)
+            if existing is None:
+                self.contacts.append(dict(item, id=len(self.contacts) + 1))
+                result.setdefault(normalized, (self.contacts[-1]['id'], True))
+            else:
+                result.setdefault(normalized, (existing['id'], False))
+        return result
+
+
+class FakeWatermarks:
+    overlap = datetime.timedelta(seconds=5)
+
+    def __init__(self):
+        self.rows = {}
+
+    def get(self, entity, session=None):
+        return self.rows.get(entity)
+
+    def advance(self, entity, records, full=False, session=None):
+        newest = max((d for d in map(updated_date_utc, records) if d), default=None)
+        row = self.rows.setdefault(entity, {'modified_since': newest})
+        row['modified_since'] = max(filter(None, [row['modified_since'], newest]), default=None)
+        row['full'] = full
+
+    def reset(self, entity, session=None):
+        self.rows.pop(entity, None)
+
+
+class TestXeroContactSync:
+    @pytest.fixture(autouse=True)
+    def setup_sync(self, monkeypatch, xero_emulator):
+        self.server = xero_emulator
+        self.clock = xero_emulator.clock
+        # Creates and updates are pushed side by side
+        monkeypatch.setattr(self.server, 'concurrent_limit', 10)
+        monkeypatch.setattr(xero_api.rate_governor, 'concurrent_limit', 10)
+        monkeypatch.setattr(xero_contact_sync, 'get_db_session', lambda: contextlib.nullcontext(MagicMock()))
+
+        self.services = XeroServices()
+        self.db = FakeDb([{'name': 'Vendor 7', 'xero_id': None}, {'name': 'Local Only', 'xero_id': None}])
+        self.watermarks = FakeWatermarks()
+        monkeypatch.setattr(self.services, 'db_ops', self.db)
+        monkeypatch.setattr(xero_contact_sync, 'vendor_resolver', self.db)
+        monkeypatch.setattr(xero_services, 'vendor_resolver', self.db)
+        monkeypatch.setattr(self.services, 'sync_watermarks', self.watermarks)
+        monkeypatch.setattr(self.services, 'xero_api', xero_api)
+
+    def test_interrupted_reconcile_resumes_from_checkpoint(self):
+        # Three pages of Xero contacts, each modified 10s after the previous page
+        for page in range(3):
+            self.server.seed('Contacts', [{'Name': f'Vendor {page * 100 + i}'} for i in range(100 if page < 2 else 50)])
+            self.clock.advance(10)
+        self.server.fail_next = [None, None, 500]  # page 3 fails
+
+        first = self.services.contact_sync.reconcile()
+
+        assert first['error'] and first['pulled'] == 200 and first['linked'] == 1
+        assert self.services.contact_sync.interrupted()
+        assert 'contacts' not in self.watermarks.rows
+
+        second = self.services.contact_sync.reconcile()
+
+        # Only the last checkpointed page (overlap) and the missing one are pulled again
+        assert second['resumed'] and second['pulled'] == 150 and second['error'] is None
+        assert second['created_xero'] == 1 and not self.services.contact_sync.interrupted()
+        assert self.watermarks.rows['contacts']['full'] is True
+        local = {c['name']: c['xero_id'] for c in self.db.contacts}
+        assert len(local) == 251 and all(local.values())
+        assert len(self.server.records('Contacts')) == 251
+
+    def test_push_creates_and_updates_concurrently(self):
+        existing = self.server.seed('Contacts', [{'Name': 'Known'}])[0]
+        contacts = [{'id': 1, 'name': 'Brand New', 'xero_id': None},
+                    {'id': 2, 'name': 'Known', 'xero_id': existing['ContactID'], 'email': 'ap@known.test'}]
+        self.db.contacts = [dict(c) for c in contacts]
+
+        result = self.services.execute_batch_upsert_contacts(contacts)
+
+        assert (result['created'], result['updated'], result['failed']) == (1, 1, {})
+        assert self.db.contacts[0]['xero_id']
+        stored = {c['Name']: c for c in self.server.records('Contacts')}
+        assert stored['Known']['EmailAddress'] == 'ap@known.test'
+        assert {r['method'] for r in self.server.requests} == {'PUT', 'POST'}
+
+    def test_merge_matches_normalized_names_and_links_concurrent_inserts(self):
+        self.server.seed('Contacts', [{'Name': 'vendor   7'}, {'Name': 'Acme Ltd'}, {'Name': 'Brand New'}])
+        sync = self.services.contact_sync
+        db_by_name = sync.by_name(self.db.search_contacts())
+        # Another worker inserted "ACME  LTD" after the snapshot was taken
+        self.db.contacts.append({'id': 3, 'name': 'ACME  LTD', 'xero_id': None})
+
+        linked, created = sync.merge(self.server.records('Contacts'), db_by_name, MagicMock())
+
+        assert (linked, created) == (2, 1)
+        local = {c['name']: c['xero_id'] for c in self.db.contacts}
+        assert len(local) == 4 and local['Vendor 7'] and local['ACME  LTD'] and local['Brand New']
+
+    def test_failed_merge_does_not_advance_checkpoint(self, monkeypatch):
+        self.server.seed('Contacts', [{'Name': 'Brand New'}])
+
+        def fail(items, session=None):
+            raise RuntimeError('unique violation')
+        monkeypatch.setattr(self.db, 'create_many', fail)
+
+        with pytest.raises(RuntimeError):
+            self.services.contact_sync.reconcile()
+
+        assert not self.services.contact_sync.interrupted()
+
+    def test_spend_money_contacts_resolve_by_normalized_name(self):
+        self.db.contacts.append({'id': 3, 'name': 'Linked Vendor', 'xero_id': 'x-old'})
+        rows = [{'_contact_xero_id': 'x-7', '_contact_name': 'VENDOR  7'},
+                {'_contact_xero_id': 'x-linked', '_contact_name': 'linked vendor'},
+                {'_contact_xero_id': 'x-new', '_contact_name': 'Brand New'}]
+
+        contact_ids = self.services._resolve_spend_money_contacts(rows, MagicMock())
+
+        assert contact_ids == {'x-7': 1, 'x-linked': 3, 'x-new': 4}
+        local = {c['name']: c['xero_id'] for c in self.db.contacts}
+        # An unlinked match is linked; one already linked elsewhere keeps its Xero ID
+        assert local == {'Vendor 7': 'x-7', 'Local Only': None, 'Linked Vendor': 'x-old', 'Brand New': 'x-new'}
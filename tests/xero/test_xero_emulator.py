@@ -0,0 +1,57 @@
+# test_xero_emulator.py
+import pytest
+from datetime import datetime
+from files_xero.xero_api import xero_api
+from files_xero.xero_rate_governor import XeroThrottled
+
+
+class TestXeroEmulator:
+    @pytest.fixture(autouse=True)
+    def setup_emulator(self, xero_emulator):
+        self.server = xero_emulator
+        self.clock = xero_emulator.clock
+
+    def test_bill_search_filters_and_honours_since(self):
+        vendor = self.server.seed('Contacts', [{'Name': 'Vendor'}])[0]
+        contact = {'ContactID': vendor['ContactID']}
+        self.server.seed('Invoices', [{'Type': 'ACCPAY', 'InvoiceNumber': f'2416_1_{i}', 'Contact': contact}
+                                      for i in range(3)] +
+                         [{'Type': 'ACCPAY', 'InvoiceNumber': '9999_1_1', 'Contact': contact},
+                          {'Type': 'ACCREC', 'InvoiceNumber': '2416_9_9', 'Contact': contact}])
+
+        assert sorted(b['InvoiceNumber'] for b in xero_api.get_bills_by_reference('2416_')) == [
+            '2416_1_0', '2416_1_1', '2416_1_2']
+
+        since = self.clock.time()
+        self.clock.advance(10)
+        self.server.seed('Invoices', [{'Type': 'ACCPAY', 'InvoiceNumber': '2416_1_3', 'Contact': contact}])
+        changed = xero_api.get_bills_by_reference('2416_', since=datetime.utcfromtimestamp(since + 1))
+
+        assert [b['InvoiceNumber'] for b in changed] == ['2416_1_3']
+        assert self.server.requests[-2]['if_modified_since']
+
+    def test_bulk_push_reports_per_element_errors(self):
+        payloads = [{'Type': 'ACCPAY', 'InvoiceNumber': f'2416_1_{i}', 'Contact': {'Name': 'Vendor'},
+                     'LineItems': [{'Description': 'Camera', 'Quantity': 1, 'UnitAmount': 10}]}
+                    for i in range(120)]
+        del payloads[7]['Contact']
+
+        result = xero_api.create_invoice_bulk(payloads)
+
+        assert len(result['created']) == 119
+        assert list(result['failed']) == ['2416_1_7']
+        assert len(self.server.records('Invoices')) == 119
+        assert len(self.server.records('Contacts')) == 1
+        puts = [r for r in self.server.requests if r['method'] == 'PUT']
+        assert len(puts) == 3 and all(r['params']['summarizeErrors'] == 'false' for r in puts)
+
+    def test_minute_limit_returns_retry_after(self):
+        self.server.minute_limit = 2
+        xero_api.get_all_contacts()
+        xero_api.get_all_contacts()
+
+        with pytest.raises(XeroThrottled) as excinfo:
+            xero_api._retry_on_unauthorized(xero_api.xero.contacts.all)
+
+        assert excinfo.value.retry_after == 60
+        assert len(self.server.requests) == 3
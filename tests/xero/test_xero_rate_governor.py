@@ -0,0 +1,75 @@
+# test_xero_rate_governor.py
+import pytest
+from files_xero.xero_rate_governor import xero_rate_governor, MemoryStateStore, FakeClock, XeroThrottled
+
+
+class FakeResponse:
+    def __init__(self, headers):
+        self.headers = headers
+
+
+class TestXeroRateGovernor:
+    @pytest.fixture(autouse=True)
+    def setup_governor(self, monkeypatch):
+        self.clock = FakeClock()
+        self.governor = xero_rate_governor
+        monkeypatch.setattr(self.governor, 'store', MemoryStateStore())
+        monkeypatch.setattr(self.governor, 'clock', self.clock)
+        monkeypatch.setattr(self.governor, 'minute_limit', 60)
+        monkeypatch.setattr(self.governor, 'concurrent_limit', 5)
+        monkeypatch.setattr(self.governor, 'daily_limit', 5000)
+        monkeypatch.setattr(self.governor, 'max_inline_wait', 5.0)
+
+    def _call(self):
+        with self.governor.slot():
+            pass
+
+    def test_minute_bucket_allows_burst_then_spaces_calls(self):
+        for _ in range(60):
+            self._call()
+        assert self.clock.sleeps == []
+
+        self._call()
+        # 61st call in the same minute waits for the next emitted slot (60s / 60 calls)
+        assert self.clock.sleeps == [pytest.approx(1.0)]
+
+    def test_far_slot_raises_instead_of_sleeping(self):
+        self.governor.observe({'X-MinLimit-Remaining': '0'})
+
+        with pytest.raises(XeroThrottled) as excinfo:
+            self.governor.slot(max_wait=0.5).__enter__()
+        assert excinfo.value.reason == 'minute'
+        assert excinfo.value.retry_after == pytest.approx(1.0)
+        assert self.clock.sleeps == []
+
+    def test_retry_after_blocks_every_caller(self):
+        assert self.governor.throttled(FakeResponse({'Retry-After': '30'})) == 30
+
+        with pytest.raises(XeroThrottled) as excinfo:
+            self._call()
+        assert excinfo.value.reason == 'retry-after'
+
+        self.clock.advance(30)
+        self._call()
+
+    def test_daily_quota_defers_to_midnight(self):
+        self.governor.observe({'X-DayLimit-Remaining': '0'})
+
+        with pytest.raises(XeroThrottled) as excinfo:
+            self._call()
+        assert excinfo.value.reason == 'day'
+        assert 0 < excinfo.value.retry_after <= 86400
+
+    def test_concurrent_leases_are_released(self):
+        held = [self.governor.slot() for _ in range(5)]
+        for slot in held:
+            slot.__enter__()
+
+        with pytest.raises(XeroThrottled) as excinfo:
+            self.governor.slot(max_wait=0).__enter__()
+        assert excinfo.value.reason == 'concurrent'
+
+        held[0].__exit__(None, None, None)
+        self._call()
+        for slot in held[1:]:
+            slot.__exit__(None, None, None)
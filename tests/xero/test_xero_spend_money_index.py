@@ -0,0 +1,43 @@
+# test_xero_spend_money_index.py
+import contextlib
+import pytest
+from unittest.mock import MagicMock
+from sqlalchemy.dialects import postgresql
+from files_xero import xero_spend_money_index as index_module
+from files_xero.xero_spend_money_index import xero_spend_money_index, reference_key
+
+
+def _tx(n, reference):
+    return {"BankTransactionID": f"bt-{n}", "Reference": reference, "Status": "AUTHORISED", "IsReconciled": False,
+            "Contact": {"ContactID": "c-1", "Name": "Vendor"}, "Total": 10.0}
+
+
+class TestXeroSpendMoneyIndex:
+    @pytest.fixture(autouse=True)
+    def setup_index(self, monkeypatch):
+        self.session = MagicMock()
+        self.xero_api = MagicMock()
+        self.watermarks = MagicMock()
+        monkeypatch.setattr(index_module, 'get_db_session', lambda: contextlib.nullcontext(self.session))
+        monkeypatch.setattr(xero_spend_money_index, 'xero_api', self.xero_api)
+        monkeypatch.setattr(xero_spend_money_index, 'watermarks', self.watermarks)
+
+    def test_reference_key(self):
+        assert reference_key("2416_4_5") == (2416, 4, 5, 1)
+        assert reference_key("2416_04_05_2") == (2416, 4, 5, 2)
+        assert reference_key("Petty cash") is None and reference_key(None) is None
+
+    def test_incremental_refresh_pages_and_upserts(self):
+        self.watermarks.since.return_value = "since"
+        pages = [[_tx(i, f"2416_1_{i}") for i in range(100)], [_tx(100, "not a reference")]]
+        self.xero_api.get_spend_money_page.side_effect = lambda page, since=None: pages[page - 1]
+
+        summary = xero_spend_money_index.refresh()
+
+        assert summary == {"mode": "incremental", "fetched": 101, "removed": 0}
+        assert [c.args[0] for c in self.xero_api.get_spend_money_page.call_args_list] == [1, 2]
+        assert self.watermarks.advance.call_count == 2
+        last_upsert = self.session.execute.call_args.args[0].compile(dialect=postgresql.dialect()).params
+        assert last_upsert["bank_transaction_id_m0"] == "bt-100" and last_upsert["project_number_m0"] is None
+        # Incremental passes never prune the index
+        self.session.query.assert_not_called()
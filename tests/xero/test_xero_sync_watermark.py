@@ -0,0 +1,37 @@
+# test_xero_sync_watermark.py
+import datetime
+import pytest
+from files_xero.xero_sync_watermark import xero_sync_watermarks, updated_date_utc
+
+
+class TestXeroSyncWatermark:
+    @pytest.fixture(autouse=True)
+    def setup_store(self, monkeypatch):
+        self.store = xero_sync_watermarks
+        self.watermark = None
+        monkeypatch.setattr(self.store, 'get', lambda entity, session=None: self.watermark)
+        monkeypatch.setattr(self.store, 'full_reconcile_interval', datetime.timedelta(hours=24))
+        monkeypatch.setattr(self.store, 'overlap', datetime.timedelta(minutes=5))
+
+    def test_first_run_is_full(self):
+        assert self.store.since('bills:2416') is None
+
+    def test_recent_full_sync_gives_since_with_overlap(self):
+        modified = datetime.datetime(2024, 3, 1, 12, 0)
+        self.watermark = {'modified_since': modified,
+                          'last_full_sync_at': datetime.datetime.utcnow() - datetime.timedelta(hours=1)}
+
+        assert self.store.since('bills:2416') == modified - datetime.timedelta(minutes=5)
+
+    def test_stale_full_sync_forces_reconcile(self):
+        self.watermark = {'modified_since': datetime.datetime(2024, 3, 1),
+                          'last_full_sync_at': datetime.datetime.utcnow() - datetime.timedelta(hours=25)}
+
+        assert self.store.since('bills:2416') is None
+
+    def test_updated_date_utc_normalises_to_naive_utc(self):
+        aware = datetime.datetime(2024, 3, 1, 14, 0, tzinfo=datetime.timezone(datetime.timedelta(hours=2)))
+
+        assert updated_date_utc({'UpdatedDateUTC': aware}) == datetime.datetime(2024, 3, 1, 12, 0)
+        assert updated_date_utc({'UpdatedDateUTC': '2024-03-01T12:00:00Z'}) == datetime.datetime(2024, 3, 1, 12, 0)
+        assert updated_date_utc({}) is None
@@ -0,0 +1,97 @@
+# test_xero_token_broker.py
+import json
+import pytest
+import redis
+from files_xero.xero_rate_governor import FakeClock, MemoryStateStore
+from files_xero.xero_token_broker import xero_token_broker
+
+
+class FakeCredentials:
+    """
+    The parts of OAuth2Credentials the broker uses; `refresh` counts calls.
+    """
+
+    def __init__(self, token, tenant_id=None):
+        self.token = token
+        self.tenant_id = tenant_id
+        self.refreshes = 0
+
+    def _init_oauth(self, token):
+        self.token = token
+
+    def refresh(self):
+        self.refreshes += 1
+        self._init_oauth({'access_token': f"{self.token['refresh_token']}-access",
+                          'refresh_token': f"{self.token['refresh_token']}+1",
+                          'expires_at': xero_token_broker.clock.time() + 1800})
+        return self.token
+
+    def get_tenants(self):
+        return [{'tenantId': 'tenant-1'}]
+
+
+class TestXeroTokenBroker:
+    @pytest.fixture(autouse=True)
+    def setup_broker(self, monkeypatch):
+        self.clock = FakeClock()
+        self.store = MemoryStateStore()
+        monkeypatch.setattr(xero_token_broker, 'store', self.store)
+        monkeypatch.setattr(xero_token_broker, 'clock', self.clock)
+        monkeypatch.setattr(xero_token_broker, 'refresh_margin', 300)
+
+    def _token(self, access, refresh, expires_in):
+        return {'access_token': access, 'refresh_token': refresh, 'expires_at': self.clock.time() + expires_in}
+
+    def test_only_one_worker_refreshes(self):
+        seed = self._token('a0', 'r0', 60)
+        first, second = FakeCredentials(dict(seed)), FakeCredentials(dict(seed))
+
+        xero_token_broker.install(first)
+        xero_token_broker.install(second)
+
+        assert (first.refreshes, second.refreshes) == (1, 0)
+        assert second.token == first.token and second.token['refresh_token'] == 'r0+1'
+        assert second.tenant_id == 'tenant-1'
+
+    def test_rejected_token_already_replaced_is_adopted(self):
+        xero_token_broker.publish(self._token('a1', 'r1', 1800), 'tenant-1')
+        stale = FakeCredentials(self._token('a0', 'r0', 1800))
+
+        xero_token_broker.install(stale, rejected_access_token='a0')
+        assert stale.refreshes == 0 and stale.token['access_token'] == 'a1'
+
+        xero_token_broker.install(stale, rejected_access_token='a1')
+        assert stale.refreshes == 1 and stale.token['refresh_token'] == 'r1+1'
+
+    def test_waits_for_lock_holder(self):
+        xero_token_broker.publish(self._token('a0', 'r0', 60))
+        holder = self.clock.time() + 10
+
+        def locked(state):
+            state.update(lock_owner='other', lock_until=holder)
+            return None, state
+        self.store.transact(xero_token_broker.key, locked)
+        waiter = FakeCredentials(self._token('a0', 'r0', 60))
+
+        xero_token_broker.install(waiter)
+
+        # Lease expired without a new token, so the waiter took over the refresh
+        assert self.clock.time() >= holder and waiter.refreshes == 1
+        state = self.store.transact(xero_token_broker.key, lambda s: (s, s))
+        assert json.loads(state['token'])['refresh_token'] == 'r0+1' and 'lock_owner' not in state
+
+    def test_failed_publish_does_not_refresh_twice(self, monkeypatch):
+        credentials = FakeCredentials(self._token('a0', 'r0', 60))
+        transact = self.store.transact
+        calls = []
+
+        def flaky(key, fn):
+            calls.append(key)
+            if len(calls) > 1:
+                raise redis.ConnectionError('redis went away')
+            return transact(key, fn)
+        monkeypatch.setattr(self.store, 'transact', flaky)
+
+        token = xero_token_broker.install(credentials)
+
+        assert credentials.refreshes == 1 and token['refresh_token'] == 'r0+1'